@@ -1,28 +1,116 @@
 """
 Campaign Orchestrator Lambda
 Main entry point for campaign post generation, triggered by EventBridge Scheduler.
+The same code runs as post-worker (worker_handler), consuming the per-post jobs
+the orchestrator queues when a campaign uses queue dispatch, and as
+batch-collector (batch_handler), storing the posts of a provider batch
+submitted in batch dispatch.
 """
 
+import asyncio
 import json
+import math
 import os
+import threading
+import time
 import uuid
-from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
 from typing import Any
 
 import boto3
-from supabase import create_client
-
-# Initialize clients
-supabase = create_client(
-    os.environ["SUPABASE_URL"],
-    os.environ["SUPABASE_SERVICE_KEY"]
-)
-lambda_client = boto3.client("lambda")
+from botocore.config import Config
+
+from meroka_common import config_cache, db, llm_router, near_duplicates, schedules
+from meroka_common.prompt_budget import budget_for
+from meroka_common.tracing import set_execution_id, span, trace, traced_handler
+from meroka_common.voice_profile import resolve_profile, use_profile
+
+# Pre-warm (see prewarm): at most PREWARM_MAX_CONCURRENCY warm-up invocations in
+# flight, each holding its container PREWARM_HOLD_MS so they land on separate
+# containers. POST_WORKER_MAX_CONCURRENCY mirrors post-worker's SQS event
+# source MaximumConcurrency in template.yaml.
+PREWARM_MAX_CONCURRENCY = int(os.environ.get("PREWARM_MAX_CONCURRENCY", "100"))
+PREWARM_HOLD_MS = float(os.environ.get("PREWARM_HOLD_MS", "200"))
+POST_WORKER_MAX_CONCURRENCY = int(os.environ.get("POST_WORKER_MAX_CONCURRENCY", "10"))
+
+# Initialize clients (the lambda client's pool fits a full pre-warm)
+lambda_client = boto3.client("lambda", config=Config(max_pool_connections=PREWARM_MAX_CONCURRENCY))
 sfn_client = boto3.client("stepfunctions")
+sqs_client = boto3.client("sqs")
 
 COMPLEX_WORKFLOW_ARN = os.environ.get("COMPLEX_WORKFLOW_ARN")
+BATCH_WORKFLOW_ARN = os.environ.get("BATCH_WORKFLOW_ARN")
+
+# "inline" runs every post in this invocation; "queue" enqueues one job per post
+# for post-worker; "batch" submits the run to the provider's batch API (simple
+# workflow, OpenAI models). Campaigns override with workflow_config.dispatch.
+DISPATCH_MODE = os.environ.get("DISPATCH_MODE", "inline")
+POST_JOBS_QUEUE_URL = os.environ.get("POST_JOBS_QUEUE_URL")
+SQS_MAX_BATCH = 10
+
+# Jobs run concurrently within one post-worker batch. The threads outlive the
+# invocation so each keeps its db event loop and connection pool warm.
+WORKER_CONCURRENCY = int(os.environ.get("WORKER_CONCURRENCY", "5"))
+worker_pool = ThreadPoolExecutor(max_workers=WORKER_CONCURRENCY, thread_name_prefix="post-job")
+
+# Receives before a failing job is dead-lettered (PostJobsQueue's maxReceiveCount)
+POST_JOB_MAX_RECEIVES = int(os.environ.get("POST_JOB_MAX_RECEIVES", "3"))
+
+# Employees per provider batch, and serialized bytes of its submit payload
+# (one context per employee plus its requests), which must stay under Lambda's
+# 6 MB synchronous invoke limit
+BATCH_MAX_EMPLOYEES = int(os.environ.get("BATCH_MAX_EMPLOYEES", "500"))
+BATCH_MAX_PAYLOAD_BYTES = int(os.environ.get("BATCH_MAX_PAYLOAD_BYTES", str(5 * 1024 * 1024)))
+BATCH_DEFAULT_MODEL = "gpt-4o"
+
+# Providers tried per simple-workflow post: a failed call fails over to the
+# next best provider the campaign allows
+LLM_MAX_ATTEMPTS = int(os.environ.get("LLM_MAX_ATTEMPTS", "2"))
+
+# Length of the schedule window a run fills (see slot_window). Keep it shorter
+# than the gap between a campaign's schedules, or a later run finds its slots
+# filled; campaigns override with workflow_config.slot_window_hours
+SLOT_WINDOW_HOURS = float(os.environ.get("SLOT_WINDOW_HOURS", "1"))
 
+# Sweep mode (see sweep). A campaign is due until its deadline,
+# workflow_config.deadline_minutes (default SWEEP_DEADLINE_MINUTES) after its
+# last scheduled run; posts one sweep defers are picked up by the next. At most
+# SWEEP_MAX_CONCURRENCY inline posts and complex workflows run at once (a
+# complex workflow until its execution ends, checked every SWEEP_POLL_SECONDS;
+# queued and batched posts run under post-worker's and the provider's limits),
+# a sweep spends at most SWEEP_TOKEN_BUDGET tokens (0: no limit) and no post
+# starts after SWEEP_MAX_SECONDS, so sweeps five minutes apart don't overlap.
+# Until a post reports its usage it is charged its prompt budget plus
+# SWEEP_OUTPUT_TOKENS per call.
+SWEEP_DEADLINE_MINUTES = float(os.environ.get("SWEEP_DEADLINE_MINUTES", "60"))
+SWEEP_MAX_CONCURRENCY = int(os.environ.get("SWEEP_MAX_CONCURRENCY", "20"))
+SWEEP_TOKEN_BUDGET = int(os.environ.get("SWEEP_TOKEN_BUDGET", "0"))
+SWEEP_OUTPUT_TOKENS = int(os.environ.get("SWEEP_OUTPUT_TOKENS", "600"))
+SWEEP_MAX_SECONDS = float(os.environ.get("SWEEP_MAX_SECONDS", "240"))
+SWEEP_POLL_SECONDS = float(os.environ.get("SWEEP_POLL_SECONDS", "5"))
+SWEEP_POLL_MAX_ERRORS = 3
+sweep_pool = ThreadPoolExecutor(max_workers=SWEEP_MAX_CONCURRENCY, thread_name_prefix="sweep-job")
 
+# Queued, batched and complex posts are recorded in post_dispatches when they
+# are handed off, and sweeps leave their slots alone until the dispatch reports
+# failure or this many minutes pass: a queued job's visibility timeout times
+# its receives, a provider batch's 24h completion window plus collection, and
+# a complex workflow's longest run.
+DISPATCH_TTL_MINUTES = {"queue": 90, "batch": 25 * 60, "complex": 30}
+
+
+def warm() -> None:
+    """Create the db client/pool before the first query (warm-up events)."""
+    db.run(db.warm())
+
+
+def warm_workers() -> None:
+    """warm() on the post-job threads (best effort: the pool picks the threads)."""
+    list(worker_pool.map(lambda _: warm(), range(WORKER_CONCURRENCY)))
+
+
+@traced_handler("campaign-orchestrator", warm=warm)
 def lambda_handler(event: dict, context: Any) -> dict:
     """
     Main handler for campaign orchestration.
@@ -30,26 +118,47 @@ def lambda_handler(event: dict, context: Any) -> dict:
     Event structure:
     {
         "campaign_id": "uuid",
-        "trigger": "scheduled" | "manual"
+        "trigger": "scheduled" | "manual",
+        "scheduled_time": "2026-10-19T09:00:00Z",  # optional; EventBridge Scheduler's
+        "slot_window": "20261019T0000Z",           # optional; overrides scheduled_time
+        "prewarm": true                            # optional; only warm the run's functions
     }
+
+    {"sweep": true, "scheduled_time": "..."} runs every due campaign instead
+    (see sweep).
+
+    Each post fills a slot (see slot_key). Slots already filled in this
+    schedule window, by an earlier or partially failed run, are skipped
+    before any LLM is called, so re-invoking a run only generates what is
+    missing. So are slots a queue, batch or complex dispatch of an earlier
+    run still holds (see post_dispatches). Without "scheduled_time", a
+    campaign with a schedule_cron runs for its last scheduled time within
+    its deadline, as a sweep would.
+
+    With "prewarm", the functions the campaign's run will invoke are warmed
+    to its expected concurrency and nothing is generated; schedule it a few
+    minutes ahead of the campaign. workflow_config.prewarm does the same at
+    the start of every run, before its burst.
     """
+    if event.get("sweep"):
+        return sweep(event, context)
+
     campaign_id = event.get("campaign_id")
     trigger = event.get("trigger", "scheduled")
-    execution_id = f"exec_{datetime.utcnow().strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:8]}"
+    execution_id = new_execution_id()
+    set_execution_id(execution_id)
 
     print(f"Starting execution {execution_id} for campaign {campaign_id}")
 
     try:
-        # 1. Fetch campaign configuration
-        campaign = fetch_campaign(campaign_id)
+        # 1-2. Fetch campaign configuration and assigned employees together
+        campaign, employees = db.run(load_campaign(campaign_id))
         if not campaign:
             return {"error": f"Campaign {campaign_id} not found"}
 
         if campaign["status"] != "active":
             return {"error": f"Campaign {campaign_id} is not active"}
 
-        # 2. Fetch assigned employees
-        employees = fetch_campaign_employees(campaign_id)
         if not employees:
             return {"error": f"No employees assigned to campaign {campaign_id}"}
 
@@ -58,40 +167,70 @@ def lambda_handler(event: dict, context: Any) -> dict:
         # 3. Determine workflow type
         workflow_type = campaign.get("workflow_type", "simple")
         posts_per_employee = campaign.get("posts_per_employee", 3)
+        dispatch = (campaign.get("workflow_config") or {}).get("dispatch", DISPATCH_MODE)
 
-        # 4. Process each employee
-        results = []
-        for employee in employees:
-            for post_num in range(posts_per_employee):
-                post_execution_id = f"{execution_id}_emp{employee['user_id'][:8]}_p{post_num}"
-
-                if workflow_type == "complex":
-                    result = trigger_complex_workflow(
-                        campaign_id=campaign_id,
-                        employee_id=employee["user_id"],
-                        execution_id=post_execution_id,
-                        campaign=campaign
-                    )
-                else:
-                    result = run_simple_workflow(
-                        campaign_id=campaign_id,
-                        employee_id=employee["user_id"],
-                        execution_id=post_execution_id,
-                        campaign=campaign
-                    )
-
-                results.append(result)
+        if event.get("prewarm"):
+            warmed = prewarm(prewarm_plan(campaign, len(employees) * posts_per_employee, dispatch))
+            return {"execution_id": execution_id, "campaign_id": campaign_id, "prewarm": warmed}
 
-        # 5. Log execution summary
-        log_execution_summary(execution_id, campaign_id, results)
+        # 4. One job per (employee, post), skipping slots this window already
+        # filled and slots an earlier dispatch is still generating
+        if not event.get("scheduled_time") and campaign.get("schedule_cron"):
+            scheduled = last_scheduled_time(campaign, datetime.now(timezone.utc))
+            if scheduled is not None:
+                event = {**event, "scheduled_time": scheduled.isoformat()}
+        window = slot_window(event, campaign.get("workflow_config") or {})
+        filled, dispatched = db.run(load_window_slots(f"{campaign_id}:{window}:"))
+        planned, skipped = plan_jobs(execution_id, campaign, employees, window, filled)
+        jobs = [job for job in planned if job["slot_key"] not in dispatched]
+        in_flight = len(planned) - len(jobs)
+        if skipped or in_flight:
+            print(f"Skipping {skipped} posts already generated and {in_flight} still in flight "
+                  f"in slot window {window}")
 
-        return {
+        summary = {
             "execution_id": execution_id,
             "campaign_id": campaign_id,
             "employees_processed": len(employees),
-            "posts_triggered": len(results),
+            "slot_window": window,
+            "posts_skipped": skipped,
+            "posts_in_flight": in_flight,
             "workflow_type": workflow_type
         }
+        if not jobs:
+            log_execution_summary(execution_id, campaign_id, [], skipped=skipped, in_flight=in_flight)
+            return {**summary, "posts_triggered": 0}
+
+        if (campaign.get("workflow_config") or {}).get("prewarm"):
+            summary["prewarm"] = prewarm(prewarm_plan(campaign, len(jobs), dispatch))
+
+        if dispatch == "batch":
+            batches = submit_batches(execution_id, campaign, jobs, window)
+            submitted = sum(b["requests"] for b in batches)
+            log_dispatch_summary(execution_id, campaign_id, submitted, dispatch="batch",
+                                 batch_ids=[b["batch_id"] for b in batches], skipped=skipped,
+                                 in_flight=in_flight)
+            return {
+                **summary,
+                "posts_submitted": submitted,
+                "batch_ids": [b["batch_id"] for b in batches],
+                "dispatch": "batch"
+            }
+
+        if dispatch == "queue":
+            enqueued = enqueue_jobs(jobs)
+            log_dispatch_summary(execution_id, campaign_id, enqueued, skipped=skipped, in_flight=in_flight)
+            return {**summary, "posts_enqueued": enqueued, "dispatch": "queue"}
+
+        results = [run_job(job) for job in jobs]
+
+        # 5. Log execution summary
+        log_execution_summary(execution_id, campaign_id, results, skipped=skipped, in_flight=in_flight)
+        if workflow_type != "complex":
+            config_cache.log_config_cache_stats()
+            llm_router.log_router_stats()
+
+        return {**summary, "posts_triggered": len(results)}
 
     except Exception as e:
         print(f"Error in orchestrator: {str(e)}")
@@ -99,41 +238,856 @@ def lambda_handler(event: dict, context: Any) -> dict:
         raise
 
 
-def fetch_campaign(campaign_id: str) -> dict | None:
-    """Fetch campaign configuration from Supabase."""
-    response = supabase.table("campaigns").select("*").eq("id", campaign_id).single().execute()
-    return response.data
+@traced_handler("post-worker", warm=warm_workers)
+def worker_handler(event: dict, context: Any) -> dict:
+    """
+    Consume post jobs queued by the orchestrator (SQS event source).
+
+    Jobs in a batch run concurrently, up to WORKER_CONCURRENCY. Failed jobs are
+    returned as batchItemFailures (ReportBatchItemFailures), so only they go
+    back to the queue; after the queue's maxReceiveCount they land in the
+    dead-letter queue.
+    """
+    records = event.get("Records", [])
+    outcomes = list(worker_pool.map(run_queued_job, records))
 
+    failures = [
+        {"itemIdentifier": record["messageId"]}
+        for record, ok in zip(records, outcomes) if not ok
+    ]
+    print(json.dumps({"post_worker": {"jobs": len(records), "failed": len(failures)}}))
+    config_cache.log_config_cache_stats()
+    llm_router.log_router_stats()
+    return {"batchItemFailures": failures}
 
-def fetch_campaign_employees(campaign_id: str) -> list[dict]:
-    """Fetch employees assigned to this campaign."""
-    response = (
-        supabase.table("campaign_employees")
-        .select("user_id, users(id, email, name)")
-        .eq("campaign_id", campaign_id)
-        .eq("is_active", True)
-        .execute()
+
+@traced_handler("batch-collector", warm=warm)
+def batch_handler(event: dict, context: Any) -> dict:
+    """
+    Tasks of the batch workflow, which polls a provider batch until it ends.
+
+    Actions:
+    - collect (default): Store the finished batch's posts
+    - log_error: Log a batch that failed or could not be collected
+    """
+    action = event.get("action", "collect")
+
+    if action == "collect":
+        return collect_batch(event)
+    elif action == "log_error":
+        log_error(event["execution_id"], event["campaign_id"],
+                  f"Batch {event.get('batch_id')} failed: {json.dumps(event.get('details'), default=str)}")
+        if event.get("batch_id"):
+            fail_dispatches(batch_id=event["batch_id"])
+        return {"logged": True}
+    else:
+        return {"error": f"Unknown action: {action}"}
+
+
+def run_queued_job(record: dict) -> bool:
+    """Run the job in one SQS record; False if it should be retried."""
+    job = None
+    try:
+        job = json.loads(record["body"])
+        if run_job(job).get("success", True):
+            return True
+    except Exception as e:
+        # A redelivered complex job whose execution already started is done
+        if "ExecutionAlreadyExists" in f"{type(e).__name__}: {e}":
+            return True
+        print(f"Post job {record.get('messageId')} failed: {e}")
+
+    # Its last receive: the job is dead-lettered, so a sweep may dispatch the slot again
+    receives = int((record.get("attributes") or {}).get("ApproximateReceiveCount", "1"))
+    if job and receives >= POST_JOB_MAX_RECEIVES:
+        fail_dispatches(execution_id=job["execution_id"])
+    return False
+
+
+def run_job(job: dict) -> dict:
+    """Run one post job, inline or from the queue."""
+    kwargs = {
+        "campaign_id": job["campaign_id"],
+        "employee_id": job["employee_id"],
+        "execution_id": job["execution_id"],
+        "campaign": {"workflow_config": job.get("workflow_config") or {}},
+        "slot_key": job.get("slot_key")
+    }
+    if job["workflow_type"] == "complex":
+        return trigger_complex_workflow(**kwargs)
+    return run_simple_workflow(**kwargs)
+
+
+def sweep(event: dict, context: Any) -> dict:
+    """
+    Run every due campaign in this one invocation (sweep mode).
+
+    Campaigns with a schedule_cron are due until their deadline (see
+    SWEEP_DEADLINE_MINUTES). Each gets its own execution_id, slot window (from
+    its scheduled time, so later sweeps only fill what is missing) and
+    execution or dispatch summary, as if it had been invoked on its own.
+    Slots still held by a queue, batch or complex dispatch (post_dispatches)
+    are left alone until that dispatch fails or expires, so asynchronous
+    posts are not paid for again while they run.
+
+    Their posts then share one scheduler, earliest deadline first. Inline and
+    complex posts run on sweep_pool; queue and batch campaigns are handed to
+    their dispatch with the posts admitted. Every post takes tokens from one
+    SweepBudget, and inline posts and complex workflows take one of its
+    slots, complex ones until their execution ends (those still running from
+    earlier sweeps hold theirs from the start). Campaigns with
+    workflow_config.prewarm have their functions warmed first. Posts that
+    don't fit the budget before SWEEP_MAX_SECONDS are deferred to the next
+    sweep. Campaigns also share this container's db pool, campaign config
+    cache and router health.
+    """
+    now = parse_time(event.get("scheduled_time")) or datetime.now(timezone.utc)
+    sweep_id = new_execution_id("sweep")
+    set_execution_id(sweep_id)
+    until = time.monotonic() + SWEEP_MAX_SECONDS
+
+    with span("sweep.plan") as s:
+        runs = sorted(db.run(load_due_runs(now)), key=lambda run: run["deadline"])
+        running = 0
+        for run in runs:
+            run["execution_id"] = new_execution_id()
+            jobs, run["skipped"] = plan_jobs(
+                run["execution_id"], run["campaign"], run["employees"], run["window"], run["filled"]
+            )
+            run["jobs"] = [job for job in jobs if job["slot_key"] not in run["dispatched"]]
+            run["in_flight"] = len(jobs) - len(run["jobs"])
+            # Complex workflows started by earlier sweeps keep their slots until they store
+            running += sum(1 for job in jobs if run["dispatched"].get(job["slot_key"]) == "complex")
+        if s:
+            s.set(campaigns=len(runs), posts=sum(len(run["jobs"]) for run in runs), running=running)
+
+    # Campaigns with nothing left to start write nothing
+    due, skipped, in_flight = len(runs), sum(run["skipped"] for run in runs), sum(run["in_flight"] for run in runs)
+    runs = [run for run in runs if run["jobs"]]
+    budget = SweepBudget(SWEEP_TOKEN_BUDGET, SWEEP_MAX_CONCURRENCY, running=running)
+    for run in runs:
+        dispatch_sweep_run(run, budget, until)
+
+    campaigns = [finish_sweep_run(run) for run in runs]
+    summary = {
+        "sweep_id": sweep_id,
+        "campaigns_due": due,
+        "campaigns_run": len(runs),
+        "posts_triggered": sum(c["posts_triggered"] for c in campaigns),
+        "posts_skipped": skipped,
+        "posts_in_flight": in_flight,
+        "posts_deferred": sum(c["posts_deferred"] for c in campaigns),
+        "tokens": budget.stats()
+    }
+    print(json.dumps({"sweep": summary}))
+    config_cache.log_config_cache_stats()
+    llm_router.log_router_stats()
+    return {**summary, "campaigns": campaigns}
+
+
+async def load_due_runs(now: datetime) -> list[dict]:
+    """
+    Due campaigns as runs: the campaign, its scheduled time, deadline and slot
+    window, its active employees, the slots already filled in the window and
+    the ones still held by a dispatch (slot_key -> dispatch).
+    """
+    runs = []
+    for campaign in await db.fetch_scheduled_campaigns():
+        scheduled = last_scheduled_time(campaign, now)
+        if scheduled is not None:
+            runs.append({
+                "campaign": campaign,
+                "scheduled": scheduled,
+                "deadline": scheduled + campaign_deadline(campaign),
+                "window": slot_window({"scheduled_time": scheduled.isoformat()}, campaign.get("workflow_config") or {})
+            })
+
+    employees, slots = await asyncio.gather(
+        asyncio.gather(*(db.fetch_campaign_employees(run["campaign"]["id"]) for run in runs)),
+        asyncio.gather(*(load_window_slots(f"{run['campaign']['id']}:{run['window']}:") for run in runs))
     )
-    return response.data
+    for run, run_employees, (filled, dispatched) in zip(runs, employees, slots):
+        run["employees"], run["filled"], run["dispatched"] = run_employees, filled, dispatched
+    return runs
+
+
+def campaign_deadline(campaign: dict) -> timedelta:
+    """How long after a scheduled time the campaign stays due (workflow_config.deadline_minutes)."""
+    workflow_config = campaign.get("workflow_config") or {}
+    return timedelta(minutes=float(workflow_config.get("deadline_minutes", SWEEP_DEADLINE_MINUTES)))
+
+
+def last_scheduled_time(campaign: dict, now: datetime) -> datetime | None:
+    """
+    The campaign's latest scheduled time (schedule_cron) within its deadline
+    before `now`; None if it is not due or its cron or timezone is invalid.
+    """
+    try:
+        return schedules.last_run(campaign["schedule_cron"], campaign.get("schedule_timezone"), now,
+                                  campaign_deadline(campaign))
+    except (ValueError, KeyError) as e:  # bad cron or unknown timezone
+        print(f"Ignoring schedule of campaign {campaign['id']}: {type(e).__name__}: {e}")
+        return None
+
+
+async def load_window_slots(prefix: str) -> tuple[set[str], dict[str, str]]:
+    """Slots filled in one campaign window, and the ones a dispatch still holds (slot_key -> dispatch)."""
+    filled, dispatched = await asyncio.gather(db.fetch_filled_slots(prefix), db.fetch_dispatched_slots(prefix))
+    return set(filled), {row["slot_key"]: row["dispatch"] for row in dispatched}
+
+
+def dispatch_sweep_run(run: dict, budget: "SweepBudget", until: float) -> None:
+    """
+    Pre-warm the run's functions if the campaign asks for it, then admit its
+    posts into the budget in order, deferring those that don't fit in time,
+    and start them: on sweep_pool, or through the campaign's queue or batch
+    dispatch.
+    """
+    campaign = run["campaign"]
+    workflow_config = campaign.get("workflow_config") or {}
+    run["dispatch"] = workflow_config.get("dispatch", DISPATCH_MODE)
+    pooled = run["dispatch"] not in ("queue", "batch")
+    admitted, run["futures"], run["batch_ids"], run["error"], run["prewarm"] = [], [], None, None, None
+
+    if workflow_config.get("prewarm"):
+        # Pooled posts run up to SWEEP_MAX_CONCURRENCY at once, not one by one
+        posts = min(len(run["jobs"]), SWEEP_MAX_CONCURRENCY) if pooled else len(run["jobs"])
+        run["prewarm"] = prewarm(prewarm_plan(campaign, posts, run["dispatch"], inline_concurrency=posts))
+
+    for job in run["jobs"]:
+        estimate = estimated_tokens(job)
+        if not budget.acquire(estimate, until):
+            continue
+        if pooled:
+            run["futures"].append(sweep_pool.submit(run_sweep_job, job, estimate, budget, until))
+        else:
+            budget.release(estimate, estimate)
+        admitted.append(job)
+    run["admitted"], run["triggered"] = admitted, len(admitted)
+
+    if pooled or not admitted:
+        return
+    try:
+        if run["dispatch"] == "batch":
+            batches = submit_batches(run["execution_id"], campaign, admitted, run["window"])
+            run["triggered"] = sum(b["requests"] for b in batches)
+            run["batch_ids"] = [b["batch_id"] for b in batches]
+        else:
+            run["triggered"] = enqueue_jobs(admitted)
+    except Exception as e:
+        run["triggered"], run["error"] = 0, str(e)
+        log_error(run["execution_id"], campaign["id"], str(e))
+
+
+def run_sweep_job(job: dict, estimate: int, budget: "SweepBudget", until: float) -> dict:
+    """
+    run_job on sweep_pool; releases its budget charging the tokens it spent
+    (else the estimate). A started complex workflow runs on after
+    start_execution returns, so its slot is freed when the execution ends,
+    or kept for the rest of the sweep if it is still running at `until`.
+    """
+    try:
+        result = run_job(job)
+    except Exception as e:
+        result = {"execution_id": job["execution_id"], "employee_id": job["employee_id"],
+                  "success": False, "error": str(e)}
+    running = "sfn_execution_arn" in result and not wait_for_execution(result["sfn_execution_arn"], until)
+    budget.release(estimate, result.get("tokens", estimate), hold=running)
+    return result
+
+
+def wait_for_execution(execution_arn: str, until: float) -> bool:
+    """
+    Poll a Step Functions execution until it ends (True) or time.monotonic()
+    passes `until` (False). After SWEEP_POLL_MAX_ERRORS failed describes in a
+    row it gives up and counts the execution as ended, so its slot is freed.
+    """
+    errors = 0
+    while True:
+        try:
+            with span("sfn.describe_execution"):
+                status = sfn_client.describe_execution(executionArn=execution_arn)["status"]
+            errors = 0
+        except Exception as e:
+            errors += 1
+            print(f"Failed to describe {execution_arn} ({errors}/{SWEEP_POLL_MAX_ERRORS}): {e}")
+            if errors >= SWEEP_POLL_MAX_ERRORS:
+                return True
+            status = "RUNNING"
+        if status != "RUNNING":
+            return True
+        remaining = until - time.monotonic()
+        if remaining <= 0:
+            return False
+        time.sleep(min(SWEEP_POLL_SECONDS, remaining))
+
+
+def finish_sweep_run(run: dict) -> dict:
+    """Wait for a run's pooled posts, write its execution (or dispatch) summary and summarise it."""
+    campaign_id = run["campaign"]["id"]
+    deferred = len(run["jobs"]) - len(run["admitted"])
+
+    if run["dispatch"] not in ("queue", "batch"):
+        results = [future.result() for future in run["futures"]]
+        log_execution_summary(run["execution_id"], campaign_id, results, skipped=run["skipped"],
+                              deferred=deferred, in_flight=run["in_flight"])
+    elif not run["error"]:
+        log_dispatch_summary(run["execution_id"], campaign_id, run["triggered"], dispatch=run["dispatch"],
+                             batch_ids=run["batch_ids"], skipped=run["skipped"], deferred=deferred,
+                             in_flight=run["in_flight"])
+
+    summary = {
+        "execution_id": run["execution_id"],
+        "campaign_id": campaign_id,
+        "scheduled_time": run["scheduled"].isoformat(),
+        "deadline": run["deadline"].isoformat(),
+        "slot_window": run["window"],
+        "workflow_type": run["campaign"].get("workflow_type", "simple"),
+        "dispatch": run["dispatch"],
+        "posts_triggered": run["triggered"],
+        "posts_skipped": run["skipped"],
+        "posts_in_flight": run["in_flight"],
+        "posts_deferred": deferred
+    }
+    if run["prewarm"] is not None:
+        summary["prewarm"] = run["prewarm"]
+    if run["error"]:
+        summary["error"] = run["error"]
+    return summary
+
+
+def estimated_tokens(job: dict) -> int:
+    """
+    Tokens a post is charged until its usage is known: its prompt budget plus
+    SWEEP_OUTPUT_TOKENS per LLM call (three council posts and the judge when complex).
+    """
+    ctx = {"campaign": {"workflow_config": job["workflow_config"]}}
+    call = budget_for(ctx) + SWEEP_OUTPUT_TOKENS
+    if job["workflow_type"] == "complex":
+        return 3 * call + budget_for(ctx, judge=True) + SWEEP_OUTPUT_TOKENS
+    return call
+
+
+class SweepBudget:
+    """
+    Concurrency slots and a token budget shared by every post of one sweep.
+
+    Complex workflows still running when the sweep stops starting posts, and
+    the `running` ones earlier sweeps left, hold their slot for the whole
+    sweep; only the other posts' slots come free as they finish.
+    """
+
+    def __init__(self, tokens: int, concurrency: int, running: int = 0):
+        self.tokens = tokens  # 0: no limit
+        self.concurrency = concurrency
+        self.in_flight = running
+        self.held = running  # slots of complex workflows not freed this sweep
+        self.reserved = 0  # estimates of the posts in flight
+        self.spent = 0
+        self.running = running
+        self.peak_in_flight = running
+        self._cond = threading.Condition()
+
+    def acquire(self, estimate: int, until: float) -> bool:
+        """
+        Wait for a free slot and room for `estimate` tokens and take them.
+        False once time.monotonic() passes `until`, or when the post cannot
+        fit even once every post that will finish this sweep has.
+        """
+        with self._cond:
+            while True:
+                fits = not self.tokens or self.spent + self.reserved + estimate <= self.tokens
+                if fits and self.in_flight < self.concurrency and time.monotonic() < until:
+                    break
+                remaining = until - time.monotonic()
+                finishing = self.in_flight - self.held
+                if remaining <= 0 or not finishing and (not fits or self.held >= self.concurrency):
+                    return False
+                self._cond.wait(remaining)
+            self.in_flight += 1
+            self.reserved += estimate
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+            return True
+
+    def release(self, estimate: int, spent: int, hold: bool = False) -> None:
+        """
+        A post is done: charge what it spent instead of its estimate and free
+        its slot, or with `hold` (a complex workflow still running) keep it.
+        """
+        with self._cond:
+            self.reserved -= estimate
+            self.spent += spent
+            if hold:
+                self.held += 1
+            else:
+                self.in_flight -= 1
+            self._cond.notify_all()
+
+    def stats(self) -> dict:
+        return {
+            "budget": self.tokens or None,
+            "spent": self.spent,
+            "max_concurrency": self.concurrency,
+            "running_at_start": self.running,
+            "peak_in_flight": self.peak_in_flight
+        }
+
+
+def prewarm_plan(campaign: dict, posts: int, dispatch: str, inline_concurrency: int = 1) -> dict[str, int]:
+    """
+    Containers each function needs warm for a run of `posts` posts, i.e. how
+    many invocations the run will have in flight at once.
+
+    Complex runs start every execution together, so each step's function sees
+    up to `posts` at once. Queued runs are bounded by post-worker's
+    concurrency, and inline runs call the LLM lambda `inline_concurrency`
+    posts at a time (one by one, unless run by a sweep). Batch runs invoke
+    nothing hot. LLM lambdas are warmed for every provider the
+    campaign allows, since the router may fail over to any of them. Plans
+    larger than PREWARM_MAX_CONCURRENCY are scaled down to fit.
+    """
+    workflow_config = campaign.get("workflow_config") or {}
+    if dispatch == "batch" or posts <= 0:
+        return {}
+
+    providers = llm_router.allowed_providers(workflow_config)
+    if campaign.get("workflow_type", "simple") == "complex":
+        steps = ["context-fetcher", "llm-gemini", "llm-openai", "llm-grok", "llm-aggregator"]
+        if workflow_config.get("generate_media"):
+            steps.append("meme-renderer")
+        plan = {function_name(step): posts for step in steps}
+    elif dispatch == "queue":
+        workers = min(posts, POST_WORKER_MAX_CONCURRENCY)
+        plan = {function_name("post-worker"): workers}
+        plan.update({llm_router.function_for(p): min(posts, workers * WORKER_CONCURRENCY) for p in providers})
+    else:
+        plan = {llm_router.function_for(p): min(posts, inline_concurrency) for p in providers}
+
+    total = sum(plan.values())
+    if total > PREWARM_MAX_CONCURRENCY:
+        plan = {name: max(1, math.floor(count * PREWARM_MAX_CONCURRENCY / total)) for name, count in plan.items()}
+    return plan
+
+
+def prewarm(plan: dict[str, int]) -> dict:
+    """
+    Send a plan's warm-up invocations all at once; per function, how many
+    were sent, how many landed on a cold container and how many failed.
+    """
+    calls = [name for name, count in plan.items() for _ in range(count)]
+    summary = {name: {"invoked": count, "cold": 0, "errors": 0} for name, count in plan.items()}
+    if not calls:
+        return summary
+
+    def warm_one(name: str) -> tuple[str, dict]:
+        try:
+            response = lambda_client.invoke(
+                FunctionName=name,
+                InvocationType="RequestResponse",
+                Payload=json.dumps({"warmup": True, "hold_ms": PREWARM_HOLD_MS})
+            )
+            result = json.loads(response["Payload"].read())
+            if response.get("FunctionError"):
+                return name, {"error": result.get("errorMessage")}
+            return name, result
+        except Exception as e:
+            return name, {"error": str(e)}
+
+    with span("prewarm", invocations=len(calls)), ThreadPoolExecutor(max_workers=len(calls)) as pool:
+        for name, result in pool.map(warm_one, calls):
+            summary[name]["cold"] += bool(result.get("cold"))
+            summary[name]["errors"] += "error" in result
+
+    print(json.dumps({"prewarm": summary}))
+    return summary
+
+
+def function_name(function_dir: str) -> str:
+    """Deployed name of one of this stack's functions (as llm_router.function_for)."""
+    return f"meroka-{function_dir}-{os.environ.get('ENVIRONMENT', 'dev')}"
+
+
+def enqueue_jobs(jobs: list[dict]) -> int:
+    """
+    Send jobs to POST_JOBS_QUEUE_URL, ten per SendMessageBatch call.
+
+    Entries SQS rejects are resent once; if any are still rejected this
+    raises, and the jobs already sent stay queued. Either way the jobs sent
+    are recorded as dispatched.
+    """
+    if not POST_JOBS_QUEUE_URL:
+        raise ValueError("Queue dispatch requires POST_JOBS_QUEUE_URL")
+
+    sent = []
+    try:
+        for start in range(0, len(jobs), SQS_MAX_BATCH):
+            chunk = jobs[start:start + SQS_MAX_BATCH]
+            entries = [{"Id": str(i), "MessageBody": json.dumps(job)} for i, job in enumerate(chunk)]
+            for _ in range(2):
+                with span("sqs.send_message_batch", messages=len(entries)):
+                    response = sqs_client.send_message_batch(QueueUrl=POST_JOBS_QUEUE_URL, Entries=entries)
+                sent += [chunk[int(s["Id"])] for s in response.get("Successful", [])]
+                rejected = {f["Id"] for f in response.get("Failed", [])}
+                entries = [e for e in entries if e["Id"] in rejected]
+                if not entries:
+                    break
+            if entries:
+                raise RuntimeError(f"SQS rejected {len(entries)} post jobs after {len(sent)} were queued")
+    finally:
+        record_dispatches(sent, "queue")
+    return len(sent)
+
+
+def submit_batches(execution_id: str, campaign: dict, jobs: list[dict], window: str) -> list[dict]:
+    """
+    Submit the run's jobs as provider batches, each with a batch workflow
+    execution that collects it when it ends. A batch takes employees until it
+    has BATCH_MAX_EMPLOYEES or the next one's context and requests would take
+    its submit payload past BATCH_MAX_PAYLOAD_BYTES.
+
+    Each request's custom_id is "<employee_id>:<post_num>", from which
+    collect_batch rebuilds the post's execution_id and, with the window,
+    its slot_key.
+    """
+    workflow_config = campaign.get("workflow_config") or {}
+    model = workflow_config.get("model", BATCH_DEFAULT_MODEL)
+    if campaign.get("workflow_type", "simple") != "simple":
+        raise ValueError("Batch dispatch supports the simple workflow only")
+    if llm_router.provider_for(model) != "openai":
+        raise ValueError(f"Batch dispatch needs an OpenAI model, got {model}")
+    if not BATCH_WORKFLOW_ARN:
+        raise ValueError("Batch dispatch requires BATCH_WORKFLOW_ARN")
+
+    jobs_by_employee: dict[str, list[dict]] = {}
+    for job in jobs:
+        jobs_by_employee.setdefault(job["employee_id"], []).append(job)
+
+    batches = []
+    contexts, batch_jobs, size = {}, [], 0
+    for employee_id, employee_jobs in jobs_by_employee.items():
+        context = fetch_context(campaign["id"], employee_id)
+        added = len(json.dumps(context)) + len(json.dumps(batch_requests(employee_jobs)))
+        if contexts and (len(contexts) >= BATCH_MAX_EMPLOYEES or size + added > BATCH_MAX_PAYLOAD_BYTES):
+            batches.append(submit_batch(execution_id, campaign, model, window, contexts, batch_jobs, len(batches)))
+            contexts, batch_jobs, size = {}, [], 0
+        contexts[employee_id] = context
+        batch_jobs += employee_jobs
+        size += added
+    if contexts:
+        batches.append(submit_batch(execution_id, campaign, model, window, contexts, batch_jobs, len(batches)))
+
+    return batches
+
+
+def submit_batch(
+    execution_id: str,
+    campaign: dict,
+    model: str,
+    window: str,
+    contexts: dict[str, dict],
+    jobs: list[dict],
+    index: int
+) -> dict:
+    """Submit one provider batch of the run and start the batch workflow execution that collects it."""
+    llm_function = get_llm_function(model)
+    with span("lambda.invoke", function=llm_function, action="submit_batch"):
+        response = lambda_client.invoke(
+            FunctionName=llm_function,
+            InvocationType="RequestResponse",
+            Payload=json.dumps({
+                "action": "submit_batch",
+                "execution_id": execution_id,
+                "campaign_id": campaign["id"],
+                "model": model,
+                "style": "balanced",
+                "contexts": contexts,
+                "requests": batch_requests(jobs)
+            })
+        )
+        submitted = json.loads(response["Payload"].read())
+    if response.get("FunctionError"):
+        raise RuntimeError(f"Batch submit failed: {submitted.get('errorMessage')}")
+
+    with span("sfn.start_execution"):
+        sfn_client.start_execution(
+            stateMachineArn=BATCH_WORKFLOW_ARN,
+            name=f"{execution_id}_batch{index}",
+            input=json.dumps({
+                "execution_id": execution_id,
+                "campaign_id": campaign["id"],
+                "batch_id": submitted["batch_id"],
+                "model": model,
+                "slot_window": window
+            })
+        )
+    record_dispatches(jobs, "batch", batch_id=submitted["batch_id"])
+    return submitted
+
+
+def batch_requests(jobs: list[dict]) -> list[dict]:
+    return [{"custom_id": f"{job['employee_id']}:{job['post_num']}", "employee_id": job["employee_id"]} for job in jobs]
+
+
+def record_dispatches(jobs: list[dict], dispatch: str, batch_id: str | None = None) -> None:
+    """
+    Record the jobs' slots as handed to `dispatch` in post_dispatches, so
+    sweeps leave them alone until it fails or DISPATCH_TTL_MINUTES pass.
+    Best effort: an unrecorded slot is at worst dispatched again.
+    """
+    now = datetime.now(timezone.utc)
+    rows = [
+        {
+            "slot_key": job["slot_key"],
+            "campaign_id": job["campaign_id"],
+            "execution_id": job["execution_id"],
+            "dispatch": dispatch,
+            "batch_id": batch_id,
+            "status": "dispatched",
+            "dispatched_at": now.isoformat(),
+            "expires_at": (now + timedelta(minutes=DISPATCH_TTL_MINUTES[dispatch])).isoformat()
+        }
+        for job in jobs
+        if job.get("slot_key")
+    ]
+    if not rows:
+        return
+    try:
+        db.run(db.upsert_post_dispatches(rows))
+    except Exception as e:
+        print(f"Failed to record {len(rows)} {dispatch} dispatches: {e}")
+
+
+def fail_dispatches(
+    execution_id: str | None = None,
+    batch_id: str | None = None,
+    execution_ids: list[str] | None = None
+) -> None:
+    """Mark posts' (or a provider batch's) dispatches failed, so the next sweep dispatches their slots again."""
+    try:
+        db.run(db.fail_post_dispatches(execution_id=execution_id, batch_id=batch_id, execution_ids=execution_ids))
+    except Exception as e:
+        print(f"Failed to mark dispatches failed: {e}")
+
+
+def collect_batch(event: dict) -> dict:
+    """
+    Store the posts of a finished batch, as run_simple_workflow would have.
+
+    Posts are stored concurrently on the db pool; requests that failed in the
+    batch are logged as errors. Stores are keyed by slot, so collecting the
+    same batch again (a retried task) stores nothing twice. Every result is also logged as an
+    llm_openai_batch call, which the cost rollup prices at the batch rate.
+    The dispatches of posts not stored (failed, or never run by an expired
+    or cancelled batch) are then marked failed, so a sweep retries them.
+    """
+    execution_id, campaign_id, model = event["execution_id"], event["campaign_id"], event["model"]
+    fetched = fetch_batch_results(event["batch_id"], execution_id, get_llm_function(model))
+
+    posts, calls = [], []
+    for result in fetched["results"]:
+        employee_id, _, post_num = result["custom_id"].partition(":")
+        post_id = post_execution_id(execution_id, employee_id, int(post_num))
+        calls.append({
+            "execution_id": post_id,
+            "campaign_id": campaign_id,
+            "employee_id": employee_id,
+            "workflow_type": "simple",
+            "step_name": "llm_openai_batch",
+            "model": model,
+            "input_tokens": result.get("input_tokens", 0),
+            "output_tokens": result.get("output_tokens", 0),
+            "latency_ms": fetched["latency_ms"],
+            "status": "error" if "error" in result else "success",
+            "error_message": result.get("error"),
+            "metadata": {"batch_id": event["batch_id"]}
+        })
+        if "error" not in result:
+            posts.append({
+                "campaign_id": campaign_id,
+                "slot_key": slot_key(campaign_id, event["slot_window"], employee_id, int(post_num)),
+                "author_id": employee_id,
+                "content": result["content"],
+                "original_content": result["content"],
+                "status": "pending_review",
+                "execution_id": post_id,
+                "generation_metadata": {
+                    "model": model,
+                    "workflow": "simple",
+                    "dispatch": "batch",
+                    "batch_id": event["batch_id"],
+                    "latency_ms": fetched["latency_ms"]
+                }
+            })
+
+    stored = db.run(store_posts(posts))
+    db.run(db.insert_workflow_logs(calls))
+
+    results = [
+        {"success": isinstance(outcome, tuple) and outcome[0] is not None,
+         "near_duplicate": outcome[1] if isinstance(outcome, tuple) else None}
+        for outcome in stored
+    ]
+    results += [{"success": False} for call in calls if call["status"] == "error"]
+    for row, outcome in zip(posts, stored):
+        if isinstance(outcome, Exception):
+            log_workflow_error(row["execution_id"], campaign_id, row["author_id"], str(outcome))
+    log_execution_summary(execution_id, campaign_id, results)
+
+    stored_ids = {
+        row["execution_id"] for row, outcome in zip(posts, stored)
+        if isinstance(outcome, tuple) and outcome[0] is not None
+    }
+    try:
+        unstored = [post_id for post_id in db.run(db.fetch_batch_dispatches(event["batch_id"]))
+                    if post_id not in stored_ids]
+    except Exception as e:
+        print(f"Failed to read the dispatches of batch {event['batch_id']}: {e}")
+        unstored = []
+    if unstored:
+        fail_dispatches(execution_ids=unstored)
+
+    return {
+        "batch_id": event["batch_id"],
+        "batch_status": fetched["status"],
+        "results": len(fetched["results"]),
+        "stored": sum(1 for r in results if r["success"]),
+        "failed": sum(1 for r in results if not r["success"])
+    }
+
+
+def fetch_batch_results(batch_id: str, execution_id: str, llm_function: str) -> dict:
+    """Every result of a finished batch, fetched page by page (each response stays under Lambda's payload limit)."""
+    fetched, offset = None, 0
+    while offset is not None:
+        with span("lambda.invoke", function=llm_function, action="fetch_batch_results"):
+            response = lambda_client.invoke(
+                FunctionName=llm_function,
+                InvocationType="RequestResponse",
+                Payload=json.dumps({
+                    "action": "fetch_batch_results",
+                    "batch_id": batch_id,
+                    "execution_id": execution_id,
+                    "offset": offset
+                })
+            )
+            page = json.loads(response["Payload"].read())
+        if response.get("FunctionError"):
+            raise RuntimeError(f"Fetching batch {batch_id} failed: {page.get('errorMessage')}")
+        if fetched is None:
+            fetched = page
+        else:
+            fetched["results"] += page["results"]
+        offset = page.get("next_offset")
+    return fetched
+
+
+async def store_posts(rows: list[dict]) -> list:
+    """near_duplicates.insert_post for each row concurrently; exceptions are returned, not raised."""
+    return await asyncio.gather(*(near_duplicates.insert_post(row) for row in rows), return_exceptions=True)
+
+
+def new_execution_id(prefix: str = "exec") -> str:
+    return f"{prefix}_{datetime.utcnow().strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:8]}"
+
+
+def plan_jobs(
+    execution_id: str,
+    campaign: dict,
+    employees: list[dict],
+    window: str,
+    filled: set[str]
+) -> tuple[list[dict], int]:
+    """
+    One job per (employee, post) of a campaign run, minus the slots in
+    `filled`; (jobs, number skipped). Jobs come post_num first, so a run cut
+    short still reaches every employee once before anyone's second post.
+    """
+    workflow_config = campaign.get("workflow_config") or {}
+    jobs = [
+        {
+            "campaign_id": campaign["id"],
+            "employee_id": employee["user_id"],
+            "execution_id": post_execution_id(execution_id, employee["user_id"], post_num),
+            "post_num": post_num,
+            "slot_key": slot_key(campaign["id"], window, employee["user_id"], post_num),
+            "workflow_type": campaign.get("workflow_type", "simple"),
+            "workflow_config": workflow_config
+        }
+        for post_num in range(campaign.get("posts_per_employee", 3))
+        for employee in employees
+    ]
+    pending = [job for job in jobs if job["slot_key"] not in filled]
+    return pending, len(jobs) - len(pending)
+
+
+def post_execution_id(execution_id: str, employee_id: str, post_num: int) -> str:
+    """execution_id of one post within a campaign run."""
+    return f"{execution_id}_emp{employee_id[:8]}_p{post_num}"
+
+
+def slot_window(event: dict, workflow_config: dict) -> str:
+    """
+    Start of the schedule window a run fills, e.g. "20261019T0000Z".
+
+    Windows are SLOT_WINDOW_HOURS long, counted from the Unix epoch in UTC,
+    and the run's is the one holding event["scheduled_time"] (set by the
+    schedule, or by lambda_handler from the campaign's schedule_cron; now
+    for manual runs of campaigns without one). A run re-invoked for the same
+    scheduled time therefore gets the same slots. event["slot_window"]
+    overrides this.
+    """
+    if event.get("slot_window"):
+        return event["slot_window"]
+    hours = float(workflow_config.get("slot_window_hours", SLOT_WINDOW_HOURS))
+    at = parse_time(event.get("scheduled_time")) or datetime.now(timezone.utc)
+    epoch = datetime(1970, 1, 1, tzinfo=timezone.utc)
+    length = timedelta(hours=hours)
+    start = epoch + ((at - epoch) // length) * length
+    return start.strftime("%Y%m%dT%H%MZ")
+
+
+def parse_time(value: str | None) -> datetime | None:
+    """An ISO timestamp (e.g. EventBridge Scheduler's scheduled-time) as an aware datetime, UTC if unzoned."""
+    if not value:
+        return None
+    at = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    return at if at.tzinfo else at.replace(tzinfo=timezone.utc)
+
+
+def slot_key(campaign_id: str, window: str, employee_id: str, post_num: int) -> str:
+    """Slot one post fills; unique in posts (migration 016)."""
+    return f"{campaign_id}:{window}:{employee_id}:{post_num}"
+
+
+async def load_campaign(campaign_id: str) -> tuple[dict | None, list[dict]]:
+    """Campaign configuration and its active employees, fetched concurrently."""
+    return tuple(await asyncio.gather(
+        db.fetch_campaign(campaign_id),
+        db.fetch_campaign_employees(campaign_id)
+    ))
 
 
 def trigger_complex_workflow(
     campaign_id: str,
     employee_id: str,
     execution_id: str,
-    campaign: dict
+    campaign: dict,
+    slot_key: str | None = None
 ) -> dict:
     """Start Step Functions execution for complex workflow."""
-    response = sfn_client.start_execution(
-        stateMachineArn=COMPLEX_WORKFLOW_ARN,
-        name=execution_id,
-        input=json.dumps({
-            "campaign_id": campaign_id,
-            "employee_id": employee_id,
-            "execution_id": execution_id,
-            "workflow_config": campaign.get("workflow_config", {})
-        })
-    )
+    with span("sfn.start_execution"):
+        response = sfn_client.start_execution(
+            stateMachineArn=COMPLEX_WORKFLOW_ARN,
+            name=execution_id,
+            input=json.dumps({
+                "campaign_id": campaign_id,
+                "employee_id": employee_id,
+                "execution_id": execution_id,
+                "slot_key": slot_key,
+                "workflow_config": campaign.get("workflow_config", {})
+            })
+        )
+    record_dispatches([{"slot_key": slot_key, "campaign_id": campaign_id, "execution_id": execution_id}], "complex")
 
     return {
         "execution_id": execution_id,
@@ -147,127 +1101,204 @@ def run_simple_workflow(
     campaign_id: str,
     employee_id: str,
     execution_id: str,
-    campaign: dict
+    campaign: dict,
+    slot_key: str | None = None
 ) -> dict:
     """Run simple single-LLM workflow inline."""
-    import time
     start_time = time.time()
 
-    try:
-        # 1. Fetch context
-        context = fetch_context(campaign_id, employee_id)
+    # Keyed on the post's execution_id, like the spans from the LLM lambda it calls
+    with trace(execution_id, "campaign-orchestrator"), span("workflow.simple"):
+        try:
+            # 1. Fetch context
+            context = fetch_context(campaign_id, employee_id)
 
-        # 2. Call single LLM
-        model = campaign.get("workflow_config", {}).get("model", "claude-3-sonnet-20240229")
-        llm_function = get_llm_function(model)
+            # 2. Call the fastest healthy LLM the campaign allows
+            result, route = invoke_llm(context, execution_id, campaign.get("workflow_config", {}))
 
-        response = lambda_client.invoke(
-            FunctionName=llm_function,
-            InvocationType="RequestResponse",
-            Payload=json.dumps({
-                "context": context,
-                "execution_id": execution_id,
-                "model": model,
-                "style": "balanced"
-            })
-        )
+            # Spent whether or not the post is kept (sweep mode charges it to its budget)
+            tokens = result.get("input_tokens", 0) + result.get("output_tokens", 0)
 
-        result = json.loads(response["Payload"].read())
+            # 3. Store post (unless it near-duplicates the employee's history and those are rejected)
+            post, duplicate = store_post(
+                campaign_id=campaign_id,
+                employee_id=employee_id,
+                execution_id=execution_id,
+                slot_key=slot_key,
+                content=result["content"],
+                metadata={
+                    "model": route.model,
+                    "provider": route.provider,
+                    "workflow": "simple",
+                    "latency_ms": int((time.time() - start_time) * 1000)
+                }
+            )
 
-        # 3. Store post
-        post = store_post(
-            campaign_id=campaign_id,
-            employee_id=employee_id,
-            execution_id=execution_id,
-            content=result["content"],
-            metadata={
-                "model": model,
+            if post is None:
+                return {
+                    "execution_id": execution_id,
+                    "employee_id": employee_id,
+                    "workflow": "simple",
+                    "success": False,
+                    "error": f"Near-duplicate of post {duplicate['post_id']}",
+                    "near_duplicate": duplicate,
+                    "tokens": tokens
+                }
+
+            return {
+                "execution_id": execution_id,
+                "employee_id": employee_id,
                 "workflow": "simple",
-                "latency_ms": int((time.time() - start_time) * 1000)
+                "post_id": post["id"],
+                "near_duplicate": duplicate,
+                # Another run stored this slot first; its post is kept
+                "already_filled": post["execution_id"] != execution_id,
+                "tokens": tokens,
+                "success": True
             }
-        )
-
-        return {
-            "execution_id": execution_id,
-            "employee_id": employee_id,
-            "workflow": "simple",
-            "post_id": post["id"],
-            "success": True
-        }
 
-    except Exception as e:
-        log_workflow_error(execution_id, campaign_id, employee_id, str(e))
-        return {
-            "execution_id": execution_id,
-            "employee_id": employee_id,
-            "workflow": "simple",
-            "success": False,
-            "error": str(e)
-        }
+        except Exception as e:
+            log_workflow_error(execution_id, campaign_id, employee_id, str(e))
+            return {
+                "execution_id": execution_id,
+                "employee_id": employee_id,
+                "workflow": "simple",
+                "success": False,
+                "error": str(e)
+            }
 
 
 def fetch_context(campaign_id: str, employee_id: str) -> dict:
-    """Fetch all context needed for post generation."""
-    # Get employee info and samples
-    employee = supabase.table("users").select("*").eq("id", employee_id).single().execute()
-
-    samples = (
-        supabase.table("employee_voice_samples")
-        .select("*")
-        .eq("email", employee.data["email"])
-        .execute()
-    )
+    """Fetch all context needed for post generation (same shape as context-fetcher)."""
+    rows = db.run(config_cache.fetch_post_context(campaign_id, employee_id))
+    employee, samples, campaign = rows["employee"], rows["voice_samples"], rows["campaign"]
+    channel = campaign.get("channels") or {}
+    account = channel.get("accounts") or {}
 
-    # Get campaign info
-    campaign = supabase.table("campaigns").select("*").eq("id", campaign_id).single().execute()
+    voice_profile = None
+    if samples and use_profile(campaign.get("workflow_config")):
+        voice_profile, _ = resolve_profile(samples, rows["voice_profile"])
 
     return {
-        "employee": employee.data,
-        "samples": samples.data[0] if samples.data else None,
-        "campaign": campaign.data
+        "employee": {
+            "id": employee["id"],
+            "name": employee["name"],
+            "email": employee["email"],
+            "settings": employee.get("settings", {})
+        },
+        "voice_samples": {
+            "example_post_1": samples["example_post_1"] if samples else None,
+            "example_post_2": samples["example_post_2"] if samples else None,
+            "example_post_3": samples["example_post_3"] if samples else None,
+            "blurb": samples["blurb"] if samples else None
+        },
+        "voice_profile": voice_profile,
+        "campaign": {
+            "id": campaign["id"],
+            "name": campaign["name"],
+            "type": campaign["type"],
+            "description": campaign.get("description"),
+            "workflow_config": campaign.get("workflow_config", {}),
+            "platform": channel.get("platform", "linkedin")
+        },
+        "brand": {
+            "name": account.get("name", "Meroka"),
+            "settings": account.get("settings", {})
+        }
     }
 
 
 def get_llm_function(model: str) -> str:
-    """Map model name to Lambda function name."""
-    env = os.environ.get("ENVIRONMENT", "dev")
-
-    if "claude" in model.lower():
-        return f"meroka-llm-claude-{env}"
-    elif "gpt" in model.lower():
-        return f"meroka-llm-openai-{env}"
-    elif "grok" in model.lower():
-        return f"meroka-llm-grok-{env}"
-    else:
-        return f"meroka-llm-claude-{env}"  # Default
+    """Map model name to Lambda function name (ValueError for models without one)."""
+    return llm_router.function_for(llm_router.provider_for(model))
+
+
+def invoke_llm(context: dict, execution_id: str, workflow_config: dict) -> tuple[dict, llm_router.Route]:
+    """
+    Generate one post on the route llm_router picks, recording every outcome.
+
+    A failed call moves on to the next best provider, up to LLM_MAX_ATTEMPTS
+    providers; the last error is raised when none is left.
+    """
+    tried: tuple[str, ...] = ()
+    error = None
+    while len(tried) < LLM_MAX_ATTEMPTS:
+        try:
+            route = llm_router.choose(workflow_config, exclude=tried)
+        except llm_router.NoHealthyProvider:
+            if error is None:
+                raise
+            break
+        tried += (route.provider,)
+
+        start = time.time()
+        try:
+            with span("lambda.invoke", function=route.function):
+                response = lambda_client.invoke(
+                    FunctionName=route.function,
+                    InvocationType="RequestResponse",
+                    Payload=json.dumps({
+                        "context": context,
+                        "execution_id": execution_id,
+                        "model": route.model,
+                        "style": "balanced"
+                    })
+                )
+                result = json.loads(response["Payload"].read())
+            error = f"{route.function}: {result.get('errorMessage')}" if response.get("FunctionError") else None
+        except Exception as e:
+            error = f"{route.function}: {e}"
+
+        llm_router.record(route.provider, (time.time() - start) * 1000, ok=error is None,
+                          rate_limited=error is not None and "RateLimitError" in error)
+        if error is None:
+            return result, route
+
+    raise RuntimeError(error)
 
 
 def store_post(
     campaign_id: str,
     employee_id: str,
     execution_id: str,
+    slot_key: str | None,
     content: str,
     metadata: dict
-) -> dict:
-    """Store generated post in Supabase."""
-    response = supabase.table("posts").insert({
+) -> tuple[dict | None, dict | None]:
+    """
+    Store generated post in Supabase; (post, near-duplicate match) as in near_duplicates.insert_post.
+
+    With a slot_key, a slot some other execution already filled is left as
+    is and its post returned.
+    """
+    return db.run(near_duplicates.insert_post({
         "campaign_id": campaign_id,
+        "slot_key": slot_key,
         "author_id": employee_id,
         "content": content,
         "original_content": content,
         "status": "pending_review",
         "execution_id": execution_id,
         "generation_metadata": metadata
-    }).execute()
+    }))
 
-    return response.data[0]
 
-
-def log_execution_summary(execution_id: str, campaign_id: str, results: list) -> None:
-    """Log execution summary to workflow_logs."""
+def log_execution_summary(
+    execution_id: str,
+    campaign_id: str,
+    results: list,
+    skipped: int = 0,
+    deferred: int = 0,
+    in_flight: int = 0
+) -> None:
+    """
+    Log execution summary to workflow_logs; skipped counts slots filled before
+    the run, deferred the posts a sweep left for a later one and in_flight the
+    slots it left to an earlier dispatch still running.
+    """
     success_count = sum(1 for r in results if r.get("success", True))
 
-    supabase.table("workflow_logs").insert({
+    db.run(db.insert_workflow_log({
         "execution_id": execution_id,
         "campaign_id": campaign_id,
         "workflow_type": "orchestrator",
@@ -276,21 +1307,51 @@ def log_execution_summary(execution_id: str, campaign_id: str, results: list) ->
         "metadata": {
             "total": len(results),
             "success": success_count,
-            "failed": len(results) - success_count
+            "failed": len(results) - success_count,
+            "near_duplicates": sum(1 for r in results if r.get("near_duplicate")),
+            "already_filled": sum(1 for r in results if r.get("already_filled")),
+            "skipped": skipped,
+            "deferred": deferred,
+            "in_flight": in_flight
         }
-    }).execute()
+    }))
+
+
+def log_dispatch_summary(
+    execution_id: str,
+    campaign_id: str,
+    enqueued: int,
+    dispatch: str = "queue",
+    batch_ids: list[str] | None = None,
+    skipped: int = 0,
+    deferred: int = 0,
+    in_flight: int = 0
+) -> None:
+    """Log how many post jobs were queued for post-worker (or submitted as provider batches)."""
+    metadata = {"dispatch": dispatch, "enqueued": enqueued, "skipped": skipped, "deferred": deferred,
+                "in_flight": in_flight}
+    if batch_ids is not None:
+        metadata["batch_ids"] = batch_ids
+    db.run(db.insert_workflow_log({
+        "execution_id": execution_id,
+        "campaign_id": campaign_id,
+        "workflow_type": "orchestrator",
+        "step_name": "dispatch_summary",
+        "status": "success",
+        "metadata": metadata
+    }))
 
 
 def log_error(execution_id: str, campaign_id: str, error: str) -> None:
     """Log error to workflow_logs."""
-    supabase.table("workflow_logs").insert({
+    db.run(db.insert_workflow_log({
         "execution_id": execution_id,
         "campaign_id": campaign_id,
         "workflow_type": "orchestrator",
         "step_name": "error",
         "status": "error",
         "error_message": error
-    }).execute()
+    }))
 
 
 def log_workflow_error(
@@ -300,7 +1361,7 @@ def log_workflow_error(
     error: str
 ) -> None:
     """Log workflow step error."""
-    supabase.table("workflow_logs").insert({
+    db.run(db.insert_workflow_log({
         "execution_id": execution_id,
         "campaign_id": campaign_id,
         "employee_id": employee_id,
@@ -308,4 +1369,4 @@ def log_workflow_error(
         "step_name": "workflow_error",
         "status": "error",
         "error_message": error
-    }).execute()
+    }))
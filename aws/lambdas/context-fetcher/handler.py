@@ -4,19 +4,19 @@ Fetches context for post generation and handles post storage.
 Used by both simple and complex workflows.
 """
 
-import json
-import os
-from datetime import datetime
 from typing import Any
 
-from supabase import create_client
+from meroka_common import config_cache, db, near_duplicates
+from meroka_common.tracing import traced_handler
+from meroka_common.voice_profile import resolve_profile, use_profile
 
-supabase = create_client(
-    os.environ["SUPABASE_URL"],
-    os.environ["SUPABASE_SERVICE_KEY"]
-)
 
+def warm() -> None:
+    """Create the db client/pool before the first query (warm-up events)."""
+    db.run(db.warm())
 
+
+@traced_handler("context-fetcher", warm=warm)
 def lambda_handler(event: dict, context: Any) -> dict:
     """
     Multi-purpose handler for context fetching and result storage.
@@ -44,38 +44,16 @@ def fetch_context(event: dict) -> dict:
     employee_id = event["employee_id"]
     execution_id = event["execution_id"]
 
-    # Get employee info
-    employee_response = (
-        supabase.table("users")
-        .select("id, email, name, settings")
-        .eq("id", employee_id)
-        .single()
-        .execute()
-    )
-    employee = employee_response.data
-
-    # Get employee voice samples
-    samples_response = (
-        supabase.table("employee_voice_samples")
-        .select("*")
-        .eq("email", employee["email"])
-        .execute()
-    )
-    samples = samples_response.data[0] if samples_response.data else None
-
-    # Get campaign config
-    campaign_response = (
-        supabase.table("campaigns")
-        .select("*, channels(platform, account_id, accounts(name, settings))")
-        .eq("id", campaign_id)
-        .single()
-        .execute()
-    )
-    campaign = campaign_response.data
+    employee, samples, campaign, stored_profile = load_context_rows(campaign_id, employee_id)
 
     # Get account/brand context
     account = campaign.get("channels", {}).get("accounts", {})
 
+    # Compact voice profile, rebuilt in-process if the precomputed one is stale
+    voice_profile, profile_source = None, "disabled"
+    if samples and use_profile(campaign.get("workflow_config")):
+        voice_profile, profile_source = resolve_profile(samples, stored_profile)
+
     # Build the context object
     context = {
         "employee": {
@@ -90,6 +68,7 @@ def fetch_context(event: dict) -> dict:
             "example_post_3": samples["example_post_3"] if samples else None,
             "blurb": samples["blurb"] if samples else None
         },
+        "voice_profile": voice_profile,
         "campaign": {
             "id": campaign["id"],
             "name": campaign["name"],
@@ -111,14 +90,32 @@ def fetch_context(event: dict) -> dict:
         campaign_id=campaign_id,
         employee_id=employee_id,
         step_name="fetch_context",
-        status="success"
+        status="success",
+        metadata={"voice_profile": profile_source}
     )
+    config_cache.log_config_cache_stats()
 
     return context
 
 
+def load_context_rows(campaign_id: str, employee_id: str) -> tuple:
+    """
+    Employee, voice samples, campaign config and stored voice profile in one
+    round-trip (get_post_context), with the campaign config cached per
+    container and revalidated by version once its TTL runs out.
+    """
+    rows = db.run(config_cache.fetch_post_context(campaign_id, employee_id))
+    return rows["employee"], rows["voice_samples"], rows["campaign"], rows["voice_profile"]
+
+
 def store_post(event: dict) -> dict:
-    """Store generated post in Supabase."""
+    """
+    Store generated post in Supabase.
+
+    With a slot_key (set by the orchestrator), a slot another execution
+    already filled is not stored again; its post_id comes back as
+    "already_stored".
+    """
     campaign_id = event["campaign_id"]
     employee_id = event["employee_id"]
     execution_id = event["execution_id"]
@@ -126,9 +123,10 @@ def store_post(event: dict) -> dict:
     media_urls = event.get("media_urls", [])
     generation_metadata = event.get("generation_metadata", {})
 
-    # Insert post
-    response = supabase.table("posts").insert({
+    # Insert post (checked against the employee's history for near-duplicates)
+    post, duplicate = db.run(near_duplicates.insert_post({
         "campaign_id": campaign_id,
+        "slot_key": event.get("slot_key"),
         "author_id": employee_id,
         "content": post_content,
         "original_content": post_content,
@@ -136,9 +134,30 @@ def store_post(event: dict) -> dict:
         "status": "pending_review",
         "execution_id": execution_id,
         "generation_metadata": generation_metadata
-    }).execute()
-
-    post = response.data[0]
+    }))
+
+    if post is None:
+        log_step(
+            execution_id=execution_id,
+            campaign_id=campaign_id,
+            employee_id=employee_id,
+            step_name="store_post",
+            status="rejected",
+            error_message=f"Near-duplicate of post {duplicate['post_id']}",
+            metadata={"near_duplicate": duplicate}
+        )
+        return {
+            "post_id": None,
+            "status": "rejected_near_duplicate",
+            "near_duplicate": duplicate
+        }
+
+    if post["execution_id"] != execution_id:
+        return {
+            "post_id": post["id"],
+            "status": "already_stored",
+            "near_duplicate": None
+        }
 
     # Log post creation
     log_step(
@@ -147,12 +166,13 @@ def store_post(event: dict) -> dict:
         employee_id=employee_id,
         step_name="store_post",
         status="success",
-        metadata={"post_id": post["id"]}
+        metadata={"post_id": post["id"], "near_duplicate": duplicate}
     )
 
     return {
         "post_id": post["id"],
-        "status": "pending_review"
+        "status": "pending_review",
+        "near_duplicate": duplicate
     }
 
 
@@ -174,6 +194,12 @@ def log_error(event: dict) -> dict:
         error_message=error_message
     )
 
+    # The workflow gave up: a sweep may start its slot again (migration 017)
+    try:
+        db.run(db.fail_post_dispatches(execution_id=execution_id))
+    except Exception as e:
+        print(f"Failed to mark dispatch of {execution_id} failed: {e}")
+
     return {"logged": True}
 
 
@@ -187,7 +213,7 @@ def log_step(
     metadata: dict | None = None
 ) -> None:
     """Log a workflow step to the database."""
-    supabase.table("workflow_logs").insert({
+    db.run(db.insert_workflow_log({
         "execution_id": execution_id,
         "campaign_id": campaign_id,
         "employee_id": employee_id,
@@ -196,4 +222,4 @@ def log_step(
         "status": status,
         "error_message": error_message,
         "metadata": metadata or {}
-    }).execute()
+    }))
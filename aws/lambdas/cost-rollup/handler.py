@@ -0,0 +1,185 @@
+"""
+Cost Rollup Lambda
+Incrementally rolls workflow_logs token counts up into token_cost_daily.
+
+Each run reads only the LLM rows (model set) created after the stored
+watermark, prices them with meroka_common.pricing, and adds per-day deltas by
+(campaign, model, employee). Deltas and the new watermark are applied in one
+transaction by the apply_token_cost_rollup SQL function.
+
+The watermark is the (created_at, id) of the last row counted, and rows are
+read in that order after it, so a capped run resumes exactly where it stopped.
+
+Late-arriving rows: created_at is stamped when a lambda's insert starts, so a
+row can commit after rows with later timestamps. Runs only read rows older
+than LATE_WINDOW_SECONDS, so those rows have committed before the watermark
+passes them and are counted exactly once. Totals therefore trail by the
+window; rows committing later than it are not picked up.
+"""
+
+import os
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from typing import Any
+
+from supabase import create_client
+
+from meroka_common.pricing import cost_usd, load_prices
+from meroka_common.tracing import span, traced_handler
+
+supabase = create_client(
+    os.environ["SUPABASE_URL"],
+    os.environ["SUPABASE_SERVICE_KEY"]
+)
+
+JOB_NAME = "token_cost_daily"
+LATE_WINDOW_SECONDS = int(os.environ.get("ROLLUP_LATE_WINDOW_SECONDS", "900"))
+PAGE_SIZE = 1000
+DEFAULT_MAX_ROWS = 50_000
+
+LOG_COLUMNS = "id, created_at, campaign_id, employee_id, step_name, model, input_tokens, output_tokens"
+
+
+@traced_handler("cost-rollup")
+def lambda_handler(event: dict, context: Any) -> dict:
+    """
+    Roll up new workflow_logs rows.
+
+    Event (all optional):
+    {
+        "max_rows": 50000  # cap per run; the next run continues from the watermark
+    }
+    """
+    max_rows = int((event or {}).get("max_rows", DEFAULT_MAX_ROWS))
+
+    state = load_state()
+    previous_watermark, previous_id = state["watermark"], state["watermark_id"]
+    settled = datetime.now(timezone.utc) - timedelta(seconds=LATE_WINDOW_SECONDS)
+
+    # Only rows past the watermark are read, so the cap counts new rows only
+    rows = fetch_new_rows(previous_watermark, previous_id, settled.isoformat(), max_rows)
+    if not rows:
+        print(f"No new workflow_logs rows since {previous_watermark}")
+        return {"rows": 0, "deltas": 0, "watermark": previous_watermark}
+
+    deltas = build_deltas(rows)
+
+    # Rows arrive in (created_at, id) order, so with a capped run the processed
+    # rows are a prefix and the next run continues after the last one
+    new_watermark = parse_timestamp(rows[-1]["created_at"]).isoformat()
+    new_id = rows[-1]["id"]
+
+    with span("db.rpc.apply_token_cost_rollup", deltas=len(deltas)):
+        supabase.rpc("apply_token_cost_rollup", {
+            "p_job": JOB_NAME,
+            "p_previous_watermark": previous_watermark,
+            "p_previous_watermark_id": previous_id,
+            "p_watermark": new_watermark,
+            "p_watermark_id": new_id,
+            "p_deltas": deltas
+        }).execute()
+
+    unpriced = sorted({d["model"] for d in deltas if d["unpriced_calls"]})
+    summary = {
+        "rows": len(rows),
+        "deltas": len(deltas),
+        "cost_usd": round(sum(d["cost_usd"] for d in deltas), 6),
+        "watermark": new_watermark,
+        "settled_before": settled.isoformat(),
+        "unpriced_models": unpriced,
+        "capped": len(rows) >= max_rows
+    }
+    print(f"Cost rollup: {summary}")
+    return summary
+
+
+def load_state() -> dict:
+    """Current watermark: created_at and id of the last row counted."""
+    with span("db.rollup_watermarks.select"):
+        response = (
+            supabase.table("rollup_watermarks")
+            .select("watermark, watermark_id")
+            .eq("job", JOB_NAME)
+            .execute()
+        )
+    if not response.data:
+        return {"watermark": None, "watermark_id": None}
+    return response.data[0]
+
+
+def fetch_new_rows(after: str | None, after_id: str | None, before: str, max_rows: int) -> list[dict]:
+    """
+    LLM rows after (after, after_id) in (created_at, id) order and created
+    before `before`, oldest first, up to max_rows.
+    """
+    rows = []
+    while len(rows) < max_rows:
+        query = (
+            supabase.table("workflow_logs")
+            .select(LOG_COLUMNS)
+            .not_.is_("model", "null")
+            .lt("created_at", before)
+        )
+        if after and after_id:
+            query = query.or_(f'created_at.gt."{after}",and(created_at.eq."{after}",id.gt.{after_id})')
+        elif after:
+            query = query.gt("created_at", after)
+        limit = min(PAGE_SIZE, max_rows - len(rows))
+        with span("db.workflow_logs.select", offset=len(rows)):
+            page = (
+                query.order("created_at").order("id")
+                .range(len(rows), len(rows) + limit - 1)
+                .execute()
+            ).data
+        rows.extend(page)
+        if len(page) < limit:
+            break
+    return rows
+
+
+def build_deltas(rows: list[dict]) -> list[dict]:
+    """Sum calls, tokens and dollars per (day, campaign, model, employee)."""
+    prices = load_prices()
+    totals = defaultdict(lambda: {
+        "calls": 0, "input_tokens": 0, "output_tokens": 0, "cost_usd": 0.0, "unpriced_calls": 0
+    })
+
+    for row in rows:
+        day = parse_timestamp(row["created_at"]).date().isoformat()
+        key = (day, row.get("campaign_id"), row["model"], row.get("employee_id"))
+        input_tokens = row.get("input_tokens") or 0
+        output_tokens = row.get("output_tokens") or 0
+        batch = (row.get("step_name") or "").endswith("_batch")
+        cost = cost_usd(row["model"], input_tokens, output_tokens, prices, batch=batch)
+
+        bucket = totals[key]
+        bucket["calls"] += 1
+        bucket["input_tokens"] += input_tokens
+        bucket["output_tokens"] += output_tokens
+        if cost is None:
+            bucket["unpriced_calls"] += 1
+        else:
+            bucket["cost_usd"] += cost
+
+    return [
+        {
+            "day": day,
+            "campaign_id": campaign_id,
+            "model": model,
+            "employee_id": employee_id,
+            **bucket,
+            "cost_usd": round(bucket["cost_usd"], 6)
+        }
+        for (day, campaign_id, model, employee_id), bucket in totals.items()
+    ]
+
+
+def parse_timestamp(value: str) -> datetime:
+    """Parse a PostgREST timestamptz (handles 'Z' and short fractional seconds)."""
+    value = value.replace("Z", "+00:00")
+    if "." in value:
+        head, _, rest = value.partition(".")
+        digits = rest[:len(rest) - len(rest.lstrip("0123456789"))]
+        offset = rest[len(digits):]
+        value = f"{head}.{digits[:6].ljust(6, '0')}{offset}"
+    return datetime.fromisoformat(value)
@@ -12,6 +12,13 @@ from typing import Any
 from openai import OpenAI
 from supabase import create_client
 
+from meroka_common import capture
+from meroka_common.prompt_budget import (
+    TOKENS_PER_MESSAGE, TOKENS_PER_REPLY, assemble, budget_for, compare_tokens, count_tokens, section
+)
+from meroka_common.tracing import span, traced_handler
+from meroka_common.voice_profile import format_voice_profile
+
 supabase = create_client(
     os.environ["SUPABASE_URL"],
     os.environ["SUPABASE_SERVICE_KEY"]
@@ -19,7 +26,28 @@ supabase = create_client(
 
 client = OpenAI(api_key=os.environ["OPENAI_API_KEY"])
 
+JUDGE_MODEL = "gpt-4o-mini"  # Fast and cost-effective for judging
+
+# "scores": per-candidate 1-10 scores as schema-checked JSON; "select": the
+# free-text SELECTED/REASONING answer. Campaigns override both with
+# workflow_config.judge_mode / judge_reasoning.
+JUDGE_MODE = os.environ.get("JUDGE_MODE", "scores")
+JUDGE_REASONING = os.environ.get("JUDGE_REASONING", "false").lower() == "true"
+# Judge calls per post; an answer that cannot be parsed is retried
+JUDGE_MAX_ATTEMPTS = int(os.environ.get("JUDGE_MAX_ATTEMPTS", "2"))
+
+# Output budgets: a scores-only answer ({"scores":[8,6,7]}) is ~10 tokens
+JUDGE_MAX_TOKENS = 256
+JUDGE_SCORES_MAX_TOKENS = 32
+JUDGE_SCORES_REASONING_MAX_TOKENS = 160
+
+
+def warm() -> None:
+    """Load the judge's tokenizer before the first prompt (warm-up events)."""
+    count_tokens("warm", JUDGE_MODEL)
 
+
+@traced_handler("llm-aggregator", warm=warm)
 def lambda_handler(event: dict, context: Any) -> dict:
     """
     Aggregate LLM council results and select the best post.
@@ -58,8 +86,9 @@ def lambda_handler(event: dict, context: Any) -> dict:
         raise ValueError("No valid posts from council")
 
     # Select best post
+    judge_usage, judge = {}, None
     if selection_method == "llm_judge":
-        selected, reasoning = select_with_llm_judge(posts, ctx)
+        selected, reasoning, judge_usage, judge = select_with_llm_judge(posts, ctx, execution_id)
     elif selection_method == "random":
         import random
         selected = random.choice(posts)
@@ -78,7 +107,9 @@ def lambda_handler(event: dict, context: Any) -> dict:
         posts_count=len(posts),
         selected_source=selected["source"],
         selection_method=selection_method,
-        latency_ms=latency_ms
+        latency_ms=latency_ms,
+        judge_usage=judge_usage,
+        judge=judge
     )
 
     return {
@@ -90,13 +121,141 @@ def lambda_handler(event: dict, context: Any) -> dict:
             "council_size": len(posts),
             "selection_method": selection_method,
             "sources": [p["source"] for p in posts],
-            "latency_ms": latency_ms
+            "latency_ms": latency_ms,
+            **({"judge": judge} if judge else {})
         }
     }
 
 
-def select_with_llm_judge(posts: list[dict], ctx: dict) -> tuple[dict, str]:
-    """Use GPT-4o-mini as a judge to select the best post."""
+def select_with_llm_judge(posts: list[dict], ctx: dict, execution_id: str) -> tuple[dict, str, dict, dict]:
+    """
+    Use GPT-4o-mini as a judge to select the best post.
+
+    Returns (post, reasoning, usage, judge); usage holds the judge's token
+    counts over all attempts, the prompt budget report with estimated vs
+    actual prompt tokens and, when the post is sampled, the raw capture of
+    the prompt and every answer (see meroka_common.capture). judge records the mode, attempts, parse failures and,
+    in scores mode, each candidate's score (in council order, like "sources").
+    An unparseable answer is retried up to JUDGE_MAX_ATTEMPTS; after that the
+    first post is used and judge["fallback"] is set.
+    """
+    config = (ctx.get("campaign") or {}).get("workflow_config") or {}
+    mode = config.get("judge_mode", JUDGE_MODE)
+    with_reasoning = bool(config.get("judge_reasoning", JUDGE_REASONING))
+    if mode not in ("scores", "select"):
+        raise ValueError(f"Unknown judge_mode {mode!r}: expected scores or select")
+
+    with span("prompt.build") as s:
+        prompt, prompt_report = build_judge_prompt(posts, ctx, mode, with_reasoning)
+        s.set(estimated_tokens=prompt_report["estimated_tokens"], budget=prompt_report["budget"])
+
+    request = {
+        "model": JUDGE_MODEL,
+        "max_tokens": JUDGE_MAX_TOKENS,
+        "messages": [{"role": "user", "content": prompt}]
+    }
+    if mode == "scores":
+        request["max_tokens"] = JUDGE_SCORES_REASONING_MAX_TOKENS if with_reasoning else JUDGE_SCORES_MAX_TOKENS
+        request["response_format"] = scores_response_format(with_reasoning)
+
+    usage = {"input_tokens": 0, "output_tokens": 0, "prompt": None}
+    judge = {"mode": mode, "attempts": 0, "parse_failures": 0}
+    answers = []
+
+    def captured() -> dict | None:
+        return capture.capture(execution_id, "llm_aggregator", config, {
+            "model": JUDGE_MODEL,
+            "mode": mode,
+            "messages": request["messages"],
+            "candidates": [{"source": p["source"], "model": p["model"]} for p in posts],
+            "answers": answers,
+            "judge": judge
+        })
+
+    while judge["attempts"] < JUDGE_MAX_ATTEMPTS:
+        judge["attempts"] += 1
+        with span("llm.judge", model=JUDGE_MODEL, mode=mode, attempt=judge["attempts"]):
+            response = client.chat.completions.create(**request)
+
+        usage["input_tokens"] += response.usage.prompt_tokens
+        usage["output_tokens"] += response.usage.completion_tokens
+        usage["prompt"] = compare_tokens(prompt_report, response.usage.prompt_tokens)
+
+        choice = response.choices[0]
+        answers.append({"content": choice.message.content, "finish_reason": choice.finish_reason})
+        try:
+            if choice.finish_reason == "length":
+                raise ValueError(f"answer cut off at max_tokens={request['max_tokens']}")
+            if mode == "scores":
+                index, reasoning, scores = parse_scores(choice.message.content or "", len(posts))
+                judge["scores"] = scores
+            else:
+                index, reasoning = parse_selection(choice.message.content or "", len(posts))
+            usage["raw"] = captured()
+            return posts[index], reasoning, usage, judge
+        except ValueError as e:
+            judge["parse_failures"] += 1
+            judge["parse_error"] = str(e)
+            print(json.dumps({"judge_parse_failure": {
+                "mode": mode, "attempt": judge["attempts"], "error": str(e)
+            }}))
+
+    judge["fallback"] = True
+    usage["raw"] = captured()
+    return posts[0], f"Fallback selection (judge answer unparseable after {judge['attempts']} attempts)", usage, judge
+
+
+def scores_response_format(with_reasoning: bool) -> dict:
+    """Strict JSON schema for the scores-mode answer."""
+    properties = {"scores": {"type": "array", "items": {"type": "integer"}}}
+    if with_reasoning:
+        properties["reasoning"] = {"type": "string"}
+    return {
+        "type": "json_schema",
+        "json_schema": {
+            "name": "judge_scores",
+            "strict": True,
+            "schema": {
+                "type": "object",
+                "properties": properties,
+                "required": list(properties),
+                "additionalProperties": False
+            }
+        }
+    }
+
+
+def parse_scores(text: str, count: int) -> tuple[int, str, list[int]]:
+    """(index of the best post, reasoning, scores) from a scores-mode answer; ValueError if invalid."""
+    answer = json.loads(text)
+    scores = answer.get("scores") if isinstance(answer, dict) else None
+    if not isinstance(scores, list) or len(scores) != count:
+        raise ValueError(f"expected {count} scores, got {scores!r}")
+    if not all(isinstance(score, int) and 1 <= score <= 10 for score in scores):
+        raise ValueError(f"scores must be integers from 1 to 10, got {scores!r}")
+
+    # Ties go to the earlier candidate
+    best = max(range(count), key=lambda i: (scores[i], -i))
+    reasoning = (answer.get("reasoning") or "").strip() or f"Highest judge score ({scores[best]}/10)"
+    return best, reasoning, scores
+
+
+def parse_selection(text: str, count: int) -> tuple[int, str]:
+    """(index, reasoning) from a SELECTED/REASONING answer; ValueError if invalid."""
+    lines = text.strip().split("\n")
+    selected = [l for l in lines if l.startswith("SELECTED:")]
+    reasoning = [l for l in lines if l.startswith("REASONING:")]
+    if not selected or not reasoning:
+        raise ValueError("answer lacks SELECTED: or REASONING: line")
+
+    index = int(selected[0].replace("SELECTED:", "").strip()) - 1
+    if not 0 <= index < count:
+        raise ValueError(f"selected post {index + 1} is not between 1 and {count}")
+    return index, reasoning[0].replace("REASONING:", "").strip()
+
+
+def build_judge_prompt(posts: list[dict], ctx: dict, mode: str = "select", with_reasoning: bool = True) -> tuple[str, dict]:
+    """Build the judge prompt; only the voice section gives way to the token budget."""
     employee = ctx["employee"]
     samples = ctx["voice_samples"]
 
@@ -106,51 +265,42 @@ def select_with_llm_judge(posts: list[dict], ctx: dict) -> tuple[dict, str]:
         for i, p in enumerate(posts)
     ])
 
-    prompt = f"""You are evaluating LinkedIn posts written for {employee['name']}.
-
-ABOUT THE PERSON:
-{samples['blurb'] if samples and samples.get('blurb') else 'A professional'}
+    voice_profile = ctx.get("voice_profile")
+    if voice_profile:
+        voice = format_voice_profile(voice_profile, "A professional", include_openers=False)
+    else:
+        blurb = samples.get("blurb") if samples else None
+        example = (samples or {}).get("example_post_1") or "[No example]"
+        voice = f'ABOUT THE PERSON:\n{blurb or "A professional"}\n\nEXAMPLE OF THEIR AUTHENTIC VOICE:\n"{example}"'
 
-EXAMPLE OF THEIR AUTHENTIC VOICE:
-"{samples['example_post_1'] if samples and samples.get('example_post_1') else '[No example]'}"
-
-CANDIDATE POSTS:
-{posts_text}
-
-EVALUATION CRITERIA:
+    return assemble([
+        section("header", f"You are evaluating LinkedIn posts written for {employee['name']}."),
+        section("voice", voice, priority=1, trim=True),
+        section("candidates", f"CANDIDATE POSTS:\n{posts_text}"),
+        section("criteria", f"""EVALUATION CRITERIA:
 1. Voice authenticity - Does it sound like the person based on their examples?
 2. Engagement potential - Will it generate likes, comments, shares?
 3. Brand alignment - Does it subtly reinforce the mission without being preachy?
 4. Originality - Is it fresh and interesting?
 5. LinkedIn appropriateness - Right length, tone, format for the platform?
 
-Select the BEST post. Respond in this exact format:
-SELECTED: [number 1-{len(posts)}]
-REASONING: [2-3 sentences explaining why]"""
-
-    response = client.chat.completions.create(
-        model="gpt-4o-mini",  # Fast and cost-effective for judging
-        max_tokens=256,
-        messages=[{"role": "user", "content": prompt}]
-    )
-
-    response_text = response.choices[0].message.content
+{answer_format(len(posts), mode, with_reasoning)}""")
+    ], JUDGE_MODEL, budget_for(ctx, judge=True), reserved_tokens=TOKENS_PER_MESSAGE + TOKENS_PER_REPLY)
 
-    # Parse response
-    try:
-        lines = response_text.strip().split("\n")
-        selected_line = [l for l in lines if l.startswith("SELECTED:")][0]
-        selected_num = int(selected_line.replace("SELECTED:", "").strip()) - 1
-        reasoning_line = [l for l in lines if l.startswith("REASONING:")][0]
-        reasoning = reasoning_line.replace("REASONING:", "").strip()
 
-        if 0 <= selected_num < len(posts):
-            return posts[selected_num], reasoning
-    except (ValueError, IndexError):
-        pass
+def answer_format(count: int, mode: str, with_reasoning: bool) -> str:
+    """The judge prompt's answer instructions for a mode."""
+    if mode == "select":
+        return f"""Select the BEST post. Respond in this exact format:
+SELECTED: [number 1-{count}]
+REASONING: [2-3 sentences explaining why]"""
 
-    # Fallback to first post if parsing fails
-    return posts[0], "Fallback selection (parsing failed)"
+    reasoning = ', "reasoning": "<one sentence on the best post>"' if with_reasoning else ""
+    return (
+        f"Score EVERY post from 1 (poor) to 10 (excellent) against all criteria. "
+        f"Respond with JSON only, one score per post in order:\n"
+        f'{{"scores": [<post 1>, ..., <post {count}>]{reasoning}}}'
+    )
 
 
 def log_aggregation(
@@ -160,21 +310,29 @@ def log_aggregation(
     posts_count: int,
     selected_source: str,
     selection_method: str,
-    latency_ms: int
+    latency_ms: int,
+    judge_usage: dict,
+    judge: dict | None = None
 ) -> None:
-    """Log aggregation step."""
-    supabase.table("workflow_logs").insert({
-        "execution_id": execution_id,
-        "campaign_id": campaign_id,
-        "employee_id": employee_id,
-        "workflow_type": "complex",
-        "step_name": "llm_aggregator",
-        "model": "gpt-4o-mini",
-        "latency_ms": latency_ms,
-        "status": "success",
-        "metadata": {
-            "posts_count": posts_count,
-            "selected_source": selected_source,
-            "selection_method": selection_method
-        }
-    }).execute()
+    """Log aggregation step, with the judge's token usage and outcome when it ran."""
+    with span("db.workflow_logs.insert"):
+        supabase.table("workflow_logs").insert({
+            "execution_id": execution_id,
+            "campaign_id": campaign_id,
+            "employee_id": employee_id,
+            "workflow_type": "complex",
+            "step_name": "llm_aggregator",
+            "model": JUDGE_MODEL,
+            "input_tokens": judge_usage.get("input_tokens", 0),
+            "output_tokens": judge_usage.get("output_tokens", 0),
+            "latency_ms": latency_ms,
+            "status": "success",
+            "metadata": {
+                "posts_count": posts_count,
+                "selected_source": selected_source,
+                "selection_method": selection_method,
+                "prompt": judge_usage.get("prompt"),
+                "judge": judge,
+                **({"raw": judge_usage["raw"]} if judge_usage.get("raw") else {})
+            }
+        }).execute()
@@ -11,14 +11,25 @@ from typing import Any
 import httpx
 from supabase import create_client
 
+from meroka_common import capture
+from meroka_common.prompt_budget import assemble, budget_for, compare_tokens, section
+from meroka_common.tracing import span, traced_handler
+from meroka_common.voice_profile import format_voice_profile
+
 supabase = create_client(
     os.environ["SUPABASE_URL"],
     os.environ["SUPABASE_SERVICE_KEY"]
 )
 
-GEMINI_API_URL = "https://generativelanguage.googleapis.com/v1beta/models"
+GEMINI_API_URL = os.environ.get(
+    "GEMINI_API_URL", "https://generativelanguage.googleapis.com/v1beta/models"
+)
+
+# Reused across warm invocations so the TLS connection to the API is kept alive
+http = httpx.Client(timeout=60.0)
 
 
+@traced_handler("llm-gemini")
 def lambda_handler(event: dict, context: Any) -> dict:
     """
     Generate post content using Google Gemini.
@@ -39,11 +50,13 @@ def lambda_handler(event: dict, context: Any) -> dict:
     start_time = time.time()
 
     try:
-        prompt = build_prompt(ctx, style)
+        with span("prompt.build") as s:
+            prompt, prompt_report = build_prompt(ctx, style, model)
+            s.set(estimated_tokens=prompt_report["estimated_tokens"], budget=prompt_report["budget"])
         api_key = os.environ["GEMINI_API_KEY"]
 
-        with httpx.Client(timeout=60.0) as client:
-            response = client.post(
+        with span("llm.gemini", model=model):
+            response = http.post(
                 f"{GEMINI_API_URL}/{model}:generateContent?key={api_key}",
                 headers={"Content-Type": "application/json"},
                 json={
@@ -64,6 +77,12 @@ def lambda_handler(event: dict, context: Any) -> dict:
         content = data["candidates"][0]["content"]["parts"][0]["text"]
         usage = data.get("usageMetadata", {})
         latency_ms = int((time.time() - start_time) * 1000)
+        raw = capture.capture(execution_id, "llm_gemini", ctx["campaign"].get("workflow_config"), {
+            "model": model,
+            "prompt": prompt,
+            "completion": content,
+            "finish_reason": data["candidates"][0].get("finishReason")
+        })
 
         log_llm_call(
             execution_id=execution_id,
@@ -73,7 +92,11 @@ def lambda_handler(event: dict, context: Any) -> dict:
             input_tokens=usage.get("promptTokenCount", 0),
             output_tokens=usage.get("candidatesTokenCount", 0),
             latency_ms=latency_ms,
-            status="success"
+            status="success",
+            metadata={
+                "prompt": compare_tokens(prompt_report, usage.get("promptTokenCount")),
+                **({"raw": raw} if raw else {})
+            }
         )
 
         return {
@@ -112,8 +135,8 @@ def lambda_handler(event: dict, context: Any) -> dict:
         raise
 
 
-def build_prompt(ctx: dict, style: str) -> str:
-    """Build the prompt for post generation."""
+def build_prompt(ctx: dict, style: str, model: str) -> tuple[str, dict]:
+    """Build the prompt for post generation, fitted to the campaign's token budget."""
     employee = ctx["employee"]
     samples = ctx["voice_samples"]
     campaign = ctx["campaign"]
@@ -125,29 +148,33 @@ def build_prompt(ctx: dict, style: str) -> str:
         "balanced": "Balance professionalism with personality. Be engaging but not over the top."
     }
 
-    prompt = f"""Write a LinkedIn post for {employee['name']} at {brand['name']}.
-
-ABOUT THEM:
-{samples['blurb'] if samples and samples.get('blurb') else 'A professional at ' + brand['name']}
-
-THEIR VOICE (examples):
-
-"{samples['example_post_1'] if samples and samples.get('example_post_1') else '[No example]'}"
-
-"{samples['example_post_2'] if samples and samples.get('example_post_2') else '[No example]'}"
-
-"{samples['example_post_3'] if samples and samples.get('example_post_3') else '[No example]'}"
-
-CAMPAIGN: {campaign['name']}
-{campaign.get('description', '')}
-
-STYLE: {style_instructions.get(style, style_instructions['thoughtful'])}
-
-MISSION: Meroka = "Saving independence in medicine" - fighting PE consolidation, giving independent docs collective power.
-
-Write ONE LinkedIn post (150-280 words) that sounds like {employee['name']}. Be authentic, not corporate. Just the post, no preamble."""
-
-    return prompt
+    # Lower priority numbers are kept longest; required sections are never cut
+    voice_profile = ctx.get("voice_profile")
+    if voice_profile:
+        voice = [
+            section("voice_profile", format_voice_profile(voice_profile, f"A professional at {brand['name']}"),
+                    priority=1, trim=True)
+        ]
+    else:
+        blurb = samples.get("blurb") if samples else None
+        posts = [(samples or {}).get(f"example_post_{n}") or "[No example]" for n in (1, 2, 3)]
+        voice = [
+            section("about", f"ABOUT THEM:\n{blurb or 'A professional at ' + brand['name']}",
+                    priority=2, trim=True),
+            section("example_1", f'THEIR VOICE (examples):\n\n"{posts[0]}"', priority=1, trim=True),
+            section("example_2", f'"{posts[1]}"', priority=3, trim=True),
+            section("example_3", f'"{posts[2]}"', priority=4, trim=True)
+        ]
+
+    return assemble([
+        section("header", f"Write a LinkedIn post for {employee['name']} at {brand['name']}."),
+        *voice,
+        section("campaign", f"CAMPAIGN: {campaign['name']}\n{campaign.get('description') or ''}",
+                priority=1, trim=True),
+        section("style", f"STYLE: {style_instructions.get(style, style_instructions['thoughtful'])}"),
+        section("mission", 'MISSION: Meroka = "Saving independence in medicine" - fighting PE consolidation, giving independent docs collective power.'),
+        section("instructions", f"Write ONE LinkedIn post (150-280 words) that sounds like {employee['name']}. Be authentic, not corporate. Just the post, no preamble.")
+    ], model, budget_for(ctx))
 
 
 def log_llm_call(
@@ -159,19 +186,22 @@ def log_llm_call(
     status: str,
     input_tokens: int = 0,
     output_tokens: int = 0,
-    error_message: str | None = None
+    error_message: str | None = None,
+    metadata: dict | None = None
 ) -> None:
     """Log LLM call to workflow_logs."""
-    supabase.table("workflow_logs").insert({
-        "execution_id": execution_id,
-        "campaign_id": campaign_id,
-        "employee_id": employee_id,
-        "workflow_type": "complex",
-        "step_name": "llm_gemini",
-        "model": model,
-        "input_tokens": input_tokens,
-        "output_tokens": output_tokens,
-        "latency_ms": latency_ms,
-        "status": status,
-        "error_message": error_message
-    }).execute()
+    with span("db.workflow_logs.insert"):
+        supabase.table("workflow_logs").insert({
+            "execution_id": execution_id,
+            "campaign_id": campaign_id,
+            "employee_id": employee_id,
+            "workflow_type": "complex",
+            "step_name": "llm_gemini",
+            "model": model,
+            "input_tokens": input_tokens,
+            "output_tokens": output_tokens,
+            "latency_ms": latency_ms,
+            "status": status,
+            "error_message": error_message,
+            "metadata": metadata or {}
+        }).execute()
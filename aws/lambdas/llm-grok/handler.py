@@ -11,14 +11,35 @@ from typing import Any
 import httpx
 from supabase import create_client
 
+from meroka_common import capture
+from meroka_common.prompt_budget import (
+    TOKENS_PER_MESSAGE, assemble, budget_for, compare_tokens, count_chat_tokens, count_tokens, section
+)
+from meroka_common.tracing import span, traced_handler
+from meroka_common.voice_profile import format_voice_profile
+
 supabase = create_client(
     os.environ["SUPABASE_URL"],
     os.environ["SUPABASE_SERVICE_KEY"]
 )
 
-GROK_API_URL = "https://api.x.ai/v1/chat/completions"
+GROK_API_URL = os.environ.get("GROK_API_URL", "https://api.x.ai/v1/chat/completions")
+
+# Reused across warm invocations so the TLS connection to the API is kept alive
+http = httpx.Client(timeout=60.0)
+
+SYSTEM_MESSAGE = {
+    "role": "system",
+    "content": "You are a witty, irreverent LinkedIn content writer who captures authentic voices while being engaging and slightly edgy."
+}
+
 
+def warm() -> None:
+    """Load the tokenizer before the first prompt (warm-up events)."""
+    count_tokens("warm", "grok-4")
 
+
+@traced_handler("llm-grok", warm=warm)
 def lambda_handler(event: dict, context: Any) -> dict:
     """
     Generate post content using Grok.
@@ -39,10 +60,12 @@ def lambda_handler(event: dict, context: Any) -> dict:
     start_time = time.time()
 
     try:
-        prompt = build_prompt(ctx, style)
+        with span("prompt.build") as s:
+            prompt, prompt_report = build_prompt(ctx, style, model)
+            s.set(estimated_tokens=prompt_report["estimated_tokens"], budget=prompt_report["budget"])
 
-        with httpx.Client(timeout=60.0) as client:
-            response = client.post(
+        with span("llm.grok", model=model):
+            response = http.post(
                 GROK_API_URL,
                 headers={
                     "Authorization": f"Bearer {os.environ['GROK_API_KEY']}",
@@ -51,13 +74,7 @@ def lambda_handler(event: dict, context: Any) -> dict:
                 json={
                     "model": model,
                     "max_tokens": 1024,
-                    "messages": [
-                        {
-                            "role": "system",
-                            "content": "You are a witty, irreverent LinkedIn content writer who captures authentic voices while being engaging and slightly edgy."
-                        },
-                        {"role": "user", "content": prompt}
-                    ]
+                    "messages": [SYSTEM_MESSAGE, {"role": "user", "content": prompt}]
                 }
             )
             response.raise_for_status()
@@ -66,6 +83,12 @@ def lambda_handler(event: dict, context: Any) -> dict:
         content = data["choices"][0]["message"]["content"]
         usage = data.get("usage", {})
         latency_ms = int((time.time() - start_time) * 1000)
+        raw = capture.capture(execution_id, "llm_grok", ctx["campaign"].get("workflow_config"), {
+            "model": model,
+            "messages": [SYSTEM_MESSAGE, {"role": "user", "content": prompt}],
+            "completion": content,
+            "finish_reason": data["choices"][0].get("finish_reason")
+        })
 
         log_llm_call(
             execution_id=execution_id,
@@ -75,7 +98,11 @@ def lambda_handler(event: dict, context: Any) -> dict:
             input_tokens=usage.get("prompt_tokens", 0),
             output_tokens=usage.get("completion_tokens", 0),
             latency_ms=latency_ms,
-            status="success"
+            status="success",
+            metadata={
+                "prompt": compare_tokens(prompt_report, usage.get("prompt_tokens")),
+                **({"raw": raw} if raw else {})
+            }
         )
 
         return {
@@ -114,8 +141,8 @@ def lambda_handler(event: dict, context: Any) -> dict:
         raise
 
 
-def build_prompt(ctx: dict, style: str) -> str:
-    """Build the prompt for post generation."""
+def build_prompt(ctx: dict, style: str, model: str) -> tuple[str, dict]:
+    """Build the prompt for post generation, fitted to the campaign's token budget."""
     employee = ctx["employee"]
     samples = ctx["voice_samples"]
     campaign = ctx["campaign"]
@@ -127,29 +154,33 @@ def build_prompt(ctx: dict, style: str) -> str:
         "balanced": "Balance professionalism with personality. Be engaging but not over the top."
     }
 
-    prompt = f"""Write a LinkedIn post for {employee['name']} at {brand['name']}.
-
-ABOUT THEM:
-{samples['blurb'] if samples and samples.get('blurb') else 'A professional at ' + brand['name']}
-
-THEIR VOICE (examples):
-
-"{samples['example_post_1'] if samples and samples.get('example_post_1') else '[No example]'}"
-
-"{samples['example_post_2'] if samples and samples.get('example_post_2') else '[No example]'}"
-
-"{samples['example_post_3'] if samples and samples.get('example_post_3') else '[No example]'}"
-
-CAMPAIGN: {campaign['name']}
-{campaign.get('description', '')}
-
-STYLE: {style_instructions.get(style, style_instructions['witty'])}
-
-MISSION: Meroka = "Saving independence in medicine" - fighting PE consolidation, giving independent docs collective power.
-
-Write ONE LinkedIn post (150-280 words) that sounds like {employee['name']}. Be authentic, not corporate. Just the post."""
-
-    return prompt
+    # Lower priority numbers are kept longest; required sections are never cut
+    voice_profile = ctx.get("voice_profile")
+    if voice_profile:
+        voice = [
+            section("voice_profile", format_voice_profile(voice_profile, f"A professional at {brand['name']}"),
+                    priority=1, trim=True)
+        ]
+    else:
+        blurb = samples.get("blurb") if samples else None
+        posts = [(samples or {}).get(f"example_post_{n}") or "[No example]" for n in (1, 2, 3)]
+        voice = [
+            section("about", f"ABOUT THEM:\n{blurb or 'A professional at ' + brand['name']}",
+                    priority=2, trim=True),
+            section("example_1", f'THEIR VOICE (examples):\n\n"{posts[0]}"', priority=1, trim=True),
+            section("example_2", f'"{posts[1]}"', priority=3, trim=True),
+            section("example_3", f'"{posts[2]}"', priority=4, trim=True)
+        ]
+
+    return assemble([
+        section("header", f"Write a LinkedIn post for {employee['name']} at {brand['name']}."),
+        *voice,
+        section("campaign", f"CAMPAIGN: {campaign['name']}\n{campaign.get('description') or ''}",
+                priority=1, trim=True),
+        section("style", f"STYLE: {style_instructions.get(style, style_instructions['witty'])}"),
+        section("mission", 'MISSION: Meroka = "Saving independence in medicine" - fighting PE consolidation, giving independent docs collective power.'),
+        section("instructions", f"Write ONE LinkedIn post (150-280 words) that sounds like {employee['name']}. Be authentic, not corporate. Just the post.")
+    ], model, budget_for(ctx), reserved_tokens=count_chat_tokens([SYSTEM_MESSAGE], model) + TOKENS_PER_MESSAGE)
 
 
 def log_llm_call(
@@ -161,19 +192,22 @@ def log_llm_call(
     status: str,
     input_tokens: int = 0,
     output_tokens: int = 0,
-    error_message: str | None = None
+    error_message: str | None = None,
+    metadata: dict | None = None
 ) -> None:
     """Log LLM call to workflow_logs."""
-    supabase.table("workflow_logs").insert({
-        "execution_id": execution_id,
-        "campaign_id": campaign_id,
-        "employee_id": employee_id,
-        "workflow_type": "complex",
-        "step_name": "llm_grok",
-        "model": model,
-        "input_tokens": input_tokens,
-        "output_tokens": output_tokens,
-        "latency_ms": latency_ms,
-        "status": status,
-        "error_message": error_message
-    }).execute()
+    with span("db.workflow_logs.insert"):
+        supabase.table("workflow_logs").insert({
+            "execution_id": execution_id,
+            "campaign_id": campaign_id,
+            "employee_id": employee_id,
+            "workflow_type": "complex",
+            "step_name": "llm_grok",
+            "model": model,
+            "input_tokens": input_tokens,
+            "output_tokens": output_tokens,
+            "latency_ms": latency_ms,
+            "status": status,
+            "error_message": error_message,
+            "metadata": metadata or {}
+        }).execute()
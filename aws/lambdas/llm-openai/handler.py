@@ -1,6 +1,10 @@
 """
 OpenAI LLM Lambda
 Wrapper for OpenAI GPT-4 API calls.
+
+Besides one-off generations it runs the provider side of batch dispatch:
+submit_batch turns a campaign run's requests into one OpenAI Batch API job,
+poll_batch reports its status and fetch_batch_results downloads the outputs.
 """
 
 import json
@@ -11,6 +15,13 @@ from typing import Any
 import openai
 from supabase import create_client
 
+from meroka_common import capture
+from meroka_common.prompt_budget import (
+    TOKENS_PER_MESSAGE, assemble, budget_for, compare_tokens, count_chat_tokens, count_tokens, section
+)
+from meroka_common.tracing import span, traced_handler
+from meroka_common.voice_profile import format_voice_profile
+
 supabase = create_client(
     os.environ["SUPABASE_URL"],
     os.environ["SUPABASE_SERVICE_KEY"]
@@ -18,8 +29,49 @@ supabase = create_client(
 
 client = openai.OpenAI(api_key=os.environ["OPENAI_API_KEY"])
 
+SYSTEM_MESSAGE = {
+    "role": "system",
+    "content": "You are an expert LinkedIn content writer who captures authentic voices."
+}
+
+BATCH_ENDPOINT = "/v1/chat/completions"
+BATCH_COMPLETION_WINDOW = "24h"
+# Batches that ended with these statuses have an output file worth collecting
+BATCH_FINAL_STATUSES = ("completed", "expired", "cancelled")
+# Serialized bytes of results per fetch_batch_results response, under Lambda's
+# 6 MB synchronous invoke limit; callers page through the rest with "offset"
+BATCH_RESULTS_MAX_BYTES = int(os.environ.get("BATCH_RESULTS_MAX_BYTES", str(5 * 1024 * 1024)))
 
+
+def warm() -> None:
+    """Load the tokenizer before the first prompt (warm-up events)."""
+    count_tokens("warm", "gpt-4o")
+
+
+@traced_handler("llm-openai", warm=warm)
 def lambda_handler(event: dict, context: Any) -> dict:
+    """
+    Actions:
+    - generate (default): One post via the chat completions endpoint
+    - submit_batch: Create a Batch API job for many posts
+    - poll_batch: Status of a batch
+    - fetch_batch_results: Outputs of a finished batch
+    """
+    action = event.get("action", "generate")
+
+    if action == "generate":
+        return generate(event)
+    elif action == "submit_batch":
+        return submit_batch(event)
+    elif action == "poll_batch":
+        return poll_batch(event)
+    elif action == "fetch_batch_results":
+        return fetch_batch_results(event)
+    else:
+        return {"error": f"Unknown action: {action}"}
+
+
+def generate(event: dict) -> dict:
     """
     Generate post content using GPT-4.
 
@@ -39,22 +91,27 @@ def lambda_handler(event: dict, context: Any) -> dict:
     start_time = time.time()
 
     try:
-        prompt = build_prompt(ctx, style)
+        with span("prompt.build") as s:
+            prompt, prompt_report = build_prompt(ctx, style, model)
+            s.set(estimated_tokens=prompt_report["estimated_tokens"], budget=prompt_report["budget"])
 
-        response = client.chat.completions.create(
-            model=model,
-            max_tokens=1024,
-            messages=[
-                {
-                    "role": "system",
-                    "content": "You are an expert LinkedIn content writer who captures authentic voices."
-                },
-                {"role": "user", "content": prompt}
-            ]
-        )
+        with span("llm.openai", model=model) as s:
+            response = client.chat.completions.create(
+                model=model,
+                max_tokens=1024,
+                messages=[SYSTEM_MESSAGE, {"role": "user", "content": prompt}]
+            )
+            s.set(input_tokens=response.usage.prompt_tokens,
+                  output_tokens=response.usage.completion_tokens)
 
         content = response.choices[0].message.content
         latency_ms = int((time.time() - start_time) * 1000)
+        raw = capture.capture(execution_id, "llm_openai", ctx["campaign"].get("workflow_config"), {
+            "model": model,
+            "messages": [SYSTEM_MESSAGE, {"role": "user", "content": prompt}],
+            "completion": content,
+            "finish_reason": response.choices[0].finish_reason
+        })
 
         log_llm_call(
             execution_id=execution_id,
@@ -64,7 +121,11 @@ def lambda_handler(event: dict, context: Any) -> dict:
             input_tokens=response.usage.prompt_tokens,
             output_tokens=response.usage.completion_tokens,
             latency_ms=latency_ms,
-            status="success"
+            status="success",
+            metadata={
+                "prompt": compare_tokens(prompt_report, response.usage.prompt_tokens),
+                **({"raw": raw} if raw else {})
+            }
         )
 
         return {
@@ -101,43 +162,185 @@ def lambda_handler(event: dict, context: Any) -> dict:
         raise
 
 
-def build_prompt(ctx: dict, style: str) -> str:
-    """Build the prompt for post generation."""
-    employee = ctx["employee"]
-    samples = ctx["voice_samples"]
-    campaign = ctx["campaign"]
-    brand = ctx["brand"]
+def submit_batch(event: dict) -> dict:
+    """
+    Create one Batch API job with a chat completion per request.
 
-    style_instructions = {
-        "thoughtful": "Write in a thoughtful, insightful tone. Focus on depth and nuance.",
-        "witty": "Write with wit and humor. Be clever but not forced.",
-        "professional": "Write in a professional, polished tone. Be authoritative but approachable.",
-        "balanced": "Write in a balanced tone that's both professional and personable."
+    Event:
+    {
+        "action": "submit_batch",
+        "execution_id": "...",
+        "campaign_id": "...",
+        "model": "gpt-4o",
+        "style": "balanced",
+        "contexts": {"<employee_id>": {...}},   # context-fetcher shape, once per employee
+        "requests": [{"custom_id": "...", "employee_id": "..."}]
     }
 
-    prompt = f"""Write a LinkedIn post for {employee['name']} at {brand['name']}.
+    Requests for the same employee share one prompt, built once.
+    """
+    model = event.get("model", "gpt-4o")
+    style = event.get("style", "balanced")
+    requests = event["requests"]
 
-ABOUT THE PERSON:
-{samples['blurb'] if samples and samples.get('blurb') else 'A professional at ' + brand['name']}
+    with span("prompt.build", requests=len(requests)):
+        prompts = {
+            employee_id: build_prompt(ctx, style, model)[0]
+            for employee_id, ctx in event["contexts"].items()
+        }
 
-EXAMPLE POSTS IN THEIR VOICE:
+    lines = [
+        json.dumps({
+            "custom_id": request["custom_id"],
+            "method": "POST",
+            "url": BATCH_ENDPOINT,
+            "body": {
+                "model": model,
+                "max_tokens": 1024,
+                "messages": [SYSTEM_MESSAGE, {"role": "user", "content": prompts[request["employee_id"]]}]
+            }
+        })
+        for request in requests
+    ]
 
-1) {samples['example_post_1'] if samples and samples.get('example_post_1') else '[No example]'}
+    with span("llm.openai.batch_create", model=model, requests=len(lines)):
+        input_file = client.files.create(
+            file=("requests.jsonl", "\n".join(lines).encode("utf-8")),
+            purpose="batch"
+        )
+        batch = client.batches.create(
+            input_file_id=input_file.id,
+            endpoint=BATCH_ENDPOINT,
+            completion_window=BATCH_COMPLETION_WINDOW,
+            metadata={"execution_id": event["execution_id"], "campaign_id": event["campaign_id"]}
+        )
 
-2) {samples['example_post_2'] if samples and samples.get('example_post_2') else '[No example]'}
+    return {"batch_id": batch.id, "status": batch.status, "requests": len(lines)}
 
-3) {samples['example_post_3'] if samples and samples.get('example_post_3') else '[No example]'}
 
-CAMPAIGN: {campaign['name']}
-{campaign.get('description', '')}
+def poll_batch(event: dict) -> dict:
+    """Status and request counts of a batch ({"batch_id": "..."})."""
+    with span("llm.openai.batch_retrieve"):
+        batch = client.batches.retrieve(event["batch_id"])
 
-STYLE: {style_instructions.get(style, style_instructions['professional'])}
+    counts = batch.request_counts
+    return {
+        "batch_id": batch.id,
+        "status": batch.status,
+        "request_counts": {
+            "total": counts.total if counts else 0,
+            "completed": counts.completed if counts else 0,
+            "failed": counts.failed if counts else 0
+        }
+    }
+
+
+def fetch_batch_results(event: dict) -> dict:
+    """
+    One result per request of a finished batch ({"batch_id": "...", "offset": 0}):
+    {"custom_id", "content", "input_tokens", "output_tokens"} or {"custom_id", "error"}.
+
+    Results are returned from "offset" on, as many as fit in
+    BATCH_RESULTS_MAX_BYTES; next_offset is where the next page starts, or
+    None after the last. Requests an expired or cancelled batch never ran are
+    not in either file and so are missing from the results. latency_ms is the
+    batch's wall time.
+    """
+    with span("llm.openai.batch_retrieve"):
+        batch = client.batches.retrieve(event["batch_id"])
+    if batch.status not in BATCH_FINAL_STATUSES:
+        raise Exception(f"Batch {batch.id} is {batch.status}")
+
+    results = []
+    for file_id in (batch.output_file_id, batch.error_file_id):
+        if not file_id:
+            continue
+        with span("llm.openai.batch_download"):
+            text = client.files.content(file_id).text
+        results.extend(parse_batch_line(json.loads(line)) for line in text.splitlines() if line.strip())
 
-BRAND MISSION: "Saving independence in medicine" - Meroka builds collective power for independent physician practices.
+    offset = next_offset = int(event.get("offset", 0))
+    size = 0
+    while next_offset < len(results):
+        size += len(json.dumps(results[next_offset]))
+        if size > BATCH_RESULTS_MAX_BYTES and next_offset > offset:
+            break
+        next_offset += 1
 
-Write ONE LinkedIn post (150-280 words) that sounds authentically like {employee['name']} based on the examples. Post content only."""
+    finished_at = batch.completed_at or batch.expired_at or batch.cancelled_at or int(time.time())
+    return {
+        "batch_id": batch.id,
+        "status": batch.status,
+        "latency_ms": (finished_at - batch.created_at) * 1000,
+        "results": results[offset:next_offset],
+        "next_offset": next_offset if next_offset < len(results) else None
+    }
+
+
+def parse_batch_line(item: dict) -> dict:
+    """A Batch API output or error line as a result dict."""
+    response = item.get("response") or {}
+    body = response.get("body") or {}
+
+    if response.get("status_code") == 200:
+        usage = body.get("usage") or {}
+        return {
+            "custom_id": item["custom_id"],
+            "content": body["choices"][0]["message"]["content"],
+            "input_tokens": usage.get("prompt_tokens", 0),
+            "output_tokens": usage.get("completion_tokens", 0)
+        }
 
-    return prompt
+    error = item.get("error") or body.get("error") or {}
+    return {
+        "custom_id": item["custom_id"],
+        "error": error.get("message") or f"HTTP {response.get('status_code')}"
+    }
+
+
+def build_prompt(ctx: dict, style: str, model: str) -> tuple[str, dict]:
+    """Build the prompt for post generation, fitted to the campaign's token budget."""
+    employee = ctx["employee"]
+    samples = ctx["voice_samples"]
+    campaign = ctx["campaign"]
+    brand = ctx["brand"]
+
+    style_instructions = {
+        "thoughtful": "Write in a thoughtful, insightful tone. Focus on depth and nuance.",
+        "witty": "Write with wit and humor. Be clever but not forced.",
+        "professional": "Write in a professional, polished tone. Be authoritative but approachable.",
+        "balanced": "Write in a balanced tone that's both professional and personable."
+    }
+
+    # Lower priority numbers are kept longest; required sections are never cut
+    voice_profile = ctx.get("voice_profile")
+    if voice_profile:
+        voice = [
+            section("voice_profile", format_voice_profile(voice_profile, f"A professional at {brand['name']}"),
+                    priority=1, trim=True)
+        ]
+        voice_source = "their voice above"
+    else:
+        blurb = samples.get("blurb") if samples else None
+        posts = [(samples or {}).get(f"example_post_{n}") or "[No example]" for n in (1, 2, 3)]
+        voice = [
+            section("about", f"ABOUT THE PERSON:\n{blurb or 'A professional at ' + brand['name']}",
+                    priority=2, trim=True),
+            section("example_1", f"EXAMPLE POSTS IN THEIR VOICE:\n\n1) {posts[0]}", priority=1, trim=True),
+            section("example_2", f"2) {posts[1]}", priority=3, trim=True),
+            section("example_3", f"3) {posts[2]}", priority=4, trim=True)
+        ]
+        voice_source = "the examples"
+
+    return assemble([
+        section("header", f"Write a LinkedIn post for {employee['name']} at {brand['name']}."),
+        *voice,
+        section("campaign", f"CAMPAIGN: {campaign['name']}\n{campaign.get('description') or ''}",
+                priority=1, trim=True),
+        section("style", f"STYLE: {style_instructions.get(style, style_instructions['professional'])}"),
+        section("mission", 'BRAND MISSION: "Saving independence in medicine" - Meroka builds collective power for independent physician practices.'),
+        section("instructions", f"Write ONE LinkedIn post (150-280 words) that sounds authentically like {employee['name']} based on {voice_source}. Post content only.")
+    ], model, budget_for(ctx), reserved_tokens=count_chat_tokens([SYSTEM_MESSAGE], model) + TOKENS_PER_MESSAGE)
 
 
 def log_llm_call(
@@ -149,19 +352,22 @@ def log_llm_call(
     status: str,
     input_tokens: int = 0,
     output_tokens: int = 0,
-    error_message: str | None = None
+    error_message: str | None = None,
+    metadata: dict | None = None
 ) -> None:
     """Log LLM call to workflow_logs."""
-    supabase.table("workflow_logs").insert({
-        "execution_id": execution_id,
-        "campaign_id": campaign_id,
-        "employee_id": employee_id,
-        "workflow_type": "complex",
-        "step_name": "llm_openai",
-        "model": model,
-        "input_tokens": input_tokens,
-        "output_tokens": output_tokens,
-        "latency_ms": latency_ms,
-        "status": status,
-        "error_message": error_message
-    }).execute()
+    with span("db.workflow_logs.insert"):
+        supabase.table("workflow_logs").insert({
+            "execution_id": execution_id,
+            "campaign_id": campaign_id,
+            "employee_id": employee_id,
+            "workflow_type": "complex",
+            "step_name": "llm_openai",
+            "model": model,
+            "input_tokens": input_tokens,
+            "output_tokens": output_tokens,
+            "latency_ms": latency_ms,
+            "status": status,
+            "error_message": error_message,
+            "metadata": metadata or {}
+        }).execute()
@@ -0,0 +1,106 @@
+"""
+Log Maintenance Lambda
+Keeps the daily workflow_logs partitions rolling.
+
+Each run creates the partitions for the next PARTITIONS_AHEAD_DAYS days and
+compacts every daily partition older than the retention window into
+workflow_log_summaries (one row per execution), dropping its raw rows. Days
+with rows stranded in the default partition (missed runs) get their partition
+first, so those rows are compacted with the rest. Each partition is compacted
+in its own transaction, so a timeout part-way through loses nothing; the next
+run picks up where this one stopped.
+
+Executions stay queryable by execution_id through the workflow_log_history
+view, which unions live rows with compacted steps. post_dispatches rows that
+expired before the cutoff are deleted too; no sweep reads them any more.
+"""
+
+import os
+from datetime import date, datetime, timedelta, timezone
+from typing import Any
+
+from supabase import create_client
+
+from meroka_common.tracing import span, traced_handler
+
+supabase = create_client(
+    os.environ["SUPABASE_URL"],
+    os.environ["SUPABASE_SERVICE_KEY"]
+)
+
+RETENTION_DAYS = int(os.environ.get("WORKFLOW_LOGS_RETENTION_DAYS", "30"))
+PARTITIONS_AHEAD_DAYS = 7
+
+
+@traced_handler("log-maintenance")
+def lambda_handler(event: dict, context: Any) -> dict:
+    """
+    Create upcoming partitions and compact expired ones.
+
+    Event (all optional):
+    {
+        "retention_days": 30,  # overrides WORKFLOW_LOGS_RETENTION_DAYS
+        "dry_run": false       # list what would be compacted without changing anything
+    }
+    """
+    event = event or {}
+    retention_days = int(event.get("retention_days", RETENTION_DAYS))
+    dry_run = bool(event.get("dry_run", False))
+
+    # Never compact the last couple of days, whatever the event says; the
+    # cost rollup and in-flight executions still read them
+    if retention_days < 2:
+        raise ValueError(f"retention_days must be at least 2, got {retention_days}")
+
+    today = datetime.now(timezone.utc).date()
+    cutoff = today - timedelta(days=retention_days)
+
+    if dry_run:
+        return {
+            "dry_run": True,
+            "cutoff": cutoff.isoformat(),
+            "would_compact": [p["partition_name"] for p in list_partitions() if p["day"] < cutoff]
+        }
+
+    # Also moves default-partition rows into their day's partition, so list after
+    with span("db.rpc.ensure_workflow_logs_partitions"):
+        created = supabase.rpc("ensure_workflow_logs_partitions", {
+            "p_from": today.isoformat(),
+            "p_to": (today + timedelta(days=PARTITIONS_AHEAD_DAYS)).isoformat()
+        }).execute().data
+
+    expired = [p for p in list_partitions() if p["day"] < cutoff]
+    compacted = []
+    for partition in expired:
+        with span("db.rpc.compact_workflow_logs_partition", partition=partition["partition_name"]):
+            result = supabase.rpc("compact_workflow_logs_partition", {
+                "p_day": partition["day"].isoformat()
+            }).execute().data
+        print(f"Compacted {result}")
+        compacted.append(result)
+
+    with span("db.post_dispatches.delete"):
+        expired_dispatches = supabase.table("post_dispatches").delete().lt(
+            "expires_at", cutoff.isoformat()
+        ).execute().data
+
+    summary = {
+        "partitions_created": created,
+        "cutoff": cutoff.isoformat(),
+        "partitions_compacted": len(compacted),
+        "rows_compacted": sum(r["rows"] for r in compacted),
+        "executions_summarized": sum(r["executions"] for r in compacted),
+        "dispatches_deleted": len(expired_dispatches)
+    }
+    print(f"Log maintenance: {summary}")
+    return summary
+
+
+def list_partitions() -> list[dict]:
+    """Daily workflow_logs partitions, oldest first."""
+    with span("db.rpc.workflow_logs_partitions"):
+        rows = supabase.rpc("workflow_logs_partitions", {}).execute().data
+    return [
+        {"partition_name": row["partition_name"], "day": date.fromisoformat(row["day"])}
+        for row in rows
+    ]
@@ -13,6 +13,21 @@ import boto3
 from PIL import Image, ImageDraw, ImageFont
 from supabase import create_client
 
+from meroka_common.cache import log_cache_stats
+from meroka_common.text_analysis import extract_quote, extract_stat
+from meroka_common.tracing import span, traced_handler
+from meme_templates import (
+    DEFAULT_MEME_TEMPLATE,
+    MEROKA_ACCENT,
+    MEROKA_DARK,
+    TEMPLATES as MEME_TEMPLATES,
+    WHITE,
+    get_card_base,
+    load_font,
+    render_template,
+    warm_atlas,
+)
+
 supabase = create_client(
     os.environ["SUPABASE_URL"],
     os.environ["SUPABASE_SERVICE_KEY"]
@@ -22,33 +37,78 @@ s3 = boto3.client("s3")
 MEDIA_BUCKET = os.environ["MEDIA_BUCKET"]
 
 
+# Speculative renders of council candidates live under this prefix until the
+# judge picks one; the winner is copied to posts/ and the rest deleted. A bucket
+# lifecycle rule expires any left behind (e.g. by a failed execution).
+CANDIDATES_PREFIX = "candidates/"
+
+
+# Rendered by warm(); exercises the quote, stat and meme text paths
+WARMUP_TEXT = "Warm-up: 42% of clinicians say the first render is the slowest one."
+
+
+def warm() -> None:
+    """
+    Compile the meme templates and render every card once (fonts, bases,
+    PNG encoder) before the first post (warm-up events). Nothing is uploaded.
+    """
+    warm_atlas()
+    images = [render_quote_card(WARMUP_TEXT), render_stat_highlight(WARMUP_TEXT)]
+    images += [render_meme(WARMUP_TEXT, name) for name in MEME_TEMPLATES]
+    for image in images:
+        image.save(BytesIO(), format="PNG")
+
+
+@traced_handler("meme-renderer", warm=warm)
 def lambda_handler(event: dict, context: Any) -> dict:
     """
     Render meme/image for a post.
 
     Event:
     {
+        "action": "render" | "render_candidates" | "keep_selected",  # default render
         "post_content": "...",
-        "template": "quote_card" | "stat_highlight" | "meme",
+        "template": "quote_card" | "stat_highlight" | "meme" | "<meme template name>",
+        "meme_template": "top_bottom" | "two_panel" | "stat_callout",  # optional, for "meme"
         "execution_id": "..."
     }
+
+    render_candidates takes "council_results" instead of "post_content" and
+    renders every candidate; keep_selected takes "selected_source" and what
+    render_candidates returned as "candidate_media" (its error if it failed).
     """
+    action = event.get("action", "render")
+    if action == "render_candidates":
+        return render_candidates(event)
+    if action == "keep_selected":
+        return keep_selected(event)
+
+    execution_id = event["execution_id"]
+    result = render_and_upload(event, f"posts/{execution_id}/{uuid.uuid4().hex}.png")
+    log_cache_stats()
+    return result
+
+
+def render_and_upload(event: dict, image_key: str) -> dict:
+    """Render event["post_content"] with its template and upload it to image_key."""
     post_content = event.get("post_content", "")
     template = event.get("template", "quote_card")
-    execution_id = event["execution_id"]
+    meme_template = event.get("meme_template", DEFAULT_MEME_TEMPLATE)
 
     try:
-        if template == "quote_card":
-            image = render_quote_card(post_content)
-        elif template == "stat_highlight":
-            image = render_stat_highlight(post_content)
-        elif template == "meme":
-            image = render_meme(post_content)
-        else:
-            image = render_quote_card(post_content)
+        with span(f"render.{template}"):
+            if template == "quote_card":
+                image = render_quote_card(post_content)
+            elif template == "stat_highlight":
+                image = render_stat_highlight(post_content)
+            elif template == "meme":
+                image = render_meme(post_content, meme_template)
+            elif template in MEME_TEMPLATES:
+                image = render_meme(post_content, template)
+            else:
+                image = render_quote_card(post_content)
 
         # Upload to S3
-        image_key = f"posts/{execution_id}/{uuid.uuid4().hex}.png"
         image_url = upload_to_s3(image, image_key)
 
         return {
@@ -67,31 +127,83 @@ def lambda_handler(event: dict, context: Any) -> dict:
         }
 
 
+def render_candidates(event: dict) -> dict:
+    """
+    Render every council candidate while the judge is still choosing.
+
+    Returns {"renders": {source: render result}}; a failed render is kept as
+    its error so keep_selected can report it for the winner.
+    """
+    execution_id = event["execution_id"]
+    renders = {}
+    for result in event["council_results"]:
+        for key in ("gemini_result", "openai_result", "grok_result"):
+            if isinstance(result, dict) and key in result:
+                source = key.replace("_result", "")
+                renders[source] = render_and_upload(
+                    {**event, "post_content": result[key].get("content", "")},
+                    f"{CANDIDATES_PREFIX}{execution_id}/{source}-{uuid.uuid4().hex}.png"
+                )
+    log_cache_stats()
+    return {"renders": renders}
+
+
+def keep_selected(event: dict) -> dict:
+    """Copy the judge's pick to posts/ and delete the other candidates' renders."""
+    execution_id = event["execution_id"]
+    renders = (event.get("candidate_media") or {}).get("renders") or {}
+    selected = renders.get(event["selected_source"]) or {"urls": [], "error": "No render for selected post"}
+
+    result = {k: v for k, v in selected.items() if k != "key"}
+    if selected.get("key"):
+        image_key = f"posts/{execution_id}/{uuid.uuid4().hex}.png"
+        with span("s3.copy"):
+            s3.copy_object(
+                Bucket=MEDIA_BUCKET,
+                Key=image_key,
+                CopySource={"Bucket": MEDIA_BUCKET, "Key": selected["key"]},
+                ContentType="image/png",
+                MetadataDirective="REPLACE"
+            )
+        result.update(urls=[f"https://{MEDIA_BUCKET}.s3.amazonaws.com/{image_key}"], key=image_key)
+
+    discarded = [r["key"] for r in renders.values() if r.get("key")]
+    if discarded:
+        with span("s3.delete", objects=len(discarded)):
+            s3.delete_objects(
+                Bucket=MEDIA_BUCKET,
+                Delete={"Objects": [{"Key": key} for key in discarded], "Quiet": True}
+            )
+
+    return {**result, "candidates_rendered": len(discarded)}
+
+
+# Static card backgrounds, cached like meme template bases
+CARD_BASES = {
+    "quote_card": {
+        "size": (1200, 630),  # LinkedIn recommended
+        "background": MEROKA_DARK,
+        "shapes": [{"type": "rectangle", "xy": (0, 0, 8, 630), "fill": MEROKA_ACCENT}]
+    },
+    "stat_highlight": {
+        "size": (1200, 630),
+        "background": MEROKA_DARK,
+        "shapes": []
+    },
+}
+
+
 def render_quote_card(text: str) -> Image.Image:
     """Render a quote card with Meroka branding."""
-    # Meroka brand colors
-    MEROKA_DARK = (30, 41, 59)      # Dark blue-gray
-    MEROKA_ACCENT = (14, 165, 233)  # Cyan accent
-    WHITE = (255, 255, 255)
-
-    # Create image
-    width, height = 1200, 630  # LinkedIn recommended
-    image = Image.new("RGB", (width, height), MEROKA_DARK)
+    image = get_card_base("quote_card", CARD_BASES["quote_card"])
+    width, height = image.size
     draw = ImageDraw.Draw(image)
 
-    # Add accent bar
-    draw.rectangle([(0, 0), (8, height)], fill=MEROKA_ACCENT)
-
     # Extract a quote-worthy snippet (first sentence or 280 chars)
     quote = extract_quote(text)
 
-    # Add text (using default font since custom fonts need to be bundled)
-    try:
-        font = ImageFont.truetype("/var/task/fonts/Inter-Medium.ttf", 36)
-        font_small = ImageFont.truetype("/var/task/fonts/Inter-Regular.ttf", 24)
-    except:
-        font = ImageFont.load_default()
-        font_small = font
+    font = load_font("Inter-Medium.ttf", 36)
+    font_small = load_font("Inter-Regular.ttf", 24)
 
     # Wrap text
     wrapped = wrap_text(quote, font, width - 120)
@@ -110,23 +222,15 @@ def render_quote_card(text: str) -> Image.Image:
 
 def render_stat_highlight(text: str) -> Image.Image:
     """Render a stat/number highlight card."""
-    MEROKA_DARK = (30, 41, 59)
-    MEROKA_ACCENT = (14, 165, 233)
-    WHITE = (255, 255, 255)
-
-    width, height = 1200, 630
-    image = Image.new("RGB", (width, height), MEROKA_DARK)
+    image = get_card_base("stat_highlight", CARD_BASES["stat_highlight"])
+    width, height = image.size
     draw = ImageDraw.Draw(image)
 
     # Try to extract a number/stat from the text
     stat = extract_stat(text)
 
-    try:
-        font_large = ImageFont.truetype("/var/task/fonts/Inter-Bold.ttf", 120)
-        font_small = ImageFont.truetype("/var/task/fonts/Inter-Regular.ttf", 28)
-    except:
-        font_large = ImageFont.load_default()
-        font_small = font_large
+    font_large = load_font("Inter-Bold.ttf", 120)
+    font_small = load_font("Inter-Regular.ttf", 28)
 
     # Draw stat
     draw.text((width // 2, height // 2 - 60), stat["number"], fill=MEROKA_ACCENT,
@@ -140,56 +244,11 @@ def render_stat_highlight(text: str) -> Image.Image:
     return image
 
 
-def render_meme(text: str) -> Image.Image:
-    """Render a simple meme-style image."""
-    # For now, just render as quote card
-    # In production, you'd have actual meme templates
-    return render_quote_card(text)
-
-
-def extract_quote(text: str, max_length: int = 280) -> str:
-    """Extract a quotable snippet from the post."""
-    # Try to get the first impactful sentence
-    sentences = text.replace("\n", " ").split(". ")
-
-    if sentences:
-        # Find the most impactful sentence (not too short, not too long)
-        for sentence in sentences:
-            if 50 < len(sentence) < max_length:
-                return sentence.strip() + "."
-
-        # Fallback to first sentence
-        return sentences[0][:max_length].strip()
-
-    return text[:max_length]
-
-
-def extract_stat(text: str) -> dict:
-    """Try to extract a statistic from the text."""
-    import re
-
-    # Look for patterns like "15 hours", "18%", "$5,000", etc.
-    patterns = [
-        (r"(\d+%)", "percentage"),
-        (r"\$(\d+[,\d]*)", "dollars"),
-        (r"(\d+)\s*(hours?|days?|weeks?|months?|years?)", "time"),
-        (r"(\d+)\s*(patients?|doctors?|practices?|physicians?)", "count"),
-    ]
-
-    for pattern, ptype in patterns:
-        match = re.search(pattern, text, re.IGNORECASE)
-        if match:
-            if ptype == "percentage":
-                return {"number": match.group(1), "label": "improvement"}
-            elif ptype == "dollars":
-                return {"number": f"${match.group(1)}", "label": "saved"}
-            elif ptype == "time":
-                return {"number": match.group(1), "label": f"{match.group(2)} saved"}
-            elif ptype == "count":
-                return {"number": match.group(1), "label": match.group(2)}
-
-    # Default
-    return {"number": "100+", "label": "independent practices"}
+def render_meme(text: str, meme_template: str = DEFAULT_MEME_TEMPLATE) -> Image.Image:
+    """Render a meme from one of the compiled meme templates."""
+    if meme_template not in MEME_TEMPLATES:
+        meme_template = DEFAULT_MEME_TEMPLATE
+    return render_template(meme_template, text)
 
 
 def wrap_text(text: str, font: ImageFont.ImageFont, max_width: int) -> list[str]:
@@ -217,15 +276,17 @@ def wrap_text(text: str, font: ImageFont.ImageFont, max_width: int) -> list[str]
 
 def upload_to_s3(image: Image.Image, key: str) -> str:
     """Upload image to S3 and return URL."""
-    buffer = BytesIO()
-    image.save(buffer, format="PNG")
-    buffer.seek(0)
-
-    s3.put_object(
-        Bucket=MEDIA_BUCKET,
-        Key=key,
-        Body=buffer,
-        ContentType="image/png"
-    )
+    with span("render.encode_png"):
+        buffer = BytesIO()
+        image.save(buffer, format="PNG")
+        buffer.seek(0)
+
+    with span("s3.upload", bytes=buffer.getbuffer().nbytes):
+        s3.put_object(
+            Bucket=MEDIA_BUCKET,
+            Key=key,
+            Body=buffer,
+            ContentType="image/png"
+        )
 
     return f"https://{MEDIA_BUCKET}.s3.amazonaws.com/{key}"
@@ -0,0 +1,308 @@
+"""
+Meme Templates
+Declarative meme layouts compiled once per container into a pre-decoded atlas.
+
+Each template is a base image plus a list of text boxes. The base is either a
+PNG under assets/ or, when no PNG ships with the template, drawn from the
+template's background and shapes. Decoded bases are kept in memory and as raw
+RGB in the shared /tmp artifact cache so a warm invocation never pays for PNG
+decode or base drawing.
+"""
+
+import hashlib
+import json
+import os
+import time
+from functools import lru_cache
+
+from PIL import Image, ImageDraw, ImageFont
+
+from meroka_common.cache import get_cache
+from meroka_common.text_analysis import analyze_post
+
+ASSETS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "assets")
+FONTS_DIR = "/var/task/fonts"
+
+# Template bases only change on deploy, and the key includes a spec digest
+atlas_cache = get_cache("meme-atlas", ttl_seconds=7 * 24 * 3600)
+
+# Meroka brand colors
+MEROKA_DARK = (30, 41, 59)
+MEROKA_ACCENT = (14, 165, 233)
+MEROKA_PANEL = (51, 65, 85)
+WHITE = (255, 255, 255)
+
+DEFAULT_MEME_TEMPLATE = "top_bottom"
+
+# Text box fields:
+#   source  - "hook" (first sentence), "punchline" (last sentence), "quote",
+#             "stat_number", "stat_label", or "literal" (uses "text")
+#   box     - (left, top, right, bottom) in pixels
+#   font    - file name under FONTS_DIR
+#   sizes   - (max, min) font size; the largest size that fits wins
+TEMPLATES = {
+    "top_bottom": {
+        "size": (1200, 630),
+        "background": MEROKA_DARK,
+        "shapes": [
+            {"type": "rectangle", "xy": (0, 0, 1200, 8), "fill": MEROKA_ACCENT},
+            {"type": "rectangle", "xy": (0, 622, 1200, 630), "fill": MEROKA_ACCENT},
+        ],
+        "boxes": [
+            {"source": "hook", "box": (60, 40, 1140, 250), "font": "Inter-Bold.ttf",
+             "sizes": (64, 28), "fill": WHITE, "align": "center", "upper": True},
+            {"source": "punchline", "box": (60, 330, 1140, 540), "font": "Inter-Bold.ttf",
+             "sizes": (64, 28), "fill": WHITE, "align": "center", "upper": True},
+            {"source": "literal", "text": "meroka", "box": (60, 560, 400, 610),
+             "font": "Inter-Regular.ttf", "sizes": (24, 24), "fill": MEROKA_ACCENT,
+             "align": "left"},
+        ]
+    },
+    "two_panel": {
+        "size": (1200, 630),
+        "background": MEROKA_DARK,
+        "shapes": [
+            {"type": "rectangle", "xy": (0, 0, 596, 630), "fill": MEROKA_PANEL},
+            {"type": "rectangle", "xy": (596, 0, 604, 630), "fill": MEROKA_ACCENT},
+        ],
+        "boxes": [
+            {"source": "literal", "text": "EXPECTATION", "box": (40, 40, 556, 90),
+             "font": "Inter-Bold.ttf", "sizes": (28, 28), "fill": MEROKA_ACCENT,
+             "align": "center"},
+            {"source": "hook", "box": (40, 120, 556, 540), "font": "Inter-Medium.ttf",
+             "sizes": (44, 22), "fill": WHITE, "align": "center"},
+            {"source": "literal", "text": "REALITY", "box": (644, 40, 1160, 90),
+             "font": "Inter-Bold.ttf", "sizes": (28, 28), "fill": MEROKA_ACCENT,
+             "align": "center"},
+            {"source": "punchline", "box": (644, 120, 1160, 540), "font": "Inter-Medium.ttf",
+             "sizes": (44, 22), "fill": WHITE, "align": "center"},
+            {"source": "literal", "text": "meroka", "box": (40, 570, 400, 610),
+             "font": "Inter-Regular.ttf", "sizes": (24, 24), "fill": MEROKA_ACCENT,
+             "align": "left"},
+        ]
+    },
+    "stat_callout": {
+        "size": (1200, 630),
+        "background": MEROKA_DARK,
+        "shapes": [
+            {"type": "rectangle", "xy": (0, 0, 8, 630), "fill": MEROKA_ACCENT},
+            {"type": "ellipse", "xy": (80, 135, 440, 495), "outline": MEROKA_ACCENT, "width": 10},
+        ],
+        "boxes": [
+            {"source": "stat_number", "box": (100, 240, 420, 340), "font": "Inter-Bold.ttf",
+             "sizes": (96, 40), "fill": MEROKA_ACCENT, "align": "center"},
+            {"source": "stat_label", "box": (100, 340, 420, 400), "font": "Inter-Regular.ttf",
+             "sizes": (28, 18), "fill": WHITE, "align": "center"},
+            {"source": "quote", "box": (500, 120, 1140, 510), "font": "Inter-Medium.ttf",
+             "sizes": (40, 22), "fill": WHITE, "align": "left"},
+            {"source": "literal", "text": "meroka", "box": (60, 570, 400, 610),
+             "font": "Inter-Regular.ttf", "sizes": (24, 24), "fill": MEROKA_ACCENT,
+             "align": "left"},
+        ]
+    },
+}
+
+# Compiled templates, keyed by name (populated on first use per container)
+_atlas: dict[str, dict] = {}
+
+# Decoded bases for non-template cards (quote_card, stat_highlight)
+_card_bases: dict[str, Image.Image] = {}
+
+
+def render_template(name: str, text: str, analysis: dict | None = None) -> Image.Image:
+    """Render post text into the named meme template."""
+    template = get_compiled_template(name)
+    if analysis is None:
+        analysis = analyze_post(text)
+
+    image = template["base"].copy()
+    draw = ImageDraw.Draw(image)
+
+    for box in template["boxes"]:
+        value = resolve_source(box, analysis)
+        if value:
+            draw_text_box(draw, box, value)
+
+    return image
+
+
+def get_compiled_template(name: str) -> dict:
+    """Return the compiled template, compiling it on first use."""
+    if name not in TEMPLATES:
+        raise ValueError(f"Unknown meme template: {name}")
+
+    if name not in _atlas:
+        _atlas[name] = compile_template(name, TEMPLATES[name])
+
+    return _atlas[name]
+
+
+def compile_template(name: str, spec: dict) -> dict:
+    """Decode or draw the template base and freeze its box specs."""
+    start_time = time.time()
+    base, source = load_base(name, spec)
+
+    boxes = []
+    for box in spec["boxes"]:
+        compiled = dict(box)
+        compiled["box"] = tuple(box["box"])
+        compiled["sizes"] = tuple(box["sizes"])
+        boxes.append(compiled)
+
+    print(f"Compiled meme template {name} from {source} in "
+          f"{int((time.time() - start_time) * 1000)}ms")
+
+    return {"name": name, "base": base, "boxes": boxes}
+
+
+def load_base(name: str, spec: dict) -> tuple[Image.Image, str]:
+    """Load the base bitmap from the raw RGB atlas cache, the asset PNG, or the spec."""
+    width, height = spec["size"]
+    asset_path = os.path.join(ASSETS_DIR, spec["base"]) if spec.get("base") else None
+    cache_key = f"{name}.{width}x{height}.{base_digest(spec, asset_path)}.rgb"
+
+    data = atlas_cache.get(cache_key)
+    if data is not None and len(data) == width * height * 3:
+        return Image.frombytes("RGB", (width, height), data), "cache"
+
+    if asset_path:
+        with Image.open(asset_path) as decoded:
+            base = decoded.convert("RGB").resize((width, height))
+        source = "asset"
+    else:
+        base = draw_base(spec)
+        source = "spec"
+
+    atlas_cache.put(cache_key, base.tobytes())
+    return base, source
+
+
+def get_card_base(name: str, spec: dict) -> Image.Image:
+    """Return a fresh copy of a card base described by a template-style spec."""
+    if name not in _card_bases:
+        _card_bases[name] = load_base(name, spec)[0]
+    return _card_bases[name].copy()
+
+
+def draw_base(spec: dict) -> Image.Image:
+    """Draw a template base from its background and shapes."""
+    image = Image.new("RGB", tuple(spec["size"]), spec.get("background", MEROKA_DARK))
+    draw = ImageDraw.Draw(image)
+
+    for shape in spec.get("shapes", []):
+        if shape["type"] == "rectangle":
+            draw.rectangle(shape["xy"], fill=shape.get("fill"), outline=shape.get("outline"),
+                           width=shape.get("width", 1))
+        elif shape["type"] == "ellipse":
+            draw.ellipse(shape["xy"], fill=shape.get("fill"), outline=shape.get("outline"),
+                         width=shape.get("width", 1))
+
+    return image
+
+
+def base_digest(spec: dict, asset_path: str | None) -> str:
+    """Fingerprint everything that affects the base bitmap."""
+    key = {
+        "size": spec["size"],
+        "background": spec.get("background"),
+        "shapes": spec.get("shapes", []),
+    }
+    if asset_path:
+        stat = os.stat(asset_path)
+        key["asset"] = [os.path.basename(asset_path), stat.st_size, int(stat.st_mtime)]
+
+    return hashlib.sha1(json.dumps(key, sort_keys=True).encode()).hexdigest()[:12]
+
+
+def resolve_source(box: dict, analysis: dict) -> str:
+    """Pick the text a box should show from the analysed post."""
+    source = box["source"]
+    sentences = analysis["sentences"]
+
+    if source == "literal":
+        value = box.get("text", "")
+    elif source == "hook":
+        value = sentences[0] if sentences else ""
+    elif source == "punchline":
+        value = sentences[-1] if len(sentences) > 1 else ""
+    elif source == "quote":
+        value = analysis["quote"]
+    elif source == "stat_number":
+        value = analysis["stat"]["number"]
+    elif source == "stat_label":
+        value = analysis["stat"]["label"]
+    else:
+        value = ""
+
+    return value.upper() if box.get("upper") else value
+
+
+def draw_text_box(draw: ImageDraw.ImageDraw, box: dict, text: str) -> None:
+    """Draw text at the largest font size that fits the box."""
+    left, top, right, bottom = box["box"]
+    max_size, min_size = box["sizes"]
+    width, height = right - left, bottom - top
+
+    size = max_size
+    while True:
+        font = load_font(box["font"], size)
+        line_height = int(size * 1.25)
+        lines = wrap_lines(text, font, width)
+        if len(lines) * line_height <= height or size <= min_size:
+            break
+        size = max(min_size, size - 4)
+
+    # Anything that still does not fit at the minimum size is cut with an ellipsis
+    max_lines = max(1, height // line_height)
+    if len(lines) > max_lines:
+        lines = lines[:max_lines]
+        lines[-1] = lines[-1].rstrip(" .,;:") + "…"
+
+    y = top + (height - len(lines) * line_height) // 2
+    for line in lines:
+        line_width = font.getlength(line)
+        if box.get("align") == "center":
+            x = left + (width - line_width) / 2
+        elif box.get("align") == "right":
+            x = right - line_width
+        else:
+            x = left
+        draw.text((x, y), line, fill=box.get("fill", WHITE), font=font)
+        y += line_height
+
+
+def wrap_lines(text: str, font: ImageFont.ImageFont, max_width: int) -> list[str]:
+    """Greedy word wrap using real glyph widths."""
+    lines = []
+    current = ""
+
+    for word in text.split():
+        candidate = f"{current} {word}" if current else word
+        if current and font.getlength(candidate) > max_width:
+            lines.append(current)
+            current = word
+        else:
+            current = candidate
+
+    if current:
+        lines.append(current)
+
+    return lines
+
+
+@lru_cache(maxsize=64)
+def load_font(file_name: str, size: int) -> ImageFont.ImageFont:
+    """Load a bundled font, falling back to Pillow's default."""
+    try:
+        return ImageFont.truetype(os.path.join(FONTS_DIR, file_name), size)
+    except OSError:
+        try:
+            return ImageFont.load_default(size=size)
+        except TypeError:
+            return ImageFont.load_default()
+
+
+def warm_atlas() -> None:
+    """Compile every template up front."""
+    for name in TEMPLATES:
+        get_compiled_template(name)
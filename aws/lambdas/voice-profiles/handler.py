@@ -0,0 +1,135 @@
+"""
+Voice Profiles Lambda
+Precomputes compact voice profiles from employee_voice_samples.
+
+Each run reads the sample rows and the stored profile hashes, and rebuilds
+only the profiles whose samples changed (sample_hash differs) or that were
+built by an older PROFILE_VERSION. Unchanged employees cost one hash each and
+no writes.
+
+Context fetchers fall back to building a profile in-process when the stored
+one is missing or stale, so a sample edited between runs is never prompted
+with an outdated profile.
+"""
+
+import os
+from datetime import datetime, timezone
+from typing import Any
+
+from supabase import create_client
+
+from meroka_common.tracing import span, traced_handler
+from meroka_common.voice_profile import PROFILE_VERSION, build_profile, format_voice_profile
+from meroka_common.voice_samples import SAMPLE_FIELDS, sample_hash
+
+supabase = create_client(
+    os.environ["SUPABASE_URL"],
+    os.environ["SUPABASE_SERVICE_KEY"]
+)
+
+PAGE_SIZE = 1000
+UPSERT_CHUNK = 200
+EMAIL_CHUNK = 100  # emails per ilike(any) filter, keeping the request URL short
+
+
+@traced_handler("voice-profiles")
+def lambda_handler(event: dict, context: Any) -> dict:
+    """
+    Rebuild stale voice profiles.
+
+    Event (all optional):
+    {
+        "emails": ["..."],  # only consider these employees (e.g. right after an import)
+        "force": false      # rebuild every profile
+    }
+    """
+    event = event or {}
+    emails = [e.strip().lower() for e in event.get("emails") or []]
+    force = bool(event.get("force", False))
+
+    stored = load_profile_hashes()
+    samples = fetch_samples(emails)
+
+    now = datetime.now(timezone.utc).isoformat()
+    upserts = []
+    for row in samples:
+        key = row["email"].strip().lower()
+        if not force and stored.get(key) == (sample_hash(row), PROFILE_VERSION):
+            continue
+        profile = build_profile(row)
+        upserts.append({
+            "email": row["email"],
+            "source_hash": profile["source_hash"],
+            "profile_version": PROFILE_VERSION,
+            "profile": profile,
+            "prompt_chars": len(format_voice_profile(profile, "")),
+            "sample_chars": sum(len(row.get(field) or "") for field in SAMPLE_FIELDS),
+            "updated_at": now
+        })
+
+    for start in range(0, len(upserts), UPSERT_CHUNK):
+        with span("db.employee_voice_profiles.upsert"):
+            supabase.table("employee_voice_profiles").upsert(
+                upserts[start:start + UPSERT_CHUNK], on_conflict="email", returning="minimal"
+            ).execute()
+
+    summary = {
+        "samples": len(samples),
+        "rebuilt": len(upserts),
+        "unchanged": len(samples) - len(upserts),
+        "prompt_chars": sum(u["prompt_chars"] for u in upserts),
+        "sample_chars": sum(u["sample_chars"] for u in upserts)
+    }
+    print(f"Voice profiles: {summary}")
+    return summary
+
+
+def load_profile_hashes() -> dict[str, tuple[str, int]]:
+    """email -> (source_hash, profile_version) for every stored profile."""
+    hashes = {}
+    for row in fetch_pages("employee_voice_profiles", "email, source_hash, profile_version"):
+        hashes[row["email"].strip().lower()] = (row["source_hash"], row["profile_version"])
+    return hashes
+
+
+def fetch_samples(emails: list[str]) -> list[dict]:
+    """
+    Sample rows of these (lowercased) emails, or of everyone. Rows keep the
+    email spelling they were imported with, so emails are matched case-insensitively.
+    """
+    columns = "email, is_sample, " + ", ".join(SAMPLE_FIELDS)
+    if not emails:
+        return fetch_pages("employee_voice_samples", columns)
+
+    wanted = set(emails)
+    rows = []
+    for start in range(0, len(emails), EMAIL_CHUNK):
+        # _ and % are ILIKE wildcards, so this can over-match; exact matches are kept below
+        chunk = emails[start:start + EMAIL_CHUNK]
+        patterns = ",".join('"' + email.replace("\\", "\\\\").replace('"', '\\"') + '"' for email in chunk)
+        with span("db.employee_voice_samples.select"):
+            rows += (
+                supabase.table("employee_voice_samples")
+                .select(columns)
+                .filter("email", "ilike(any)", f"{{{patterns}}}")
+                .execute()
+            ).data
+    return [row for row in rows if row["email"].strip().lower() in wanted]
+
+
+def fetch_pages(table: str, columns: str) -> list[dict]:
+    rows = []
+    offset = 0
+    while True:
+        with span(f"db.{table}.select"):
+            page = (
+                supabase.table(table)
+                .select(columns)
+                .order("email")
+                .range(offset, offset + PAGE_SIZE - 1)
+                .execute()
+            ).data
+        rows.extend(page)
+        if len(page) < PAGE_SIZE:
+            return rows
+        offset += PAGE_SIZE
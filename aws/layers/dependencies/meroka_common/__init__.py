@@ -0,0 +1,4 @@
+"""
+Meroka Common
+Shared helpers for the orchestration lambdas, shipped in the dependencies layer.
+"""
@@ -0,0 +1,318 @@
+"""
+Artifact Cache
+Two-tier (memory + /tmp) cache for artefacts that are expensive to rebuild.
+
+Lambda keeps /tmp and module globals alive across warm invocations on the same
+container, so anything cached here survives until the container is recycled.
+Entries expire by TTL and are evicted least-recently-used when a tier is over
+its size budget. Disk writes are atomic (temp file + rename), so a concurrent
+reader never sees a partial entry.
+
+Usage:
+    from meroka_common.cache import get_cache, log_cache_stats
+
+    cache = get_cache("campaign-config", ttl_seconds=300)
+    config = cache.get_or_build_json(f"campaign:{campaign_id}", lambda: fetch(campaign_id))
+    ...
+    log_cache_stats()
+"""
+
+import hashlib
+import json
+import os
+import struct
+import tempfile
+import time
+from collections import OrderedDict
+from typing import Any, Callable
+
+CACHE_ROOT = os.environ.get("MEROKA_CACHE_DIR", "/tmp/meroka-cache")
+
+DEFAULT_TTL_SECONDS = 3600
+DEFAULT_MEMORY_BYTES = 64 * 1024 * 1024
+DEFAULT_DISK_BYTES = 256 * 1024 * 1024
+
+# Disk entry header: expiry as a unix timestamp (big-endian double)
+HEADER = struct.Struct(">d")
+
+_caches: dict[str, "ArtifactCache"] = {}
+
+
+class ArtifactCache:
+    """Namespaced bytes cache with an in-memory LRU front and a /tmp back."""
+
+    def __init__(
+        self,
+        namespace: str,
+        ttl_seconds: float = DEFAULT_TTL_SECONDS,
+        max_memory_bytes: int = DEFAULT_MEMORY_BYTES,
+        max_disk_bytes: int = DEFAULT_DISK_BYTES,
+        root: str | None = None
+    ):
+        self.namespace = namespace
+        self.ttl_seconds = ttl_seconds
+        self.max_memory_bytes = max_memory_bytes
+        self.max_disk_bytes = max_disk_bytes
+        self.directory = os.path.join(root or CACHE_ROOT, namespace)
+
+        # key -> (expires_at, data), most recently used last
+        self._memory: OrderedDict[str, tuple[float, bytes]] = OrderedDict()
+        self._memory_bytes = 0
+        self._disk_bytes: int | None = None  # computed lazily on first write
+
+        self.counters = {
+            "memory_hits": 0,
+            "disk_hits": 0,
+            "misses": 0,
+            "writes": 0,
+            "expired": 0,
+            "evictions": 0,
+            "disk_errors": 0,
+        }
+
+    # ---- public API ----
+
+    def get(self, key: str) -> bytes | None:
+        """Return cached bytes for key, or None on miss/expiry."""
+        now = time.time()
+
+        entry = self._memory.get(key)
+        if entry is not None:
+            expires_at, data = entry
+            if expires_at > now:
+                self._memory.move_to_end(key)
+                self.counters["memory_hits"] += 1
+                return data
+            self._drop_memory(key)
+            self.counters["expired"] += 1
+
+        entry = self._read_disk(key, now)
+        if entry is not None:
+            expires_at, data = entry
+            self._put_memory(key, data, expires_at)
+            self.counters["disk_hits"] += 1
+            return data
+
+        self.counters["misses"] += 1
+        return None
+
+    def put(self, key: str, data: bytes, ttl_seconds: float | None = None) -> None:
+        """Store bytes under key in both tiers."""
+        expires_at = time.time() + (self.ttl_seconds if ttl_seconds is None else ttl_seconds)
+        self._put_memory(key, data, expires_at)
+        self._write_disk(key, data, expires_at)
+        self.counters["writes"] += 1
+
+    def get_or_build(
+        self,
+        key: str,
+        build: Callable[[], bytes],
+        ttl_seconds: float | None = None
+    ) -> bytes:
+        """Return cached bytes, building and storing them on a miss."""
+        data = self.get(key)
+        if data is None:
+            data = build()
+            self.put(key, data, ttl_seconds)
+        return data
+
+    def get_json(self, key: str) -> Any:
+        data = self.get(key)
+        return json.loads(data) if data is not None else None
+
+    def put_json(self, key: str, value: Any, ttl_seconds: float | None = None) -> None:
+        self.put(key, json.dumps(value, default=str).encode(), ttl_seconds)
+
+    def get_or_build_json(
+        self,
+        key: str,
+        build: Callable[[], Any],
+        ttl_seconds: float | None = None
+    ) -> Any:
+        """JSON variant of get_or_build for fetched configs and similar documents."""
+        data = self.get(key)
+        if data is not None:
+            return json.loads(data)
+
+        value = build()
+        self.put_json(key, value, ttl_seconds)
+        return value
+
+    def invalidate(self, key: str) -> None:
+        """Remove key from both tiers."""
+        self._drop_memory(key)
+        try:
+            path = self._path(key)
+            size = os.path.getsize(path)
+            os.remove(path)
+            if self._disk_bytes is not None:
+                self._disk_bytes -= size
+        except OSError:
+            pass
+
+    def clear(self, disk: bool = True) -> None:
+        """Drop every entry from memory, and from /tmp unless disk=False."""
+        self._memory.clear()
+        self._memory_bytes = 0
+        if not disk or not os.path.isdir(self.directory):
+            return
+
+        for entry in os.scandir(self.directory):
+            try:
+                os.remove(entry.path)
+            except OSError:
+                pass
+        self._disk_bytes = 0
+
+    def stats(self) -> dict:
+        lookups = self.counters["memory_hits"] + self.counters["disk_hits"] + self.counters["misses"]
+        hits = lookups - self.counters["misses"]
+        return {
+            "namespace": self.namespace,
+            **self.counters,
+            "hit_rate": round(hits / lookups, 4) if lookups else None,
+            "memory_entries": len(self._memory),
+            "memory_bytes": self._memory_bytes,
+            "disk_bytes": self._disk_bytes,
+        }
+
+    # ---- memory tier ----
+
+    def _put_memory(self, key: str, data: bytes, expires_at: float) -> None:
+        if len(data) > self.max_memory_bytes:
+            return
+
+        self._drop_memory(key)
+        self._memory[key] = (expires_at, data)
+        self._memory_bytes += len(data)
+
+        while self._memory_bytes > self.max_memory_bytes:
+            oldest = next(iter(self._memory))
+            self._drop_memory(oldest)
+            self.counters["evictions"] += 1
+
+    def _drop_memory(self, key: str) -> None:
+        entry = self._memory.pop(key, None)
+        if entry is not None:
+            self._memory_bytes -= len(entry[1])
+
+    # ---- disk tier ----
+
+    def _path(self, key: str) -> str:
+        digest = hashlib.sha256(key.encode()).hexdigest()
+        return os.path.join(self.directory, f"{digest}.bin")
+
+    def _read_disk(self, key: str, now: float) -> tuple[float, bytes] | None:
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                raw = f.read()
+        except FileNotFoundError:
+            return None
+        except OSError:
+            self.counters["disk_errors"] += 1
+            return None
+
+        if len(raw) < HEADER.size:
+            return None
+
+        (expires_at,) = HEADER.unpack_from(raw)
+        if expires_at <= now:
+            self.counters["expired"] += 1
+            self.invalidate(key)
+            return None
+
+        # Touch so disk eviction is least-recently-used rather than oldest-written
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+
+        return expires_at, raw[HEADER.size:]
+
+    def _write_disk(self, key: str, data: bytes, expires_at: float) -> None:
+        size = HEADER.size + len(data)
+        if size > self.max_disk_bytes:
+            return
+
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            if self._disk_bytes is None:
+                self._disk_bytes = self._scan_disk_bytes()
+
+            path = self._path(key)
+            previous = os.path.getsize(path) if os.path.exists(path) else 0
+
+            fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".part")
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    f.write(HEADER.pack(expires_at))
+                    f.write(data)
+                os.replace(tmp_path, path)
+            except BaseException:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                raise
+
+            self._disk_bytes += size - previous
+            if self._disk_bytes > self.max_disk_bytes:
+                self._evict_disk(keep=path)
+
+        except OSError as e:
+            self.counters["disk_errors"] += 1
+            print(f"Cache {self.namespace}: disk write failed: {e}")
+
+    def _scan_disk_bytes(self) -> int:
+        total = 0
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(".bin"):
+                total += entry.stat().st_size
+        return total
+
+    def _evict_disk(self, keep: str) -> None:
+        """Remove expired entries, then least recently used ones, until under budget."""
+        now = time.time()
+        entries = []
+        for entry in os.scandir(self.directory):
+            if not entry.name.endswith(".bin") or entry.path == keep:
+                continue
+            stat = entry.stat()
+            entries.append((stat.st_mtime, entry.path, stat.st_size))
+
+        # Expired first (cheap check via header), then oldest access
+        expired = []
+        live = []
+        for mtime, path, size in entries:
+            try:
+                with open(path, "rb") as f:
+                    (expires_at,) = HEADER.unpack(f.read(HEADER.size))
+            except (OSError, struct.error):
+                expires_at = 0
+            (expired if expires_at <= now else live).append((mtime, path, size))
+
+        for _, path, size in expired + sorted(live):
+            if self._disk_bytes <= self.max_disk_bytes:
+                break
+            try:
+                os.remove(path)
+                self._disk_bytes -= size
+                self.counters["evictions"] += 1
+            except OSError:
+                pass
+
+
+def get_cache(namespace: str, **kwargs) -> ArtifactCache:
+    """Return the container-wide cache for a namespace, creating it on first use."""
+    if namespace not in _caches:
+        _caches[namespace] = ArtifactCache(namespace, **kwargs)
+    return _caches[namespace]
+
+
+def cache_stats() -> list[dict]:
+    return [cache.stats() for cache in _caches.values()]
+
+
+def log_cache_stats() -> None:
+    """Print hit/miss counters for every cache as one structured log line."""
+    if _caches:
+        print(json.dumps({"cache_stats": cache_stats()}))
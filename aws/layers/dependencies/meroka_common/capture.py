@@ -0,0 +1,163 @@
+"""
+Raw Capture
+Sampled, compressed copies of full LLM prompts and completions, kept out of
+workflow_logs.
+
+The log row only gets a pointer and a content hash in metadata.raw:
+
+    {"uri": "s3://meroka-post-media-dev/raw/2026/10/19/<execution_id>/llm_openai-1a2b3c4d.json.zst",
+     "sha256": "<hex of the uncompressed JSON>", "bytes": 5120, "stored_bytes": 1870}
+
+so inserts and index pages stay the size they were, and the raw_input /
+raw_output columns stay empty. Capture is opt-in: RAW_CAPTURE_RATE (default 0)
+is the fraction of posts captured, and campaigns override it with
+workflow_config.raw_capture_rate. Sampling hashes the execution_id, so every
+call made for one post (council, judge, failover) is captured or none is.
+
+Captures are JSON, compressed with zstd when the zstandard package is
+installed (gzip otherwise), and written under RAW_CAPTURE_PREFIX in
+RAW_CAPTURE_BUCKET (default MEDIA_BUCKET; the bucket expires them after 30
+days). RAW_CAPTURE_DIR writes them to a local directory instead, for local
+runs. Capture is best effort: a failed write is logged and never fails the call.
+
+    from meroka_common import capture
+
+    raw = capture.capture(execution_id, "llm_openai", workflow_config, {
+        "model": model, "messages": messages, "completion": content
+    })
+    log_llm_call(..., metadata={..., "raw": raw})
+
+Read one back (decompressed and checked against its hash) with
+scripts/read_raw_capture.py or capture.read().
+"""
+
+import functools
+import gzip
+import hashlib
+import json
+import os
+import uuid
+from datetime import datetime, timezone
+
+from meroka_common.tracing import span
+
+RAW_CAPTURE_RATE = float(os.environ.get("RAW_CAPTURE_RATE", "0"))
+RAW_CAPTURE_BUCKET = os.environ.get("RAW_CAPTURE_BUCKET") or os.environ.get("MEDIA_BUCKET")
+RAW_CAPTURE_PREFIX = os.environ.get("RAW_CAPTURE_PREFIX", "raw/")
+RAW_CAPTURE_DIR = os.environ.get("RAW_CAPTURE_DIR")
+RAW_CAPTURE_ZSTD_LEVEL = int(os.environ.get("RAW_CAPTURE_ZSTD_LEVEL", "3"))
+
+# boto3 s3 client, created on the first capture so lambdas that never sample
+# don't pay for it at cold start (the load test swaps in LocalS3)
+s3 = None
+
+
+def sample_rate(workflow_config: dict | None) -> float:
+    return float((workflow_config or {}).get("raw_capture_rate", RAW_CAPTURE_RATE))
+
+
+def sampled(execution_id: str, rate: float) -> bool:
+    """Whether a post is captured; the same for every call made for it."""
+    if rate <= 0:
+        return False
+    digest = hashlib.sha256(execution_id.encode()).digest()
+    return int.from_bytes(digest[:8], "big") / 2 ** 64 < rate
+
+
+@functools.cache
+def _zstd():
+    """zstandard compressor, or None if the package is missing."""
+    try:
+        import zstandard
+        return zstandard.ZstdCompressor(level=RAW_CAPTURE_ZSTD_LEVEL)
+    except Exception as e:
+        print(f"zstandard unavailable, compressing raw captures with gzip: {type(e).__name__}")
+        return None
+
+
+def compress(data: bytes) -> tuple[bytes, str]:
+    """(compressed bytes, file suffix)."""
+    compressor = _zstd()
+    if compressor is not None:
+        return compressor.compress(data), ".json.zst"
+    return gzip.compress(data, compresslevel=6), ".json.gz"
+
+
+def decompress(data: bytes, name: str) -> bytes:
+    if name.endswith(".zst"):
+        import zstandard
+        return zstandard.ZstdDecompressor().decompress(data)
+    if name.endswith(".gz"):
+        return gzip.decompress(data)
+    return data
+
+
+def capture(execution_id: str, step: str, workflow_config: dict | None, payload: dict) -> dict | None:
+    """
+    Write one call's payload if its post is sampled; the pointer for the log
+    row's metadata.raw, or None when not sampled or the write failed.
+    """
+    if not sampled(execution_id, sample_rate(workflow_config)):
+        return None
+
+    try:
+        body = json.dumps(
+            {"execution_id": execution_id, "step": step,
+             "captured_at": datetime.now(timezone.utc).isoformat(), **payload},
+            default=str, separators=(",", ":")
+        ).encode()
+        stored, suffix = compress(body)
+        key = (f"{RAW_CAPTURE_PREFIX}{datetime.now(timezone.utc):%Y/%m/%d}/"
+               f"{execution_id}/{step}-{uuid.uuid4().hex[:8]}{suffix}")
+
+        with span("s3.put_object", bytes=len(stored)):
+            uri = write(key, stored)
+        return {
+            "uri": uri,
+            "sha256": hashlib.sha256(body).hexdigest(),
+            "bytes": len(body),
+            "stored_bytes": len(stored)
+        }
+    except Exception as e:
+        print(json.dumps({"raw_capture": {"error": str(e), "execution_id": execution_id, "step": step}}))
+        return None
+
+
+def get_s3():
+    global s3
+    if s3 is None:
+        import boto3
+        s3 = boto3.client("s3")
+    return s3
+
+
+def write(key: str, data: bytes) -> str:
+    """Store a capture under key; returns its URI."""
+    if RAW_CAPTURE_DIR:
+        path = os.path.join(RAW_CAPTURE_DIR, key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as f:
+            f.write(data)
+        return f"file://{os.path.abspath(path)}"
+
+    if not RAW_CAPTURE_BUCKET:
+        raise ValueError("Raw capture needs RAW_CAPTURE_BUCKET, MEDIA_BUCKET or RAW_CAPTURE_DIR")
+    get_s3().put_object(Bucket=RAW_CAPTURE_BUCKET, Key=key, Body=data, ContentType="application/json")
+    return f"s3://{RAW_CAPTURE_BUCKET}/{key}"
+
+
+def read(uri: str, sha256: str | None = None) -> dict:
+    """A capture's JSON; ValueError if it does not match the sha256 from its log row."""
+    if uri.startswith("file://"):
+        with open(uri[len("file://"):], "rb") as f:
+            data = f.read()
+    elif uri.startswith("s3://"):
+        bucket, _, key = uri[len("s3://"):].partition("/")
+        data = get_s3().get_object(Bucket=bucket, Key=key)["Body"].read()
+    else:
+        raise ValueError(f"Unsupported raw capture URI {uri!r}: expected s3:// or file://")
+
+    body = decompress(data, uri)
+    if sha256 and hashlib.sha256(body).hexdigest() != sha256:
+        raise ValueError(f"Raw capture {uri} does not match sha256 {sha256}")
+    return json.loads(body)
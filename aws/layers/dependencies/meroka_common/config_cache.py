@@ -0,0 +1,164 @@
+"""
+Campaign Config Cache
+Per-container cache of campaign config (campaign row with its channel and
+account/brand settings) with TTL expiry and version revalidation.
+
+An entry validated within CONFIG_CACHE_TTL_SECONDS is used as is, and the
+campaign is left out of the context query. Once it expires it is not refetched
+in full: its version (the latest updated_at across campaign, channel and
+account, see campaign_config_version) rides along on get_post_context, which
+returns the campaign only if that version has moved. Either way a post's
+context is still one round-trip:
+
+    from meroka_common import config_cache, db
+
+    rows = db.run(config_cache.fetch_post_context(campaign_id, employee_id))
+    ...
+    config_cache.log_config_cache_stats()
+
+Stats report how often the config was served without a full fetch and how
+stale TTL hits were: max_age_seconds is the longest time since validation of
+any hit, and when a revalidation finds a change, hits served after the
+change's updated_at are counted in stale_hits (stale_seconds_max is the worst).
+Staleness compares database timestamps with the container clock, so it is
+only as accurate as their skew.
+"""
+
+import copy
+import json
+import os
+import threading
+import time
+from datetime import datetime
+
+from meroka_common import db
+
+CONFIG_CACHE_TTL_SECONDS = float(os.environ.get("CONFIG_CACHE_TTL_SECONDS", "300"))
+
+
+class ConfigCache:
+    """In-memory campaign configs keyed by campaign id, with their versions."""
+
+    def __init__(self, ttl_seconds: float = CONFIG_CACHE_TTL_SECONDS):
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        # campaign_id -> {"value", "version", "validated_at", "served": [hit times since validation]}
+        self._entries: dict[str, dict] = {}
+
+        self.counters = {
+            "hits": 0,          # fresh within TTL, no database check
+            "revalidated": 0,   # expired, version unchanged
+            "changed": 0,       # expired, version moved: refetched
+            "misses": 0,        # not cached
+            "stale_hits": 0,
+        }
+        self.max_age_seconds = 0.0
+        self.stale_seconds_max = 0.0
+
+    def lookup(self, campaign_id: str) -> tuple[dict | None, str | None, bool]:
+        """
+        (config, version, fresh) for a campaign; (None, None, False) if not cached.
+
+        A fresh entry counts as a hit. An expired one still comes back with its
+        version so the caller can revalidate it, then report the outcome with
+        revalidated() or store().
+        """
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(campaign_id)
+            if entry is None:
+                return None, None, False
+
+            age = now - entry["validated_at"]
+            fresh = age < self.ttl_seconds
+            if fresh:
+                self.counters["hits"] += 1
+                self.max_age_seconds = max(self.max_age_seconds, age)
+                entry["served"].append(now)
+            return copy.deepcopy(entry["value"]), entry["version"], fresh
+
+    def revalidated(self, campaign_id: str) -> None:
+        """The cached version is still current; restart its TTL."""
+        with self._lock:
+            entry = self._entries.get(campaign_id)
+            if entry is not None:
+                entry["validated_at"] = time.time()
+                entry["served"] = []
+                self.counters["revalidated"] += 1
+
+    def store(self, campaign_id: str, value: dict, version: str | None) -> None:
+        """Cache a freshly fetched config (a miss, or a change found on revalidation)."""
+        now = time.time()
+        with self._lock:
+            previous = self._entries.get(campaign_id)
+            if previous is None or previous["version"] == version:
+                # Not cached, or another thread filled it with the same version meanwhile
+                self.counters["misses"] += 1
+            else:
+                self.counters["changed"] += 1
+                changed_at = version_time(version)
+                if changed_at is not None:
+                    stale = [served - changed_at for served in previous["served"] if served > changed_at]
+                    self.counters["stale_hits"] += len(stale)
+                    self.stale_seconds_max = max([self.stale_seconds_max, *stale])
+
+            self._entries[campaign_id] = {
+                "value": copy.deepcopy(value),
+                "version": version,
+                "validated_at": now,
+                "served": []
+            }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        lookups = sum(self.counters[k] for k in ("hits", "revalidated", "changed", "misses"))
+        reused = self.counters["hits"] + self.counters["revalidated"]
+        return {
+            "ttl_seconds": self.ttl_seconds,
+            "entries": len(self._entries),
+            **self.counters,
+            "hit_rate": round(reused / lookups, 4) if lookups else None,
+            "max_age_seconds": round(self.max_age_seconds, 3),
+            "stale_seconds_max": round(self.stale_seconds_max, 3),
+        }
+
+
+def version_time(version: str | None) -> float | None:
+    """Unix time of a campaign_config_version value (an ISO timestamp)."""
+    try:
+        return datetime.fromisoformat(version).timestamp() if version else None
+    except ValueError:
+        return None
+
+
+campaign_configs = ConfigCache()
+
+
+async def fetch_post_context(campaign_id: str, employee_id: str) -> db.PostContext:
+    """
+    db.fetch_post_context with the campaign served from campaign_configs.
+
+    The result always has the campaign filled in, exactly as an uncached call.
+    """
+    cached, version, fresh = campaign_configs.lookup(campaign_id)
+
+    if fresh:
+        rows = await db.fetch_post_context(campaign_id, employee_id, include_campaign=False)
+        rows["campaign"], rows["campaign_version"] = cached, version
+        return rows
+
+    rows = await db.fetch_post_context(campaign_id, employee_id, campaign_version=version)
+    if rows["campaign"] is None:
+        campaign_configs.revalidated(campaign_id)
+        rows["campaign"] = cached
+    else:
+        campaign_configs.store(campaign_id, rows["campaign"], rows["campaign_version"])
+    return rows
+
+
+def log_config_cache_stats() -> None:
+    """Print the campaign config cache's hit rate and staleness as one structured log line."""
+    print(json.dumps({"config_cache": campaign_configs.stats()}))
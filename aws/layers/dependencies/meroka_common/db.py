@@ -0,0 +1,439 @@
+"""
+Async Data Access
+Async PostgREST queries shared by the lambdas, on one connection pool per container.
+
+Handlers stay synchronous: the container keeps one event loop alive and
+`run()` drives coroutines on it, so the pooled httpx client (bound to that
+loop) keeps its keep-alive connections to Supabase across warm invocations.
+Loop and pool are per thread; a Lambda container has one, while local
+harnesses that call a handler from several threads get one each.
+
+Independent reads are overlapped with `asyncio.gather`:
+
+    from meroka_common import db
+
+    async def load(employee_id, campaign_id):
+        return await asyncio.gather(
+            db.fetch_user(employee_id),
+            db.fetch_campaign_config(campaign_id)
+        )
+
+    employee, campaign = db.run(load(employee_id, campaign_id))
+
+DB_POOL_SIZE caps concurrent connections per container (default 10).
+
+DB_BACKEND picks the transport behind these functions: "postgrest" (default)
+goes through Supabase's REST API, "postgres" talks to DATABASE_URL directly
+over a pooled asyncpg connection with prepared statements (see `pg`).
+"""
+
+import asyncio
+import os
+import threading
+from datetime import datetime, timezone
+from typing import Any, Callable, Coroutine, TypedDict, TypeVar
+
+import httpx
+from postgrest import AsyncPostgrestClient
+
+from meroka_common.tracing import span
+
+DB_POOL_SIZE = int(os.environ.get("DB_POOL_SIZE", "10"))
+DB_TIMEOUT_SECONDS = float(os.environ.get("DB_TIMEOUT_SECONDS", "10"))
+DB_BACKEND = os.environ.get("DB_BACKEND", "postgrest")
+
+# Rows per PostgREST page; Supabase caps a response at max-rows (default 1000)
+PAGE_SIZE = 1000
+# Values per PostgREST in.() filter, keeping the request URL short
+IN_CHUNK = 100
+
+if DB_BACKEND == "postgres":
+    from meroka_common import pg
+elif DB_BACKEND != "postgrest":
+    raise ValueError(f"Unknown DB_BACKEND {DB_BACKEND!r}: expected postgrest or postgres")
+
+T = TypeVar("T")
+
+_local = threading.local()
+
+
+class User(TypedDict):
+    id: str
+    email: str
+    name: str
+    settings: dict
+
+
+class VoiceSamples(TypedDict):
+    email: str
+    example_post_1: str
+    example_post_2: str
+    example_post_3: str
+    blurb: str
+    is_sample: bool
+
+
+class PostContext(TypedDict):
+    employee: User
+    voice_samples: VoiceSamples | None
+    voice_profile: dict | None
+    campaign: dict | None  # fetch_campaign_config shape
+    campaign_version: str | None
+
+
+class CampaignEmployee(TypedDict):
+    user_id: str
+    users: dict  # {"id", "email", "name"}
+
+
+# ============================================
+# LOOP + POOL
+# ============================================
+
+def run(coro: Coroutine[Any, Any, T]) -> T:
+    """Run a coroutine to completion on the container's event loop."""
+    loop = getattr(_local, "loop", None)
+    if loop is None or loop.is_closed():
+        loop = _local.loop = asyncio.new_event_loop()
+        _local.client = None
+        _local.pool = None
+    return loop.run_until_complete(coro)
+
+
+def get_client() -> AsyncPostgrestClient:
+    """This thread's PostgREST client; created on first use and then reused."""
+    client = getattr(_local, "client", None)
+    if client is None:
+        key = os.environ["SUPABASE_SERVICE_KEY"]
+        client = _local.client = AsyncPostgrestClient(
+            f"{os.environ['SUPABASE_URL'].rstrip('/')}/rest/v1",
+            headers={"apikey": key, "Authorization": f"Bearer {key}"},
+            http_client=httpx.AsyncClient(
+                timeout=httpx.Timeout(DB_TIMEOUT_SECONDS),
+                limits=httpx.Limits(
+                    max_connections=DB_POOL_SIZE,
+                    max_keepalive_connections=DB_POOL_SIZE
+                ),
+                follow_redirects=True
+            )
+        )
+    return client
+
+
+async def get_pool():
+    """
+    This thread's asyncpg pool (DB_BACKEND=postgres); created on first use and then reused.
+
+    Held as a task so reads gathered on a cold container share one pool
+    instead of each opening their own; a failed connect is retried next call.
+    """
+    pending = getattr(_local, "pool", None)
+    if pending is None or (pending.done() and pending.exception()):
+        pending = _local.pool = asyncio.ensure_future(pg.create_pool(DB_POOL_SIZE, DB_TIMEOUT_SECONDS))
+    return await pending
+
+
+async def warm() -> None:
+    """Create this thread's PostgREST client or asyncpg pool ahead of the first query (warm-up events)."""
+    with span("db.warm"):
+        if DB_BACKEND == "postgres":
+            await get_pool()
+        else:
+            get_client()
+
+
+# ============================================
+# READS
+# ============================================
+
+async def fetch_campaign(campaign_id: str) -> dict:
+    """Campaign row (all columns)."""
+    with span("db.campaigns.select"):
+        if DB_BACKEND == "postgres":
+            return await pg.fetch_one(await get_pool(), pg.CAMPAIGN, campaign_id, table="campaigns")
+        response = await (
+            get_client().table("campaigns")
+            .select("*")
+            .eq("id", campaign_id)
+            .single()
+            .execute()
+        )
+    return response.data
+
+
+async def fetch_scheduled_campaigns() -> list[dict]:
+    """Active campaigns with a schedule_cron (all columns), for the orchestrator's sweep."""
+    with span("db.campaigns.select_scheduled"):
+        if DB_BACKEND == "postgres":
+            return await pg.fetch_all(await get_pool(), pg.SCHEDULED_CAMPAIGNS)
+        response = await (
+            get_client().table("campaigns")
+            .select("*")
+            .eq("status", "active")
+            .not_.is_("schedule_cron", "null")
+            .execute()
+        )
+    return response.data
+
+
+async def fetch_campaign_config(campaign_id: str) -> dict:
+    """Campaign with its channel and account (brand) settings."""
+    with span("db.campaigns.select"):
+        if DB_BACKEND == "postgres":
+            return await pg.fetch_one(await get_pool(), pg.CAMPAIGN_CONFIG, campaign_id, table="campaigns")
+        response = await (
+            get_client().table("campaigns")
+            .select("*, channels(platform, account_id, accounts(name, settings))")
+            .eq("id", campaign_id)
+            .single()
+            .execute()
+        )
+    return response.data
+
+
+async def fetch_campaign_employees(campaign_id: str) -> list[CampaignEmployee]:
+    """Active employees assigned to a campaign."""
+    with span("db.campaign_employees.select"):
+        if DB_BACKEND == "postgres":
+            return await pg.fetch_all(await get_pool(), pg.CAMPAIGN_EMPLOYEES, campaign_id)
+        response = await (
+            get_client().table("campaign_employees")
+            .select("user_id, users(id, email, name)")
+            .eq("campaign_id", campaign_id)
+            .eq("is_active", True)
+            .execute()
+        )
+    return response.data
+
+
+async def fetch_user(user_id: str) -> User:
+    with span("db.users.select"):
+        if DB_BACKEND == "postgres":
+            return await pg.fetch_one(await get_pool(), pg.USER, user_id, table="users")
+        response = await (
+            get_client().table("users")
+            .select("id, email, name, settings")
+            .eq("id", user_id)
+            .single()
+            .execute()
+        )
+    return response.data
+
+
+async def fetch_voice_samples(email: str) -> VoiceSamples | None:
+    with span("db.employee_voice_samples.select"):
+        if DB_BACKEND == "postgres":
+            return await (await get_pool()).fetchval(pg.VOICE_SAMPLES, email)
+        response = await (
+            get_client().table("employee_voice_samples")
+            .select("*")
+            .eq("email", email)
+            .execute()
+        )
+    return response.data[0] if response.data else None
+
+
+async def fetch_voice_profile(email: str) -> dict | None:
+    """Stored voice profile JSON, current or not (see voice_profile.resolve_profile)."""
+    with span("db.employee_voice_profiles.select"):
+        if DB_BACKEND == "postgres":
+            return await (await get_pool()).fetchval(pg.VOICE_PROFILE, email)
+        response = await (
+            get_client().table("employee_voice_profiles")
+            .select("profile")
+            .eq("email", email)
+            .execute()
+        )
+    return response.data[0]["profile"] if response.data else None
+
+
+async def fetch_post_context(
+    campaign_id: str,
+    employee_id: str,
+    include_campaign: bool = True,
+    campaign_version: str | None = None
+) -> PostContext:
+    """
+    Employee, voice samples, stored voice profile and campaign config in one
+    round-trip (the get_post_context database function).
+
+    include_campaign=False skips the campaign (returned as None) when the
+    caller already holds its config. With campaign_version set to a cached
+    copy's version, the campaign is only returned if it has changed since;
+    campaign_version in the result is always the current one.
+    """
+    params = {
+        "p_campaign_id": campaign_id,
+        "p_employee_id": employee_id,
+        "p_include_campaign": include_campaign,
+        "p_campaign_version": campaign_version
+    }
+    with span("db.rpc.get_post_context"):
+        if DB_BACKEND == "postgres":
+            return await (await get_pool()).fetchval(pg.POST_CONTEXT, *params.values())
+        response = await get_client().rpc("get_post_context", params).execute()
+    return response.data
+
+
+async def fetch_minhash_candidates(bands: list[int], since: str | None, limit: int) -> list[dict]:
+    """
+    post_id and signature of indexed posts sharing any LSH band key with
+    `bands`, newest first (see near_duplicates). since bounds created_at.
+    """
+    with span("db.post_minhash.select"):
+        if DB_BACKEND == "postgres":
+            since_at = datetime.fromisoformat(since) if since else None
+            return await pg.fetch_all(await get_pool(), pg.MINHASH_CANDIDATES, bands, since_at, limit)
+        query = get_client().table("post_minhash").select("post_id, signature").ov("bands", bands)
+        if since:
+            query = query.gte("created_at", since)
+        response = await query.order("created_at", desc=True).limit(limit).execute()
+    return response.data
+
+
+async def fetch_filled_slots(prefix: str) -> list[str]:
+    """slot_keys of stored posts starting with prefix (one campaign window, see migration 016)."""
+    with span("db.posts.select_slots"):
+        if DB_BACKEND == "postgres":
+            return await pg.fetch_all(await get_pool(), pg.FILLED_SLOTS, f"{prefix}%")
+        rows = await fetch_pages(lambda: get_client().table("posts").select("slot_key").like("slot_key", f"{prefix}%"))
+    return [row["slot_key"] for row in rows]
+
+
+async def fetch_dispatched_slots(prefix: str) -> list[dict]:
+    """
+    slot_key and dispatch of the slots starting with prefix whose queue,
+    batch or complex dispatch is still running: not failed, not expired
+    (see migration 017).
+    """
+    with span("db.post_dispatches.select"):
+        if DB_BACKEND == "postgres":
+            return await pg.fetch_all(await get_pool(), pg.DISPATCHED_SLOTS, f"{prefix}%")
+        now = datetime.now(timezone.utc).isoformat()
+        return await fetch_pages(lambda: (
+            get_client().table("post_dispatches")
+            .select("slot_key, dispatch")
+            .like("slot_key", f"{prefix}%")
+            .eq("status", "dispatched")
+            .gt("expires_at", now)
+        ))
+
+
+async def fetch_batch_dispatches(batch_id: str) -> list[str]:
+    """execution_ids of a provider batch's posts whose dispatch is still 'dispatched' (see migration 017)."""
+    with span("db.post_dispatches.select_batch"):
+        if DB_BACKEND == "postgres":
+            return await pg.fetch_all(await get_pool(), pg.BATCH_DISPATCHES, batch_id)
+        rows = await fetch_pages(lambda: (
+            get_client().table("post_dispatches")
+            .select("execution_id")
+            .eq("batch_id", batch_id)
+            .eq("status", "dispatched")
+        ))
+    return [row["execution_id"] for row in rows]
+
+
+async def fetch_pages(query: Callable[[], Any], order: str = "slot_key") -> list[dict]:
+    """Every row of a PostgREST select, PAGE_SIZE rows per request in `order` (query() builds it afresh)."""
+    rows = []
+    offset = 0
+    while True:
+        page = (await query().order(order).range(offset, offset + PAGE_SIZE - 1).execute()).data
+        rows.extend(page)
+        if len(page) < PAGE_SIZE:
+            return rows
+        offset += PAGE_SIZE
+
+
+# ============================================
+# WRITES
+# ============================================
+
+async def insert_post(row: dict) -> dict:
+    """Insert a posts row and return it."""
+    with span("db.posts.insert"):
+        if DB_BACKEND == "postgres":
+            return await pg.insert(await get_pool(), "posts", row)
+        response = await get_client().table("posts").insert(row).execute()
+    return response.data[0]
+
+
+async def insert_post_slot(row: dict) -> tuple[dict, bool]:
+    """
+    Insert a posts row unless a post already fills its slot_key.
+
+    Returns (post, inserted); when the slot was filled, the stored post comes
+    back with inserted False and nothing is written.
+    """
+    with span("db.posts.insert", slot=True):
+        if DB_BACKEND == "postgres":
+            pool = await get_pool()
+            post = await pg.insert(pool, "posts", row, skip_conflict="slot_key")
+            if post is not None:
+                return post, True
+            return await pool.fetchval(pg.POST_BY_SLOT, row["slot_key"]), False
+        response = await get_client().table("posts").upsert(
+            row, on_conflict="slot_key", ignore_duplicates=True
+        ).execute()
+        if response.data:
+            return response.data[0], True
+        response = await get_client().table("posts").select("*").eq("slot_key", row["slot_key"]).execute()
+    return response.data[0], False
+
+
+async def upsert_post_dispatches(rows: list[dict]) -> None:
+    """Record dispatched slots (all with the same keys), replacing earlier dispatches of the same slots."""
+    with span("db.post_dispatches.upsert", rows=len(rows)):
+        if DB_BACKEND == "postgres":
+            await (await get_pool()).execute(pg.UPSERT_POST_DISPATCHES, rows)
+            return
+        if rows:
+            await get_client().table("post_dispatches").upsert(
+                rows, on_conflict="slot_key", returning="minimal"
+            ).execute()
+
+
+async def fail_post_dispatches(
+    execution_id: str | None = None,
+    batch_id: str | None = None,
+    execution_ids: list[str] | None = None
+) -> None:
+    """Mark the dispatches of one post (execution_id), several posts or one provider batch as failed."""
+    execution_ids = [execution_id] if execution_id else list(execution_ids or [])
+    with span("db.post_dispatches.update", posts=len(execution_ids)):
+        if DB_BACKEND == "postgres":
+            if execution_ids:
+                await (await get_pool()).execute(pg.FAIL_DISPATCHES_BY_EXECUTION, execution_ids)
+            if batch_id:
+                await (await get_pool()).execute(pg.FAIL_DISPATCHES_BY_BATCH, batch_id)
+            return
+        table = get_client().table("post_dispatches")
+        for start in range(0, len(execution_ids), IN_CHUNK):
+            await table.update({"status": "failed"}, returning="minimal").in_(
+                "execution_id", execution_ids[start:start + IN_CHUNK]
+            ).execute()
+        if batch_id:
+            await table.update({"status": "failed"}, returning="minimal").eq("batch_id", batch_id).execute()
+
+
+async def insert_workflow_log(row: dict) -> None:
+    with span("db.workflow_logs.insert"):
+        if DB_BACKEND == "postgres":
+            return await pg.insert(await get_pool(), "workflow_logs", row, returning=False)
+        await get_client().table("workflow_logs").insert(row, returning="minimal").execute()
+
+
+async def insert_post_minhash(row: dict) -> None:
+    with span("db.post_minhash.insert"):
+        if DB_BACKEND == "postgres":
+            return await pg.insert(await get_pool(), "post_minhash", row, returning=False)
+        await get_client().table("post_minhash").insert(row, returning="minimal").execute()
+
+
+async def insert_workflow_logs(rows: list[dict]) -> None:
+    """Insert many workflow_logs rows (all with the same keys) in one request."""
+    with span("db.workflow_logs.insert", rows=len(rows)):
+        if DB_BACKEND == "postgres":
+            return await pg.insert_many(await get_pool(), "workflow_logs", rows)
+        if rows:
+            await get_client().table("workflow_logs").insert(rows, returning="minimal").execute()
@@ -0,0 +1,212 @@
+"""
+LLM Router
+Picks the LLM provider (and its lambda) for a generation call from live
+per-provider health, kept per container so it carries across warm invocations.
+
+Every call's outcome is recorded: latency feeds an exponentially weighted
+moving average (ROUTER_EWMA_ALPHA) and success/failure an EWMA error rate.
+A provider is scored by its expected time to a successful call,
+ewma_latency / (1 - error_rate), and calls go to the best-scoring healthy
+provider among those the campaign allows. A provider without data scores 0,
+so it is tried once and then competes on its numbers.
+
+Each provider has a circuit breaker. ROUTER_FAILURE_THRESHOLD consecutive
+failures (errors or 429s) open it, and an open provider gets no calls for
+ROUTER_COOLDOWN_SECONDS. After that it is half-open, and a single trial call
+is let through: success closes the breaker, failure reopens it.
+
+    from meroka_common import llm_router
+
+    route = llm_router.choose(campaign["workflow_config"])
+    ...invoke route.function with route.model...
+    llm_router.record(route.provider, latency_ms, ok=True)
+
+Campaigns choose what may be routed to with workflow_config:
+- providers: allowed providers in order of preference (ties go to the first);
+  default is the provider of `model`, or every provider when no model is set
+- model: the model for its own provider (default gpt-4o)
+- models: {"<provider>": "<model>"} for the others (default DEFAULT_MODELS)
+"""
+
+import json
+import os
+import threading
+import time
+from typing import NamedTuple
+
+ROUTER_EWMA_ALPHA = float(os.environ.get("ROUTER_EWMA_ALPHA", "0.2"))
+ROUTER_FAILURE_THRESHOLD = int(os.environ.get("ROUTER_FAILURE_THRESHOLD", "3"))
+ROUTER_COOLDOWN_SECONDS = float(os.environ.get("ROUTER_COOLDOWN_SECONDS", "30"))
+
+# Provider -> model prefixes it serves, and its lambda (meroka-llm-<provider>-<env>)
+PROVIDER_PREFIXES = {
+    "openai": ("gpt", "o1", "o3", "o4"),
+    "gemini": ("gemini",),
+    "grok": ("grok",),
+}
+
+DEFAULT_MODEL = "gpt-4o"
+DEFAULT_MODELS = {
+    "openai": "gpt-4o",
+    "gemini": "gemini-3-flash-preview",
+    "grok": "grok-4",
+}
+
+
+class NoHealthyProvider(RuntimeError):
+    """Every provider the campaign allows has an open circuit breaker."""
+
+
+class Route(NamedTuple):
+    provider: str
+    model: str
+    function: str
+
+
+def provider_for(model: str) -> str:
+    """Provider serving a model; ValueError for models without an LLM lambda."""
+    name = model.lower()
+    for provider, prefixes in PROVIDER_PREFIXES.items():
+        if name.startswith(prefixes):
+            return provider
+    raise ValueError(f"No LLM function for model {model!r}: expected one of {', '.join(PROVIDER_PREFIXES)}")
+
+
+def function_for(provider: str) -> str:
+    return f"meroka-llm-{provider}-{os.environ.get('ENVIRONMENT', 'dev')}"
+
+
+class ModelRouter:
+    """Latency/error EWMAs and a circuit breaker per provider."""
+
+    def __init__(
+        self,
+        alpha: float = ROUTER_EWMA_ALPHA,
+        failure_threshold: int = ROUTER_FAILURE_THRESHOLD,
+        cooldown_seconds: float = ROUTER_COOLDOWN_SECONDS
+    ):
+        self.alpha = alpha
+        self.failure_threshold = failure_threshold
+        self.cooldown_seconds = cooldown_seconds
+        self._lock = threading.Lock()
+        self._health: dict[str, dict] = {}
+
+    def _entry(self, provider: str) -> dict:
+        if provider not in self._health:
+            self._health[provider] = {
+                "latency_ms": None,
+                "error_rate": 0.0,
+                "consecutive_failures": 0,
+                "opened_at": None,        # set while the breaker is open or half-open
+                "trial_in_flight": False,
+                "calls": 0,
+                "failures": 0,
+                "rate_limited": 0,
+                "opened": 0,
+            }
+        return self._health[provider]
+
+    def choose(self, allowed: list[str], exclude: tuple[str, ...] = ()) -> str:
+        """Best-scoring available provider in `allowed`; NoHealthyProvider if none."""
+        now = time.time()
+        with self._lock:
+            best, best_score = None, None
+            for provider in allowed:
+                if provider in exclude:
+                    continue
+                entry = self._entry(provider)
+                if entry["opened_at"] is not None:
+                    half_open = now - entry["opened_at"] >= self.cooldown_seconds
+                    if not half_open or entry["trial_in_flight"]:
+                        continue
+                score = (entry["latency_ms"] or 0.0) / max(1.0 - entry["error_rate"], 0.05)
+                if best_score is None or score < best_score:
+                    best, best_score = provider, score
+
+            if best is None:
+                raise NoHealthyProvider(f"No healthy LLM provider among {', '.join(allowed)}")
+            if self._health[best]["opened_at"] is not None:
+                self._health[best]["trial_in_flight"] = True
+            return best
+
+    def record(self, provider: str, latency_ms: float, ok: bool, rate_limited: bool = False) -> None:
+        """Fold one call's outcome into the provider's health."""
+        with self._lock:
+            entry = self._entry(provider)
+            entry["calls"] += 1
+            entry["trial_in_flight"] = False
+            if entry["latency_ms"] is None:
+                entry["latency_ms"] = float(latency_ms)
+            else:
+                entry["latency_ms"] += self.alpha * (latency_ms - entry["latency_ms"])
+            entry["error_rate"] += self.alpha * ((0.0 if ok else 1.0) - entry["error_rate"])
+
+            if ok:
+                entry["consecutive_failures"] = 0
+                entry["opened_at"] = None
+                return
+
+            entry["failures"] += 1
+            entry["rate_limited"] += rate_limited
+            entry["consecutive_failures"] += 1
+            # A failed half-open trial reopens at once
+            if entry["opened_at"] is not None or entry["consecutive_failures"] >= self.failure_threshold:
+                entry["opened_at"] = time.time()
+                entry["opened"] += 1
+
+    def reset(self) -> None:
+        with self._lock:
+            self._health.clear()
+
+    def stats(self) -> dict:
+        now = time.time()
+        with self._lock:
+            return {
+                provider: {
+                    "state": (
+                        "closed" if entry["opened_at"] is None
+                        else "half_open" if now - entry["opened_at"] >= self.cooldown_seconds
+                        else "open"
+                    ),
+                    "latency_ms": round(entry["latency_ms"], 1) if entry["latency_ms"] is not None else None,
+                    "error_rate": round(entry["error_rate"], 4),
+                    **{k: entry[k] for k in ("calls", "failures", "rate_limited", "opened")},
+                }
+                for provider, entry in self._health.items()
+            }
+
+
+router = ModelRouter()
+
+
+def allowed_providers(workflow_config: dict | None) -> list[str]:
+    """Providers a campaign may be routed to, in order of preference."""
+    config = workflow_config or {}
+    if config.get("providers"):
+        return [p for p in config["providers"] if p in PROVIDER_PREFIXES]
+    if config.get("model"):
+        return [provider_for(config["model"])]
+    return list(PROVIDER_PREFIXES)
+
+
+def model_for(provider: str, workflow_config: dict | None) -> str:
+    config = workflow_config or {}
+    model = config.get("model")
+    if model and provider_for(model) == provider:
+        return model
+    return (config.get("models") or {}).get(provider, DEFAULT_MODELS[provider])
+
+
+def choose(workflow_config: dict | None, exclude: tuple[str, ...] = ()) -> Route:
+    """Route for one generation call under a campaign's workflow_config."""
+    provider = router.choose(allowed_providers(workflow_config), exclude)
+    return Route(provider, model_for(provider, workflow_config), function_for(provider))
+
+
+def record(provider: str, latency_ms: float, ok: bool, rate_limited: bool = False) -> None:
+    router.record(provider, latency_ms, ok, rate_limited)
+
+
+def log_router_stats() -> None:
+    """Print per-provider latency, error rate and breaker state as one structured log line."""
+    print(json.dumps({"llm_router": router.stats()}))
@@ -0,0 +1,186 @@
+"""
+Near-Duplicate Posts
+MinHash/LSH index over each employee's generated posts, so a new post can be
+checked against their whole history without a pairwise scan.
+
+A post's content is reduced to word shingles (SHINGLE_WORDS-word windows of the
+lowercased text) and summarised by a NUM_PERM-value MinHash signature; the
+fraction of equal values between two signatures estimates the Jaccard
+similarity of their shingle sets. The signature is cut into BANDS bands, and
+each band is hashed together with the author id into a band key. Posts that
+share any band key are candidates: with 32 bands of 4 rows, a pair at 0.7
+similarity collides with probability > 0.999 and one at 0.3 about 0.23.
+
+Signatures and band keys live in post_minhash (migration 015), one row per
+post with a GIN index on bands, so candidates come from an index lookup
+(`bands && <new post's keys>`) whose cost depends on the number of matching
+posts, not on the size of the history. Candidates are then verified against
+NEAR_DUPLICATE_THRESHOLD on their signatures.
+
+Both store paths go through insert_post here instead of db.insert_post:
+
+    from meroka_common import db, near_duplicates
+
+    post, duplicate = db.run(near_duplicates.insert_post(row))
+
+NEAR_DUPLICATE_MODE decides what happens to a match: "flag" (default) stores
+the post with generation_metadata.near_duplicate = {post_id, similarity},
+"reject" skips the insert and returns (None, duplicate), "off" stores without
+checking or indexing. The index is best effort: a failed lookup or index write
+is logged and never fails the store.
+
+A row with a slot_key (migration 016) is inserted only if no post fills that
+slot yet; otherwise the stored post is returned as is, unchecked and not
+indexed again. Callers tell the two apart by its execution_id.
+
+Signatures depend on SHINGLE_WORDS, NUM_PERM and SEED; changing any of them
+makes stored rows incomparable, so rebuild with scripts/backfill_post_minhash.py.
+"""
+
+import hashlib
+import json
+import os
+import random
+import re
+from datetime import datetime, timedelta, timezone
+from typing import TypedDict
+
+from meroka_common import db
+
+NEAR_DUPLICATE_MODE = os.environ.get("NEAR_DUPLICATE_MODE", "flag")
+NEAR_DUPLICATE_THRESHOLD = float(os.environ.get("NEAR_DUPLICATE_THRESHOLD", "0.7"))
+# Only compare with posts from the last N days; 0 compares with the whole history
+NEAR_DUPLICATE_WINDOW_DAYS = int(os.environ.get("NEAR_DUPLICATE_WINDOW_DAYS", "180"))
+NEAR_DUPLICATE_MAX_CANDIDATES = int(os.environ.get("NEAR_DUPLICATE_MAX_CANDIDATES", "50"))
+
+if NEAR_DUPLICATE_MODE not in ("flag", "reject", "off"):
+    raise ValueError(f"Unknown NEAR_DUPLICATE_MODE {NEAR_DUPLICATE_MODE!r}: expected flag, reject or off")
+
+SHINGLE_WORDS = 3
+NUM_PERM = 128
+BANDS = 32
+ROWS = NUM_PERM // BANDS
+SEED = 1
+
+_PRIME = (1 << 61) - 1
+_MASK = (1 << 32) - 1
+_rng = random.Random(SEED)
+_PERMUTATIONS = [(_rng.randrange(1, _PRIME), _rng.randrange(0, _PRIME)) for _ in range(NUM_PERM)]
+
+WORD = re.compile(r"[\w'#@]+")
+
+
+class Duplicate(TypedDict):
+    post_id: str
+    similarity: float
+
+
+# ============================================
+# MINHASH
+# ============================================
+
+def shingles(text: str) -> set[int]:
+    """64-bit hashes of the text's SHINGLE_WORDS-word windows (the whole text if shorter)."""
+    words = WORD.findall(text.lower())
+    windows = {
+        " ".join(words[i:i + SHINGLE_WORDS])
+        for i in range(max(len(words) - SHINGLE_WORDS + 1, 1))
+    }
+    return {
+        int.from_bytes(hashlib.blake2b(w.encode("utf-8"), digest_size=8).digest(), "big")
+        for w in windows
+    }
+
+
+def signature(text: str) -> list[int]:
+    """NUM_PERM-value MinHash signature (32-bit values) of the text's shingles."""
+    hashes = shingles(text)
+    return [min((a * h + b) % _PRIME for h in hashes) & _MASK for a, b in _PERMUTATIONS]
+
+
+def band_keys(author_id: str, sig: list[int]) -> list[int]:
+    """One signed 64-bit key per band, salted with the author so buckets are per employee."""
+    keys = []
+    for band in range(BANDS):
+        rows = sig[band * ROWS:(band + 1) * ROWS]
+        digest = hashlib.blake2b(
+            f"{author_id}:{band}:{','.join(map(str, rows))}".encode("utf-8"),
+            digest_size=8
+        ).digest()
+        keys.append(int.from_bytes(digest, "big", signed=True))
+    return keys
+
+
+def similarity(a: list[int], b: list[int]) -> float:
+    """Estimated Jaccard similarity of two signatures."""
+    return sum(x == y for x, y in zip(a, b)) / NUM_PERM
+
+
+# ============================================
+# INDEX
+# ============================================
+
+async def find_duplicate(sig: list[int], keys: list[int]) -> Duplicate | None:
+    """Most similar indexed post at or above NEAR_DUPLICATE_THRESHOLD, if any."""
+    since = None
+    if NEAR_DUPLICATE_WINDOW_DAYS:
+        since = (datetime.now(timezone.utc) - timedelta(days=NEAR_DUPLICATE_WINDOW_DAYS)).isoformat()
+
+    candidates = await db.fetch_minhash_candidates(keys, since, NEAR_DUPLICATE_MAX_CANDIDATES)
+    best = None
+    for candidate in candidates:
+        score = similarity(sig, candidate["signature"])
+        if score >= NEAR_DUPLICATE_THRESHOLD and (best is None or score > best["similarity"]):
+            best = {"post_id": candidate["post_id"], "similarity": round(score, 4)}
+    return best
+
+
+async def insert_post(row: dict) -> tuple[dict | None, Duplicate | None]:
+    """
+    db.insert_post with a near-duplicate check before and indexing after.
+
+    Returns (post, duplicate); post is None only when NEAR_DUPLICATE_MODE is
+    "reject" and a duplicate was found.
+    """
+    if NEAR_DUPLICATE_MODE == "off" or not row.get("author_id"):
+        return await store(row), None
+
+    sig = signature(row["content"])
+    keys = band_keys(row["author_id"], sig)
+
+    duplicate = None
+    try:
+        duplicate = await find_duplicate(sig, keys)
+    except Exception as e:
+        print(json.dumps({"near_duplicates": {"lookup_error": str(e)}}))
+
+    if duplicate is not None:
+        if NEAR_DUPLICATE_MODE == "reject":
+            return None, duplicate
+        row = {**row, "generation_metadata": {**(row.get("generation_metadata") or {}), "near_duplicate": duplicate}}
+
+    if row.get("slot_key"):
+        post, inserted = await db.insert_post_slot(row)
+        if not inserted:
+            return post, None
+    else:
+        post = await db.insert_post(row)
+
+    try:
+        await db.insert_post_minhash({
+            "post_id": post["id"],
+            "author_id": row["author_id"],
+            "signature": sig,
+            "bands": keys
+        })
+    except Exception as e:
+        print(json.dumps({"near_duplicates": {"index_error": str(e), "post_id": post["id"]}}))
+
+    return post, duplicate
+
+
+async def store(row: dict) -> dict:
+    """db.insert_post, or db.insert_post_slot for rows with a slot_key."""
+    if row.get("slot_key"):
+        return (await db.insert_post_slot(row))[0]
+    return await db.insert_post(row)
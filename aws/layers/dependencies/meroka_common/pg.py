@@ -0,0 +1,193 @@
+"""
+Direct Postgres Backend
+asyncpg implementation of the `db` queries, selected with DB_BACKEND=postgres.
+
+Skips PostgREST for the hot path: each container keeps a small asyncpg pool
+to DATABASE_URL, and asyncpg prepares every statement server-side on first use
+per connection and reuses it from its statement cache, so warm invocations
+send only Bind/Execute for the queries below.
+
+Rows are built with to_jsonb() so they come back in the same JSON shape
+PostgREST returns (UUIDs and timestamps as strings, embedded relations as
+nested objects) and callers can't tell the backends apart.
+
+DATABASE_URL must be a direct connection or a session-mode pooler (Supabase
+port 5432). Behind a transaction-mode pooler (port 6543) prepared statements
+don't survive across transactions; set DB_STATEMENT_CACHE_SIZE=0 there.
+"""
+
+import json
+import os
+
+import asyncpg
+
+DATABASE_URL = os.environ.get("DATABASE_URL", "")
+DB_STATEMENT_CACHE_SIZE = int(os.environ.get("DB_STATEMENT_CACHE_SIZE", "100"))
+
+# ============================================
+# HOT STATEMENTS
+# ============================================
+
+CAMPAIGN = "SELECT to_jsonb(c) FROM campaigns c WHERE c.id = $1"
+
+SCHEDULED_CAMPAIGNS = "SELECT to_jsonb(c) FROM campaigns c WHERE c.status = 'active' AND c.schedule_cron IS NOT NULL"
+
+# Same shape as select("*, channels(platform, account_id, accounts(name, settings))")
+CAMPAIGN_CONFIG = """
+SELECT to_jsonb(c) || jsonb_build_object('channels', (
+    SELECT jsonb_build_object(
+        'platform', ch.platform,
+        'account_id', ch.account_id,
+        'accounts', (
+            SELECT jsonb_build_object('name', a.name, 'settings', a.settings)
+            FROM accounts a WHERE a.id = ch.account_id
+        )
+    )
+    FROM channels ch WHERE ch.id = c.channel_id
+))
+FROM campaigns c WHERE c.id = $1
+"""
+
+CAMPAIGN_EMPLOYEES = """
+SELECT jsonb_build_object(
+    'user_id', ce.user_id,
+    'users', jsonb_build_object('id', u.id, 'email', u.email, 'name', u.name)
+)
+FROM campaign_employees ce
+LEFT JOIN users u ON u.id = ce.user_id
+WHERE ce.campaign_id = $1 AND ce.is_active
+"""
+
+USER = """
+SELECT jsonb_build_object('id', id, 'email', email, 'name', name, 'settings', settings)
+FROM users WHERE id = $1
+"""
+
+VOICE_SAMPLES = "SELECT to_jsonb(s) FROM employee_voice_samples s WHERE s.email = $1"
+
+VOICE_PROFILE = "SELECT profile FROM employee_voice_profiles WHERE email = $1"
+
+POST_CONTEXT = "SELECT get_post_context($1, $2, $3, $4)"
+
+MINHASH_CANDIDATES = """
+SELECT jsonb_build_object('post_id', post_id, 'signature', signature)
+FROM post_minhash
+WHERE bands && $1::bigint[] AND ($2::timestamptz IS NULL OR created_at >= $2::timestamptz)
+ORDER BY created_at DESC
+LIMIT $3
+"""
+
+FILLED_SLOTS = "SELECT slot_key FROM posts WHERE slot_key LIKE $1"
+
+POST_BY_SLOT = "SELECT to_jsonb(p) FROM posts p WHERE p.slot_key = $1"
+
+DISPATCHED_SLOTS = """
+SELECT jsonb_build_object('slot_key', slot_key, 'dispatch', dispatch)
+FROM post_dispatches
+WHERE slot_key LIKE $1 AND status = 'dispatched' AND expires_at > NOW()
+"""
+
+# A slot dispatched again (after failing or expiring) takes the new dispatch's row
+UPSERT_POST_DISPATCHES = """
+INSERT INTO post_dispatches (slot_key, campaign_id, execution_id, dispatch, batch_id, status, dispatched_at, expires_at)
+SELECT slot_key, campaign_id, execution_id, dispatch, batch_id, status, dispatched_at, expires_at
+FROM jsonb_populate_recordset(NULL::post_dispatches, $1)
+ON CONFLICT (slot_key) DO UPDATE SET
+    campaign_id = EXCLUDED.campaign_id,
+    execution_id = EXCLUDED.execution_id,
+    dispatch = EXCLUDED.dispatch,
+    batch_id = EXCLUDED.batch_id,
+    status = EXCLUDED.status,
+    dispatched_at = EXCLUDED.dispatched_at,
+    expires_at = EXCLUDED.expires_at
+"""
+
+BATCH_DISPATCHES = "SELECT execution_id FROM post_dispatches WHERE batch_id = $1 AND status = 'dispatched'"
+
+FAIL_DISPATCHES_BY_EXECUTION = "UPDATE post_dispatches SET status = 'failed' WHERE execution_id = ANY($1::text[])"
+
+FAIL_DISPATCHES_BY_BATCH = "UPDATE post_dispatches SET status = 'failed' WHERE batch_id = $1"
+
+
+class NotFound(LookupError):
+    """A single-row query matched nothing (PostgREST's .single() raises here too)."""
+
+
+async def _init_connection(conn: asyncpg.Connection) -> None:
+    for name in ("json", "jsonb"):
+        await conn.set_type_codec(name, encoder=json.dumps, decoder=json.loads, schema="pg_catalog")
+
+
+async def create_pool(max_size: int, timeout: float) -> asyncpg.Pool:
+    """Connection pool for the calling thread's event loop."""
+    if not DATABASE_URL:
+        raise RuntimeError("DB_BACKEND=postgres requires DATABASE_URL")
+    return await asyncpg.create_pool(
+        DATABASE_URL,
+        min_size=1,
+        max_size=max_size,
+        command_timeout=timeout,
+        statement_cache_size=DB_STATEMENT_CACHE_SIZE,
+        init=_init_connection
+    )
+
+
+async def fetch_one(pool: asyncpg.Pool, query: str, *args, table: str) -> dict:
+    value = await pool.fetchval(query, *args)
+    if value is None:
+        raise NotFound(f"No {table} row for {args[0]}")
+    return value
+
+
+async def fetch_all(pool: asyncpg.Pool, query: str, *args) -> list:
+    return [record[0] for record in await pool.fetch(query, *args)]
+
+
+# ============================================
+# INSERTS
+# ============================================
+
+def insert_statement(table: str, columns: list[str], returning: bool, skip_conflict: str | None = None) -> str:
+    """
+    INSERT for a fixed column set, with the row passed as one jsonb parameter.
+
+    jsonb_populate_record casts each value to its column type, and only the
+    listed columns are written so the rest keep their defaults. Callers insert
+    the same column set every time, so each table's statement is prepared once
+    per connection. skip_conflict names a unique column whose conflicts are
+    skipped (ON CONFLICT DO NOTHING; nothing is returned for them).
+    """
+    names = ", ".join(quote_identifier(c) for c in columns)
+    statement = (
+        f"INSERT INTO {quote_identifier(table)} ({names}) "
+        f"SELECT {names} FROM jsonb_populate_record(NULL::{quote_identifier(table)}, $1)"
+    )
+    if skip_conflict:
+        statement += f" ON CONFLICT ({quote_identifier(skip_conflict)}) DO NOTHING"
+    if returning:
+        statement += f" RETURNING to_jsonb({quote_identifier(table)})"
+    return statement
+
+
+def quote_identifier(name: str) -> str:
+    return '"' + name.replace('"', '""') + '"'
+
+
+async def insert(
+    pool: asyncpg.Pool,
+    table: str,
+    row: dict,
+    returning: bool = True,
+    skip_conflict: str | None = None
+) -> dict | None:
+    statement = insert_statement(table, sorted(row), returning, skip_conflict)
+    if returning:
+        return await pool.fetchval(statement, row)
+    await pool.execute(statement, row)
+    return None
+
+
+async def insert_many(pool: asyncpg.Pool, table: str, rows: list[dict]) -> None:
+    """Insert rows that all share one column set, as a single prepared statement."""
+    if rows:
+        await pool.executemany(insert_statement(table, sorted(rows[0]), False), [(row,) for row in rows])
@@ -0,0 +1,74 @@
+"""
+Model Pricing
+Per-model token prices used to turn workflow_logs token counts into dollars.
+
+Prices are USD per million tokens as (input, output) and are matched on the
+longest model-name prefix, so dated variants like `gpt-4o-2024-08-06` pick up
+the `gpt-4o` price while `gpt-4o-mini` keeps its own. Override or extend the
+table without a deploy via the MODEL_PRICES_JSON environment variable:
+
+    MODEL_PRICES_JSON='{"gpt-4o": [2.5, 10.0], "my-finetune": {"input": 3.0, "output": 12.0}}'
+
+Calls made through a provider's batch API (logged with a step_name ending in
+`_batch`) are billed at BATCH_PRICE_FACTOR of the list price.
+"""
+
+import json
+import os
+
+# OpenAI's Batch API bills input and output at half the synchronous price
+BATCH_PRICE_FACTOR = float(os.environ.get("BATCH_PRICE_FACTOR", "0.5"))
+
+# List prices, USD per 1M tokens: (input, output)
+DEFAULT_PRICES: dict[str, tuple[float, float]] = {
+    "gpt-4o-mini": (0.15, 0.60),
+    "gpt-4o": (2.50, 10.00),
+    "gpt-4-turbo": (10.00, 30.00),
+    "gpt-4": (30.00, 60.00),
+    "grok-4": (3.00, 15.00),
+    "grok-3-mini": (0.30, 0.50),
+    "grok-3": (3.00, 15.00),
+    "gemini-3-flash": (0.50, 3.00),
+    "gemini-2.5-flash": (0.30, 2.50),
+    "gemini-2.5-pro": (1.25, 10.00),
+    "claude-3-haiku": (0.25, 1.25),
+    "claude-3-sonnet": (3.00, 15.00),
+    "claude-3-opus": (15.00, 75.00),
+}
+
+
+def load_prices() -> dict[str, tuple[float, float]]:
+    """Default price table merged with any MODEL_PRICES_JSON overrides."""
+    prices = dict(DEFAULT_PRICES)
+    overrides = json.loads(os.environ.get("MODEL_PRICES_JSON") or "{}")
+    for model, price in overrides.items():
+        if isinstance(price, dict):
+            prices[model] = (float(price["input"]), float(price["output"]))
+        else:
+            prices[model] = (float(price[0]), float(price[1]))
+    return prices
+
+
+def price_for(model: str | None, prices: dict[str, tuple[float, float]] | None = None) -> tuple[float, float] | None:
+    """(input, output) USD per 1M tokens for the longest matching prefix, or None."""
+    if not model:
+        return None
+    prices = prices if prices is not None else load_prices()
+    name = model.lower()
+    matches = [prefix for prefix in prices if name.startswith(prefix.lower())]
+    return prices[max(matches, key=len)] if matches else None
+
+
+def cost_usd(
+    model: str | None,
+    input_tokens: int,
+    output_tokens: int,
+    prices: dict[str, tuple[float, float]] | None = None,
+    batch: bool = False
+) -> float | None:
+    """Dollar cost of one call, or None when the model has no price."""
+    price = price_for(model, prices)
+    if price is None:
+        return None
+    cost = (input_tokens * price[0] + output_tokens * price[1]) / 1_000_000
+    return cost * BATCH_PRICE_FACTOR if batch else cost
@@ -0,0 +1,209 @@
+"""
+Prompt Budget
+Local token counting and budget-fitted prompt assembly for the LLM lambdas.
+
+Prompts are built from sections. Required sections (priority 0) are always
+kept; optional ones are trimmed or dropped, least important (highest
+priority number) first, until the estimate fits the budget:
+
+    prompt, report = assemble([
+        section("header", "Write a LinkedIn post..."),
+        section("example_1", example_1, priority=1, trim=True),
+        section("example_2", example_2, priority=3, trim=True),
+        section("instructions", "Write ONE LinkedIn post..."),
+    ], model="gpt-4o", budget=1500)
+
+OpenAI models (and Grok, whose tokenizer is close to cl100k) are counted with
+tiktoken when it is installed and its encoding can be loaded; everything else
+falls back to a per-family characters-per-token estimate. Lambdas log the
+estimate next to the provider's actual prompt_tokens, so the ratios below can
+be recalibrated from workflow_logs.
+"""
+
+import functools
+import math
+import os
+
+# Prompt token budgets; campaigns override with workflow_config.prompt_token_budget
+# and workflow_config.judge_prompt_token_budget
+PROMPT_TOKEN_BUDGET = int(os.environ.get("PROMPT_TOKEN_BUDGET", "1500"))
+JUDGE_PROMPT_TOKEN_BUDGET = int(os.environ.get("JUDGE_PROMPT_TOKEN_BUDGET", "4000"))
+
+# Longest model-name prefix -> tiktoken encoding
+ENCODINGS = {
+    "gpt-4o": "o200k_base",
+    "gpt-4.1": "o200k_base",
+    "gpt-5": "o200k_base",
+    "o1": "o200k_base",
+    "o3": "o200k_base",
+    "o4": "o200k_base",
+    "gpt-4": "cl100k_base",
+    "gpt-3.5": "cl100k_base",
+    "grok": "cl100k_base",
+}
+
+# Fallback estimate, characters per token, by model-name prefix
+CHARS_PER_TOKEN = {
+    "gemini": 4.0,
+    "claude": 3.5,
+    "gpt": 4.0,
+    "grok": 4.0,
+}
+DEFAULT_CHARS_PER_TOKEN = 4.0
+
+# Chat formatting overhead per message and for the reply primer (OpenAI cookbook)
+TOKENS_PER_MESSAGE = 3
+TOKENS_PER_REPLY = 3
+
+# A trimmed section shorter than this is dropped instead
+MIN_TRIMMED_TOKENS = 40
+ELLIPSIS = " …"
+
+
+def longest_prefix(model: str, table: dict):
+    model = model.lower()
+    matches = [prefix for prefix in table if model.startswith(prefix)]
+    return table[max(matches, key=len)] if matches else None
+
+
+@functools.lru_cache(maxsize=None)
+def get_encoding(name: str):
+    """tiktoken encoding, or None if tiktoken is missing or can't load it (e.g. offline)."""
+    try:
+        import tiktoken
+        return tiktoken.get_encoding(name)
+    except Exception as e:
+        print(f"tiktoken {name} unavailable, estimating tokens from characters: {type(e).__name__}")
+        return None
+
+
+def tokenizer_for(model: str) -> str:
+    """Name of the counter used for a model: a tiktoken encoding or "chars/N"."""
+    name = longest_prefix(model, ENCODINGS)
+    if name and get_encoding(name):
+        return name
+    return f"chars/{longest_prefix(model, CHARS_PER_TOKEN) or DEFAULT_CHARS_PER_TOKEN}"
+
+
+def count_tokens(text: str, model: str) -> int:
+    """Token count of text for a model, exact where a local tokenizer is available."""
+    if not text:
+        return 0
+    name = longest_prefix(model, ENCODINGS)
+    encoding = get_encoding(name) if name else None
+    if encoding:
+        return len(encoding.encode(text, disallowed_special=()))
+    chars_per_token = longest_prefix(model, CHARS_PER_TOKEN) or DEFAULT_CHARS_PER_TOKEN
+    return math.ceil(len(text) / chars_per_token)
+
+
+def count_chat_tokens(messages: list[dict], model: str) -> int:
+    """Prompt tokens of a chat request, including per-message formatting overhead."""
+    return TOKENS_PER_REPLY + sum(
+        TOKENS_PER_MESSAGE + count_tokens(str(m.get("content", "")), model)
+        for m in messages
+    )
+
+
+def budget_for(ctx: dict, judge: bool = False) -> int:
+    """Prompt token budget for a context, from the campaign's workflow_config or the env default."""
+    config = (ctx.get("campaign") or {}).get("workflow_config") or {}
+    if judge:
+        return int(config.get("judge_prompt_token_budget", JUDGE_PROMPT_TOKEN_BUDGET))
+    return int(config.get("prompt_token_budget", PROMPT_TOKEN_BUDGET))
+
+
+def section(name: str, text: str, priority: int = 0, trim: bool = False) -> dict:
+    """
+    A prompt section.
+
+    priority 0 is required; higher numbers are given up first. trim=True lets
+    the section be cut at a sentence or line boundary before it is dropped.
+    """
+    return {"name": name, "text": text, "priority": priority, "trim": trim}
+
+
+def assemble(
+    sections: list[dict],
+    model: str,
+    budget: int,
+    separator: str = "\n\n",
+    reserved_tokens: int = 0
+) -> tuple[str, dict]:
+    """
+    Join sections, trimming or dropping optional ones until the prompt fits.
+
+    reserved_tokens covers whatever is sent alongside the prompt (system
+    message, chat overhead) and counts against the budget.
+
+    Returns (prompt, report):
+    {
+        "tokenizer": "o200k_base",
+        "budget": 1500,
+        "estimated_tokens": 1312,    # includes reserved_tokens
+        "trimmed": ["example_2"],
+        "dropped": ["example_3"],
+        "over_budget": false         # required sections alone exceed the budget
+    }
+    """
+    separator_tokens = count_tokens(separator, model)
+    kept = [dict(s, tokens=count_tokens(s["text"], model)) for s in sections if s["text"]]
+
+    def total() -> int:
+        return reserved_tokens + sum(s["tokens"] for s in kept) + separator_tokens * max(len(kept) - 1, 0)
+
+    trimmed, dropped = [], []
+    optional = sorted((s for s in kept if s["priority"] > 0), key=lambda s: -s["priority"])
+    for candidate in optional:
+        excess = total() - budget
+        if excess <= 0:
+            break
+        target = candidate["tokens"] - excess
+        if candidate["trim"] and target >= MIN_TRIMMED_TOKENS:
+            text = trim_to_tokens(candidate["text"], target, model)
+            if text:
+                candidate["text"], candidate["tokens"] = text, count_tokens(text, model)
+                trimmed.append(candidate["name"])
+                continue
+        kept.remove(candidate)
+        dropped.append(candidate["name"])
+
+    estimated = total()
+    report = {
+        "tokenizer": tokenizer_for(model),
+        "budget": budget,
+        "estimated_tokens": estimated,
+        "trimmed": trimmed,
+        "dropped": dropped,
+        "over_budget": estimated > budget
+    }
+    return separator.join(s["text"] for s in kept), report
+
+
+def trim_to_tokens(text: str, max_tokens: int, model: str) -> str:
+    """Longest prefix of text ending on a sentence or line break that fits max_tokens."""
+    tokens = count_tokens(text, model)
+    if tokens <= max_tokens:
+        return text
+
+    # Tokens are roughly proportional to characters: start from the
+    # proportional cut and back off until the trimmed text fits
+    cut = int(len(text) * max_tokens / tokens)
+    while cut > 0:
+        candidate = text[:cut]
+        boundary = max(candidate.rfind(mark) for mark in (". ", "! ", "? ", "\n"))
+        if boundary > len(candidate) // 2:
+            candidate = candidate[:boundary + 1]
+        candidate = candidate.rstrip() + ELLIPSIS
+        if count_tokens(candidate, model) <= max_tokens:
+            return candidate
+        cut = int(cut * 0.9)
+    return ""
+
+
+def compare_tokens(report: dict, actual_tokens: int | None) -> dict:
+    """Report plus the provider's actual prompt_tokens and the estimate error."""
+    result = dict(report, actual_tokens=actual_tokens)
+    if actual_tokens:
+        result["estimate_ratio"] = round(report["estimated_tokens"] / actual_tokens, 3)
+    return result
@@ -0,0 +1,90 @@
+"""
+Schedules
+Campaign schedules (campaigns.schedule_cron, in schedule_timezone) for the
+orchestrator's sweep mode.
+
+schedule_cron is a five-field cron expression: minute, hour, day of month,
+month, day of week (0-6 from Sunday; 7 is Sunday too). Fields take `*`,
+numbers, ranges `a-b`, lists `a,b` and steps `*/n`, `a/n` or `a-b/n`. As in cron, when
+both day of month and day of week are restricted, a day matching either one
+matches. Times are evaluated in the campaign's IANA timezone, so
+`0 9 * * 1-5` in America/New_York fires at 9:00 local across DST changes.
+
+    from meroka_common import schedules
+
+    scheduled = schedules.last_run("0 9 * * 1-5", "America/New_York", now, within=timedelta(hours=1))
+
+last_run returns the latest scheduled time in (now - within, now], in UTC, or
+None when the campaign was not scheduled in that span.
+"""
+
+import functools
+from datetime import datetime, timedelta, timezone
+from typing import NamedTuple
+from zoneinfo import ZoneInfo
+
+# (low, high) of each field
+FIELD_RANGES = ((0, 59), (0, 23), (1, 31), (1, 12), (0, 7))
+
+
+class Cron(NamedTuple):
+    minutes: frozenset[int]
+    hours: frozenset[int]
+    days: frozenset[int]
+    months: frozenset[int]
+    weekdays: frozenset[int]
+    any_day: bool       # day of month is *
+    any_weekday: bool   # day of week is *
+
+
+@functools.lru_cache(maxsize=256)
+def parse(expression: str) -> Cron:
+    """Parsed cron expression; ValueError if it is not five valid fields."""
+    fields = expression.split()
+    if len(fields) != 5:
+        raise ValueError(f"Invalid cron {expression!r}: expected 5 fields, got {len(fields)}")
+
+    values = [parse_field(field, low, high) for field, (low, high) in zip(fields, FIELD_RANGES)]
+    weekdays = frozenset(7 if day == 0 else day for day in values[4])  # isoweekday: Sunday is 7
+    return Cron(*values[:4], weekdays, fields[2] == "*", fields[4] == "*")
+
+
+def parse_field(field: str, low: int, high: int) -> frozenset[int]:
+    values = set()
+    for part in field.split(","):
+        span, _, step = part.partition("/")
+        if span == "*":
+            start, end = low, high
+        elif "-" in span:
+            start, end = (int(bound) for bound in span.split("-", 1))
+        else:
+            start = int(span)
+            end = high if step else start  # "5/15" is 5-59/15
+        if not low <= start <= end <= high or (step and int(step) < 1):
+            raise ValueError(f"Invalid cron field {field!r}: expected values in {low}-{high} and steps of 1 or more")
+        values.update(range(start, end + 1, int(step) if step else 1))
+    return frozenset(values)
+
+
+def matches(cron: Cron, at: datetime) -> bool:
+    """Whether a (local) time is a scheduled minute."""
+    if at.minute not in cron.minutes or at.hour not in cron.hours or at.month not in cron.months:
+        return False
+    day = at.day in cron.days
+    weekday = at.isoweekday() in cron.weekdays
+    if cron.any_day or cron.any_weekday:
+        return day and weekday
+    return day or weekday
+
+
+def last_run(expression: str, tz: str | None, now: datetime, within: timedelta) -> datetime | None:
+    """Latest scheduled time in (now - within, now], in UTC; None if there is none."""
+    cron = parse(expression)
+    zone = ZoneInfo(tz or "UTC")
+    at = now.astimezone(timezone.utc).replace(second=0, microsecond=0)
+    earliest = now - within
+    while at > earliest:
+        if matches(cron, at.astimezone(zone)):
+            return at
+        at -= timedelta(minutes=1)
+    return None
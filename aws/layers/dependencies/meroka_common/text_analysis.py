@@ -0,0 +1,143 @@
+"""
+Text Analysis
+Single-pass sentence segmentation and stat extraction for post content.
+Used by meme-renderer and any other media template that needs a quote or stat.
+"""
+
+import re
+
+# Sentence boundaries: terminal punctuation followed by whitespace, or line breaks
+SENTENCE_BOUNDARY = re.compile(r"(?<=[.!?])\s+|\s*\n+\s*")
+
+# Plain or comma-grouped integer, e.g. "15" or "5,000"
+NUMBER = r"(?:\d{1,3}(?:,\d{3})+|\d+)"
+
+# One pattern for every stat kind so each post is scanned exactly once.
+# The lookbehind stops matches from starting in the middle of a number.
+STAT_PATTERN = re.compile(
+    r"(?<![\d.,])(?P<percent>\d+(?:\.\d+)?%)"
+    rf"|\$(?P<dollars>{NUMBER}(?:\.\d+)?[kKmM]?)"
+    rf"|(?<![\d.,$])(?P<duration>{NUMBER})\s*"
+    r"(?P<duration_unit>minutes?|hours?|days?|weeks?|months?|years?)\b"
+    rf"|(?<![\d.,$])(?P<count>{NUMBER})\s*"
+    r"(?P<count_unit>patients?|doctors?|practices?|physicians?|clinics?)\b",
+    re.IGNORECASE,
+)
+
+# Higher weight = more headline-worthy
+STAT_WEIGHTS = {
+    "percent": 4.0,
+    "dollars": 3.0,
+    "duration": 2.0,
+    "count": 1.0,
+}
+
+DEFAULT_STAT = {"number": "100+", "label": "independent practices"}
+
+QUOTE_MIN_LENGTH = 50
+
+
+def split_sentences(text: str) -> list[str]:
+    """Split post text into trimmed, non-empty sentences."""
+    return [s.strip() for s in SENTENCE_BOUNDARY.split(text) if s and s.strip()]
+
+
+def find_stats(text: str) -> list[dict]:
+    """
+    Find every stat candidate in the text, ranked best first.
+
+    Each candidate:
+    {
+        "kind": "percent" | "dollars" | "duration" | "count",
+        "number": "18%",
+        "label": "improvement",
+        "position": 42,   # character offset in the text
+        "score": 3.9
+    }
+    """
+    length = max(len(text), 1)
+    candidates = []
+
+    for match in STAT_PATTERN.finditer(text):
+        kind = match.lastgroup
+        if kind == "duration_unit":
+            kind = "duration"
+        elif kind == "count_unit":
+            kind = "count"
+
+        if kind == "percent":
+            number, label = match.group("percent"), "improvement"
+        elif kind == "dollars":
+            number, label = f"${match.group('dollars')}", "saved"
+        elif kind == "duration":
+            number = match.group("duration")
+            label = f"{match.group('duration_unit').lower()} saved"
+        else:
+            number, label = match.group("count"), match.group("count_unit").lower()
+
+        # Earlier stats tend to be the hook of the post, so they get a small boost
+        position = match.start()
+        score = STAT_WEIGHTS[kind] + (1 - position / length) * 0.5
+
+        candidates.append({
+            "kind": kind,
+            "number": number,
+            "label": label,
+            "position": position,
+            "score": round(score, 4)
+        })
+
+    candidates.sort(key=lambda c: (-c["score"], c["position"]))
+    return candidates
+
+
+def extract_stat(text: str) -> dict:
+    """Return the best stat in the text as {"number", "label"}, or a default."""
+    stats = find_stats(text)
+    if not stats:
+        return dict(DEFAULT_STAT)
+
+    return {"number": stats[0]["number"], "label": stats[0]["label"]}
+
+
+def extract_quote(
+    text: str,
+    max_length: int = 280,
+    sentences: list[str] | None = None
+) -> str:
+    """Extract a quotable snippet from the post."""
+    if sentences is None:
+        sentences = split_sentences(text)
+
+    if not sentences:
+        return text[:max_length]
+
+    # Find the most impactful sentence (not too short, not too long)
+    for sentence in sentences:
+        if QUOTE_MIN_LENGTH < len(sentence) < max_length:
+            return sentence if sentence[-1] in ".!?" else sentence + "."
+
+    # Fallback to first sentence
+    return sentences[0][:max_length].strip()
+
+
+def analyze_post(text: str, max_quote_length: int = 280) -> dict:
+    """Segment a post once and derive its quote and ranked stats."""
+    text = text or ""
+    sentences = split_sentences(text)
+    stats = find_stats(text)
+
+    return {
+        "sentences": sentences,
+        "quote": extract_quote(text, max_quote_length, sentences=sentences),
+        "stats": stats,
+        "stat": (
+            {"number": stats[0]["number"], "label": stats[0]["label"]}
+            if stats else dict(DEFAULT_STAT)
+        )
+    }
+
+
+def analyze_posts(texts: list[str], max_quote_length: int = 280) -> list[dict]:
+    """Batch version of analyze_post, results in input order."""
+    return [analyze_post(text, max_quote_length) for text in texts]
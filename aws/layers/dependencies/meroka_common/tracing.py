@@ -0,0 +1,310 @@
+"""
+Tracing
+Lightweight spans keyed on execution_id, plus per-step latency histograms.
+
+Every handler wraps its entry point with `traced_handler`, which opens a root
+span for the invocation and, when it returns, emits:
+
+- one `{"trace": {...}}` log line holding every span of the invocation (ids,
+  parent ids, absolute start times and durations), so spans from the
+  orchestrator, context-fetcher, LLM lambdas and renderer can be stitched into
+  one timeline per execution_id offline;
+- one CloudWatch Embedded Metric Format line per step with the raw latencies
+  (`StepLatency`) and fixed-bucket histogram counts, which CloudWatch turns into
+  metrics and `scripts/trace_report.py` parses from exported logs.
+
+Span names are dotted: `db.<table>.<op>`, `llm.<provider>`, `prompt.build`,
+`render.<template>`, `s3.upload`.
+
+The root span `handler.<service>` carries `cold`: true on the first invocation
+a container serves. Its latency is also recorded as step
+`handler.<service>.cold` or `handler.<service>.warm`, so cold and warm
+invocations get separate percentiles.
+
+Warm-up events (`{"warmup": true}`) never reach the handler. The decorator
+runs the service's `warm` initialiser (clients, encodings, templates, fonts)
+and returns without side effects (see warm_up).
+
+Usage:
+    from meroka_common.tracing import span, traced_handler
+
+    @traced_handler("llm-openai")
+    def lambda_handler(event, context):
+        with span("prompt.build"):
+            prompt = build_prompt(ctx, style)
+        with span("llm.openai", model=model) as s:
+            response = client.chat.completions.create(...)
+            s.set(output_tokens=response.usage.completion_tokens)
+"""
+
+import functools
+import json
+import threading
+import time
+import uuid
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Iterator
+
+METRICS_NAMESPACE = "Meroka/Workflow"
+
+# Upper bounds (ms) of the histogram buckets; the last bucket is open-ended
+BUCKET_BOUNDS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000)
+
+# EMF accepts at most 100 values per metric per line
+MAX_EMF_VALUES = 100
+
+_current_trace: ContextVar["Trace | None"] = ContextVar("meroka_trace", default=None)
+_current_span: ContextVar["Span | None"] = ContextVar("meroka_span", default=None)
+
+_histograms: dict[tuple[str, str], "Histogram"] = {}
+_histograms_lock = threading.Lock()
+
+# Services that have served an invocation in this container
+_started: set[str] = set()
+_started_lock = threading.Lock()
+
+# Where finished traces and metric lines go; print() lands in CloudWatch Logs
+_sink: Callable[[dict], None] = lambda record: print(json.dumps(record, default=str))
+
+
+class Span:
+    """One timed operation inside a trace."""
+
+    def __init__(self, trace: "Trace", name: str, parent: "Span | None", attrs: dict):
+        self.trace = trace
+        self.name = name
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent.span_id if parent else None
+        self.attrs = attrs
+        self.status = "ok"
+        self.started_at = time.time()
+        self._start = time.perf_counter()
+        self.duration_ms: float | None = None
+
+    def set(self, **attrs) -> None:
+        """Attach attributes discovered while the span is open (tokens, sizes...)."""
+        self.attrs.update(attrs)
+
+    def finish(self, error: BaseException | None = None) -> None:
+        self.duration_ms = (time.perf_counter() - self._start) * 1000
+        if error is not None:
+            self.status = "error"
+            self.attrs["error"] = type(error).__name__
+        record_latency(self.trace.service, self.name, self.duration_ms)
+
+    def to_dict(self) -> dict:
+        return {
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start_ms": round(self.started_at * 1000, 3),
+            "duration_ms": round(self.duration_ms or 0.0, 3),
+            "status": self.status,
+            "attrs": self.attrs,
+        }
+
+
+class Trace:
+    """Spans recorded by one service (lambda) for one execution."""
+
+    def __init__(self, execution_id: str | None, service: str):
+        self.execution_id = execution_id
+        self.service = service
+        self.spans: list[Span] = []
+
+    def to_dict(self) -> dict:
+        return {
+            "execution_id": self.execution_id,
+            "service": self.service,
+            "spans": [s.to_dict() for s in self.spans],
+        }
+
+
+class Histogram:
+    """Fixed-bucket latency histogram that also keeps raw values until flushed."""
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKET_BOUNDS_MS) + 1)
+        self.values: list[float] = []
+        self.total = 0.0
+
+    def record(self, value_ms: float) -> None:
+        self.counts[bisect_left(BUCKET_BOUNDS_MS, value_ms)] += 1
+        self.values.append(value_ms)
+        self.total += value_ms
+
+
+@contextmanager
+def trace(execution_id: str | None, service: str) -> Iterator[Trace]:
+    """Record spans for one execution; emits the trace and step metrics on exit."""
+    current = Trace(execution_id, service)
+    trace_token = _current_trace.set(current)
+    span_token = _current_span.set(None)
+    try:
+        yield current
+    finally:
+        _current_span.reset(span_token)
+        _current_trace.reset(trace_token)
+        if current.spans:
+            _sink({"trace": current.to_dict()})
+        flush_metrics()
+
+
+@contextmanager
+def span(name: str, **attrs) -> Iterator[Span | None]:
+    """Time a block as a child of the current span; a no-op outside a trace."""
+    current = _current_trace.get()
+    if current is None:
+        yield None
+        return
+
+    new_span = Span(current, name, _current_span.get(), attrs)
+    current.spans.append(new_span)
+    token = _current_span.set(new_span)
+    try:
+        yield new_span
+    except BaseException as e:
+        new_span.finish(e)
+        raise
+    else:
+        new_span.finish()
+    finally:
+        _current_span.reset(token)
+
+
+def traced_handler(service: str, warm: Callable[[], Any] | None = None) -> Callable:
+    """
+    Decorate a lambda_handler so each invocation is traced under `service`.
+
+    warm pre-initialises what the handler would otherwise load on first use;
+    it runs for warm-up events instead of the handler.
+    """
+    def decorator(handler: Callable) -> Callable:
+        @functools.wraps(handler)
+        def wrapper(event: dict, context: Any) -> Any:
+            cold = cold_start(service, context)
+            if is_warmup(event):
+                return warm_up(service, warm, event, cold)
+
+            execution_id = event.get("execution_id") if isinstance(event, dict) else None
+            with trace(execution_id, service):
+                root = None
+                try:
+                    with span(f"handler.{service}", action=_action(event), cold=cold) as root:
+                        return handler(event, context)
+                finally:
+                    if root is not None:
+                        record_latency(service, f"{root.name}.{'cold' if cold else 'warm'}", root.duration_ms)
+        return wrapper
+    return decorator
+
+
+def cold_start(service: str, context: Any) -> bool:
+    """
+    Whether this is the first invocation of `service` in this container.
+
+    Harnesses that model containers (loadtest/local_aws.py) say so on the
+    context as `cold_start`.
+    """
+    cold = getattr(context, "cold_start", None)
+    with _started_lock:
+        if cold is None:
+            cold = service not in _started
+        _started.add(service)
+    return cold
+
+
+def is_warmup(event: Any) -> bool:
+    return isinstance(event, dict) and event.get("warmup") is True
+
+
+def warm_up(service: str, warm: Callable[[], Any] | None, event: dict, cold: bool) -> dict:
+    """
+    Serve a warm-up event: run `warm`, then hold the container for
+    event["hold_ms"] (counted from the start) so that concurrent warm-ups land
+    on separate containers. Writes nothing; a failing `warm` is reported, not
+    raised.
+    """
+    started = time.perf_counter()
+    error = None
+    with trace(None, service):
+        with span(f"warmup.{service}", cold=cold):
+            try:
+                if warm is not None:
+                    warm()
+            except Exception as e:
+                error = f"{type(e).__name__}: {e}"
+        init_ms = (time.perf_counter() - started) * 1000
+        remaining = float(event.get("hold_ms", 0)) / 1000 - (time.perf_counter() - started)
+        if remaining > 0:
+            time.sleep(remaining)
+
+    result = {"warmed": service, "cold": cold, "init_ms": round(init_ms, 1)}
+    if error:
+        result["error"] = error
+    return result
+
+
+def current_trace() -> Trace | None:
+    return _current_trace.get()
+
+
+def set_execution_id(execution_id: str) -> None:
+    """Key the current trace on an execution_id created mid-invocation."""
+    current = _current_trace.get()
+    if current is not None:
+        current.execution_id = execution_id
+
+
+def record_latency(service: str, step: str, duration_ms: float) -> None:
+    with _histograms_lock:
+        key = (service, step)
+        if key not in _histograms:
+            _histograms[key] = Histogram()
+        _histograms[key].record(duration_ms)
+
+
+def flush_metrics() -> None:
+    """Emit one EMF line per (service, step) recorded since the last flush."""
+    with _histograms_lock:
+        pending = list(_histograms.items())
+        _histograms.clear()
+
+    timestamp = int(time.time() * 1000)
+    for (service, step), histogram in pending:
+        for start in range(0, len(histogram.values), MAX_EMF_VALUES):
+            chunk = histogram.values[start:start + MAX_EMF_VALUES]
+            record = {
+                "_aws": {
+                    "Timestamp": timestamp,
+                    "CloudWatchMetrics": [{
+                        "Namespace": METRICS_NAMESPACE,
+                        "Dimensions": [["Service", "Step"]],
+                        "Metrics": [{"Name": "StepLatency", "Unit": "Milliseconds"}],
+                    }],
+                },
+                "Service": service,
+                "Step": step,
+                "StepLatency": [round(v, 3) for v in chunk],
+            }
+            # Bucket counts ride along once per step; CloudWatch ignores them
+            if start == 0:
+                record["Histogram"] = {
+                    "bounds_ms": list(BUCKET_BOUNDS_MS),
+                    "counts": histogram.counts,
+                    "count": len(histogram.values),
+                    "sum_ms": round(histogram.total, 3),
+                }
+            _sink(record)
+
+
+def set_sink(sink: Callable[[dict], None]) -> None:
+    """Redirect trace and metric records (the load test writes them to a file)."""
+    global _sink
+    _sink = sink
+
+
+def _action(event: Any) -> str | None:
+    return event.get("action") if isinstance(event, dict) else None
@@ -0,0 +1,239 @@
+"""
+Voice Profile
+Compact, precomputed stand-in for an employee's raw voice samples.
+
+A profile condenses example_post_1..3 and the blurb into style statistics,
+recurring phrases, post openers and a short summary. Prompts render it with
+`format_voice_profile` in place of the raw posts, which are sent once per
+council member and again to the judge.
+
+Profiles are stored in employee_voice_profiles with the `sample_hash` of the
+samples they were built from, so they are only rebuilt when the samples change
+(or PROFILE_VERSION is bumped).
+
+VOICE_PROMPT_MODE picks what prompts use: "profile" (default) or "samples"
+for the raw posts. A campaign can override it with workflow_config.voice_prompt.
+"""
+
+import os
+import re
+from collections import Counter
+
+from meroka_common.text_analysis import split_sentences
+from meroka_common.voice_samples import normalize_text, sample_hash
+
+# Bump when build_profile changes shape or output so stored profiles are rebuilt
+PROFILE_VERSION = 1
+
+VOICE_PROMPT_MODE = os.environ.get("VOICE_PROMPT_MODE", "profile")
+
+POST_FIELDS = ("example_post_1", "example_post_2", "example_post_3")
+
+MAX_PHRASES = 8
+MAX_HASHTAGS = 5
+MAX_OPENER_LENGTH = 120
+MAX_SUMMARY_LENGTH = 300
+
+WORD = re.compile(r"[a-z][a-z'’]*")
+HASHTAG = re.compile(r"#\w+")
+EMOJI = re.compile("[\U0001F000-\U0001FAFF☀-➿⬀-⯿]")
+LIST_LINE = re.compile(r"^\s*(?:[-•*→✅]|\d+[.)])\s+", re.MULTILINE)
+
+# Phrases may not start or end on one of these
+STOPWORDS = frozenset("""
+a an and are as at be but by for from had has have i in is it its it's me my of on or our
+so that the their this to was we were will with you your i'm
+""".split())
+
+FIRST_PERSON_SINGULAR = frozenset({"i", "i'm", "i've", "i'd", "i'll", "me", "my", "mine"})
+FIRST_PERSON_PLURAL = frozenset({"we", "we're", "we've", "we'll", "us", "our", "ours"})
+
+
+def build_profile(samples: dict) -> dict:
+    """
+    Build a voice profile from an employee_voice_samples row.
+
+    Returns:
+    {
+        "version": 1,
+        "source_hash": "...",        # sample_hash(samples)
+        "summary": "...",            # condensed blurb
+        "stats": {...},              # see style_stats
+        "phrases": ["...", ...],     # recurring multi-word phrases
+        "hashtags": ["#...", ...],
+        "openers": ["...", ...]      # first sentence of each post
+    }
+    """
+    posts = [normalize_text(samples.get(field)) for field in POST_FIELDS]
+    posts = [p for p in posts if p]
+
+    return {
+        "version": PROFILE_VERSION,
+        "source_hash": sample_hash(samples),
+        "summary": condense(normalize_text(samples.get("blurb")), MAX_SUMMARY_LENGTH),
+        "stats": style_stats(posts),
+        "phrases": recurring_phrases(posts),
+        "hashtags": top_hashtags(posts),
+        "openers": [condense(split_sentences(p)[0], MAX_OPENER_LENGTH) for p in posts]
+    }
+
+
+def use_profile(workflow_config: dict | None) -> bool:
+    """Whether prompts for a campaign should use the profile instead of raw samples."""
+    return (workflow_config or {}).get("voice_prompt", VOICE_PROMPT_MODE) == "profile"
+
+
+def is_current(profile: dict | None, samples: dict) -> bool:
+    """True if the profile was built from these samples by this PROFILE_VERSION."""
+    return (
+        bool(profile)
+        and profile.get("version") == PROFILE_VERSION
+        and profile.get("source_hash") == sample_hash(samples)
+    )
+
+
+def resolve_profile(samples: dict | None, stored: dict | None) -> tuple[dict | None, str]:
+    """
+    Pick the profile to prompt with.
+
+    Returns (profile, source), source being "stored" when the precomputed
+    profile is current, "computed" when it was missing or stale and was rebuilt
+    in-process, or "none" when the employee has no samples.
+    """
+    if not samples:
+        return None, "none"
+    if is_current(stored, samples):
+        return stored, "stored"
+    return build_profile(samples), "computed"
+
+
+def style_stats(posts: list[str]) -> dict:
+    """Per-post averages describing length, structure and tone markers."""
+    if not posts:
+        return {}
+
+    sentences = [s for p in posts for s in split_sentences(p)]
+    words = [w for p in posts for w in WORD.findall(p.lower())]
+    singular = sum(w in FIRST_PERSON_SINGULAR for w in words)
+    plural = sum(w in FIRST_PERSON_PLURAL for w in words)
+
+    if singular >= plural and singular:
+        person = "first person singular"
+    elif plural:
+        person = "first person plural"
+    else:
+        person = "third person"
+
+    count = len(posts)
+    return {
+        "words_per_post": round(len(words) / count),
+        "words_per_sentence": round(len(words) / max(len(sentences), 1), 1),
+        "paragraphs_per_post": round(sum(len(re.split(r"\n\s*\n", p)) for p in posts) / count, 1),
+        "question_share": round(sum(s.endswith("?") for s in sentences) / max(len(sentences), 1), 2),
+        "exclamation_share": round(sum(s.endswith("!") for s in sentences) / max(len(sentences), 1), 2),
+        "emoji_per_post": round(sum(len(EMOJI.findall(p)) for p in posts) / count, 1),
+        "hashtags_per_post": round(sum(len(HASHTAG.findall(p)) for p in posts) / count, 1),
+        "list_posts": sum(bool(LIST_LINE.search(p)) for p in posts),
+        "posts": count,
+        "person": person
+    }
+
+
+def recurring_phrases(posts: list[str], limit: int = MAX_PHRASES) -> list[str]:
+    """
+    Two- to four-word phrases used more than once, most widespread first.
+
+    Phrases that start or end on a stopword are ignored, as are phrases
+    contained in a longer phrase that was already picked.
+    """
+    occurrences = Counter()
+    post_counts = Counter()
+    for post in posts:
+        tokens = WORD.findall(post.lower().replace("’", "'"))
+        seen = set()
+        for n in (2, 3, 4):
+            for i in range(len(tokens) - n + 1):
+                gram = tokens[i:i + n]
+                if gram[0] in STOPWORDS or gram[-1] in STOPWORDS:
+                    continue
+                phrase = " ".join(gram)
+                occurrences[phrase] += 1
+                seen.add(phrase)
+        post_counts.update(seen)
+
+    ranked = sorted(
+        (p for p, c in occurrences.items() if c > 1),
+        key=lambda p: (-post_counts[p], -len(p.split()), -occurrences[p], p)
+    )
+
+    picked: list[str] = []
+    for phrase in ranked:
+        if any(phrase in longer for longer in picked):
+            continue
+        picked.append(phrase)
+        if len(picked) == limit:
+            break
+    return picked
+
+
+def top_hashtags(posts: list[str], limit: int = MAX_HASHTAGS) -> list[str]:
+    counts = Counter(tag.lower() for p in posts for tag in HASHTAG.findall(p))
+    return [tag for tag, _ in counts.most_common(limit)]
+
+
+def condense(text: str, max_length: int) -> str:
+    """Whole sentences up to max_length; a single long sentence is cut at a word."""
+    kept = ""
+    for sentence in split_sentences(text):
+        candidate = f"{kept} {sentence}".strip()
+        if len(candidate) > max_length:
+            break
+        kept = candidate
+    if kept or not text:
+        return kept
+    return text[:max_length].rsplit(" ", 1)[0].rstrip(",;:") + "…"
+
+
+def format_voice_profile(profile: dict, fallback_about: str, include_openers: bool = True) -> str:
+    """
+    Render a profile as the voice section of a generation or judge prompt.
+
+    The judge only scores against the voice, so it can leave out the openers.
+    """
+    stats = profile.get("stats") or {}
+    lines = [
+        "ABOUT THE PERSON:",
+        profile.get("summary") or fallback_about,
+        "",
+        "THEIR VOICE (condensed from their own posts):"
+    ]
+
+    if stats:
+        lines.append(
+            f"- Length: ~{stats['words_per_post']} words per post, "
+            f"~{stats['words_per_sentence']} words per sentence, "
+            f"~{stats['paragraphs_per_post']} paragraphs"
+        )
+        lines.append(
+            f"- Writes in {stats['person']}; "
+            f"{round(stats['question_share'] * 100)}% of sentences are questions, "
+            f"{round(stats['exclamation_share'] * 100)}% exclamations"
+        )
+        markers = [
+            f"~{stats['emoji_per_post']} emoji per post" if stats["emoji_per_post"] else "no emoji",
+            f"~{stats['hashtags_per_post']} hashtags per post" if stats["hashtags_per_post"] else "no hashtags"
+        ]
+        if stats["list_posts"]:
+            markers.append(f"uses lists in {stats['list_posts']} of {stats['posts']} posts")
+        markers_text = ", ".join(markers)
+        lines.append(f"- {markers_text[0].upper()}{markers_text[1:]}")
+
+    if profile.get("phrases"):
+        lines.append("- Recurring phrases: " + ", ".join(f'"{p}"' for p in profile["phrases"]))
+    if profile.get("hashtags"):
+        lines.append("- Hashtags they use: " + " ".join(profile["hashtags"]))
+    if include_openers and profile.get("openers"):
+        lines.append("- How they open posts:")
+        lines.extend(f'  "{opener}"' for opener in profile["openers"])
+
+    return "\n".join(lines)
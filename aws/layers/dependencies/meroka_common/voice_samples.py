@@ -0,0 +1,28 @@
+"""
+Voice Samples
+Shared definitions for rows of employee_voice_samples.
+
+`sample_hash` fingerprints a row's content. The importer stores it as
+content_hash so unchanged sheet rows can be skipped.
+"""
+
+import hashlib
+
+SAMPLE_FIELDS = ("example_post_1", "example_post_2", "example_post_3", "blurb")
+
+# Unit separator between fields; never appears in pasted post text
+FIELD_SEPARATOR = "\x1f"
+
+
+def normalize_text(value: str | None) -> str:
+    """Trim and unify line endings, so re-exported sheets hash the same."""
+    if value is None:
+        return ""
+    return value.replace("\r\n", "\n").replace("\r", "\n").strip()
+
+
+def sample_hash(row: dict) -> str:
+    """SHA-256 of the sample content (posts, blurb, is_sample) in a fixed order."""
+    parts = [normalize_text(row.get(field)) for field in SAMPLE_FIELDS]
+    parts.append("true" if row.get("is_sample") else "false")
+    return hashlib.sha256(FIELD_SEPARATOR.join(parts).encode("utf-8")).hexdigest()
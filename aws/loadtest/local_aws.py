@@ -0,0 +1,557 @@
+"""
+Local AWS
+In-process stand-ins for the Lambda, Step Functions, S3 and SQS clients the
+orchestrator, post-worker and meme-renderer use.
+
+LocalLambda loads each lambda's handler.py under a unique module name and calls
+lambda_handler directly, mimicking Lambda's error payloads. It also models
+containers: an invocation reuses an idle container of its function or pays a
+cold start (cold_start_ms) on a new one, and the handler is told which. LocalStepFunctions
+interprets the real complex-workflow.asl.json (Task, Parallel, Choice, Wait,
+Succeed, Fail with Parameters, ResultSelector, ResultPath, Retry and Catch) on a thread pool,
+plus any other state machine registered with add_state_machine (the batch
+workflow), so changes to them are exercised by the load test too. LocalSQS keeps the
+post job queue in memory and plays the SQS event source for post-worker.
+"""
+
+import copy
+import importlib.util
+import io
+import json
+import os
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import Counter, deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Any
+
+AWS_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+LAMBDAS_DIR = os.path.join(AWS_DIR, "lambdas")
+LAYER_DIR = os.path.join(AWS_DIR, "layers", "dependencies")
+ASL_PATH = os.path.join(AWS_DIR, "step-functions", "complex-workflow.asl.json")
+BATCH_ASL_PATH = os.path.join(AWS_DIR, "step-functions", "batch-workflow.asl.json")
+
+# DefinitionSubstitutions from template.yaml -> lambda directory
+ASL_FUNCTIONS = {
+    "ContextFetcherArn": "context-fetcher",
+    "LLMGeminiArn": "llm-gemini",
+    "LLMOpenAIArn": "llm-openai",
+    "LLMGrokArn": "llm-grok",
+    "LLMAggregatorArn": "llm-aggregator",
+    "MemeRendererArn": "meme-renderer",
+    "BatchCollectorArn": "campaign-orchestrator",
+}
+
+# Functions whose template Handler is not handler.lambda_handler
+ASL_HANDLERS = {
+    "BatchCollectorArn": "batch_handler",
+}
+
+# template.yaml functions sharing another function's code: name -> (directory, handler)
+SHARED_CODE = {
+    "post-worker": ("campaign-orchestrator", "worker_handler"),
+    "batch-collector": ("campaign-orchestrator", "batch_handler"),
+}
+
+if LAYER_DIR not in sys.path:
+    sys.path.insert(0, LAYER_DIR)
+
+
+def load_handler(function_dir: str):
+    """Import lambdas/<function_dir>/handler.py as its own module."""
+    path = os.path.join(LAMBDAS_DIR, function_dir, "handler.py")
+    module_name = f"lambda_{function_dir.replace('-', '_')}"
+
+    # Lambda-local helper modules (e.g. meme_templates) resolve from the function dir
+    function_path = os.path.dirname(path)
+    if function_path not in sys.path:
+        sys.path.insert(0, function_path)
+
+    spec = importlib.util.spec_from_file_location(module_name, path)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[module_name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+class LocalContext:
+    """Minimal Lambda context object."""
+
+    def __init__(self, function_name: str, timeout_seconds: int = 300, cold_start: bool | None = None):
+        self.function_name = function_name
+        self.aws_request_id = str(uuid.uuid4())
+        # Not on real contexts; lets tracing tell cold from warm per modelled container
+        self.cold_start = cold_start
+        self._deadline = time.time() + timeout_seconds
+
+    def get_remaining_time_in_millis(self) -> int:
+        return max(0, int((self._deadline - time.time()) * 1000))
+
+
+class LocalLambda:
+    """Drop-in for boto3's lambda client, dispatching to in-process handlers."""
+
+    def __init__(self, environment: str, cold_start_ms: float = 0.0, time_scale: float = 1.0):
+        self.environment = environment
+        self.handlers: dict[str, Any] = {}
+        self.lock = threading.Lock()
+        self.invocations: dict[str, int] = {}
+        self.cold_start_ms = cold_start_ms
+        self.time_scale = time_scale
+        # Containers per function: idle ones, and how many were started cold
+        self.idle: Counter = Counter()
+        self.cold_starts: Counter = Counter()
+
+    def handler_for(self, function_dir: str):
+        with self.lock:
+            if function_dir not in self.handlers:
+                self.handlers[function_dir] = load_handler(function_dir)
+            return self.handlers[function_dir]
+
+    def function_dir(self, function_name: str) -> str:
+        name = function_name.split(":")[-1]
+        if name.startswith("meroka-"):
+            name = name[len("meroka-"):]
+        suffix = f"-{self.environment}"
+        if name.endswith(suffix):
+            name = name[:-len(suffix)]
+        if name not in SHARED_CODE and not os.path.isdir(os.path.join(LAMBDAS_DIR, name)):
+            raise LocalFunctionNotFound(f"Function not found: {function_name}")
+        return name
+
+    @contextmanager
+    def container(self, name: str):
+        """
+        Run an invocation of function `name` on an idle container, or on a new
+        one after a cold start; yields whether it was cold.
+        """
+        with self.lock:
+            cold = not self.idle[name]
+            if cold:
+                self.cold_starts[name] += 1
+            else:
+                self.idle[name] -= 1
+        if cold and self.cold_start_ms:
+            time.sleep(self.cold_start_ms * self.time_scale / 1000)
+        try:
+            yield cold
+        finally:
+            with self.lock:
+                self.idle[name] += 1
+
+    def call(self, function_dir: str, event: dict, handler: str = "lambda_handler") -> Any:
+        """Invoke a handler and return its result, raising on handler errors."""
+        name = next(
+            (function for function, code in SHARED_CODE.items() if code == (function_dir, handler)),
+            function_dir if handler == "lambda_handler" else f"{function_dir}.{handler}"
+        )
+        with self.lock:
+            self.invocations[name] = self.invocations.get(name, 0) + 1
+        module = self.handler_for(function_dir)
+        with self.container(name) as cold:
+            return getattr(module, handler)(copy.deepcopy(event), LocalContext(name, cold_start=cold))
+
+    def invoke(self, FunctionName: str, Payload: str | bytes = "{}",
+               InvocationType: str = "RequestResponse", **kwargs) -> dict:
+        name = self.function_dir(FunctionName)
+        function_dir, handler = SHARED_CODE.get(name, (name, "lambda_handler"))
+        event = json.loads(Payload or "{}")
+
+        if InvocationType == "Event":
+            threading.Thread(target=self._call_quietly, args=(function_dir, event, handler), daemon=True).start()
+            return {"StatusCode": 202, "Payload": io.BytesIO(b"")}
+
+        try:
+            result = self.call(function_dir, event, handler)
+            return {"StatusCode": 200, "Payload": io.BytesIO(json.dumps(result, default=str).encode())}
+        except Exception as e:
+            error = {"errorMessage": str(e), "errorType": type(e).__name__}
+            return {
+                "StatusCode": 200,
+                "FunctionError": "Unhandled",
+                "Payload": io.BytesIO(json.dumps(error).encode())
+            }
+
+    def _call_quietly(self, function_dir: str, event: dict, handler: str = "lambda_handler") -> None:
+        try:
+            self.call(function_dir, event, handler)
+        except Exception as e:
+            print(f"Async invocation of {function_dir} failed: {e}")
+
+
+class LocalFunctionNotFound(Exception):
+    pass
+
+
+class StateError(Exception):
+    """A Step Functions error with its error name (e.g. States.TaskFailed)."""
+
+    def __init__(self, error: str, cause: str):
+        super().__init__(f"{error}: {cause}")
+        self.error = error
+        self.cause = cause
+
+
+class LocalStepFunctions:
+    """Drop-in for boto3's stepfunctions client running the state machines locally."""
+
+    def __init__(self, lambdas: LocalLambda, max_workers: int = 50,
+                 time_scale: float = 1.0, asl_path: str = ASL_PATH):
+        with open(asl_path) as f:
+            self.definition = json.load(f)
+        # stateMachineArn -> definition; anything else runs the complex workflow
+        self.definitions: dict[str, dict] = {}
+        self.lambdas = lambdas
+        self.time_scale = time_scale
+        self.executor = ThreadPoolExecutor(max_workers=max_workers)
+        # Branches get their own pool so a full execution pool cannot deadlock them
+        self.branch_executor = ThreadPoolExecutor(max_workers=max_workers * 4)
+        self.executions: dict[str, Future] = {}
+        self.started_at: dict[str, float] = {}
+        self.finished_at: dict[str, float] = {}
+        self.lock = threading.Lock()
+        self.task_errors: Counter = Counter()
+
+    def add_state_machine(self, arn: str, asl_path: str) -> None:
+        with open(asl_path) as f:
+            self.definitions[arn] = json.load(f)
+
+    def start_execution(self, stateMachineArn: str, name: str, input: str, **kwargs) -> dict:
+        arn = f"{stateMachineArn}:{name}"
+        definition = self.definitions.get(stateMachineArn, self.definition)
+        with self.lock:
+            if arn in self.executions:
+                raise StateError("ExecutionAlreadyExists", f"Execution already exists: {arn}")
+            self.executions[arn] = self.executor.submit(self._run, arn, definition, json.loads(input))
+        return {"executionArn": arn, "startDate": time.time()}
+
+    def describe_execution(self, executionArn: str, **kwargs) -> dict:
+        future = self.executions[executionArn]
+        if not future.done():
+            return {"executionArn": executionArn, "status": "RUNNING"}
+        return {"executionArn": executionArn, "status": "FAILED" if future.exception() else "SUCCEEDED"}
+
+    def wait_all(self) -> dict[str, dict]:
+        """Block until every execution finishes; returns arn -> outcome."""
+        outcomes = {}
+        for arn, future in list(self.executions.items()):
+            try:
+                outcomes[arn] = {"status": "SUCCEEDED", "output": future.result()}
+            except StateError as e:
+                outcomes[arn] = {"status": "FAILED", "error": e.error, "cause": e.cause}
+        return outcomes
+
+    def latency_seconds(self, arn: str) -> float | None:
+        if arn in self.finished_at:
+            return self.finished_at[arn] - self.started_at[arn]
+        return None
+
+    def _run(self, arn: str, definition: dict, state_input: dict) -> dict:
+        # Latency is measured from when a worker picks the execution up, not from
+        # submission, so the local pool size does not masquerade as workflow latency
+        self.started_at[arn] = time.time()
+        try:
+            return self.run_states(definition, state_input)
+        finally:
+            self.finished_at[arn] = time.time()
+
+    # ---- ASL interpreter ----
+
+    def run_states(self, machine: dict, data: Any) -> Any:
+        name = machine["StartAt"]
+        while True:
+            state = machine["States"][name]
+            kind = state["Type"]
+
+            if kind == "Succeed":
+                return data
+            if kind == "Fail":
+                raise StateError(state.get("Error", "States.Failed"), state.get("Cause", ""))
+            if kind == "Choice":
+                name = self._choose(state, data)
+                continue
+            if kind == "Wait":
+                time.sleep(state["Seconds"] * self.time_scale)
+                name = state["Next"]
+                continue
+
+            try:
+                result = self._with_retry(state, data)
+                if "ResultSelector" in state:
+                    result = resolve_parameters(state["ResultSelector"], result)
+                data = apply_result_path(data, state.get("ResultPath", "$"), result)
+            except StateError as e:
+                handler = next(
+                    (c for c in state.get("Catch", []) if error_matches(c["ErrorEquals"], e.error)),
+                    None
+                )
+                if handler is None:
+                    raise
+                data = apply_result_path(
+                    data, handler.get("ResultPath", "$"), {"Error": e.error, "Cause": e.cause}
+                )
+                name = handler["Next"]
+                continue
+
+            if state.get("End"):
+                return data
+            name = state["Next"]
+
+    def _with_retry(self, state: dict, data: Any) -> Any:
+        attempts: dict[int, int] = {}
+        while True:
+            try:
+                return self._execute(state, data)
+            except StateError as e:
+                for index, retrier in enumerate(state.get("Retry", [])):
+                    if error_matches(retrier["ErrorEquals"], e.error):
+                        count = attempts.get(index, 0)
+                        if count >= retrier.get("MaxAttempts", 3):
+                            raise
+                        attempts[index] = count + 1
+                        interval = retrier.get("IntervalSeconds", 1) * retrier.get("BackoffRate", 2.0) ** count
+                        time.sleep(interval * self.time_scale)
+                        break
+                else:
+                    raise
+
+    def _execute(self, state: dict, data: Any) -> Any:
+        params = resolve_parameters(state["Parameters"], data) if "Parameters" in state else data
+
+        if state["Type"] == "Parallel":
+            futures = [
+                self.branch_executor.submit(self.run_states, branch, copy.deepcopy(params))
+                for branch in state["Branches"]
+            ]
+            return [f.result() for f in futures]
+
+        if state["Type"] == "Task":
+            resource = state["Resource"]
+            if resource == "arn:aws:states:::lambda:invoke":
+                payload = self._invoke(placeholder(params["FunctionName"]), params.get("Payload", {}))
+                return {"Payload": payload, "StatusCode": 200}
+            return self._invoke(placeholder(resource), params)
+
+        raise StateError("States.Runtime", f"Unsupported state type {state['Type']}")
+
+    def _invoke(self, function: str, event: dict) -> Any:
+        function_dir = ASL_FUNCTIONS[function]
+        try:
+            return self.lambdas.call(function_dir, event, ASL_HANDLERS.get(function, "lambda_handler"))
+        except Exception as e:
+            self.task_errors[f"{function_dir}: {type(e).__name__}"] += 1
+            raise StateError(type(e).__name__, str(e)) from e
+
+    def _choose(self, state: dict, data: Any) -> str:
+        for choice in state.get("Choices", []):
+            try:
+                value = read_path(data, choice["Variable"])
+            except KeyError:
+                continue
+            if "BooleanEquals" in choice and value is choice["BooleanEquals"]:
+                return choice["Next"]
+            if "StringEquals" in choice and value == choice["StringEquals"]:
+                return choice["Next"]
+            if "IsPresent" in choice and choice["IsPresent"]:
+                return choice["Next"]
+        if "Default" not in state:
+            raise StateError("States.NoChoiceMatched", "No choice matched")
+        return state["Default"]
+
+
+class LocalS3:
+    """Drop-in for boto3's s3 client; keeps objects in memory."""
+
+    def __init__(self):
+        self.objects: dict[tuple[str, str], bytes] = {}
+        self.lock = threading.Lock()
+
+    def put_object(self, Bucket: str, Key: str, Body: Any, **kwargs) -> dict:
+        data = Body.read() if hasattr(Body, "read") else Body
+        with self.lock:
+            self.objects[(Bucket, Key)] = data if isinstance(data, bytes) else str(data).encode()
+        return {"ETag": uuid.uuid4().hex}
+
+    def get_object(self, Bucket: str, Key: str, **kwargs) -> dict:
+        return {"Body": io.BytesIO(self.objects[(Bucket, Key)])}
+
+    def delete_object(self, Bucket: str, Key: str, **kwargs) -> dict:
+        with self.lock:
+            self.objects.pop((Bucket, Key), None)
+        return {}
+
+    def delete_objects(self, Bucket: str, Delete: dict, **kwargs) -> dict:
+        with self.lock:
+            for obj in Delete["Objects"]:
+                self.objects.pop((Bucket, obj["Key"]), None)
+        return {}
+
+    def copy_object(self, Bucket: str, Key: str, CopySource: dict, **kwargs) -> dict:
+        with self.lock:
+            self.objects[(Bucket, Key)] = self.objects[(CopySource["Bucket"], CopySource["Key"])]
+        return {"CopyObjectResult": {"ETag": uuid.uuid4().hex}}
+
+
+class LocalSQS:
+    """
+    Drop-in for boto3's sqs client (send_message, send_message_batch) on one
+    in-memory queue.
+
+    consume() plays the Lambda SQS event source with ReportBatchItemFailures:
+    batches of up to batch_size records go to the handler on at most
+    max_concurrency threads. Records listed in batchItemFailures (or the whole
+    batch, if the handler raises) are redelivered. After max_receive_count
+    receives a message moves to dead_letters instead.
+    """
+
+    def __init__(self, max_receive_count: int = 3):
+        self.max_receive_count = max_receive_count
+        self.queue: deque[dict] = deque()
+        self.dead_letters: list[dict] = []
+        self.in_flight = 0
+        self.lock = threading.Lock()
+        self.counters: Counter = Counter()
+
+    def send_message(self, QueueUrl: str, MessageBody: str, **kwargs) -> dict:
+        message_id = str(uuid.uuid4())
+        with self.lock:
+            self.queue.append({"messageId": message_id, "body": MessageBody, "receive_count": 0})
+            self.counters["sent"] += 1
+        return {"MessageId": message_id}
+
+    def send_message_batch(self, QueueUrl: str, Entries: list[dict], **kwargs) -> dict:
+        if len(Entries) > 10:
+            raise ValueError("TooManyEntriesInBatchRequest: at most 10 entries per batch")
+        return {
+            "Successful": [
+                {"Id": entry["Id"], "MessageId": self.send_message(QueueUrl, entry["MessageBody"])["MessageId"]}
+                for entry in Entries
+            ],
+            "Failed": []
+        }
+
+    def receive(self, max_messages: int) -> list[dict]:
+        with self.lock:
+            messages = [self.queue.popleft() for _ in range(min(max_messages, len(self.queue)))]
+            for message in messages:
+                message["receive_count"] += 1
+            if messages:
+                self.in_flight += 1
+                self.counters["batches"] += 1
+        return messages
+
+    def consume(self, handler, batch_size: int = 10, max_concurrency: int = 2) -> None:
+        """Feed messages to handler until the queue is empty and no batch is in flight."""
+        def poll() -> None:
+            while True:
+                messages = self.receive(batch_size)
+                if not messages:
+                    with self.lock:
+                        if not self.queue and not self.in_flight:
+                            return
+                    time.sleep(0.005)
+                    continue
+                self._deliver(handler, messages)
+
+        with ThreadPoolExecutor(max_workers=max_concurrency) as pool:
+            for future in [pool.submit(poll) for _ in range(max_concurrency)]:
+                future.result()
+
+    def _deliver(self, handler, messages: list[dict]) -> None:
+        records = [
+            {
+                "messageId": m["messageId"],
+                "receiptHandle": uuid.uuid4().hex,
+                "body": m["body"],
+                "attributes": {"ApproximateReceiveCount": str(m["receive_count"])},
+                "eventSource": "aws:sqs"
+            }
+            for m in messages
+        ]
+        try:
+            response = handler({"Records": records}, LocalContext("post-worker")) or {}
+            failed = {f["itemIdentifier"] for f in response.get("batchItemFailures", [])}
+        except Exception as e:
+            print(f"post-worker batch failed: {e}")
+            failed = {m["messageId"] for m in messages}
+
+        with self.lock:
+            for message in messages:
+                if message["messageId"] not in failed:
+                    self.counters["deleted"] += 1
+                elif message["receive_count"] >= self.max_receive_count:
+                    self.dead_letters.append(message)
+                    self.counters["dead_lettered"] += 1
+                else:
+                    self.queue.append(message)
+                    self.counters["redelivered"] += 1
+            self.in_flight -= 1
+
+
+# ---- JSONPath helpers (the "$.a.b" / "$[0].a" subset the state machine uses) ----
+
+PATH_PART = re.compile(r"\[-?\d+\]|[^.\[\]]+")
+
+def placeholder(value: str) -> str:
+    return value.strip().removeprefix("${").removesuffix("}")
+
+
+def error_matches(error_equals: list[str], error: str) -> bool:
+    if "States.ALL" in error_equals or error in error_equals:
+        return True
+    # Any exception raised by a Lambda task is a task failure
+    return "States.TaskFailed" in error_equals and not error.startswith("States.")
+
+
+def read_path(data: Any, path: str) -> Any:
+    if path == "$":
+        return data
+    value = data
+    for part in PATH_PART.findall(path.removeprefix("$")):
+        if part.startswith("["):
+            index = int(part[1:-1])
+            if not isinstance(value, list) or not -len(value) <= index < len(value):
+                raise KeyError(path)
+            value = value[index]
+            continue
+        if not isinstance(value, dict) or part not in value:
+            raise KeyError(path)
+        value = value[part]
+    return value
+
+
+def resolve_parameters(template: Any, data: Any) -> Any:
+    if isinstance(template, dict):
+        resolved = {}
+        for key, value in template.items():
+            if key.endswith(".$"):
+                try:
+                    resolved[key[:-2]] = copy.deepcopy(read_path(data, value))
+                except KeyError:
+                    raise StateError("States.Runtime", f"Invalid path {value}")
+            else:
+                resolved[key] = resolve_parameters(value, data)
+        return resolved
+    if isinstance(template, list):
+        return [resolve_parameters(v, data) for v in template]
+    return template
+
+
+def apply_result_path(data: Any, path: str | None, result: Any) -> Any:
+    if path is None:
+        return data
+    if path == "$":
+        return result
+
+    data = dict(data)
+    target = data
+    parts = path.removeprefix("$.").split(".")
+    for part in parts[:-1]:
+        target[part] = dict(target.get(part) or {})
+        target = target[part]
+    target[parts[-1]] = result
+    return data
@@ -0,0 +1,449 @@
+#!/usr/bin/env python3
+"""
+Memory and duration profile of each Lambda handler, for right-sizing MemorySize.
+
+Starts the load test's stub Supabase and stub providers, seeds a synthetic
+campaign, then runs every scenario below in its own Python process (one
+scenario = one handler and a representative event), so each gets a clean
+interpreter like a fresh Lambda sandbox. Per scenario it records:
+
+- init: wall and CPU time to import the handler (the cold start's INIT phase)
+- warm invocations: wall and CPU time, and the CPU share of the wall time
+- peak RSS of the process, imports included
+- tracemalloc: peak traced memory per invocation, the largest live allocation
+  sites, and memory still held after the invocations (growth across warm runs)
+
+Lambda gives a function CPU in proportion to its memory, one full vCPU at
+1769 MB. Assuming a local core is about one Lambda vCPU, a scenario's duration
+at memory M is modelled as its non-CPU wall time plus its CPU time scaled by
+1769 / M (and by no more than its parallelism above that). The recommended
+size is the cheapest one, at or above peak RSS plus headroom, whose predicted
+duration is within --latency-tolerance (or --latency-slack-ms, whichever is
+larger) of the fastest size.
+
+Usage:
+    python loadtest/profile_functions.py
+    python loadtest/profile_functions.py --only meme-renderer --invocations 20
+    python loadtest/profile_functions.py --llm-latency fixed:800 --json /tmp/profile.json
+
+cost-rollup and log-maintenance are not profiled: they call database functions
+the stub Supabase does not implement.
+"""
+
+import argparse
+import contextlib
+import copy
+import io
+import json
+import math
+import os
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+import uuid
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, HERE)
+
+from local_aws import AWS_DIR, LocalContext, LocalS3, LocalSQS, load_handler  # noqa: E402
+
+TEMPLATE_PATH = os.path.join(AWS_DIR, "template.yaml")
+
+# Lambda memory sizes considered for a recommendation (MB)
+MEMORY_SIZES = [128, 256, 384, 512, 768, 1024, 1536, 1769, 2048, 3008]
+FULL_VCPU_MB = 1769
+HEADROOM = 1.25  # over measured peak RSS
+
+# us-east-1 / us-west-2 x86_64 list prices
+GB_SECOND_USD = 0.0000166667
+REQUEST_USD = 0.20 / 1_000_000
+
+# name -> (lambda directory, handler, event builder key)
+SCENARIOS = {
+    "campaign-orchestrator": ("campaign-orchestrator", "lambda_handler", "orchestrator"),
+    "context-fetcher": ("context-fetcher", "lambda_handler", "fetch_context"),
+    "context-fetcher.store_post": ("context-fetcher", "lambda_handler", "store_post"),
+    "llm-openai": ("llm-openai", "lambda_handler", "generate_openai"),
+    "llm-gemini": ("llm-gemini", "lambda_handler", "generate_gemini"),
+    "llm-grok": ("llm-grok", "lambda_handler", "generate_grok"),
+    "llm-aggregator": ("llm-aggregator", "lambda_handler", "aggregate"),
+    "meme-renderer": ("meme-renderer", "lambda_handler", "render"),
+    "meme-renderer.render_candidates": ("meme-renderer", "lambda_handler", "render_candidates"),
+    "voice-profiles": ("voice-profiles", "lambda_handler", "voice_profiles"),
+}
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--only", action="append", help="Scenario (or lambda directory) to profile; repeatable")
+    parser.add_argument("--invocations", type=int, default=10, help="Timed invocations per scenario")
+    parser.add_argument("--trace-invocations", type=int, default=3,
+                        help="Further invocations under tracemalloc")
+    parser.add_argument("--employees", type=int, default=50, help="Employees in the seeded campaign")
+    parser.add_argument("--llm-latency", default="fixed:1500", help="Stub provider latency spec")
+    parser.add_argument("--latency-tolerance", type=float, default=0.10,
+                        help="Accepted slowdown over the fastest size when picking the cheapest")
+    parser.add_argument("--latency-slack-ms", type=float, default=50,
+                        help="Accepted slowdown in ms, for functions too fast for a relative tolerance")
+    parser.add_argument("--top", type=int, default=5, help="Allocation sites shown per scenario")
+    parser.add_argument("--json", dest="json_path", help="Also write the report as JSON")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    parser.add_argument("--out", help=argparse.SUPPRESS)
+    return parser.parse_args()
+
+
+# ============================================
+# TEMPLATE
+# ============================================
+
+def template_functions(path: str = TEMPLATE_PATH) -> dict[tuple[str, str], dict]:
+    """(lambda directory, handler function) -> {"resource", "memory_mb", "timeout_s"} from template.yaml."""
+    text = open(path, encoding="utf-8").read()
+    globals_block = text.split("\nResources:", 1)[0]
+    default_memory = int(re.search(r"^    MemorySize: (\d+)", globals_block, re.M).group(1))
+    default_timeout = int(re.search(r"^    Timeout: (\d+)", globals_block, re.M).group(1))
+
+    functions = {}
+    for block in re.split(r"\n(?=  \w+:\n)", text.split("\nResources:", 1)[1]):
+        if "Type: AWS::Serverless::Function" not in block:
+            continue
+        code_uri = re.search(r"^      CodeUri: lambdas/([^/\s]+)/?", block, re.M)
+        handler = re.search(r"^      Handler: handler\.(\w+)", block, re.M)
+        if not code_uri or not handler:
+            continue
+        memory = re.search(r"^      MemorySize: (\d+)", block, re.M)
+        timeout = re.search(r"^      Timeout: (\d+)", block, re.M)
+        functions[(code_uri.group(1), handler.group(1))] = {
+            "resource": block.strip().split(":", 1)[0],
+            "memory_mb": int(memory.group(1)) if memory else default_memory,
+            "timeout_s": int(timeout.group(1)) if timeout else default_timeout,
+        }
+    return functions
+
+
+# ============================================
+# MODEL
+# ============================================
+
+def predict_ms(wall_ms: float, cpu_ms: float, memory_mb: int) -> float:
+    """Modelled duration at memory_mb of an invocation measured at wall_ms / cpu_ms on one local core."""
+    parallelism = max(1.0, cpu_ms / wall_ms) if wall_ms else 1.0
+    waiting = max(wall_ms - cpu_ms / parallelism, 0.0)
+    return waiting + max(cpu_ms / parallelism, cpu_ms * FULL_VCPU_MB / memory_mb)
+
+
+def cost_per_million(duration_ms: float, memory_mb: int) -> float:
+    """USD per million invocations (duration billed per ms, plus the request charge)."""
+    return 1_000_000 * (duration_ms / 1000 * memory_mb / 1024 * GB_SECOND_USD + REQUEST_USD)
+
+
+def recommend(result: dict, current_mb: int, tolerance: float, slack_ms: float) -> dict:
+    """Cheapest memory size within tolerance of the fastest, with the current size for comparison."""
+    wall, cpu = result["warm"]["wall_ms_p50"], result["warm"]["cpu_ms_p50"]
+    floor = max(128, math.ceil(result["peak_rss_mb"] * HEADROOM / 64) * 64)
+    sizes = sorted({floor, *(m for m in MEMORY_SIZES if m >= floor)})
+
+    options = [
+        {"memory_mb": m, "duration_ms": round(predict_ms(wall, cpu, m), 1),
+         "usd_per_million": round(cost_per_million(predict_ms(wall, cpu, m), m), 2)}
+        for m in sizes
+    ]
+    fastest = min(o["duration_ms"] for o in options)
+    pick = min(
+        (o for o in options if o["duration_ms"] <= max(fastest * (1 + tolerance), fastest + slack_ms)),
+        key=lambda o: (o["usd_per_million"], o["memory_mb"])
+    )
+    current = {
+        "memory_mb": current_mb,
+        "duration_ms": round(predict_ms(wall, cpu, current_mb), 1),
+        "usd_per_million": round(cost_per_million(predict_ms(wall, cpu, current_mb), current_mb), 2),
+        "fits": current_mb >= floor,
+    }
+    return {"min_memory_mb": floor, "recommended": pick, "current": current, "options": options}
+
+
+# ============================================
+# CHILD: one scenario in a fresh interpreter
+# ============================================
+
+def peak_rss_mb() -> float:
+    import resource
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is KB on Linux, bytes on macOS
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def short_path(filename: str) -> str:
+    """Path relative to aws/, or to site-packages / the stdlib."""
+    if filename.startswith(AWS_DIR):
+        return os.path.relpath(filename, AWS_DIR)
+    match = re.search(r"site-packages/(.+)$", filename) or re.search(r"lib/python3\.\d+/(.+)$", filename)
+    return match.group(1) if match else filename
+
+
+def profile_child(spec_path: str, out_path: str) -> None:
+    with open(spec_path) as f:
+        spec = json.load(f)
+    function_dir, handler_name = spec["function_dir"], spec["handler"]
+
+    from meroka_common import tracing
+    tracing.set_sink(lambda record: None)
+
+    start_wall, start_cpu = time.perf_counter(), time.process_time()
+    with contextlib.redirect_stdout(io.StringIO()):
+        module = load_handler(function_dir)
+    init = {
+        "wall_ms": round((time.perf_counter() - start_wall) * 1000, 1),
+        "cpu_ms": round((time.process_time() - start_cpu) * 1000, 1),
+        "rss_mb": round(peak_rss_mb(), 1),
+    }
+    # Same wiring as the load test: AWS clients replaced by in-process stand-ins
+    if hasattr(module, "s3"):
+        module.s3 = LocalS3()
+    if hasattr(module, "sqs_client"):
+        module.sqs_client = LocalSQS()
+    handler = getattr(module, handler_name)
+
+    def invoke() -> tuple[float, float]:
+        wall, cpu = time.perf_counter(), time.process_time()
+        with contextlib.redirect_stdout(io.StringIO()):
+            handler(copy.deepcopy(spec["event"]), LocalContext(function_dir))
+        return (time.perf_counter() - wall) * 1000, (time.process_time() - cpu) * 1000
+
+    runs = [invoke() for _ in range(spec["invocations"])]
+    # The first invocation pays lazy setup (clients, caches); the rest are warm
+    warm = runs[1:] or runs
+    peak = peak_rss_mb()
+
+    tracemalloc.start(10)
+    baseline = tracemalloc.take_snapshot()
+    traced_peaks = []
+    for _ in range(spec["trace_invocations"]):
+        tracemalloc.reset_peak()
+        invoke()
+        traced_peaks.append(tracemalloc.get_traced_memory()[1])
+    ignore = [
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        # The stand-ins' state (e.g. LocalS3 objects) is the harness's, not the function's
+        tracemalloc.Filter(False, os.path.join(HERE, "*")),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap*>"),
+        tracemalloc.Filter(False, "<unknown>"),
+    ]
+    snapshot = tracemalloc.take_snapshot().filter_traces(ignore)
+    tracemalloc.stop()
+
+    def site(stat) -> dict:
+        frame = stat.traceback[0]
+        return {"site": f"{short_path(frame.filename)}:{frame.lineno}",
+                "kb": round(stat.size / 1024, 1),
+                "blocks": stat.count}
+
+    growth = [s for s in snapshot.compare_to(baseline.filter_traces(ignore), "lineno") if s.size_diff > 0]
+    result = {
+        "init": init,
+        "first_invocation": {"wall_ms": round(runs[0][0], 1), "cpu_ms": round(runs[0][1], 1)},
+        "warm": {
+            "invocations": len(warm),
+            "wall_ms_p50": round(statistics.median(w for w, _ in warm), 1),
+            "wall_ms_max": round(max(w for w, _ in warm), 1),
+            "cpu_ms_p50": round(statistics.median(c for _, c in warm), 1),
+        },
+        "peak_rss_mb": round(peak, 1),
+        "traced_peak_mb": round(max(traced_peaks) / (1024 * 1024), 2) if traced_peaks else None,
+        "top_allocations": [site(s) for s in snapshot.statistics("lineno")[:spec["top"]]],
+        "retained_growth_kb": round(sum(s.size_diff for s in growth) / 1024, 1),
+        "top_growth": [
+            {**site(s), "kb": round(s.size_diff / 1024, 1), "blocks": s.count_diff}
+            for s in sorted(growth, key=lambda s: s.size_diff, reverse=True)[:spec["top"]]
+        ],
+    }
+    with open(out_path, "w") as f:
+        json.dump(result, f)
+
+
+# ============================================
+# PARENT: stubs, events, report
+# ============================================
+
+def build_events(store, campaign_id: str, employee_ids: list[str], sample_posts: list[str]) -> dict[str, dict]:
+    """Representative event per scenario, using a context fetched from the seeded campaign."""
+    fetcher = load_handler("context-fetcher")
+    with contextlib.redirect_stdout(io.StringIO()):
+        ctx = fetcher.lambda_handler(
+            {"campaign_id": campaign_id, "employee_id": employee_ids[0], "execution_id": "profile_ctx"},
+            LocalContext("context-fetcher")
+        )
+
+    execution_id = f"profile_{uuid.uuid4().hex[:8]}"
+    council_results = [
+        {f"{source}_result": {"content": sample_posts[i], "model": model, "style": style}}
+        for i, (source, model, style) in enumerate([
+            ("gemini", "gemini-3-flash-preview", "thoughtful"),
+            ("openai", "gpt-4o", "professional"),
+            ("grok", "grok-4", "witty"),
+        ])
+    ]
+    generate = {"context": ctx, "execution_id": execution_id, "style": "balanced"}
+    return {
+        "orchestrator": {"campaign_id": campaign_id, "trigger": "manual"},
+        "fetch_context": {"campaign_id": campaign_id, "employee_id": employee_ids[0], "execution_id": execution_id},
+        "store_post": {
+            "action": "store_post", "campaign_id": campaign_id, "employee_id": employee_ids[1],
+            "execution_id": execution_id, "post_content": sample_posts[3],
+            "media_urls": [], "generation_metadata": {"workflow": "complex"}
+        },
+        "generate_openai": {**generate, "model": "gpt-4o"},
+        "generate_gemini": {**generate, "model": "gemini-3-flash-preview"},
+        "generate_grok": {**generate, "model": "grok-4"},
+        "aggregate": {"council_results": council_results, "context": ctx, "execution_id": execution_id},
+        "render": {"post_content": sample_posts[0], "template": "quote_card", "execution_id": execution_id},
+        "render_candidates": {
+            "action": "render_candidates", "council_results": council_results,
+            "template": "quote_card", "execution_id": execution_id
+        },
+        "voice_profiles": {"force": True},
+    }
+
+
+def run_scenario(name: str, event: dict, args: argparse.Namespace, workdir: str) -> dict:
+    function_dir, handler, _ = SCENARIOS[name]
+    spec_path = os.path.join(workdir, f"{name}.spec.json")
+    out_path = os.path.join(workdir, f"{name}.out.json")
+    with open(spec_path, "w") as f:
+        json.dump({
+            "function_dir": function_dir, "handler": handler, "event": event,
+            "invocations": args.invocations, "trace_invocations": args.trace_invocations, "top": args.top
+        }, f, default=str)
+
+    proc = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "--child", spec_path, "--out", out_path],
+        capture_output=True, text=True
+    )
+    if proc.returncode != 0:
+        return {"error": (proc.stderr.strip().splitlines() or ["exit code %d" % proc.returncode])[-1]}
+    with open(out_path) as f:
+        return json.load(f)
+
+
+def main() -> None:
+    args = parse_args()
+    if args.child:
+        return profile_child(args.child, args.out)
+
+    from run_loadtest import load_voice_samples, seed_campaign, stub_environment
+    from stub_llm import ProviderProfile, start_stub_llm
+    from stub_supabase import SupabaseStore, start_stub_supabase
+
+    samples = load_voice_samples()
+    sample_posts = [s[k] for s in samples for k in ("example_post_1", "example_post_2", "example_post_3")]
+
+    store = SupabaseStore()
+    supabase_server = start_stub_supabase(store)
+    servers = {
+        name: start_stub_llm(ProviderProfile(name, latency=args.llm_latency, seed=offset, sample_posts=sample_posts))
+        for offset, name in enumerate(("openai", "gemini", "grok"))
+    }
+    os.environ.update(stub_environment(supabase_server, servers))
+
+    # Queue dispatch keeps the orchestrator scenario to its own work (load, plan, enqueue)
+    campaign_id = seed_campaign(store, argparse.Namespace(
+        employees=args.employees, posts_per_employee=3, workflow="simple", model="gpt-4o", providers=None,
+        generate_media=False, dispatch="queue", judge_mode="scores", judge_reasoning=False, prewarm=False,
+        campaigns=1
+    ), samples)
+    employee_ids = [row["user_id"] for row in store.rows("campaign_employees")]
+    events = build_events(store, campaign_id, employee_ids, sample_posts)
+
+    selected = [
+        name for name in SCENARIOS
+        if not args.only or name in args.only or SCENARIOS[name][0] in args.only
+    ]
+    functions = template_functions()
+
+    report = {"latency_tolerance": args.latency_tolerance, "latency_slack_ms": args.latency_slack_ms,
+              "llm_latency": args.llm_latency, "scenarios": {}}
+    with tempfile.TemporaryDirectory(prefix="meroka-profile-") as workdir:
+        for name in selected:
+            function_dir, handler, event_key = SCENARIOS[name]
+            print(f"Profiling {name}...", file=sys.stderr)
+            result = run_scenario(name, events[event_key], args, workdir)
+            template = functions.get((function_dir, handler))
+            if "error" not in result and template:
+                result["template"] = template
+                result["sizing"] = recommend(
+                    result, template["memory_mb"], args.latency_tolerance, args.latency_slack_ms
+                )
+            report["scenarios"][name] = result
+
+    # A function is sized for its most demanding scenario
+    by_function: dict[str, dict] = {}
+    for name, result in report["scenarios"].items():
+        if "sizing" not in result:
+            continue
+        resource = result["template"]["resource"]
+        pick = result["sizing"]["recommended"]
+        best = by_function.get(resource)
+        if best is None or pick["memory_mb"] > best["recommended_mb"]:
+            by_function[resource] = {
+                "current_mb": result["template"]["memory_mb"],
+                "recommended_mb": pick["memory_mb"],
+                "sized_by": name,
+            }
+    report["functions"] = by_function
+
+    print_report(report)
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nWrote {args.json_path}")
+
+    for server in (supabase_server, *servers.values()):
+        server.shutdown()
+
+
+def print_report(report: dict) -> None:
+    print()
+    print(f"{'scenario':<34}{'init ms':>9}{'warm ms':>9}{'cpu ms':>8}{'cpu %':>7}{'rss MB':>8}"
+          f"{'now MB':>8}{'rec MB':>8}{'now ms':>9}{'rec ms':>9}{'now $/M':>9}{'rec $/M':>9}")
+    for name, result in report["scenarios"].items():
+        if "error" in result:
+            print(f"{name:<34}  failed: {result['error']}")
+            continue
+        warm = result["warm"]
+        cpu_share = 100 * warm["cpu_ms_p50"] / warm["wall_ms_p50"] if warm["wall_ms_p50"] else 0
+        line = (f"{name:<34}{result['init']['wall_ms']:>9,.0f}{warm['wall_ms_p50']:>9,.1f}"
+                f"{warm['cpu_ms_p50']:>8,.1f}{cpu_share:>6.0f}%{result['peak_rss_mb']:>8,.0f}")
+        sizing = result.get("sizing")
+        if sizing:
+            now, rec = sizing["current"], sizing["recommended"]
+            line += (f"{now['memory_mb']:>8}{rec['memory_mb']:>8}{now['duration_ms']:>9,.1f}"
+                     f"{rec['duration_ms']:>9,.1f}{now['usd_per_million']:>9,.2f}{rec['usd_per_million']:>9,.2f}")
+            if not now["fits"]:
+                line += f"  (current below {sizing['min_memory_mb']} MB minimum)"
+        print(line)
+
+    print(f"\nPredicted ms and $ per million invocations assume one local core ~ one Lambda vCPU "
+          f"({FULL_VCPU_MB} MB); recommendations accept up to {report['latency_tolerance']:.0%} "
+          f"or {report['latency_slack_ms']:.0f} ms over the fastest size.")
+
+    print("\nRecommended MemorySize per function:")
+    for resource, pick in sorted(report["functions"].items()):
+        change = "" if pick["recommended_mb"] == pick["current_mb"] else f" (now {pick['current_mb']})"
+        print(f"    {resource:<34}{pick['recommended_mb']:>6} MB{change}  sized by {pick['sized_by']}")
+
+    print("\nAllocation hot spots (live after the traced invocations):")
+    for name, result in report["scenarios"].items():
+        if "error" in result:
+            continue
+        print(f"  {name}: traced peak {result['traced_peak_mb']} MB per invocation, "
+              f"{result['retained_growth_kb']} KB more held after them")
+        for alloc in result["top_allocations"]:
+            print(f"      {alloc['kb']:>10,.1f} KB {alloc['blocks']:>7} blocks  {alloc['site']}")
+
+
+if __name__ == "__main__":
+    main()
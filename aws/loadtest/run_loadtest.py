@@ -0,0 +1,579 @@
+#!/usr/bin/env python3
+"""
+Offline load test for campaign-orchestrator and the LLM lambdas.
+
+Starts a stub Supabase (PostgREST subset) and stub OpenAI/Gemini/Grok servers,
+seeds a synthetic campaign, then runs the real orchestrator handler with the
+Lambda/Step Functions/S3/SQS clients swapped for in-process stand-ins. No real
+tokens are spent and nothing leaves the machine.
+
+Reports posts/sec, per-post latency percentiles and DB round-trips per post.
+
+Usage:
+    python loadtest/run_loadtest.py --employees 100 --workflow complex --time-scale 0.05
+    python loadtest/run_loadtest.py --employees 5000 --posts-per-employee 1 \\
+        --openai-latency lognormal:1500:0.5 --rate-429 0.02 --json /tmp/loadtest.json
+    python loadtest/run_loadtest.py --employees 200 --dispatch queue --workers 10 --batch-size 5
+    python loadtest/run_loadtest.py --employees 200 --dispatch batch --openai-batch-latency fixed:300000
+    python loadtest/run_loadtest.py --employees 50 --rerun --rerun-drop 0.3
+    python loadtest/run_loadtest.py --employees 50 --workflow complex --raw-capture-rate 0.2
+    python loadtest/run_loadtest.py --employees 50 --workflow complex --cold-start-ms 1500 --prewarm
+    python loadtest/run_loadtest.py --campaigns 5 --employees 20 --sweep --sweep-concurrency 10
+
+Requires the lambdas' runtime dependencies (supabase, openai, httpx, boto3, Pillow).
+"""
+
+import argparse
+import csv
+import json
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, HERE)
+
+from local_aws import (  # noqa: E402
+    AWS_DIR, BATCH_ASL_PATH, LocalLambda, LocalS3, LocalSQS, LocalStepFunctions, load_handler
+)
+from stub_llm import ProviderProfile, start_stub_llm  # noqa: E402
+from stub_supabase import SupabaseStore, now_iso, start_stub_supabase  # noqa: E402
+
+sys.path.insert(0, os.path.join(AWS_DIR, "scripts"))
+from meroka_common import tracing  # noqa: E402
+from trace_report import where_time_goes  # noqa: E402
+
+ENVIRONMENT = "loadtest"
+SAMPLES_CSV = os.path.join(os.path.dirname(AWS_DIR), "data", "sample_employee_posts.csv")
+
+# Looks like a JWT so supabase-py's key validation accepts it
+STUB_SERVICE_KEY = "stub.eyJyb2xlIjoic2VydmljZV9yb2xlIn0.stub"
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--employees", type=int, default=10)
+    parser.add_argument("--posts-per-employee", type=int, default=3)
+    parser.add_argument("--workflow", choices=["simple", "complex"], default="simple")
+    parser.add_argument("--model", default="gpt-4o", help="Model for the simple workflow")
+    parser.add_argument("--providers", help="Comma-separated providers the simple workflow may be "
+                                            "routed to (default: the --model provider)")
+    parser.add_argument("--generate-media", action="store_true")
+    parser.add_argument("--dispatch", choices=["inline", "queue", "batch"], default="inline",
+                        help="Run posts inside the orchestrator, queue them for post-worker, or "
+                             "submit them as an OpenAI batch (simple workflow)")
+    parser.add_argument("--workers", type=int, default=10,
+                        help="Concurrent post-worker invocations (queue dispatch)")
+    parser.add_argument("--batch-size", type=int, default=5, help="SQS batch size (queue dispatch)")
+    parser.add_argument("--worker-concurrency", type=int, default=5,
+                        help="Jobs run concurrently inside one post-worker batch")
+    parser.add_argument("--time-scale", type=float, default=0.05,
+                        help="Multiply every stub latency and retry interval; use 1.0 for "
+                             "real-time throughput and latency numbers")
+    parser.add_argument("--openai-latency", default="lognormal:1800:0.35")
+    parser.add_argument("--gemini-latency", default="lognormal:1400:0.35")
+    parser.add_argument("--grok-latency", default="lognormal:2200:0.45")
+    parser.add_argument("--openai-batch-latency", default="fixed:300000",
+                        help="Time for a stub OpenAI batch to complete (batch dispatch)")
+    parser.add_argument("--rate-429", type=float, default=0.0, help="429 rate for every provider")
+    parser.add_argument("--openai-429", type=float)
+    parser.add_argument("--gemini-429", type=float)
+    parser.add_argument("--grok-429", type=float)
+    parser.add_argument("--judge-mode", choices=["scores", "select"], default="scores",
+                        help="Aggregator judge answer format (complex workflow)")
+    parser.add_argument("--judge-reasoning", action="store_true", help="Ask the scores judge for reasoning")
+    parser.add_argument("--judge-malformed", type=float, default=0.0,
+                        help="Fraction of scores-judge answers the stub returns malformed")
+    parser.add_argument("--sfn-concurrency", type=int, default=50,
+                        help="Concurrent Step Functions executions (complex workflow)")
+    parser.add_argument("--rerun", action="store_true",
+                        help="Invoke the orchestrator again for the same schedule window after the run")
+    parser.add_argument("--rerun-drop", type=float, default=0.3,
+                        help="Fraction of stored posts deleted before the rerun, as if they had failed")
+    parser.add_argument("--raw-capture-rate", type=float, default=0.0,
+                        help="Fraction of posts whose raw prompts/completions are captured (to a temp dir)")
+    parser.add_argument("--cold-start-ms", type=float, default=0.0,
+                        help="Init time of a new Lambda container (scaled by --time-scale)")
+    parser.add_argument("--prewarm", action="store_true",
+                        help="Warm the run's functions from the orchestrator before dispatch")
+    parser.add_argument("--campaigns", type=int, default=1,
+                        help="Campaigns to seed, each with --employees employees and its own deadline")
+    parser.add_argument("--sweep", action="store_true",
+                        help="Run every campaign in one sweep invocation instead of one invocation each")
+    parser.add_argument("--sweep-concurrency", type=int, default=20, help="SWEEP_MAX_CONCURRENCY")
+    parser.add_argument("--sweep-token-budget", type=int, default=0, help="SWEEP_TOKEN_BUDGET (0: no limit)")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--json", dest="json_path", help="Also write the report as JSON")
+    parser.add_argument("--trace-out", help="Write span and step-latency records as JSON lines "
+                                            "(for scripts/trace_report.py)")
+    return parser.parse_args()
+
+
+def load_voice_samples() -> list[dict]:
+    with open(SAMPLES_CSV, newline="", encoding="utf-8") as f:
+        return list(csv.DictReader(f))
+
+
+def seed_campaign(store: SupabaseStore, args: argparse.Namespace, samples: list[dict], index: int = 0) -> str:
+    """
+    Create one account/channel/campaign and the requested number of employees.
+
+    Campaigns are scheduled hourly; later ones get earlier deadlines, so a
+    sweep has to reorder them.
+    """
+    account_id, channel_id, campaign_id = (str(uuid.uuid4()) for _ in range(3))
+    updated_at = now_iso()
+
+    store.seed("accounts", [{"id": account_id, "name": "Meroka", "slug": "meroka", "settings": {},
+                             "updated_at": updated_at}])
+    store.seed("channels", [{
+        "id": channel_id, "account_id": account_id, "platform": "linkedin",
+        "name": "LinkedIn", "settings": {}, "is_active": True, "updated_at": updated_at
+    }])
+    store.seed("campaigns", [{
+        "id": campaign_id,
+        "channel_id": channel_id,
+        "name": f"Load Test Voices {index}" if index else "Load Test Voices",
+        "type": "employee_voices",
+        "description": "Synthetic campaign for the offline load test",
+        "status": "active",
+        "is_active": True,
+        "workflow_type": args.workflow,
+        "posts_per_employee": args.posts_per_employee,
+        "schedule_cron": "0 * * * *",
+        "schedule_timezone": "UTC",
+        "updated_at": updated_at,
+        "workflow_config": {
+            "model": args.model,
+            **({"providers": args.providers.split(",")} if args.providers else {}),
+            "generate_media": args.generate_media,
+            "media_template": "quote_card",
+            "dispatch": args.dispatch,
+            "judge_mode": args.judge_mode,
+            "judge_reasoning": args.judge_reasoning,
+            "prewarm": args.prewarm,
+            "deadline_minutes": 30 * (args.campaigns - index)
+        }
+    }])
+
+    users, assignments, voice_samples = [], [], []
+    for i in range(args.employees):
+        user_id = str(uuid.uuid4())
+        email = f"employee{index}-{i}@loadtest.meroka.com" if index else f"employee{i}@loadtest.meroka.com"
+        sample = samples[i % len(samples)]
+        users.append({"id": user_id, "account_id": account_id, "email": email,
+                      "name": f"Employee {i}", "settings": {}})
+        assignments.append({"id": str(uuid.uuid4()), "campaign_id": campaign_id,
+                            "user_id": user_id, "is_active": True})
+        voice_samples.append({
+            "id": str(uuid.uuid4()), "email": email,
+            "example_post_1": sample["example_post_1"],
+            "example_post_2": sample["example_post_2"],
+            "example_post_3": sample["example_post_3"],
+            "blurb": sample["blurb"], "is_sample": True
+        })
+
+    store.seed("users", users)
+    store.seed("campaign_employees", assignments)
+    store.seed("employee_voice_samples", voice_samples)
+    return campaign_id
+
+
+def stub_environment(supabase_server, servers: dict) -> dict:
+    """Environment pointing the lambdas at the stub servers and local AWS names."""
+    def url(server) -> str:
+        return f"http://127.0.0.1:{server.server_port}"
+
+    return {
+        "ENVIRONMENT": ENVIRONMENT,
+        "AWS_DEFAULT_REGION": os.environ.get("AWS_DEFAULT_REGION", "us-west-2"),
+        "SUPABASE_URL": url(supabase_server),
+        "SUPABASE_SERVICE_KEY": STUB_SERVICE_KEY,
+        "OPENAI_API_KEY": "stub",
+        "OPENAI_BASE_URL": f"{url(servers['openai'])}/v1",
+        "GEMINI_API_KEY": "stub",
+        "GEMINI_API_URL": f"{url(servers['gemini'])}/v1beta/models",
+        "GROK_API_KEY": "stub",
+        "GROK_API_URL": f"{url(servers['grok'])}/v1/chat/completions",
+        "MEDIA_BUCKET": "meroka-post-media-loadtest",
+        "COMPLEX_WORKFLOW_ARN": "arn:aws:states:local:000000000000:stateMachine:meroka-complex-workflow-loadtest",
+        "BATCH_WORKFLOW_ARN": "arn:aws:states:local:000000000000:stateMachine:meroka-batch-workflow-loadtest",
+        "POST_JOBS_QUEUE_URL": "https://sqs.local/000000000000/meroka-post-jobs-loadtest",
+    }
+
+
+def percentile(values: list[float], pct: float) -> float | None:
+    """Nearest-rank percentile."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+
+def main() -> None:
+    args = parse_args()
+    samples = load_voice_samples()
+    sample_posts = [s[k] for s in samples for k in ("example_post_1", "example_post_2", "example_post_3")]
+
+    # Collect trace/metric records instead of printing one line per span
+    trace_records = []
+    trace_lock = threading.Lock()
+
+    def collect(record: dict) -> None:
+        with trace_lock:
+            trace_records.append(record)
+
+    tracing.set_sink(collect)
+
+    # ---- stub servers ----
+    store = SupabaseStore()
+    supabase_server = start_stub_supabase(store)
+
+    profiles = {}
+    servers = {}
+    for offset, name in enumerate(("openai", "gemini", "grok")):
+        rate = getattr(args, f"{name}_429")
+        profiles[name] = ProviderProfile(
+            name,
+            latency=getattr(args, f"{name}_latency"),
+            rate_429=args.rate_429 if rate is None else rate,
+            time_scale=args.time_scale,
+            seed=args.seed + offset,
+            sample_posts=sample_posts,
+            batch_latency=args.openai_batch_latency,
+            judge_malformed=args.judge_malformed
+        )
+        servers[name] = start_stub_llm(profiles[name])
+
+    os.environ.update(stub_environment(supabase_server, servers))
+    os.environ["WORKER_CONCURRENCY"] = str(args.worker_concurrency)
+    os.environ["POST_WORKER_MAX_CONCURRENCY"] = str(args.workers)
+    os.environ["PREWARM_HOLD_MS"] = str(200 * args.time_scale)
+    os.environ["SWEEP_MAX_CONCURRENCY"] = str(args.sweep_concurrency)
+    os.environ["SWEEP_TOKEN_BUDGET"] = str(args.sweep_token_budget)
+    os.environ["SWEEP_POLL_SECONDS"] = str(5 * args.time_scale)
+    if args.raw_capture_rate:
+        os.environ["RAW_CAPTURE_RATE"] = str(args.raw_capture_rate)
+        os.environ["RAW_CAPTURE_DIR"] = tempfile.mkdtemp(prefix="meroka-raw-")
+
+    campaign_ids = [seed_campaign(store, args, samples, index) for index in range(args.campaigns)]
+
+    # ---- wire the orchestrator to local AWS ----
+    lambdas = LocalLambda(ENVIRONMENT, cold_start_ms=args.cold_start_ms, time_scale=args.time_scale)
+    sfn = LocalStepFunctions(lambdas, max_workers=args.sfn_concurrency, time_scale=args.time_scale)
+    sfn.add_state_machine(os.environ["BATCH_WORKFLOW_ARN"], BATCH_ASL_PATH)
+    s3 = LocalS3()
+    sqs = LocalSQS()
+
+    orchestrator = load_handler("campaign-orchestrator")
+    orchestrator.lambda_client = lambdas
+    orchestrator.sfn_client = sfn
+    orchestrator.sqs_client = sqs
+    lambdas.handlers["campaign-orchestrator"] = orchestrator
+    if args.generate_media:
+        lambdas.handler_for("meme-renderer").s3 = s3
+
+    simple_latencies = []
+    simple_results = []
+    run_simple_workflow = orchestrator.run_simple_workflow
+
+    def timed_simple_workflow(**kwargs):
+        start = time.perf_counter()
+        result = run_simple_workflow(**kwargs)
+        simple_latencies.append(time.perf_counter() - start)
+        simple_results.append(result)
+        return result
+
+    orchestrator.run_simple_workflow = timed_simple_workflow
+
+    # Warm every handler so import time is not counted as throughput
+    for function_dir in ("context-fetcher", "llm-openai", "llm-gemini", "llm-grok", "llm-aggregator"):
+        lambdas.handler_for(function_dir)
+    store.reset_counters()
+
+    # ---- run ----
+    print(f"Running {args.workflow} workflow: {args.campaigns} x {args.employees} employees x "
+          f"{args.posts_per_employee} posts (time scale {args.time_scale})")
+    def worker(event: dict, context) -> dict:
+        return lambdas.call("campaign-orchestrator", event, "worker_handler")
+
+    # As if swept five minutes after the campaigns' hourly schedule
+    scheduled_time = datetime.now(timezone.utc).replace(minute=0, second=0, microsecond=0) + timedelta(minutes=5)
+    events = [
+        {"campaign_id": campaign_id, "trigger": "loadtest", "scheduled_time": now_iso()}
+        for campaign_id in campaign_ids
+    ]
+
+    def invoke_orchestrator() -> dict:
+        """One sweep, or one invocation per campaign at once (as separate schedules would)."""
+        if args.sweep:
+            return orchestrator.lambda_handler(
+                {"sweep": True, "trigger": "loadtest", "scheduled_time": scheduled_time.isoformat()}, None
+            )
+        with ThreadPoolExecutor(max_workers=len(events)) as pool:
+            summaries = list(pool.map(lambda e: orchestrator.lambda_handler(e, None), events))
+        if len(summaries) == 1:
+            return summaries[0]
+        return {
+            "campaigns": summaries,
+            **{key: sum(s.get(key, 0) for s in summaries) for key in ("posts_skipped", "posts_submitted")}
+        }
+
+    started, started_at = time.perf_counter(), datetime.now(timezone.utc)
+    summary = invoke_orchestrator()
+    if args.dispatch == "queue":
+        sqs.consume(worker, batch_size=args.batch_size, max_concurrency=args.workers)
+
+    if args.dispatch == "batch":
+        # One execution per provider batch; its latency covers submit-to-stored
+        outcomes = sfn.wait_all()
+        latencies = [sfn.latency_seconds(arn) for arn in outcomes]
+        collected = [o.get("output", {}).get("collected", {}) for o in outcomes.values()]
+        succeeded = sum(c.get("stored", 0) for c in collected)
+        failed = summary.get("posts_submitted", summary.get("posts_triggered", 0)) - succeeded
+    elif args.workflow == "complex":
+        outcomes = sfn.wait_all()
+        latencies = [sfn.latency_seconds(arn) for arn in outcomes]
+        succeeded = sum(1 for o in outcomes.values() if o["status"] == "SUCCEEDED")
+        failed = len(outcomes) - succeeded
+    else:
+        latencies = simple_latencies
+        succeeded = sum(1 for r in simple_results if r.get("success"))
+        failed = len(simple_results) - succeeded
+    if args.dispatch == "queue":
+        # Failed attempts were retried from the queue; only dead letters are lost
+        failed = len(sqs.dead_letters)
+
+    elapsed = time.perf_counter() - started
+    attempted = succeeded + failed
+    stored = len(store.rows("posts"))
+    near_duplicates = sum(
+        1 for post in store.rows("posts") if (post.get("generation_metadata") or {}).get("near_duplicate")
+    )
+    judges = [
+        post["generation_metadata"]["judge"] for post in store.rows("posts")
+        if (post.get("generation_metadata") or {}).get("judge")
+    ]
+    judge_logs = [row for row in store.rows("workflow_logs") if row.get("step_name") == "llm_aggregator"]
+    db_requests = store.total_requests()
+
+    report = {
+        "workflow": args.workflow,
+        "dispatch": args.dispatch,
+        "employees": args.employees,
+        "posts_per_employee": args.posts_per_employee,
+        "time_scale": args.time_scale,
+        "orchestrator_summary": summary,
+        "posts_attempted": attempted,
+        "posts_succeeded": succeeded,
+        "posts_failed": failed,
+        "posts_stored": stored,
+        "posts_near_duplicate": near_duplicates,
+        "judge": {
+            "calls": sum(j["attempts"] for j in judges),
+            "parse_failures": sum(j["parse_failures"] for j in judges),
+            "fallbacks": sum(1 for j in judges if j.get("fallback")),
+            "output_tokens_per_post": (
+                round(statistics.fmean(row.get("output_tokens") or 0 for row in judge_logs), 1)
+                if judge_logs else None
+            ),
+        } if judges else None,
+        "wall_seconds": round(elapsed, 3),
+        "posts_per_second": round(stored / elapsed, 3) if elapsed else None,
+        "latency_seconds": {
+            "p50": percentile(latencies, 50),
+            "p95": percentile(latencies, 95),
+            "p99": percentile(latencies, 99),
+            "mean": statistics.fmean(latencies) if latencies else None,
+        },
+        "db_round_trips": db_requests,
+        "db_round_trips_per_post": round(db_requests / attempted, 2) if attempted else None,
+        "db_round_trips_by_table": {
+            f"{method} {table}": count for (method, table), count in sorted(store.requests.items())
+        },
+        "lambda_invocations": dict(lambdas.invocations),
+        "cold_starts": dict(lambdas.cold_starts),
+        "prewarm": summary.get("prewarm"),
+        "queue": dict(sqs.counters) if args.dispatch == "queue" else None,
+        "media": {
+            "posts_with_media": sum(1 for post in store.rows("posts") if post.get("media_urls")),
+            "objects": Counter(key.split("/", 1)[0] for _, key in s3.objects),
+        } if args.generate_media else None,
+        "raw_capture": raw_capture_report(store) if args.raw_capture_rate else None,
+        "providers": {name: dict(p.counters) for name, p in profiles.items()},
+        "prompt_tokens_per_post": (
+            round(sum(p.counters["prompt_tokens"] for p in profiles.values()) / attempted)
+            if attempted else None
+        ),
+        "time_per_post": where_time_goes(trace_records),
+        "campaigns": campaign_report(store, started_at) if args.campaigns > 1 else None,
+        "rerun": None,
+    }
+
+    if args.rerun:
+        def run_again() -> dict:
+            rerun_summary = invoke_orchestrator()
+            if args.dispatch == "queue":
+                sqs.consume(worker, batch_size=args.batch_size, max_concurrency=args.workers)
+            if args.dispatch == "batch" or args.workflow == "complex":
+                sfn.wait_all()
+            return rerun_summary
+
+        report["rerun"] = rerun_campaign(store, profiles, args.rerun_drop, run_again)
+
+    print_report(report)
+    if args.trace_out:
+        with open(args.trace_out, "w") as f:
+            for record in trace_records:
+                f.write(json.dumps(record, default=str) + "\n")
+        print(f"\nWrote {len(trace_records)} trace records to {args.trace_out}")
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump(report, f, indent=2, default=str)
+        print(f"\nWrote {args.json_path}")
+
+    for server in (supabase_server, *servers.values()):
+        server.shutdown()
+
+
+def rerun_campaign(store: SupabaseStore, profiles: dict, drop: float, run_again) -> dict:
+    """
+    Delete a `drop` fraction of the stored posts, as if they had failed, and
+    invoke the orchestrator again for the same schedule window. Only the
+    deleted slots should be generated again; the LLM calls made show it.
+    """
+    with store.lock:
+        posts = store.rows("posts")
+        dropped = posts[:round(len(posts) * drop)]
+        dropped_ids = {post["id"] for post in dropped}
+        store.tables["posts"] = [post for post in posts if post["id"] not in dropped_ids]
+        store.tables["post_minhash"] = [
+            row for row in store.rows("post_minhash") if row["post_id"] not in dropped_ids
+        ]
+        # Their dispatches failed too, or a sweep would wait for them to expire
+        dropped_slots = {post.get("slot_key") for post in dropped}
+        for row in store.rows("post_dispatches"):
+            if row["slot_key"] in dropped_slots:
+                row["status"] = "failed"
+    kept = len(store.rows("posts"))
+
+    calls_before = llm_calls(profiles)
+    summary = run_again()
+    return {
+        "posts_dropped": len(dropped),
+        "posts_skipped": summary.get("posts_skipped"),
+        "posts_regenerated": len(store.rows("posts")) - kept,
+        "llm_calls": llm_calls(profiles) - calls_before,
+        "posts_stored": len(store.rows("posts")),
+        "duplicate_slots": len(store.rows("posts")) - len({p.get("slot_key") for p in store.rows("posts")}),
+    }
+
+
+def campaign_report(store: SupabaseStore, started_at: datetime) -> list[dict]:
+    """Per campaign, earliest deadline first: posts stored and when its last one was stored."""
+    report = []
+    for campaign in sorted(store.rows("campaigns"), key=lambda c: c["workflow_config"]["deadline_minutes"]):
+        stored = [
+            datetime.fromisoformat(post["created_at"]) for post in store.rows("posts")
+            if post["campaign_id"] == campaign["id"]
+        ]
+        report.append({
+            "campaign": campaign["name"],
+            "deadline_minutes": campaign["workflow_config"]["deadline_minutes"],
+            "posts_stored": len(stored),
+            "last_stored_seconds": round((max(stored) - started_at).total_seconds(), 3) if stored else None,
+        })
+    return report
+
+
+def raw_capture_report(store: SupabaseStore) -> dict:
+    """Captures pointed to by workflow_logs rows, each read back and checked against its hash."""
+    from meroka_common import capture
+
+    pointers = [
+        (row["execution_id"], row["metadata"]["raw"]) for row in store.rows("workflow_logs")
+        if (row.get("metadata") or {}).get("raw")
+    ]
+    unreadable = 0
+    for _, pointer in pointers:
+        try:
+            capture.read(pointer["uri"], pointer["sha256"])
+        except Exception:
+            unreadable += 1
+    raw_bytes = sum(p["bytes"] for _, p in pointers)
+    stored_bytes = sum(p["stored_bytes"] for _, p in pointers)
+    return {
+        "captures": len(pointers),
+        "posts": len({execution_id for execution_id, _ in pointers}),
+        "bytes": raw_bytes,
+        "stored_bytes": stored_bytes,
+        "compression_ratio": round(raw_bytes / stored_bytes, 2) if stored_bytes else None,
+        "unreadable": unreadable,
+        "dir": os.environ["RAW_CAPTURE_DIR"],
+    }
+
+
+def llm_calls(profiles: dict) -> int:
+    return sum(p.counters["ok"] + p.counters["429"] + p.counters["batch_requests"] for p in profiles.values())
+
+
+def print_report(report: dict) -> None:
+    def ms(value: float | None) -> str:
+        return f"{value * 1000:,.1f} ms" if value is not None else "-"
+
+    latency = report["latency_seconds"]
+    print()
+    print(f"Posts stored:        {report['posts_stored']} / {report['posts_attempted']} "
+          f"({report['posts_failed']} failed, {report['posts_near_duplicate']} flagged near-duplicate)")
+    print(f"Wall time:           {report['wall_seconds']} s")
+    print(f"Throughput:          {report['posts_per_second']} posts/s")
+    print(f"Latency p50/p95/p99: {ms(latency['p50'])} / {ms(latency['p95'])} / {ms(latency['p99'])} "
+          f"(scaled by {report['time_scale']})")
+    print(f"DB round-trips:      {report['db_round_trips']} total, "
+          f"{report['db_round_trips_per_post']} per post")
+    for key, count in report["db_round_trips_by_table"].items():
+        print(f"    {key:<32}{count:>8}")
+    print(f"Lambda invocations:  {report['lambda_invocations']}")
+    print(f"Cold starts:         {report['cold_starts']}")
+    if report["prewarm"]:
+        print(f"Prewarm:             {report['prewarm']}")
+    if report["queue"]:
+        print(f"Post job queue:      {report['queue']}")
+    if report["media"]:
+        print(f"Media:               {report['media']['posts_with_media']} posts with media, "
+              f"S3 objects by prefix {dict(report['media']['objects'])}")
+    print(f"Provider calls:      {report['providers']}")
+    if report["judge"]:
+        print(f"Judge:               {report['judge']}")
+    print(f"Prompt tokens/post:  {report['prompt_tokens_per_post']} (estimated, council + judge)")
+    if report["raw_capture"]:
+        print(f"Raw capture:         {report['raw_capture']}")
+    if "sweep_id" in report["orchestrator_summary"]:
+        sweep = report["orchestrator_summary"]
+        print(f"Sweep:               {sweep['campaigns_run']} of {sweep['campaigns_due']} due campaigns run, "
+              f"{sweep['posts_triggered']} posts, {sweep['posts_deferred']} deferred, tokens {sweep['tokens']}")
+    if report["campaigns"]:
+        print("Campaigns (earliest deadline first):")
+        for campaign in report["campaigns"]:
+            print(f"    {campaign['campaign']:<24}deadline {campaign['deadline_minutes']:>4} min  "
+                  f"{campaign['posts_stored']:>5} posts  last stored at {campaign['last_stored_seconds']} s")
+    if report["rerun"]:
+        print(f"Rerun (same window): {report['rerun']}")
+
+    time_per_post = report["time_per_post"]
+    if time_per_post["executions"]:
+        print(f"Time per post (mean wall {ms(time_per_post['wall_ms'] / 1000)}, exclusive per step):")
+        for row in time_per_post["steps"][:12]:
+            print(f"    {row['step']:<32}{ms(row['mean_ms'] / 1000):>12}  {row['share'] * 100:5.1f}%")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,312 @@
+"""
+Stub LLM Providers
+Local OpenAI, Grok (OpenAI-compatible) and Gemini endpoints with configurable
+latency distributions and 429 rates, so load tests spend no real tokens.
+
+The OpenAI stub also serves the Batch API (file upload, batches create and
+retrieve, file content): a batch finishes after one `batch_latency` sample,
+with every request answered and no 429s, as provider batches are not subject
+to the live rate limits.
+
+Chat completions that ask for the aggregator's judge_scores JSON schema get
+one 1-10 score per candidate post; `judge_malformed` is the fraction of those
+answers sent back with the wrong number of scores, to exercise judge retries.
+
+Latency specs:
+    fixed:800               always 800 ms
+    uniform:500:2000        uniform between 500 and 2000 ms
+    lognormal:1200:0.4      lognormal with median 1200 ms and sigma 0.4
+"""
+
+import json
+import math
+import random
+import re
+import threading
+import time
+import uuid
+from collections import Counter
+from email import policy
+from email.parser import BytesParser
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+GEMINI_PATH = re.compile(r"^/v1beta/models/(?P<model>[^:]+):generateContent")
+BATCH_PATH = re.compile(r"^/v1/batches/(?P<batch_id>[^/]+)$")
+FILE_CONTENT_PATH = re.compile(r"^/v1/files/(?P<file_id>[^/]+)/content$")
+
+
+def parse_latency(spec: str):
+    """Turn a latency spec into a sampler returning milliseconds."""
+    kind, *args = spec.split(":")
+    values = [float(a) for a in args]
+
+    if kind == "fixed":
+        return lambda rng: values[0]
+    if kind == "uniform":
+        return lambda rng: rng.uniform(values[0], values[1])
+    if kind == "lognormal":
+        median, sigma = values
+        return lambda rng: rng.lognormvariate(math.log(median), sigma)
+
+    raise ValueError(f"Unknown latency spec: {spec}")
+
+
+class ProviderProfile:
+    """Latency/error behaviour and counters for one stub provider."""
+
+    def __init__(
+        self,
+        name: str,
+        latency: str = "lognormal:1200:0.4",
+        rate_429: float = 0.0,
+        time_scale: float = 1.0,
+        seed: int | None = None,
+        sample_posts: list[str] | None = None,
+        batch_latency: str = "fixed:300000",
+        judge_malformed: float = 0.0
+    ):
+        self.name = name
+        self.sample_latency = parse_latency(latency)
+        self.sample_batch_latency = parse_latency(batch_latency)
+        self.rate_429 = rate_429
+        self.judge_malformed = judge_malformed
+        self.time_scale = time_scale
+        self.sample_posts = sample_posts or ["Independent medicine is worth fighting for."]
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.counters: Counter = Counter()
+        self.in_flight = 0
+        # Batch API state: file_id -> bytes, batch_id -> batch object
+        self.files: dict[str, bytes] = {}
+        self.batches: dict[str, dict] = {}
+
+    def next_outcome(self) -> tuple[float, bool, str]:
+        """Sample (latency seconds, is_rate_limited, completion text) for one request."""
+        with self.lock:
+            latency_ms = self.sample_latency(self.rng)
+            limited = self.rng.random() < self.rate_429
+            text = self.rng.choice(self.sample_posts)
+        return latency_ms / 1000 * self.time_scale, limited, text
+
+
+def estimate_tokens(text: str) -> int:
+    return max(1, len(text) // 4)
+
+
+class StubLLMHandler(BaseHTTPRequestHandler):
+    profile: ProviderProfile  # set by start_stub_llm
+
+    # Keep-alive, like the real endpoints
+    protocol_version = "HTTP/1.1"
+    # Headers and body go out as separate writes; without this, Nagle plus delayed
+    # ACKs add ~40 ms to every keep-alive response
+    disable_nagle_algorithm = True
+
+    def log_message(self, *args) -> None:
+        pass
+
+    def do_GET(self):
+        batch = BATCH_PATH.match(self.path)
+        if batch:
+            with self.profile.lock:
+                found = self.profile.batches.get(batch["batch_id"])
+                found = dict(found) if found else None
+            if found is None:
+                return self._send(404, {"error": {"message": f"No batch {batch['batch_id']}"}})
+            return self._send(200, found)
+
+        content = FILE_CONTENT_PATH.match(self.path)
+        if content and content["file_id"] in self.profile.files:
+            return self._send_bytes(200, self.profile.files[content["file_id"]], "application/jsonl")
+
+        self._send(404, {"error": {"message": f"Unknown path {self.path}"}})
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        raw = self.rfile.read(length) if length else b""
+
+        if self.path.rstrip("/") == "/v1/files":
+            return self._upload_file(raw)
+
+        body = json.loads(raw) if raw else {}
+        if self.path.rstrip("/") == "/v1/batches":
+            return self._create_batch(body)
+
+        latency, limited, text = self.profile.next_outcome()
+        with self.profile.lock:
+            self.profile.in_flight += 1
+            self.profile.counters["peak_in_flight"] = max(self.profile.counters["peak_in_flight"],
+                                                          self.profile.in_flight)
+        time.sleep(latency)
+        with self.profile.lock:
+            self.profile.in_flight -= 1
+
+        if limited:
+            self.profile.counters["429"] += 1
+            return self._send(429, {"error": {"message": "Rate limit exceeded", "type": "rate_limit"}},
+                              {"retry-after-ms": str(int(1000 * self.profile.time_scale))})
+
+        self.profile.counters["ok"] += 1
+        gemini = GEMINI_PATH.match(self.path)
+        if gemini:
+            prompt = " ".join(
+                part.get("text", "")
+                for content in body.get("contents", [])
+                for part in content.get("parts", [])
+            )
+            self.profile.counters["prompt_tokens"] += estimate_tokens(prompt)
+            return self._send(200, {
+                "candidates": [{"content": {"role": "model", "parts": [{"text": text}]}}],
+                "usageMetadata": {
+                    "promptTokenCount": estimate_tokens(prompt),
+                    "candidatesTokenCount": estimate_tokens(text)
+                }
+            })
+
+        if self.path.rstrip("/").endswith("/chat/completions"):
+            prompt = " ".join(str(m.get("content", "")) for m in body.get("messages", []))
+            # The aggregator's judge expects a SELECTED/REASONING answer or judge_scores JSON
+            if "SELECTED:" in prompt:
+                text = "SELECTED: 1\nREASONING: Strongest voice match in the stub."
+            schema = (body.get("response_format") or {}).get("json_schema") or {}
+            if schema.get("name") == "judge_scores":
+                text = self._judge_scores(prompt, "reasoning" in schema["schema"]["properties"])
+            self.profile.counters["prompt_tokens"] += estimate_tokens(prompt)
+            return self._send(200, {
+                "id": f"chatcmpl-{uuid.uuid4().hex[:12]}",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": body.get("model", "stub"),
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": text},
+                    "finish_reason": "stop"
+                }],
+                "usage": {
+                    "prompt_tokens": estimate_tokens(prompt),
+                    "completion_tokens": estimate_tokens(text),
+                    "total_tokens": estimate_tokens(prompt) + estimate_tokens(text)
+                }
+            })
+
+        self._send(404, {"error": {"message": f"Unknown path {self.path}"}})
+
+    def _judge_scores(self, prompt: str, with_reasoning: bool) -> str:
+        candidates = prompt.count("=== POST ")
+        with self.profile.lock:
+            malformed = self.profile.rng.random() < self.profile.judge_malformed
+            scores = [self.profile.rng.randint(4, 9) for _ in range(candidates - malformed)]
+            self.profile.counters["judge_malformed"] += malformed
+        answer = {"scores": scores}
+        if with_reasoning:
+            answer["reasoning"] = "Strongest voice match in the stub."
+        return json.dumps(answer, separators=(",", ":"))
+
+    # ---- Batch API ----
+
+    def _upload_file(self, raw: bytes) -> None:
+        message = BytesParser(policy=policy.HTTP).parsebytes(
+            f"Content-Type: {self.headers['Content-Type']}\r\n\r\n".encode() + raw
+        )
+        parts = {part.get_param("name", header="content-disposition"): part for part in message.iter_parts()}
+        data = parts["file"].get_payload(decode=True)
+
+        file_id = f"file-{uuid.uuid4().hex[:24]}"
+        with self.profile.lock:
+            self.profile.files[file_id] = data
+        self._send(200, {
+            "id": file_id, "object": "file", "bytes": len(data), "created_at": int(time.time()),
+            "filename": parts["file"].get_filename(), "purpose": parts["purpose"].get_content().strip(),
+            "status": "processed"
+        })
+
+    def _create_batch(self, body: dict) -> None:
+        lines = [json.loads(line) for line in self.profile.files[body["input_file_id"]].splitlines() if line.strip()]
+        batch = {
+            "id": f"batch_{uuid.uuid4().hex[:24]}",
+            "object": "batch",
+            "endpoint": body["endpoint"],
+            "input_file_id": body["input_file_id"],
+            "completion_window": body["completion_window"],
+            "metadata": body.get("metadata"),
+            "status": "in_progress",
+            "created_at": int(time.time()),
+            "request_counts": {"total": len(lines), "completed": 0, "failed": 0}
+        }
+        with self.profile.lock:
+            self.profile.batches[batch["id"]] = batch
+            self.profile.counters["batches"] += 1
+            delay = self.profile.sample_batch_latency(self.profile.rng) / 1000 * self.profile.time_scale
+        threading.Timer(delay, self._finish_batch, args=(batch["id"], lines)).start()
+        self._send(200, batch)
+
+    def _finish_batch(self, batch_id: str, lines: list[dict]) -> None:
+        profile = self.profile
+        output = []
+        for line in lines:
+            prompt = " ".join(str(m.get("content", "")) for m in line["body"].get("messages", []))
+            with profile.lock:
+                text = profile.rng.choice(profile.sample_posts)
+                profile.counters["batch_requests"] += 1
+                profile.counters["prompt_tokens"] += estimate_tokens(prompt)
+            output.append(json.dumps({
+                "id": f"batch_req_{uuid.uuid4().hex[:12]}",
+                "custom_id": line["custom_id"],
+                "response": {
+                    "status_code": 200,
+                    "request_id": uuid.uuid4().hex,
+                    "body": {
+                        "id": f"chatcmpl-{uuid.uuid4().hex[:12]}",
+                        "object": "chat.completion",
+                        "created": int(time.time()),
+                        "model": line["body"].get("model", "stub"),
+                        "choices": [{
+                            "index": 0,
+                            "message": {"role": "assistant", "content": text},
+                            "finish_reason": "stop"
+                        }],
+                        "usage": {
+                            "prompt_tokens": estimate_tokens(prompt),
+                            "completion_tokens": estimate_tokens(text),
+                            "total_tokens": estimate_tokens(prompt) + estimate_tokens(text)
+                        }
+                    }
+                },
+                "error": None
+            }))
+
+        file_id = f"file-{uuid.uuid4().hex[:24]}"
+        with profile.lock:
+            profile.files[file_id] = "\n".join(output).encode()
+            profile.batches[batch_id].update({
+                "status": "completed",
+                "output_file_id": file_id,
+                "completed_at": int(time.time()),
+                "request_counts": {"total": len(lines), "completed": len(lines), "failed": 0}
+            })
+
+    def _send(self, status: int, payload: dict, headers: dict | None = None) -> None:
+        self._send_bytes(status, json.dumps(payload).encode(), "application/json", headers)
+
+    def _send_bytes(self, status: int, data: bytes, content_type: str, headers: dict | None = None) -> None:
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+
+class StubServer(ThreadingHTTPServer):
+    # The default backlog of 5 resets connections under load-test concurrency
+    request_queue_size = 512
+    daemon_threads = True
+
+
+def start_stub_llm(profile: ProviderProfile, port: int = 0) -> ThreadingHTTPServer:
+    """Start a stub provider on a background thread; returns the server."""
+    handler = type(f"Stub{profile.name.title()}Handler", (StubLLMHandler,), {"profile": profile})
+    server = StubServer(("127.0.0.1", port), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
@@ -0,0 +1,379 @@
+"""
+Stub Supabase
+In-memory stand-in for the PostgREST endpoints the lambdas use.
+
+Supports the subset of PostgREST that supabase-py emits from these handlers:
+select (including many-to-one embeds like `users(id, email)`), eq/neq/gt/gte/
+lt/lte/in/is/ov/like/ilike(any) filters and their not. forms, order, limit, single-object responses, insert, upsert
+(on_conflict), update, delete and RPC calls registered in `rpc_handlers`.
+
+Every request is counted per (method, table) so the driver can report DB
+round-trips per post.
+"""
+
+import json
+import re
+import threading
+import uuid
+from collections import Counter
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable
+from urllib.parse import parse_qsl, urlsplit
+
+SINGLE_OBJECT = "application/vnd.pgrst.object+json"
+RESERVED_PARAMS = {"select", "order", "limit", "offset", "on_conflict", "columns"}
+
+
+class SupabaseStore:
+    """Thread-safe table storage plus request counters."""
+
+    def __init__(self):
+        self.tables: dict[str, list[dict]] = {}
+        self.lock = threading.Lock()
+        self.requests: Counter = Counter()
+        self.rpc_handlers: dict[str, Callable[["SupabaseStore", dict], Any]] = {
+            "get_post_context": get_post_context
+        }
+
+    def seed(self, table: str, rows: list[dict]) -> None:
+        with self.lock:
+            self.tables.setdefault(table, []).extend(rows)
+
+    def rows(self, table: str) -> list[dict]:
+        return self.tables.setdefault(table, [])
+
+    def total_requests(self) -> int:
+        return sum(self.requests.values())
+
+    def reset_counters(self) -> None:
+        self.requests.clear()
+
+
+def parse_select(select: str) -> list:
+    """Parse a PostgREST select list into columns and (name, sub-select) embeds."""
+    items = []
+    depth = 0
+    current = ""
+    for char in select:
+        if char == "(":
+            depth += 1
+        elif char == ")":
+            depth -= 1
+        if char == "," and depth == 0:
+            items.append(current.strip())
+            current = ""
+        else:
+            current += char
+    if current.strip():
+        items.append(current.strip())
+
+    parsed = []
+    for item in items:
+        match = re.match(r"^([\w!:]+)\((.*)\)$", item, re.DOTALL)
+        if match:
+            parsed.append((match.group(1).split("!")[0].split(":")[-1], parse_select(match.group(2))))
+        else:
+            parsed.append(item)
+    return parsed
+
+
+def project(store: SupabaseStore, table: str, row: dict, select: list) -> dict:
+    """Apply a parsed select list to a row, resolving many-to-one embeds."""
+    result = {}
+    for item in select:
+        if isinstance(item, tuple):
+            embed_table, sub_select = item
+            foreign_key = f"{embed_table.rstrip('s')}_id"
+            target = next(
+                (r for r in store.rows(embed_table) if r.get("id") == row.get(foreign_key)),
+                None
+            )
+            result[embed_table] = project(store, embed_table, target, sub_select) if target else None
+        elif item == "*":
+            result.update(row)
+        else:
+            result[item] = row.get(item)
+    return result
+
+
+def matches(row: dict, filters: list[tuple[str, str, str]]) -> bool:
+    for column, op, value in filters:
+        if op == "not":
+            inner_op, _, inner_value = value.partition(".")
+            if matches(row, [(column, inner_op, inner_value)]):
+                return False
+            continue
+        actual = row.get(column)
+        if op == "eq" and str_value(actual) != value:
+            return False
+        if op == "neq" and str_value(actual) == value:
+            return False
+        if op == "in" and str_value(actual) not in [v.strip('"') for v in value.strip("()").split(",")]:
+            return False
+        if op == "ov" and not set(str_value(v) for v in actual or []) & set(value.strip("{}").split(",")):
+            return False
+        if op == "like" and (actual is None or not like_pattern(value).fullmatch(str(actual))):
+            return False
+        if op == "ilike(any)" and (actual is None or not any(
+            like_pattern(v.strip('"'), re.IGNORECASE).fullmatch(str(actual)) for v in value.strip("{}").split(",")
+        )):
+            return False
+        if op == "is" and not ((value == "null" and actual is None) or str_value(actual) == value):
+            return False
+        if op in ("gt", "gte", "lt", "lte"):
+            if actual is None or not compare(actual, value, op):
+                return False
+    return True
+
+
+def str_value(value: Any) -> str | None:
+    if value is None:
+        return None
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    return str(value)
+
+
+def like_pattern(value: str, flags: int = 0) -> re.Pattern:
+    """LIKE pattern as a regex; PostgREST accepts * for % in URLs."""
+    return re.compile(".*".join(re.escape(part) for part in re.split(r"[%*]", value)), re.DOTALL | flags)
+
+
+def compare(actual: Any, value: str, op: str) -> bool:
+    try:
+        left, right = float(actual), float(value)
+    except (TypeError, ValueError):
+        left, right = str(actual), value
+    return {
+        "gt": left > right,
+        "gte": left >= right,
+        "lt": left < right,
+        "lte": left <= right,
+    }[op]
+
+
+def parse_filters(params: list[tuple[str, str]]) -> list[tuple[str, str, str]]:
+    filters = []
+    for key, raw in params:
+        if key in RESERVED_PARAMS or "." not in raw:
+            continue
+        op, _, value = raw.partition(".")
+        filters.append((key, op, value))
+    return filters
+
+
+def now_iso() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+# ---- database functions (registered by default in SupabaseStore.rpc_handlers) ----
+
+CAMPAIGN_CONFIG_SELECT = parse_select("*, channels(platform, account_id, accounts(name, settings))")
+
+
+def get_post_context(store: SupabaseStore, params: dict) -> dict:
+    """Stand-in for get_post_context (scripts/migrations/014_post_context_config_version.sql)."""
+    def find(table: str, column: str, value: Any) -> dict | None:
+        return next((r for r in store.rows(table) if r.get(column) == value), None)
+
+    user = find("users", "id", params["p_employee_id"])
+    if user is None:
+        raise LookupError(f"User {params['p_employee_id']} not found")
+
+    campaign = version = None
+    if params.get("p_include_campaign", True):
+        row = find("campaigns", "id", params["p_campaign_id"])
+        if row is None:
+            raise LookupError(f"Campaign {params['p_campaign_id']} not found")
+        # campaign_config_version: latest updated_at of campaign, channel, account
+        channel = find("channels", "id", row.get("channel_id")) or {}
+        account = find("accounts", "id", channel.get("account_id")) or {}
+        version = max(str(r.get("updated_at") or "") for r in (row, channel, account)) or None
+        if version != params.get("p_campaign_version"):
+            campaign = project(store, "campaigns", row, CAMPAIGN_CONFIG_SELECT)
+
+    profile = find("employee_voice_profiles", "email", user["email"])
+    return {
+        "employee": {key: user.get(key) for key in ("id", "email", "name", "settings")},
+        "voice_samples": find("employee_voice_samples", "email", user["email"]),
+        "voice_profile": profile["profile"] if profile else None,
+        "campaign": campaign,
+        "campaign_version": version
+    }
+
+
+class PostgrestHandler(BaseHTTPRequestHandler):
+    store: SupabaseStore  # set by start_stub_supabase
+
+    # Keep-alive, like the real endpoints
+    protocol_version = "HTTP/1.1"
+    # Headers and body go out as separate writes; without this, Nagle plus delayed
+    # ACKs add ~40 ms to every keep-alive response
+    disable_nagle_algorithm = True
+
+    def log_message(self, *args) -> None:
+        pass
+
+    # ---- routing ----
+
+    def do_GET(self):
+        self._dispatch("GET")
+
+    def do_POST(self):
+        self._dispatch("POST")
+
+    def do_PATCH(self):
+        self._dispatch("PATCH")
+
+    def do_DELETE(self):
+        self._dispatch("DELETE")
+
+    def _dispatch(self, method: str) -> None:
+        url = urlsplit(self.path)
+        parts = url.path.strip("/").split("/")
+        if len(parts) < 3 or parts[:2] != ["rest", "v1"]:
+            return self._send(404, {"message": f"Unknown path {url.path}"})
+
+        params = parse_qsl(url.query, keep_blank_values=True)
+        body = self._read_body()
+
+        if parts[2] == "rpc":
+            name = parts[3]
+            self.store.requests[("RPC", name)] += 1
+            handler = self.store.rpc_handlers.get(name)
+            if handler is None:
+                return self._send(404, {"message": f"Unknown function {name}"})
+            try:
+                with self.store.lock:
+                    result = handler(self.store, body or {})
+            except LookupError as e:
+                # RAISE ... USING ERRCODE = 'no_data_found'
+                return self._send(400, {"code": "P0002", "message": str(e)})
+            return self._send(200, result)
+
+        table = parts[2]
+        self.store.requests[(method, table)] += 1
+        with self.store.lock:
+            if method == "GET":
+                self._select(table, params)
+            elif method == "POST":
+                self._insert(table, params, body)
+            elif method == "PATCH":
+                self._update(table, params, body)
+            else:
+                self._delete(table, params)
+
+    # ---- operations ----
+
+    def _select(self, table: str, params: list[tuple[str, str]]) -> None:
+        query = dict(params)
+        select = parse_select(query.get("select", "*"))
+        rows = [r for r in self.store.rows(table) if matches(r, parse_filters(params))]
+
+        if "order" in query:
+            for clause in reversed(query["order"].split(",")):
+                column, _, direction = clause.partition(".")
+                rows.sort(
+                    key=lambda r: (r.get(column) is None, r.get(column) or ""),
+                    reverse=direction.startswith("desc")
+                )
+        offset = int(query.get("offset", 0))
+        if "limit" in query:
+            rows = rows[offset:offset + int(query["limit"])]
+
+        self._respond_rows(200, [project(self.store, table, r, select) for r in rows])
+
+    def _insert(self, table: str, params: list[tuple[str, str]], body: Any) -> None:
+        records = body if isinstance(body, list) else [body]
+        conflict = dict(params).get("on_conflict")
+        upsert = "resolution=merge-duplicates" in self.headers.get("Prefer", "")
+        ignore = "resolution=ignore-duplicates" in self.headers.get("Prefer", "")
+        keys = conflict.split(",") if conflict else ["id"]
+
+        written = []
+        for record in records:
+            existing = None
+            if all(record.get(k) is not None for k in keys):
+                existing = next(
+                    (r for r in self.store.rows(table) if all(r.get(k) == record[k] for k in keys)),
+                    None
+                )
+            if existing is not None:
+                if ignore:
+                    continue
+                if not upsert:
+                    return self._send(409, {
+                        "code": "23505",
+                        "message": f"duplicate key value violates unique constraint on {table}"
+                    })
+                existing.update(record)
+                existing["updated_at"] = now_iso()
+                written.append(existing)
+            else:
+                row = {"id": str(uuid.uuid4()), "created_at": now_iso(), **record}
+                self.store.rows(table).append(row)
+                written.append(row)
+
+        self._respond_rows(201, written)
+
+    def _update(self, table: str, params: list[tuple[str, str]], body: dict) -> None:
+        updated = []
+        for row in self.store.rows(table):
+            if matches(row, parse_filters(params)):
+                row.update(body)
+                updated.append(row)
+        self._respond_rows(200, updated)
+
+    def _delete(self, table: str, params: list[tuple[str, str]]) -> None:
+        filters = parse_filters(params)
+        kept, removed = [], []
+        for row in self.store.rows(table):
+            (removed if matches(row, filters) else kept).append(row)
+        self.store.tables[table] = kept
+        self._respond_rows(200, removed)
+
+    # ---- io ----
+
+    def _read_body(self) -> Any:
+        length = int(self.headers.get("Content-Length") or 0)
+        if not length:
+            return None
+        return json.loads(self.rfile.read(length))
+
+    def _respond_rows(self, status: int, rows: list[dict]) -> None:
+        if SINGLE_OBJECT in self.headers.get("Accept", ""):
+            if len(rows) != 1:
+                return self._send(406, {
+                    "code": "PGRST116",
+                    "message": "JSON object requested, multiple (or no) rows returned",
+                    "details": f"The result contains {len(rows)} rows"
+                })
+            return self._send(status, rows[0])
+
+        if "return=minimal" in self.headers.get("Prefer", ""):
+            return self._send(status, None)
+
+        self._send(status, rows)
+
+    def _send(self, status: int, payload: Any) -> None:
+        data = b"" if payload is None else json.dumps(payload, default=str).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+class StubServer(ThreadingHTTPServer):
+    # The default backlog of 5 resets connections under load-test concurrency
+    request_queue_size = 512
+    daemon_threads = True
+
+
+def start_stub_supabase(store: SupabaseStore, port: int = 0) -> ThreadingHTTPServer:
+    """Start the stub on a background thread; returns the server (see .server_port)."""
+    handler = type("BoundPostgrestHandler", (PostgrestHandler,), {"store": store})
+    server = StubServer(("127.0.0.1", port), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
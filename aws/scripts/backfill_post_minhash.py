@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Backfill the near-duplicate index (post_minhash) from existing posts.
+
+New posts are indexed as they are stored (meroka_common.near_duplicates); this
+covers posts stored before migration 015, or rebuilds every row after the
+MinHash parameters change. Posts are read in id order with keyset paging and
+their signatures upserted in chunks, keeping each post's created_at so the
+NEAR_DUPLICATE_WINDOW_DAYS window applies to them. Already indexed posts are
+left alone unless --rebuild is given. Posts without an author are skipped.
+
+Usage:
+    python scripts/backfill_post_minhash.py
+    python scripts/backfill_post_minhash.py --rebuild --chunk-size 1000
+    python scripts/backfill_post_minhash.py --dry-run
+
+Requires SUPABASE_URL and SUPABASE_SERVICE_KEY.
+"""
+
+import argparse
+import os
+import sys
+import time
+
+AWS_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(AWS_DIR, "layers", "dependencies"))
+
+from supabase import create_client  # noqa: E402
+
+from meroka_common.near_duplicates import band_keys, signature  # noqa: E402
+
+TABLE = "post_minhash"
+PAGE_SIZE = 1000
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--chunk-size", type=int, default=500, help="Rows per upsert request")
+    parser.add_argument("--dry-run", action="store_true", help="Compute signatures only; write nothing")
+    parser.add_argument("--rebuild", action="store_true", help="Overwrite rows that are already indexed")
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    supabase = create_client(os.environ["SUPABASE_URL"], os.environ["SUPABASE_SERVICE_KEY"])
+
+    started = time.perf_counter()
+    counts = {"indexed": 0, "skipped": 0}
+    pending: list[dict] = []
+    requests = 0
+
+    def flush() -> None:
+        nonlocal requests
+        if pending and not args.dry_run:
+            supabase.table(TABLE).upsert(
+                pending,
+                on_conflict="post_id",
+                ignore_duplicates=not args.rebuild,
+                returning="minimal"
+            ).execute()
+            requests += 1
+        pending.clear()
+
+    last_id = None
+    while True:
+        query = supabase.table("posts").select("id, author_id, content, original_content, created_at")
+        if last_id is not None:
+            query = query.gt("id", last_id)
+        page = query.order("id").limit(PAGE_SIZE).execute().data
+
+        for post in page:
+            # Index what was generated, not later edits (that is what the live path indexes)
+            content = post.get("original_content") or post.get("content")
+            if not post.get("author_id") or not content:
+                counts["skipped"] += 1
+                continue
+
+            sig = signature(content)
+            pending.append({
+                "post_id": post["id"],
+                "author_id": post["author_id"],
+                "signature": sig,
+                "bands": band_keys(post["author_id"], sig),
+                "created_at": post["created_at"]
+            })
+            counts["indexed"] += 1
+            if len(pending) >= args.chunk_size:
+                flush()
+
+        if len(page) < PAGE_SIZE:
+            break
+        last_id = page[-1]["id"]
+
+    flush()
+
+    elapsed = time.perf_counter() - started
+    mode = "dry run, nothing written" if args.dry_run else f"{requests} upsert request(s)"
+    print(f"{counts['indexed']} indexed, {counts['skipped']} skipped ({mode}, {elapsed:.2f}s)")
+
+
+if __name__ == "__main__":
+    main()
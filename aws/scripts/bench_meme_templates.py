@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Benchmark meme template rendering.
+
+Measures, per template: cold compile (base drawn/decoded), warm compile from the
+/tmp raw RGB atlas, and render + PNG encode time over many sample posts.
+
+Usage:
+    python scripts/bench_meme_templates.py [--iterations 50] [--csv ../data/sample_employee_posts.csv]
+"""
+
+import argparse
+import csv
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from io import BytesIO
+
+AWS_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(AWS_DIR, "layers", "dependencies"))
+sys.path.insert(0, os.path.join(AWS_DIR, "lambdas", "meme-renderer"))
+
+# Keep the benchmark's atlas away from a real /tmp cache
+CACHE_DIR = tempfile.mkdtemp(prefix="meroka-cache-bench-")
+os.environ["MEROKA_CACHE_DIR"] = CACHE_DIR
+
+import meme_templates  # noqa: E402
+from meroka_common.text_analysis import analyze_posts  # noqa: E402
+
+
+def load_posts(csv_path: str) -> list[str]:
+    """Load example posts from the voice samples CSV."""
+    posts = []
+    with open(csv_path, newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            for key in ("example_post_1", "example_post_2", "example_post_3"):
+                if row.get(key):
+                    posts.append(row[key])
+    return posts
+
+
+def percentile(values: list[float], pct: float) -> float:
+    """Nearest-rank percentile."""
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+
+def time_ms(fn) -> float:
+    start = time.perf_counter()
+    fn()
+    return (time.perf_counter() - start) * 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--iterations", type=int, default=50)
+    parser.add_argument(
+        "--csv",
+        default=os.path.join(os.path.dirname(AWS_DIR), "data", "sample_employee_posts.csv")
+    )
+    args = parser.parse_args()
+
+    posts = load_posts(args.csv)
+    analyses = analyze_posts(posts)
+    print(f"Benchmarking {len(meme_templates.TEMPLATES)} templates over "
+          f"{len(posts)} posts x {args.iterations} iterations\n")
+
+    header = f"{'template':<14}{'cold ms':>9}{'tmp ms':>9}{'render p50':>12}{'p95':>8}{'png p50':>10}"
+    print(header)
+    print("-" * len(header))
+
+    for name, spec in meme_templates.TEMPLATES.items():
+        meme_templates.atlas_cache.clear()
+        meme_templates._atlas.clear()
+        cold_ms = time_ms(lambda: meme_templates.get_compiled_template(name))
+
+        # Simulate a fresh module on a container whose /tmp is already populated
+        meme_templates.atlas_cache.clear(disk=False)
+        meme_templates._atlas.clear()
+        tmp_ms = time_ms(lambda: meme_templates.get_compiled_template(name))
+
+        render_times = []
+        encode_times = []
+        for i in range(args.iterations):
+            text, analysis = posts[i % len(posts)], analyses[i % len(posts)]
+
+            start = time.perf_counter()
+            image = meme_templates.render_template(name, text, analysis)
+            render_times.append((time.perf_counter() - start) * 1000)
+
+            encode_times.append(time_ms(lambda: image.save(BytesIO(), format="PNG")))
+
+        print(f"{name:<14}{cold_ms:>9.2f}{tmp_ms:>9.2f}"
+              f"{statistics.median(render_times):>12.2f}{percentile(render_times, 95):>8.2f}"
+              f"{statistics.median(encode_times):>10.2f}")
+
+    shutil.rmtree(CACHE_DIR, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
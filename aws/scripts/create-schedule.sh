@@ -48,7 +48,7 @@ aws scheduler create-schedule \
     --target "{
         \"Arn\": \"$LAMBDA_ARN\",
         \"RoleArn\": \"$SCHEDULER_ROLE_ARN\",
-        \"Input\": \"{\\\"campaign_id\\\": \\\"$CAMPAIGN_ID\\\", \\\"trigger\\\": \\\"scheduled\\\"}\"
+        \"Input\": \"{\\\"campaign_id\\\": \\\"$CAMPAIGN_ID\\\", \\\"trigger\\\": \\\"scheduled\\\", \\\"scheduled_time\\\": \\\"<aws.scheduler.scheduled-time>\\\"}\"
     }" \
     --state ENABLED
 
@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+"""
+Import employee voice samples from CSV into employee_voice_samples.
+
+Streams the CSV row by row, hashes each row's content and compares it with the
+content_hash stored for that email. Only new or changed rows are upserted (on
+conflict by email) in chunked batches, so re-running on an unchanged 10k-row
+sheet costs one paged read of (email, content_hash) and no writes.
+
+Reads both layouts in the repo:
+- data/sample_employee_posts.csv: email, example_post_1..3, blurb, is_sample
+- "Employee Ambassador - Data - Sheet1.csv": the ambassador sheet. The three
+  LinkedIn Posts columns become the examples (N/A slots fall back to the Slack
+  messages column) and the blurb is composed from role, generation, tone and
+  origin story.
+
+Rows edited in the app keep their content_hash, so they are only overwritten
+when the sheet row itself changes (or with --force).
+
+Emails are matched case-insensitively. The email column's unique constraint is
+case-sensitive, so an existing row is upserted under its stored spelling and
+new rows are stored lowercased.
+
+Usage:
+    python scripts/import_voice_samples.py ../data/sample_employee_posts.csv
+    python scripts/import_voice_samples.py "../Employee Ambassador - Data - Sheet1.csv" --dry-run
+    python scripts/import_voice_samples.py samples.csv --chunk-size 500 --force
+
+Requires SUPABASE_URL and SUPABASE_SERVICE_KEY.
+"""
+
+import argparse
+import csv
+import os
+import sys
+import time
+from datetime import datetime, timezone
+from typing import Iterator
+
+AWS_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(AWS_DIR, "layers", "dependencies"))
+
+from supabase import create_client  # noqa: E402
+
+from meroka_common.voice_samples import SAMPLE_FIELDS, normalize_text, sample_hash  # noqa: E402
+
+TABLE = "employee_voice_samples"
+PAGE_SIZE = 1000
+MISSING = {"", "n/a", "na", "none", "-"}
+
+# Sheet cells can hold long posts; the csv module's default limit is 128 KB
+csv.field_size_limit(16 * 1024 * 1024)
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("csv_path")
+    parser.add_argument("--chunk-size", type=int, default=500, help="Rows per upsert request")
+    parser.add_argument("--dry-run", action="store_true", help="Diff only; write nothing")
+    parser.add_argument("--force", action="store_true", help="Upsert every row even if unchanged")
+    parser.add_argument("--is-sample", action="store_true",
+                        help="Mark imported rows as samples (ambassador sheet has no is_sample column)")
+    return parser.parse_args()
+
+
+# ============================================
+# CSV READING
+# ============================================
+
+def read_rows(csv_path: str, default_is_sample: bool = False) -> Iterator[dict]:
+    """Yield voice sample rows from either supported CSV layout, one at a time."""
+    with open(csv_path, newline="", encoding="utf-8-sig") as f:
+        reader = csv.reader(f)
+        for header in reader:
+            columns = [c.strip() for c in header]
+            if "email" in columns:
+                yield from read_samples_layout(reader, columns)
+                return
+            if "Email" in columns and "LinkedIn Posts" in columns:
+                yield from read_ambassador_layout(reader, columns, default_is_sample)
+                return
+            # Banner rows above the real header (the ambassador sheet has one)
+        raise ValueError(f"{csv_path}: no recognised header row")
+
+
+def read_samples_layout(reader, columns: list[str]) -> Iterator[dict]:
+    for values in reader:
+        record = dict(zip(columns, values))
+        if not record.get("email"):
+            continue
+        yield {
+            "email": record["email"],
+            **{field: record.get(field, "") for field in SAMPLE_FIELDS},
+            "is_sample": record.get("is_sample", "").strip().lower() == "true"
+        }
+
+
+def read_ambassador_layout(reader, columns: list[str], default_is_sample: bool) -> Iterator[dict]:
+    post_indexes = [i for i, c in enumerate(columns) if c == "LinkedIn Posts"]
+    slack_index = next((i for i, c in enumerate(columns) if c.startswith("Slack messages")), None)
+
+    def cell(values: list[str], name: str) -> str:
+        index = columns.index(name) if name in columns else None
+        value = values[index].strip() if index is not None and index < len(values) else ""
+        return "" if value.lower() in MISSING else value
+
+    for values in reader:
+        email = cell(values, "Email")
+        if not email:
+            continue
+
+        posts = [values[i].strip() for i in post_indexes if i < len(values)]
+        posts = [p for p in posts if p.lower() not in MISSING]
+        if slack_index is not None and slack_index < len(values):
+            slack = values[slack_index].strip()
+            if slack.lower() not in MISSING:
+                posts.append(slack)
+
+        yield {
+            "email": email,
+            "example_post_1": posts[0] if len(posts) > 0 else "",
+            "example_post_2": posts[1] if len(posts) > 1 else "",
+            "example_post_3": posts[2] if len(posts) > 2 else "",
+            "blurb": compose_blurb(
+                name=cell(values, "Employee"),
+                generation=cell(values, "Generation"),
+                role=cell(values, "Role at Meroka"),
+                tone=cell(values, "Tone you prefer"),
+                origin=cell(values, "Origin story (Why you are at Meroka)")
+            ),
+            "is_sample": default_is_sample
+        }
+
+
+def compose_blurb(name: str, generation: str, role: str, tone: str, origin: str) -> str:
+    first_name = name.split()[0] if name else "This employee"
+    who = " ".join(part for part in (generation, role or "team member") if part)
+    sentences = [f"{first_name} is a {who} at Meroka."]
+    if tone:
+        sentences.append(f"{tone.rstrip('.')} tone.")
+    if origin:
+        sentences.append(f"Why Meroka: {origin.rstrip('.')}.")
+    return " ".join(sentences)
+
+
+# ============================================
+# DIFF + UPSERT
+# ============================================
+
+def load_stored_hashes(supabase) -> dict[str, tuple[str, str | None]]:
+    """Lowercased email -> (stored email, content_hash) for every stored row, read in pages."""
+    hashes = {}
+    offset = 0
+    while True:
+        page = (
+            supabase.table(TABLE)
+            .select("email, content_hash")
+            .order("email")
+            .range(offset, offset + PAGE_SIZE - 1)
+            .execute()
+        ).data
+        for row in page:
+            hashes.setdefault(row["email"].strip().lower(), (row["email"], row["content_hash"]))
+        if len(page) < PAGE_SIZE:
+            return hashes
+        offset += PAGE_SIZE
+
+
+def main() -> None:
+    args = parse_args()
+    supabase = create_client(os.environ["SUPABASE_URL"], os.environ["SUPABASE_SERVICE_KEY"])
+
+    started = time.perf_counter()
+    stored = load_stored_hashes(supabase)
+
+    counts = {"inserted": 0, "updated": 0, "unchanged": 0, "skipped": 0, "duplicates": 0}
+    pending: dict[str, dict] = {}
+    requests = 0
+
+    def flush() -> None:
+        nonlocal requests
+        if pending and not args.dry_run:
+            supabase.table(TABLE).upsert(
+                list(pending.values()), on_conflict="email", returning="minimal"
+            ).execute()
+            requests += 1
+        pending.clear()
+
+    outcomes: dict[str, str] = {}
+    now = datetime.now(timezone.utc).isoformat()
+    for row in read_rows(args.csv_path, args.is_sample):
+        email = row["email"].strip().lower()
+        record = {
+            "email": email,
+            **{field: normalize_text(row[field]) for field in SAMPLE_FIELDS},
+            "is_sample": row["is_sample"]
+        }
+
+        # Every content column is NOT NULL; a row without three examples can't be stored
+        missing = [field for field in SAMPLE_FIELDS if not record[field]]
+        if missing:
+            print(f"Skipping {email}: missing {', '.join(missing)}")
+            counts["skipped"] += 1
+            continue
+
+        if email in outcomes:
+            # Later rows win, as they would in the sheet; uncount the earlier one
+            counts["duplicates"] += 1
+            counts[outcomes[email]] -= 1
+
+        content_hash = sample_hash(record)
+        stored_email, stored_hash = stored.get(email, (email, None))
+        if not args.force and email in stored and stored_hash == content_hash:
+            outcomes[email] = "unchanged"
+            counts["unchanged"] += 1
+            pending.pop(email, None)
+            continue
+
+        outcomes[email] = "updated" if email in stored else "inserted"
+        counts[outcomes[email]] += 1
+        pending[email] = {**record, "email": stored_email, "content_hash": content_hash, "updated_at": now}
+        if len(pending) >= args.chunk_size:
+            flush()
+
+    flush()
+
+    elapsed = time.perf_counter() - started
+    mode = "dry run, nothing written" if args.dry_run else f"{requests} upsert request(s)"
+    print(f"{counts['inserted']} inserted, {counts['updated']} updated, "
+          f"{counts['unchanged']} unchanged, {counts['skipped']} skipped, "
+          f"{counts['duplicates']} duplicate emails ({mode}, {elapsed:.2f}s)")
+
+
+if __name__ == "__main__":
+    main()
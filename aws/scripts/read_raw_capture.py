@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Print sampled raw LLM captures (meroka_common.capture).
+
+Give a capture URI from a workflow_logs row's metadata.raw, or an execution_id
+to print every capture logged for that post (council, judge, failover) in
+step order. Captures are decompressed and checked against the sha256 in their
+log row.
+
+Usage:
+    python scripts/read_raw_capture.py s3://meroka-post-media-dev/raw/2026/10/19/<execution_id>/llm_openai-1a2b3c4d.json.zst
+    python scripts/read_raw_capture.py --execution-id exec_20261019_070000_ab12cd34_emp1a2b3c4d_p0
+
+Reading from S3 needs AWS credentials; --execution-id also needs SUPABASE_URL
+and SUPABASE_SERVICE_KEY.
+"""
+
+import argparse
+import json
+import os
+import sys
+
+AWS_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(AWS_DIR, "layers", "dependencies"))
+
+from meroka_common import capture  # noqa: E402
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("uri", nargs="?", help="s3:// or file:// URI of one capture")
+    parser.add_argument("--sha256", help="Expected hash of the uncompressed capture")
+    parser.add_argument("--execution-id", help="Print every capture logged for this execution_id")
+    args = parser.parse_args()
+    if bool(args.uri) == bool(args.execution_id):
+        parser.error("give a capture URI or --execution-id")
+    return args
+
+
+def logged_captures(execution_id: str) -> list[dict]:
+    """metadata.raw of each workflow_logs row of an execution that has one."""
+    from supabase import create_client
+
+    supabase = create_client(os.environ["SUPABASE_URL"], os.environ["SUPABASE_SERVICE_KEY"])
+    rows = (
+        supabase.table("workflow_logs")
+        .select("step_name, metadata, created_at")
+        .eq("execution_id", execution_id)
+        .order("created_at")
+        .execute()
+        .data
+    )
+    return [row["metadata"]["raw"] for row in rows if (row.get("metadata") or {}).get("raw")]
+
+
+def main() -> None:
+    args = parse_args()
+    pointers = [{"uri": args.uri, "sha256": args.sha256}] if args.uri else logged_captures(args.execution_id)
+    if not pointers:
+        sys.exit(f"No raw captures logged for {args.execution_id} (not sampled, or RAW_CAPTURE_RATE is 0)")
+
+    for pointer in pointers:
+        print(json.dumps(capture.read(pointer["uri"], pointer.get("sha256")), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -45,7 +45,7 @@ aws scheduler create-schedule \
     --target "{
         \"Arn\": \"$LAMBDA_ARN\",
         \"RoleArn\": \"$SCHEDULER_ROLE_ARN\",
-        \"Input\": \"{\\\"campaign_id\\\": \\\"$CAMPAIGN_ID\\\", \\\"trigger\\\": \\\"scheduled\\\", \\\"schedule\\\": \\\"7am\\\"}\"
+        \"Input\": \"{\\\"campaign_id\\\": \\\"$CAMPAIGN_ID\\\", \\\"trigger\\\": \\\"scheduled\\\", \\\"scheduled_time\\\": \\\"<aws.scheduler.scheduled-time>\\\", \\\"schedule\\\": \\\"7am\\\"}\"
     }" \
     --state ENABLED \
     --region "$REGION" \
@@ -57,7 +57,7 @@ aws scheduler create-schedule \
     --target "{
         \"Arn\": \"$LAMBDA_ARN\",
         \"RoleArn\": \"$SCHEDULER_ROLE_ARN\",
-        \"Input\": \"{\\\"campaign_id\\\": \\\"$CAMPAIGN_ID\\\", \\\"trigger\\\": \\\"scheduled\\\", \\\"schedule\\\": \\\"7am\\\"}\"
+        \"Input\": \"{\\\"campaign_id\\\": \\\"$CAMPAIGN_ID\\\", \\\"trigger\\\": \\\"scheduled\\\", \\\"scheduled_time\\\": \\\"<aws.scheduler.scheduled-time>\\\", \\\"schedule\\\": \\\"7am\\\"}\"
     }" \
     --state ENABLED \
     --region "$REGION"
@@ -75,7 +75,7 @@ aws scheduler create-schedule \
     --target "{
         \"Arn\": \"$LAMBDA_ARN\",
         \"RoleArn\": \"$SCHEDULER_ROLE_ARN\",
-        \"Input\": \"{\\\"campaign_id\\\": \\\"$CAMPAIGN_ID\\\", \\\"trigger\\\": \\\"scheduled\\\", \\\"schedule\\\": \\\"12pm\\\"}\"
+        \"Input\": \"{\\\"campaign_id\\\": \\\"$CAMPAIGN_ID\\\", \\\"trigger\\\": \\\"scheduled\\\", \\\"scheduled_time\\\": \\\"<aws.scheduler.scheduled-time>\\\", \\\"schedule\\\": \\\"12pm\\\"}\"
     }" \
     --state ENABLED \
     --region "$REGION" \
@@ -87,7 +87,7 @@ aws scheduler create-schedule \
     --target "{
         \"Arn\": \"$LAMBDA_ARN\",
         \"RoleArn\": \"$SCHEDULER_ROLE_ARN\",
-        \"Input\": \"{\\\"campaign_id\\\": \\\"$CAMPAIGN_ID\\\", \\\"trigger\\\": \\\"scheduled\\\", \\\"schedule\\\": \\\"12pm\\\"}\"
+        \"Input\": \"{\\\"campaign_id\\\": \\\"$CAMPAIGN_ID\\\", \\\"trigger\\\": \\\"scheduled\\\", \\\"scheduled_time\\\": \\\"<aws.scheduler.scheduled-time>\\\", \\\"schedule\\\": \\\"12pm\\\"}\"
     }" \
     --state ENABLED \
     --region "$REGION"
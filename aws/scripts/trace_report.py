@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+"""
+Summarize tracing output from the lambdas.
+
+Reads log lines (CloudWatch exports, `sam logs` output or the load test's
+--trace-out file), picks out the `{"trace": ...}` records and the EMF
+`StepLatency` lines written by meroka_common.tracing, and prints:
+
+- per-step latency percentiles (from the raw EMF values);
+- where each post's seconds go: exclusive (self) time per step averaged over
+  executions, stitched across lambdas by execution_id;
+- with --execution-id, the full cross-lambda span timeline of one execution.
+
+Usage:
+    python scripts/trace_report.py logs/*.log
+    aws logs tail /aws/lambda/meroka-llm-openai-dev --since 1h | python scripts/trace_report.py -
+    python scripts/trace_report.py /tmp/traces.jsonl --execution-id exec_20250101_120000_ab12cd34_emp1a2b3c4d_p0
+"""
+
+import argparse
+import json
+import statistics
+import sys
+from collections import defaultdict
+
+
+def parse_records(lines) -> list[dict]:
+    """Extract JSON objects from log lines, skipping anything that is not JSON."""
+    records = []
+    for line in lines:
+        start = line.find("{")
+        if start < 0:
+            continue
+        try:
+            record = json.loads(line[start:])
+        except json.JSONDecodeError:
+            continue
+        if isinstance(record, dict):
+            records.append(record)
+    return records
+
+
+def percentile(values: list[float], pct: float) -> float:
+    """Nearest-rank percentile."""
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+
+def step_latencies(records: list[dict]) -> dict[tuple[str, str], list[float]]:
+    """Raw latencies per (service, step) from EMF lines."""
+    latencies = defaultdict(list)
+    for record in records:
+        if "_aws" in record and "StepLatency" in record:
+            values = record["StepLatency"]
+            latencies[(record.get("Service"), record.get("Step"))].extend(
+                values if isinstance(values, list) else [values]
+            )
+    return latencies
+
+
+def step_table(records: list[dict]) -> list[dict]:
+    rows = []
+    for (service, step), values in sorted(step_latencies(records).items()):
+        rows.append({
+            "service": service,
+            "step": step,
+            "count": len(values),
+            "p50_ms": round(percentile(values, 50), 2),
+            "p95_ms": round(percentile(values, 95), 2),
+            "p99_ms": round(percentile(values, 99), 2),
+            "mean_ms": round(statistics.fmean(values), 2),
+        })
+    return rows
+
+
+def executions(records: list[dict]) -> dict[str, list[dict]]:
+    """Spans per execution_id, across every service, each tagged with its service."""
+    spans = defaultdict(list)
+    for record in records:
+        trace = record.get("trace")
+        if not trace or not trace.get("execution_id"):
+            continue
+        for span in trace["spans"]:
+            spans[trace["execution_id"]].append({**span, "service": trace["service"]})
+    return spans
+
+
+def link_children(spans: list[dict]) -> dict[str, list[dict]]:
+    """Children per span id, including other lambdas' root spans nested in a lambda.invoke."""
+    children = defaultdict(list)
+    roots = [s for s in spans if s["parent_id"] is None]
+    for span in spans:
+        if span["parent_id"] is not None:
+            children[span["parent_id"]].append(span)
+
+    for invoke in (s for s in spans if s["name"] == "lambda.invoke"):
+        start, end = invoke["start_ms"], invoke["start_ms"] + invoke["duration_ms"]
+        for root in roots:
+            if root["service"] != invoke["service"] and start <= root["start_ms"] <= end:
+                children[invoke["span_id"]].append(root)
+                root["linked"] = True
+    return children
+
+
+def breakdown(spans: list[dict]) -> tuple[float, dict[str, float]]:
+    """Wall time and exclusive time per step for one execution."""
+    children = link_children(spans)
+    self_ms = defaultdict(float)
+    for span in spans:
+        child_ms = sum(c["duration_ms"] for c in children.get(span["span_id"], []))
+        self_ms[span["name"]] += max(0.0, span["duration_ms"] - child_ms)
+
+    starts = [s["start_ms"] for s in spans]
+    ends = [s["start_ms"] + s["duration_ms"] for s in spans]
+    wall_ms = max(ends) - min(starts)
+
+    # Time between the lambdas of a Step Functions execution (state transitions, cold starts)
+    covered = 0.0
+    cursor = None
+    for span in sorted((s for s in spans if s["parent_id"] is None and not s.get("linked")),
+                       key=lambda s: s["start_ms"]):
+        start, end = span["start_ms"], span["start_ms"] + span["duration_ms"]
+        if cursor is None or start >= cursor:
+            covered += end - start
+            cursor = end
+        elif end > cursor:
+            covered += end - cursor
+            cursor = end
+    self_ms["(between lambdas)"] = max(0.0, wall_ms - covered)
+    return wall_ms, self_ms
+
+
+def where_time_goes(records: list[dict]) -> dict:
+    """Average wall time per post execution and average exclusive time per step."""
+    per_execution = executions(records)
+    # Orchestrator batch traces (exec_..., parent of exec_..._emp<id>_p<n>) span whole runs
+    batches = {execution_id.split("_emp")[0] for execution_id in per_execution if "_emp" in execution_id}
+    per_execution = {k: v for k, v in per_execution.items() if k not in batches}
+    if not per_execution:
+        return {"executions": 0, "wall_ms": None, "steps": []}
+
+    walls = []
+    totals = defaultdict(float)
+    for spans in per_execution.values():
+        wall_ms, self_ms = breakdown(spans)
+        walls.append(wall_ms)
+        for name, ms in self_ms.items():
+            totals[name] += ms
+
+    count = len(per_execution)
+    mean_wall = statistics.fmean(walls)
+    steps = [
+        {"step": name, "mean_ms": round(total / count, 2),
+         "share": round(total / count / mean_wall, 3) if mean_wall else None}
+        for name, total in sorted(totals.items(), key=lambda item: -item[1])
+    ]
+    return {"executions": count, "wall_ms": round(mean_wall, 2), "steps": steps}
+
+
+def print_timeline(spans: list[dict]) -> None:
+    children = link_children(spans)
+    origin = min(s["start_ms"] for s in spans)
+
+    def show(span: dict, depth: int) -> None:
+        offset = span["start_ms"] - origin
+        status = "" if span["status"] == "ok" else f"  [{span['status']}]"
+        print(f"{offset:>10.1f} {span['duration_ms']:>10.1f}  {'  ' * depth}"
+              f"{span['service']}: {span['name']}{status}")
+        for child in sorted(children.get(span["span_id"], []), key=lambda s: s["start_ms"]):
+            show(child, depth + 1)
+
+    print(f"{'start ms':>10} {'dur ms':>10}  span")
+    for root in sorted((s for s in spans if s["parent_id"] is None and not s.get("linked")),
+                       key=lambda s: s["start_ms"]):
+        show(root, 0)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("paths", nargs="+", help="Log files, or - for stdin")
+    parser.add_argument("--execution-id", help="Print the span timeline of one execution")
+    parser.add_argument("--json", action="store_true", help="Print the summary as JSON")
+    args = parser.parse_args()
+
+    records = []
+    for path in args.paths:
+        if path == "-":
+            records.extend(parse_records(sys.stdin))
+        else:
+            with open(path, encoding="utf-8") as f:
+                records.extend(parse_records(f))
+
+    if args.execution_id:
+        spans = executions(records).get(args.execution_id)
+        if not spans:
+            sys.exit(f"No spans for execution {args.execution_id}")
+        print_timeline(spans)
+        return
+
+    steps = step_table(records)
+    time_goes = where_time_goes(records)
+    if args.json:
+        print(json.dumps({"steps": steps, "per_execution": time_goes}, indent=2))
+        return
+
+    header = f"{'service':<24}{'step':<34}{'count':>7}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}"
+    print(header)
+    print("-" * len(header))
+    for row in steps:
+        print(f"{row['service']:<24}{row['step']:<34}{row['count']:>7}"
+              f"{row['p50_ms']:>10.1f}{row['p95_ms']:>10.1f}{row['p99_ms']:>10.1f}")
+
+    print(f"\nWhere the time goes ({time_goes['executions']} executions, "
+          f"mean wall {time_goes['wall_ms']} ms):")
+    for row in time_goes["steps"]:
+        share = f"{row['share'] * 100:5.1f}%" if row["share"] is not None else "-"
+        print(f"    {row['step']:<40}{row['mean_ms']:>10.1f} ms  {share}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+-- Migration: 009_token_cost_rollups
+-- Daily token/cost aggregates maintained incrementally from workflow_logs
+-- by the cost-rollup lambda (aws/lambdas/cost-rollup)
+
+-- ============================================
+-- DAILY AGGREGATES
+-- One row per (day, campaign, model, employee); day is the UTC date of
+-- workflow_logs.created_at
+-- ============================================
+
+CREATE TABLE IF NOT EXISTS token_cost_daily (
+  day DATE NOT NULL,
+  campaign_id UUID REFERENCES campaigns(id),
+  model TEXT NOT NULL,
+  employee_id UUID REFERENCES users(id),
+  calls INTEGER NOT NULL DEFAULT 0,
+  input_tokens BIGINT NOT NULL DEFAULT 0,
+  output_tokens BIGINT NOT NULL DEFAULT 0,
+  cost_usd NUMERIC(14, 6) NOT NULL DEFAULT 0,
+  unpriced_calls INTEGER NOT NULL DEFAULT 0, -- calls whose model had no price
+  updated_at TIMESTAMPTZ DEFAULT NOW(),
+  CONSTRAINT token_cost_daily_key UNIQUE NULLS NOT DISTINCT (day, campaign_id, model, employee_id)
+);
+
+CREATE INDEX IF NOT EXISTS idx_token_cost_daily_campaign ON token_cost_daily(campaign_id, day);
+CREATE INDEX IF NOT EXISTS idx_token_cost_daily_day ON token_cost_daily(day);
+
+COMMENT ON TABLE token_cost_daily IS 'Per-day token and dollar totals by campaign, model and employee, rolled up from workflow_logs';
+
+-- ============================================
+-- ROLLUP WATERMARKS
+-- Progress of incremental jobs over append-only tables, as the
+-- (created_at, id) of the last row counted. Jobs only read rows older than
+-- their late-arrival window, so rows behind the watermark are settled and
+-- each row is counted exactly once.
+-- ============================================
+
+CREATE TABLE IF NOT EXISTS rollup_watermarks (
+  job TEXT PRIMARY KEY,
+  watermark TIMESTAMPTZ,
+  watermark_id UUID,
+  updated_at TIMESTAMPTZ DEFAULT NOW()
+);
+
+-- Rollup reads workflow_logs rows with a model in (created_at, id) order
+CREATE INDEX IF NOT EXISTS idx_workflow_logs_created_model
+ON workflow_logs(created_at, id)
+WHERE model IS NOT NULL;
+
+-- ============================================
+-- APPLY A ROLLUP BATCH
+-- Adds the deltas and advances the watermark in one transaction, so a
+-- crashed run never double counts. Fails if another run moved the
+-- watermark since this one read it.
+-- ============================================
+
+CREATE OR REPLACE FUNCTION apply_token_cost_rollup(
+  p_job TEXT,
+  p_previous_watermark TIMESTAMPTZ,
+  p_previous_watermark_id UUID,
+  p_watermark TIMESTAMPTZ,
+  p_watermark_id UUID,
+  p_deltas JSONB
+)
+RETURNS INTEGER AS $$
+DECLARE
+  current_watermark TIMESTAMPTZ;
+  current_watermark_id UUID;
+  applied INTEGER;
+BEGIN
+  INSERT INTO rollup_watermarks (job) VALUES (p_job) ON CONFLICT (job) DO NOTHING;
+
+  SELECT watermark, watermark_id INTO current_watermark, current_watermark_id
+  FROM rollup_watermarks
+  WHERE job = p_job
+  FOR UPDATE;
+
+  IF current_watermark IS DISTINCT FROM p_previous_watermark
+     OR current_watermark_id IS DISTINCT FROM p_previous_watermark_id THEN
+    RAISE EXCEPTION 'Watermark for % moved from (%, %) to (%, %) during the run',
+      p_job, p_previous_watermark, p_previous_watermark_id, current_watermark, current_watermark_id;
+  END IF;
+
+  INSERT INTO token_cost_daily AS t (
+    day, campaign_id, model, employee_id,
+    calls, input_tokens, output_tokens, cost_usd, unpriced_calls, updated_at
+  )
+  SELECT
+    (d->>'day')::DATE,
+    (d->>'campaign_id')::UUID,
+    d->>'model',
+    (d->>'employee_id')::UUID,
+    (d->>'calls')::INTEGER,
+    (d->>'input_tokens')::BIGINT,
+    (d->>'output_tokens')::BIGINT,
+    (d->>'cost_usd')::NUMERIC,
+    (d->>'unpriced_calls')::INTEGER,
+    NOW()
+  FROM jsonb_array_elements(p_deltas) AS d
+  ON CONFLICT ON CONSTRAINT token_cost_daily_key DO UPDATE SET
+    calls = t.calls + EXCLUDED.calls,
+    input_tokens = t.input_tokens + EXCLUDED.input_tokens,
+    output_tokens = t.output_tokens + EXCLUDED.output_tokens,
+    cost_usd = t.cost_usd + EXCLUDED.cost_usd,
+    unpriced_calls = t.unpriced_calls + EXCLUDED.unpriced_calls,
+    updated_at = NOW();
+
+  GET DIAGNOSTICS applied = ROW_COUNT;
+
+  UPDATE rollup_watermarks
+  SET watermark = p_watermark,
+      watermark_id = p_watermark_id,
+      updated_at = NOW()
+  WHERE job = p_job;
+
+  RETURN applied;
+END;
+$$ LANGUAGE plpgsql;
+
+-- ============================================
+-- ROW LEVEL SECURITY
+-- ============================================
+
+ALTER TABLE token_cost_daily ENABLE ROW LEVEL SECURITY;
+ALTER TABLE rollup_watermarks ENABLE ROW LEVEL SECURITY;
+
+CREATE POLICY "Users can view token costs in their account" ON token_cost_daily
+  FOR SELECT USING (
+    campaign_id IN (
+      SELECT ca.id FROM campaigns ca
+      JOIN channels ch ON ca.channel_id = ch.id
+      JOIN users u ON ch.account_id = u.account_id
+      WHERE u.auth_id = auth.uid()
+    )
+  );
+
+CREATE POLICY "Service role full access token_cost_daily" ON token_cost_daily
+  FOR ALL TO service_role USING (true) WITH CHECK (true);
+
+CREATE POLICY "Service role full access rollup_watermarks" ON rollup_watermarks
+  FOR ALL TO service_role USING (true) WITH CHECK (true);
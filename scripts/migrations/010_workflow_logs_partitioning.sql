@@ -0,0 +1,330 @@
+-- Migration: 010_workflow_logs_partitioning
+-- Range-partition workflow_logs by day on created_at, compact expired days into
+-- per-execution summaries, and keep execution_id lookups working across both
+-- through the workflow_log_history view.
+--
+-- Partitions are maintained by the log-maintenance lambda
+-- (aws/lambdas/log-maintenance), which creates days ahead and compacts days
+-- older than the retention window.
+
+BEGIN;
+
+-- ============================================
+-- PARTITIONED TABLE
+-- Same columns as before; the primary key has to include the partition key
+-- ============================================
+
+ALTER TABLE workflow_logs RENAME TO workflow_logs_unpartitioned;
+
+CREATE TABLE workflow_logs (
+  id UUID DEFAULT gen_random_uuid(),
+  execution_id TEXT NOT NULL,
+  campaign_id UUID REFERENCES campaigns(id),
+  employee_id UUID REFERENCES users(id),
+  workflow_type TEXT NOT NULL,
+  step_name TEXT NOT NULL,
+  model TEXT,
+  prompt_version TEXT,
+  input_tokens INTEGER,
+  output_tokens INTEGER,
+  latency_ms INTEGER,
+  status TEXT NOT NULL, -- 'success' | 'error' | 'timeout'
+  error_message TEXT,
+  raw_input TEXT,
+  raw_output TEXT,
+  metadata JSONB DEFAULT '{}',
+  created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+  PRIMARY KEY (id, created_at)
+) PARTITION BY RANGE (created_at);
+
+-- Catches rows outside every daily partition (e.g. clock skew far ahead)
+CREATE TABLE workflow_logs_default PARTITION OF workflow_logs DEFAULT;
+
+-- ============================================
+-- PARTITION MAINTENANCE
+-- Daily partitions named workflow_logs_pYYYYMMDD, bounded on UTC midnight.
+-- SECURITY DEFINER because creating/dropping partitions needs the table owner.
+--
+-- Rows that landed in the default partition (maintenance missed its runs)
+-- would make CREATE ... PARTITION OF fail for their day. Days up to p_to with
+-- rows there are also created: the rows are moved into a new table, which is
+-- then attached as the day's partition, so compaction sees them too.
+-- ============================================
+
+CREATE OR REPLACE FUNCTION ensure_workflow_logs_partitions(p_from DATE, p_to DATE)
+RETURNS INTEGER AS $$
+DECLARE
+  d DATE;
+  partition_name TEXT;
+  day_start TIMESTAMPTZ;
+  day_end TIMESTAMPTZ;
+  created INTEGER := 0;
+BEGIN
+  FOR d IN
+    SELECT generate_series(p_from, p_to, INTERVAL '1 day')::DATE
+    UNION
+    SELECT DISTINCT (created_at AT TIME ZONE 'UTC')::DATE
+    FROM workflow_logs_default
+    WHERE created_at < (p_to + 1)::TIMESTAMP AT TIME ZONE 'UTC'
+    ORDER BY 1
+  LOOP
+    partition_name := 'workflow_logs_p' || to_char(d, 'YYYYMMDD');
+    day_start := d::TIMESTAMP AT TIME ZONE 'UTC';
+    day_end := (d + 1)::TIMESTAMP AT TIME ZONE 'UTC';
+    IF to_regclass(partition_name) IS NOT NULL THEN
+      CONTINUE;
+    END IF;
+
+    IF EXISTS (SELECT 1 FROM workflow_logs_default WHERE created_at >= day_start AND created_at < day_end) THEN
+      EXECUTE format(
+        'CREATE TABLE %I (LIKE workflow_logs INCLUDING DEFAULTS INCLUDING CONSTRAINTS)',
+        partition_name
+      );
+      EXECUTE format(
+        'WITH moved AS (
+           DELETE FROM workflow_logs_default WHERE created_at >= %L AND created_at < %L RETURNING *
+         )
+         INSERT INTO %I SELECT * FROM moved',
+        day_start, day_end, partition_name
+      );
+      EXECUTE format(
+        'ALTER TABLE workflow_logs ATTACH PARTITION %I FOR VALUES FROM (%L) TO (%L)',
+        partition_name, day_start, day_end
+      );
+    ELSE
+      EXECUTE format(
+        'CREATE TABLE %I PARTITION OF workflow_logs FOR VALUES FROM (%L) TO (%L)',
+        partition_name, day_start, day_end
+      );
+    END IF;
+    created := created + 1;
+  END LOOP;
+  RETURN created;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER SET search_path = public;
+
+CREATE OR REPLACE FUNCTION workflow_logs_partitions()
+RETURNS TABLE (partition_name TEXT, day DATE) AS $$
+  SELECT c.relname::TEXT, to_date(substring(c.relname FROM '(\d{8})$'), 'YYYYMMDD')
+  FROM pg_inherits i
+  JOIN pg_class c ON c.oid = i.inhrelid
+  WHERE i.inhparent = 'public.workflow_logs'::regclass
+    AND c.relname ~ '^workflow_logs_p\d{8}$'
+  ORDER BY 2;
+$$ LANGUAGE sql STABLE SECURITY DEFINER SET search_path = public;
+
+-- ============================================
+-- MOVE EXISTING ROWS
+-- ============================================
+
+DO $$
+DECLARE
+  first_day DATE;
+BEGIN
+  SELECT COALESCE((MIN(created_at) AT TIME ZONE 'UTC')::DATE, CURRENT_DATE)
+  INTO first_day
+  FROM workflow_logs_unpartitioned;
+
+  PERFORM ensure_workflow_logs_partitions(first_day, CURRENT_DATE + 7);
+END $$;
+
+INSERT INTO workflow_logs (
+  id, execution_id, campaign_id, employee_id, workflow_type, step_name, model,
+  prompt_version, input_tokens, output_tokens, latency_ms, status, error_message,
+  raw_input, raw_output, metadata, created_at
+)
+SELECT
+  id, execution_id, campaign_id, employee_id, workflow_type, step_name, model,
+  prompt_version, input_tokens, output_tokens, latency_ms, status, error_message,
+  raw_input, raw_output, metadata, COALESCE(created_at, NOW())
+FROM workflow_logs_unpartitioned;
+
+DROP TABLE workflow_logs_unpartitioned;
+
+-- ============================================
+-- INDEXES
+-- Down from six secondary indexes to three. Partition pruning covers
+-- created_at ranges, and the employee/model/status lookups go through
+-- token_cost_daily or a campaign/execution filter first.
+-- ============================================
+
+CREATE INDEX IF NOT EXISTS idx_workflow_logs_execution ON workflow_logs(execution_id);
+CREATE INDEX IF NOT EXISTS idx_workflow_logs_campaign ON workflow_logs(campaign_id, created_at);
+CREATE INDEX IF NOT EXISTS idx_workflow_logs_created_model
+ON workflow_logs(created_at, id)
+WHERE model IS NOT NULL;
+
+-- ============================================
+-- COMPACTED SUMMARIES
+-- One row per execution once its day has passed the retention window. steps
+-- keeps every row's fields except raw_input/raw_output, in created_at order.
+-- ============================================
+
+CREATE TABLE IF NOT EXISTS workflow_log_summaries (
+  execution_id TEXT PRIMARY KEY,
+  campaign_id UUID REFERENCES campaigns(id),
+  employee_id UUID REFERENCES users(id),
+  workflow_type TEXT,
+  started_at TIMESTAMPTZ NOT NULL,
+  finished_at TIMESTAMPTZ NOT NULL,
+  step_count INTEGER NOT NULL,
+  error_count INTEGER NOT NULL,
+  input_tokens BIGINT NOT NULL DEFAULT 0,
+  output_tokens BIGINT NOT NULL DEFAULT 0,
+  latency_ms BIGINT NOT NULL DEFAULT 0,
+  steps JSONB NOT NULL,
+  compacted_at TIMESTAMPTZ DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_workflow_log_summaries_campaign
+ON workflow_log_summaries(campaign_id, started_at);
+
+COMMENT ON TABLE workflow_log_summaries IS 'Per-execution summaries of workflow_logs days past retention; read through workflow_log_history';
+
+-- Summarize one day's partition, then drop it, in one transaction. An
+-- execution that crossed midnight is merged into its existing summary.
+CREATE OR REPLACE FUNCTION compact_workflow_logs_partition(p_day DATE)
+RETURNS JSONB AS $$
+DECLARE
+  partition_name TEXT := 'workflow_logs_p' || to_char(p_day, 'YYYYMMDD');
+  raw_rows INTEGER;
+  executions INTEGER;
+BEGIN
+  IF to_regclass(partition_name) IS NULL THEN
+    RETURN jsonb_build_object('partition', partition_name, 'rows', 0, 'executions', 0);
+  END IF;
+
+  EXECUTE format('SELECT COUNT(*) FROM %I', partition_name) INTO raw_rows;
+
+  EXECUTE format($sql$
+    INSERT INTO workflow_log_summaries AS s (
+      execution_id, campaign_id, employee_id, workflow_type, started_at, finished_at,
+      step_count, error_count, input_tokens, output_tokens, latency_ms, steps, compacted_at
+    )
+    SELECT
+      execution_id,
+      (array_agg(campaign_id) FILTER (WHERE campaign_id IS NOT NULL))[1],
+      (array_agg(employee_id) FILTER (WHERE employee_id IS NOT NULL))[1],
+      (array_agg(workflow_type ORDER BY created_at))[1],
+      MIN(created_at),
+      MAX(created_at),
+      COUNT(*),
+      COUNT(*) FILTER (WHERE status <> 'success'),
+      COALESCE(SUM(input_tokens), 0),
+      COALESCE(SUM(output_tokens), 0),
+      COALESCE(SUM(latency_ms), 0),
+      jsonb_agg(jsonb_build_object(
+        'id', id,
+        'step_name', step_name,
+        'model', model,
+        'prompt_version', prompt_version,
+        'input_tokens', input_tokens,
+        'output_tokens', output_tokens,
+        'latency_ms', latency_ms,
+        'status', status,
+        'error_message', error_message,
+        'metadata', metadata,
+        'created_at', created_at
+      ) ORDER BY created_at),
+      NOW()
+    FROM %I
+    GROUP BY execution_id
+    ON CONFLICT (execution_id) DO UPDATE SET
+      campaign_id = COALESCE(s.campaign_id, EXCLUDED.campaign_id),
+      employee_id = COALESCE(s.employee_id, EXCLUDED.employee_id),
+      started_at = LEAST(s.started_at, EXCLUDED.started_at),
+      finished_at = GREATEST(s.finished_at, EXCLUDED.finished_at),
+      step_count = s.step_count + EXCLUDED.step_count,
+      error_count = s.error_count + EXCLUDED.error_count,
+      input_tokens = s.input_tokens + EXCLUDED.input_tokens,
+      output_tokens = s.output_tokens + EXCLUDED.output_tokens,
+      latency_ms = s.latency_ms + EXCLUDED.latency_ms,
+      steps = s.steps || EXCLUDED.steps,
+      compacted_at = NOW()
+  $sql$, partition_name);
+
+  GET DIAGNOSTICS executions = ROW_COUNT;
+
+  EXECUTE format('DROP TABLE %I', partition_name);
+
+  RETURN jsonb_build_object('partition', partition_name, 'rows', raw_rows, 'executions', executions);
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER SET search_path = public;
+
+-- Only the service role runs maintenance
+REVOKE EXECUTE ON FUNCTION ensure_workflow_logs_partitions(DATE, DATE) FROM PUBLIC, anon, authenticated;
+REVOKE EXECUTE ON FUNCTION workflow_logs_partitions() FROM PUBLIC, anon, authenticated;
+REVOKE EXECUTE ON FUNCTION compact_workflow_logs_partition(DATE) FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION ensure_workflow_logs_partitions(DATE, DATE) TO service_role;
+GRANT EXECUTE ON FUNCTION workflow_logs_partitions() TO service_role;
+GRANT EXECUTE ON FUNCTION compact_workflow_logs_partition(DATE) TO service_role;
+
+-- ============================================
+-- HISTORY VIEW
+-- Live rows and compacted steps in one shape; filter on execution_id as
+-- before (raw_input/raw_output are only available for live rows)
+-- ============================================
+
+CREATE OR REPLACE VIEW workflow_log_history WITH (security_invoker = true) AS
+SELECT
+  id, execution_id, campaign_id, employee_id, workflow_type, step_name, model,
+  prompt_version, input_tokens, output_tokens, latency_ms, status, error_message,
+  metadata, created_at, 'live'::TEXT AS source
+FROM workflow_logs
+UNION ALL
+SELECT
+  (step->>'id')::UUID,
+  s.execution_id,
+  s.campaign_id,
+  s.employee_id,
+  s.workflow_type,
+  step->>'step_name',
+  step->>'model',
+  step->>'prompt_version',
+  (step->>'input_tokens')::INTEGER,
+  (step->>'output_tokens')::INTEGER,
+  (step->>'latency_ms')::INTEGER,
+  step->>'status',
+  step->>'error_message',
+  step->'metadata',
+  (step->>'created_at')::TIMESTAMPTZ,
+  'compacted'::TEXT
+FROM workflow_log_summaries s
+CROSS JOIN LATERAL jsonb_array_elements(s.steps) AS step;
+
+COMMENT ON VIEW workflow_log_history IS 'workflow_logs rows plus compacted steps; query by execution_id across the retention boundary';
+
+-- ============================================
+-- ROW LEVEL SECURITY
+-- ============================================
+
+ALTER TABLE workflow_logs ENABLE ROW LEVEL SECURITY;
+ALTER TABLE workflow_log_summaries ENABLE ROW LEVEL SECURITY;
+
+CREATE POLICY "Users can view workflow logs in their account" ON workflow_logs
+  FOR SELECT USING (
+    campaign_id IN (
+      SELECT ca.id FROM campaigns ca
+      JOIN channels ch ON ca.channel_id = ch.id
+      JOIN users u ON ch.account_id = u.account_id
+      WHERE u.auth_id = auth.uid()
+    )
+  );
+
+CREATE POLICY "Service role full access workflow_logs" ON workflow_logs
+  FOR ALL TO service_role USING (true) WITH CHECK (true);
+
+CREATE POLICY "Users can view workflow log summaries in their account" ON workflow_log_summaries
+  FOR SELECT USING (
+    campaign_id IN (
+      SELECT ca.id FROM campaigns ca
+      JOIN channels ch ON ca.channel_id = ch.id
+      JOIN users u ON ch.account_id = u.account_id
+      WHERE u.auth_id = auth.uid()
+    )
+  );
+
+CREATE POLICY "Service role full access workflow_log_summaries" ON workflow_log_summaries
+  FOR ALL TO service_role USING (true) WITH CHECK (true);
+
+COMMIT;
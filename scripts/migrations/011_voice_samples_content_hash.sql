@@ -0,0 +1,7 @@
+-- Migration: 011_voice_samples_content_hash
+-- Content fingerprint for employee_voice_samples so the CSV importer
+-- (aws/scripts/import_voice_samples.py) only writes rows whose content changed
+
+ALTER TABLE employee_voice_samples ADD COLUMN IF NOT EXISTS content_hash TEXT;
+
+COMMENT ON COLUMN employee_voice_samples.content_hash IS 'SHA-256 of the sample content last written by the importer (meroka_common.voice_samples.sample_hash); NULL rows are rewritten on the next import';
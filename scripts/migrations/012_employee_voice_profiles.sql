@@ -0,0 +1,36 @@
+-- Migration: 012_employee_voice_profiles
+-- Compact voice profiles precomputed from employee_voice_samples by the
+-- voice-profiles lambda (aws/lambdas/voice-profiles) and used in prompts in
+-- place of the raw example posts
+
+-- ============================================
+-- VOICE PROFILES
+-- One row per employee_voice_samples row. source_hash is the
+-- meroka_common.voice_samples.sample_hash of the samples the profile was
+-- built from; a profile whose hash or version no longer matches is stale.
+-- ============================================
+
+CREATE TABLE IF NOT EXISTS employee_voice_profiles (
+  email TEXT PRIMARY KEY REFERENCES employee_voice_samples(email) ON DELETE CASCADE ON UPDATE CASCADE,
+  source_hash TEXT NOT NULL,
+  profile_version INTEGER NOT NULL,
+  profile JSONB NOT NULL,
+  prompt_chars INTEGER,        -- length of the rendered profile, for comparing with the raw samples
+  sample_chars INTEGER,        -- length of the raw posts + blurb it replaces
+  created_at TIMESTAMPTZ DEFAULT NOW(),
+  updated_at TIMESTAMPTZ DEFAULT NOW()
+);
+
+COMMENT ON TABLE employee_voice_profiles IS 'Compact voice profiles (style stats, recurring phrases, openers, summary) derived from employee_voice_samples';
+
+-- ============================================
+-- ROW LEVEL SECURITY
+-- ============================================
+
+ALTER TABLE employee_voice_profiles ENABLE ROW LEVEL SECURITY;
+
+CREATE POLICY "Allow authenticated users to read voice profiles" ON employee_voice_profiles
+  FOR SELECT TO authenticated USING (true);
+
+CREATE POLICY "Service role full access employee_voice_profiles" ON employee_voice_profiles
+  FOR ALL TO service_role USING (true) WITH CHECK (true);
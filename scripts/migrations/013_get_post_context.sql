@@ -0,0 +1,72 @@
+-- Migration: 013_get_post_context
+-- One round-trip context fetch for post generation
+
+-- ============================================
+-- GET_POST_CONTEXT
+-- Employee, voice samples, stored voice profile and campaign (with its
+-- channel and account) as one JSON document, replacing the separate
+-- users -> employee_voice_samples/employee_voice_profiles and campaigns reads.
+-- Shapes match the PostgREST selects they replace:
+--   employee:      users(id, email, name, settings)
+--   voice_samples: employee_voice_samples(*) or null
+--   voice_profile: employee_voice_profiles.profile or null
+--   campaign:      campaigns(*, channels(platform, account_id, accounts(name, settings)))
+-- p_include_campaign = false leaves campaign null, for callers that already
+-- hold the campaign config.
+-- ============================================
+
+CREATE OR REPLACE FUNCTION get_post_context(
+  p_campaign_id UUID,
+  p_employee_id UUID,
+  p_include_campaign BOOLEAN DEFAULT true
+)
+RETURNS JSONB AS $$
+DECLARE
+  employee JSONB;
+  campaign JSONB;
+BEGIN
+  SELECT jsonb_build_object('id', u.id, 'email', u.email, 'name', u.name, 'settings', u.settings)
+  INTO employee
+  FROM users u
+  WHERE u.id = p_employee_id;
+
+  IF employee IS NULL THEN
+    RAISE EXCEPTION 'User % not found', p_employee_id USING ERRCODE = 'no_data_found';
+  END IF;
+
+  IF p_include_campaign THEN
+    SELECT to_jsonb(c) || jsonb_build_object('channels', (
+      SELECT jsonb_build_object(
+        'platform', ch.platform,
+        'account_id', ch.account_id,
+        'accounts', (
+          SELECT jsonb_build_object('name', a.name, 'settings', a.settings)
+          FROM accounts a WHERE a.id = ch.account_id
+        )
+      )
+      FROM channels ch WHERE ch.id = c.channel_id
+    ))
+    INTO campaign
+    FROM campaigns c
+    WHERE c.id = p_campaign_id;
+
+    IF campaign IS NULL THEN
+      RAISE EXCEPTION 'Campaign % not found', p_campaign_id USING ERRCODE = 'no_data_found';
+    END IF;
+  END IF;
+
+  RETURN jsonb_build_object(
+    'employee', employee,
+    'voice_samples', (
+      SELECT to_jsonb(s) FROM employee_voice_samples s WHERE s.email = employee->>'email'
+    ),
+    'voice_profile', (
+      SELECT p.profile FROM employee_voice_profiles p WHERE p.email = employee->>'email'
+    ),
+    'campaign', campaign
+  );
+END;
+$$ LANGUAGE plpgsql STABLE;
+
+REVOKE EXECUTE ON FUNCTION get_post_context(UUID, UUID, BOOLEAN) FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION get_post_context(UUID, UUID, BOOLEAN) TO service_role;
@@ -0,0 +1,92 @@
+-- Migration: 014_post_context_config_version
+-- Let get_post_context revalidate a cached campaign config by version
+
+-- ============================================
+-- CAMPAIGN_CONFIG_VERSION
+-- Latest updated_at across a campaign, its channel and its account; changes
+-- whenever anything in the campaign config document changes (the
+-- update_*_timestamp triggers in schema.sql bump updated_at on every UPDATE).
+-- ============================================
+
+CREATE OR REPLACE FUNCTION campaign_config_version(p_campaign_id UUID)
+RETURNS TEXT AS $$
+  SELECT to_jsonb(GREATEST(c.updated_at, ch.updated_at, a.updated_at)) #>> '{}'
+  FROM campaigns c
+  LEFT JOIN channels ch ON ch.id = c.channel_id
+  LEFT JOIN accounts a ON a.id = ch.account_id
+  WHERE c.id = p_campaign_id
+$$ LANGUAGE sql STABLE;
+
+-- ============================================
+-- GET_POST_CONTEXT
+-- Same document as 013 plus campaign_version. With p_campaign_version set to
+-- the caller's cached version, campaign is only returned when it changed
+-- (null means the cached copy is still current). p_include_campaign = false
+-- skips the campaign and the version check entirely.
+-- ============================================
+
+DROP FUNCTION IF EXISTS get_post_context(UUID, UUID, BOOLEAN);
+
+CREATE OR REPLACE FUNCTION get_post_context(
+  p_campaign_id UUID,
+  p_employee_id UUID,
+  p_include_campaign BOOLEAN DEFAULT true,
+  p_campaign_version TEXT DEFAULT NULL
+)
+RETURNS JSONB AS $$
+DECLARE
+  employee JSONB;
+  campaign JSONB;
+  version TEXT;
+BEGIN
+  SELECT jsonb_build_object('id', u.id, 'email', u.email, 'name', u.name, 'settings', u.settings)
+  INTO employee
+  FROM users u
+  WHERE u.id = p_employee_id;
+
+  IF employee IS NULL THEN
+    RAISE EXCEPTION 'User % not found', p_employee_id USING ERRCODE = 'no_data_found';
+  END IF;
+
+  IF p_include_campaign THEN
+    version := campaign_config_version(p_campaign_id);
+    IF version IS NULL THEN
+      RAISE EXCEPTION 'Campaign % not found', p_campaign_id USING ERRCODE = 'no_data_found';
+    END IF;
+
+    IF version IS DISTINCT FROM p_campaign_version THEN
+      SELECT to_jsonb(c) || jsonb_build_object('channels', (
+        SELECT jsonb_build_object(
+          'platform', ch.platform,
+          'account_id', ch.account_id,
+          'accounts', (
+            SELECT jsonb_build_object('name', a.name, 'settings', a.settings)
+            FROM accounts a WHERE a.id = ch.account_id
+          )
+        )
+        FROM channels ch WHERE ch.id = c.channel_id
+      ))
+      INTO campaign
+      FROM campaigns c
+      WHERE c.id = p_campaign_id;
+    END IF;
+  END IF;
+
+  RETURN jsonb_build_object(
+    'employee', employee,
+    'voice_samples', (
+      SELECT to_jsonb(s) FROM employee_voice_samples s WHERE s.email = employee->>'email'
+    ),
+    'voice_profile', (
+      SELECT p.profile FROM employee_voice_profiles p WHERE p.email = employee->>'email'
+    ),
+    'campaign', campaign,
+    'campaign_version', version
+  );
+END;
+$$ LANGUAGE plpgsql STABLE;
+
+REVOKE EXECUTE ON FUNCTION campaign_config_version(UUID) FROM PUBLIC, anon, authenticated;
+REVOKE EXECUTE ON FUNCTION get_post_context(UUID, UUID, BOOLEAN, TEXT) FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION campaign_config_version(UUID) TO service_role;
+GRANT EXECUTE ON FUNCTION get_post_context(UUID, UUID, BOOLEAN, TEXT) TO service_role;
@@ -0,0 +1,38 @@
+-- Migration: 015_post_minhash
+-- MinHash/LSH index for near-duplicate detection of generated posts
+-- (aws/layers/dependencies/meroka_common/near_duplicates.py)
+
+-- ============================================
+-- POST MINHASH
+-- One row per generated post, written right after the post is stored.
+-- signature: the post's 128-value MinHash signature (32-bit values)
+-- bands:     its 32 LSH band keys, each salted with the author id, so two
+--            posts share a key only if they have the same author and agree on
+--            a whole band of the signature
+-- Candidates for a new post are the rows whose bands overlap its own
+-- (bands && ...), answered by the GIN index without scanning the history.
+-- Backfill existing posts with aws/scripts/backfill_post_minhash.py.
+-- ============================================
+
+CREATE TABLE IF NOT EXISTS post_minhash (
+  post_id UUID PRIMARY KEY REFERENCES posts(id) ON DELETE CASCADE,
+  author_id UUID REFERENCES users(id) ON DELETE CASCADE,
+  signature BIGINT[] NOT NULL,
+  bands BIGINT[] NOT NULL,
+  created_at TIMESTAMPTZ DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_post_minhash_bands ON post_minhash USING GIN (bands);
+CREATE INDEX IF NOT EXISTS idx_post_minhash_author ON post_minhash(author_id);
+
+COMMENT ON TABLE post_minhash IS 'MinHash signatures and per-author LSH band keys of generated posts, for near-duplicate lookups';
+
+-- ============================================
+-- ROW LEVEL SECURITY
+-- Written and read by the lambdas only
+-- ============================================
+
+ALTER TABLE post_minhash ENABLE ROW LEVEL SECURITY;
+
+CREATE POLICY "Service role full access post_minhash" ON post_minhash
+  FOR ALL TO service_role USING (true) WITH CHECK (true);
@@ -0,0 +1,30 @@
+-- Migration: 016_post_slot_keys
+-- Deterministic slot key per generated post, so a re-invoked campaign run
+-- skips posts that were already generated instead of paying for them twice
+-- (aws/lambdas/campaign-orchestrator/handler.py)
+
+-- ============================================
+-- SLOT KEYS
+-- slot_key = '<campaign_id>:<window>:<employee_id>:<post_num>', where window
+-- is the start of the schedule window the run belongs to (e.g. 20261019T0000Z).
+-- The orchestrator lists the keys already filled for a campaign window before
+-- calling any LLM; every store path inserts with ON CONFLICT (slot_key) DO
+-- NOTHING, so a racing or retried store keeps the first post.
+-- Posts created outside the orchestrator keep slot_key NULL, which the unique
+-- constraint does not restrict.
+-- ============================================
+
+ALTER TABLE posts ADD COLUMN IF NOT EXISTS slot_key TEXT;
+
+DO $$
+BEGIN
+  IF NOT EXISTS (SELECT 1 FROM pg_constraint WHERE conname = 'posts_slot_key_key') THEN
+    ALTER TABLE posts ADD CONSTRAINT posts_slot_key_key UNIQUE (slot_key);
+  END IF;
+END $$;
+
+-- Prefix lookups for one campaign window (slot_key LIKE '<campaign_id>:<window>:%')
+CREATE INDEX IF NOT EXISTS idx_posts_slot_key_prefix ON posts (slot_key text_pattern_ops)
+  WHERE slot_key IS NOT NULL;
+
+COMMENT ON COLUMN posts.slot_key IS 'campaign:window:employee:post_num slot this post fills; NULL for posts not generated by a campaign run';
@@ -0,0 +1,40 @@
+-- Migration: 017_post_dispatches
+-- Posts handed to an asynchronous dispatch (queue, provider batch or complex
+-- workflow), so the orchestrator's sweep doesn't dispatch a slot again while
+-- its first dispatch is still running (aws/lambdas/campaign-orchestrator/handler.py)
+
+-- ============================================
+-- DISPATCHES
+-- One row per slot (see posts.slot_key, migration 016), overwritten when the
+-- slot is dispatched again. A sweep leaves a slot alone while its row is
+-- 'dispatched' and not expired; the dispatch marks it 'failed' when it gives
+-- up (dead-lettered job, failed batch, failed workflow), and expires_at covers
+-- dispatches that never report back.
+-- ============================================
+
+CREATE TABLE IF NOT EXISTS post_dispatches (
+  slot_key TEXT PRIMARY KEY,
+  campaign_id UUID REFERENCES campaigns(id) ON DELETE CASCADE,
+  execution_id TEXT NOT NULL, -- the post's execution_id
+  dispatch TEXT NOT NULL, -- 'queue' | 'batch' | 'complex'
+  batch_id TEXT, -- provider batch, for batch dispatch
+  status TEXT NOT NULL DEFAULT 'dispatched', -- 'dispatched' | 'failed'
+  dispatched_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+  expires_at TIMESTAMPTZ NOT NULL
+);
+
+-- Prefix lookups for one campaign window (slot_key LIKE '<campaign_id>:<window>:%')
+CREATE INDEX IF NOT EXISTS idx_post_dispatches_slot_key_prefix ON post_dispatches (slot_key text_pattern_ops);
+CREATE INDEX IF NOT EXISTS idx_post_dispatches_execution ON post_dispatches(execution_id);
+CREATE INDEX IF NOT EXISTS idx_post_dispatches_batch ON post_dispatches(batch_id) WHERE batch_id IS NOT NULL;
+
+COMMENT ON TABLE post_dispatches IS 'Slots handed to queue, batch or complex dispatch; a sweep skips them until the dispatch fails or expires';
+
+-- ============================================
+-- ROW LEVEL SECURITY
+-- ============================================
+
+ALTER TABLE post_dispatches ENABLE ROW LEVEL SECURITY;
+
+CREATE POLICY "Service role full access post_dispatches" ON post_dispatches
+  FOR ALL TO service_role USING (true) WITH CHECK (true);